@@ -0,0 +1,134 @@
+"""Validate the crawl planner (scraper.crawl_plan) against a crawl of a recorded corpus.
+
+The plan of a range of list pages is made on pages saved with `--recordDir`, then the same range is
+crawled from the same pages into a copy of the database (or an empty database). The predicted and
+the actual number of requests and new questions are compared. Replayed pages are served
+without waiting, so the wall clock time is predicted for the request delay of live crawls.
+
+Usage:
+    python -m benchmarks.crawl_plan --replayDir <dir> --category <str> --endPage <int> [--database <str>] [--samples 5]
+"""
+from __future__ import annotations
+
+import argparse
+import logging
+import os
+import shutil
+import tempfile
+from datetime import timedelta
+
+from db_tools.db_connection import db_connection
+from gyik_scraper import GyikScraper, crawl
+from scraper import crawl_plan, download_page, transport
+
+
+def compare(
+    replay_dir: str,
+    url_path: str,
+    start_page: int,
+    end_page: int,
+    database: str | None = None,
+    samples: int = 5,
+) -> dict:
+    """Plan and crawl a range of list pages of a recorded corpus.
+
+    Args:
+        replay_dir (str): folder of the recorded pages
+        url_path (str): path of the category (and subcategory)
+        start_page (int): first list page
+        end_page (int): last list page
+        database (str | None): database the crawl starts from, it is not modified
+        samples (int): number of list pages sampled by the planner
+    Returns:
+        dict: the plan, the actual requests and new questions, and the wall clock time of a live
+            crawl with the predicted and the actual number of requests
+    """
+    transport.set_transport("replay", directory=replay_dir)
+
+    with tempfile.TemporaryDirectory() as folder:
+        filename = os.path.join(folder, "crawl.db")
+        if database is not None:
+            shutil.copyfile(database, filename)
+        connection = db_connection(filename)
+        handler = connection.handler()
+
+        plan = crawl_plan.plan_crawl(
+            url_path, start_page, end_page, handler.get_answer_count, samples
+        )
+
+        questions_before = handler.query("SELECT COUNT(*) FROM QUESTION")[0][0]
+
+        transport.stats.reset()
+        crawl(GyikScraper(connection), start_page, end_page, url_path, None, None, None)
+        requests = transport.stats.summary()["requests"]
+
+        new_questions = (
+            handler.query("SELECT COUNT(*) FROM QUESTION")[0][0] - questions_before
+        )
+        connection.conn.close()
+
+    # Replayed pages are not waited for, live crawls wait before every request:
+    live_seconds = plan["seconds_per_request"] + download_page.REQUEST_DELAY
+    return {
+        "plan": plan,
+        "requests": requests,
+        "new_questions": new_questions,
+        "live_wall_clock": str(timedelta(seconds=round(requests * live_seconds))),
+        "predicted_live_wall_clock": str(
+            timedelta(seconds=round(plan["requests"] * live_seconds))
+        ),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Compare the crawl plan with a crawl of recorded pages."
+    )
+    parser.add_argument(
+        "--replayDir", type=str, required=True, help="Folder of the recorded pages."
+    )
+    parser.add_argument("--category", type=str, required=True, help="Main category.")
+    parser.add_argument("--subCategory", type=str, required=False, help="Subcategory.")
+    parser.add_argument(
+        "--startPage", type=int, default=1, help="First page of the question list."
+    )
+    parser.add_argument(
+        "--endPage", type=int, required=True, help="Last page of the question list."
+    )
+    parser.add_argument(
+        "--database",
+        type=str,
+        required=False,
+        help="Database the crawl starts from (copied, not modified).",
+    )
+    parser.add_argument(
+        "--samples", type=int, default=5, help="List pages sampled by the planner."
+    )
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.ERROR, format="%(asctime)s %(message)s")
+
+    url_path = (
+        f"{args.category}__{args.subCategory}" if args.subCategory else args.category
+    )
+    result = compare(
+        args.replayDir,
+        url_path,
+        args.startPage,
+        args.endPage,
+        args.database,
+        args.samples,
+    )
+
+    plan = result["plan"]
+    print(f"Plan: {plan}\n")
+    print(f"{'':<22}{'predicted':>12}{'actual':>12}")
+    for key, predicted in [
+        ("requests", plan["requests"]),
+        ("new_questions", plan["new_questions"]),
+        ("live_wall_clock", result["predicted_live_wall_clock"]),
+    ]:
+        print(f"{key:<22}{predicted:>12}{result[key]:>12}")
+    print(
+        f"\nRequest estimate error: {(plan['requests'] - result['requests']) / result['requests']:+.1%}"
+    )
@@ -0,0 +1,415 @@
+"""Latency of the db_handler and question_loader operations as the database grows.
+
+For every scale point a synthetic database is built (see benchmarks.synthetic) and kept in the data
+folder for later runs. Each variant works on a copy of it:
+    - baseline: the schema as created by db_connection,
+    - indexes: with the PROPOSED_INDEXES on the lookup columns,
+    - pragmas: with the PROPOSED_PRAGMAS,
+    - indexes+pragmas: both.
+
+Every operation is run on random existing keys (users and keywords drawn with their popularity), the
+writes are rolled back, and the median and 95th percentile latencies are reported. The results are
+appended to a JSONL file with a label (the git commit by default), so the scaling curves of versions
+can be compared with --compare.
+
+Usage:
+    python -m benchmarks.db_scaling [--scales 10000 100000 1000000] [--variants baseline indexes]
+        [--repeat 200] [--dataDir <str>] [--output <jsonl>] [--label <str>] [--compare <label>]
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import logging
+import os
+import random
+import shutil
+import statistics
+import subprocess
+import tempfile
+import time
+from dataclasses import replace
+from datetime import datetime
+from typing import Callable, Dict, List
+
+from benchmarks.synthetic import build_database, synthetic_generator
+from db_tools.db_connection import db_connection
+from db_tools.db_utils import db_handler, question_loader
+from scraper.records import Answer, Question, UserRef
+
+logger = logging.getLogger("__main__")
+
+# Indexes on the columns the handler looks up by:
+PROPOSED_INDEXES = [
+    "CREATE INDEX IF NOT EXISTS USER_USER ON USER (USER)",
+    "CREATE INDEX IF NOT EXISTS KEYWORD_KEYWORD ON KEYWORD (KEYWORD)",
+    "CREATE INDEX IF NOT EXISTS QUESTION_GYIK_ID ON QUESTION (GYIK_ID)",
+    "CREATE INDEX IF NOT EXISTS ANSWER_GYIK_ID ON ANSWER (GYIK_ID)",
+    "CREATE INDEX IF NOT EXISTS ANSWER_QUESTION_ID ON ANSWER (QUESTION_ID)",
+    "CREATE INDEX IF NOT EXISTS QUESTION_KEYWORD_LINK ON QUESTION_KEYWORD (QUESTION_ID, KEYWORD_ID)",
+]
+
+PROPOSED_PRAGMAS = [
+    "PRAGMA journal_mode = WAL",
+    "PRAGMA synchronous = NORMAL",
+    "PRAGMA cache_size = -65536",
+    "PRAGMA mmap_size = 268435456",
+    "PRAGMA temp_store = MEMORY",
+]
+
+VARIANTS = {
+    "baseline": (False, False),
+    "indexes": (True, False),
+    "pragmas": (False, True),
+    "indexes+pragmas": (True, True),
+}
+
+# Number of keys sampled for each operation:
+SAMPLE_SIZE = 1000
+
+
+def git_label() -> str:
+    """Short hash of the current commit, or the date if not in a git repository."""
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return datetime.now().strftime("%Y%m%d%H%M")
+
+
+def base_database(data_dir: str, answers: int, seed: int) -> str:
+    """File of the synthetic database of a scale point, built if not exists."""
+    filename = os.path.join(data_dir, f"synthetic_{answers}_{seed}.db")
+    if not os.path.isfile(filename):
+        logger.info(f"Building synthetic database with {answers} answers.")
+        partial = filename + ".partial"
+        if os.path.isfile(partial):
+            os.remove(partial)
+        build_database(partial, answers, seed)
+        os.rename(partial, filename)
+    return filename
+
+
+def load_question(conn, question_id: int) -> Question:
+    """Rebuild the record of a stored question, used to measure refreshes."""
+    (
+        gyik_id,
+        url,
+        title,
+        category,
+        subcategory,
+        text,
+        question_date,
+        user,
+    ) = conn.execute(
+        """
+            SELECT Q.GYIK_ID, Q.URL, Q.QUESTION_TITLE, Q.CATEGORY, Q.SUBCATEGORY,
+                gyik_text(Q.QUESTION), Q.QUESTION_DATE, U.USER
+            FROM QUESTION AS Q LEFT JOIN USER AS U ON U.ID = Q.USER_ID
+            WHERE Q.ID = ?
+            """,
+        (question_id,),
+    ).fetchone()
+    keywords = conn.execute(
+        """
+        SELECT K.KEYWORD FROM QUESTION_KEYWORD AS QK JOIN KEYWORD AS K ON K.ID = QK.KEYWORD_ID
+        WHERE QK.QUESTION_ID = ?
+        """,
+        (question_id,),
+    ).fetchall()
+    answers = conn.execute(
+        """
+        SELECT A.GYIK_ID, U.USER, A.USER_PERCENT, A.ANSWER_DATE, gyik_text(A.ANSWER_TEXT),
+            A.ANSWER_PERCENT
+        FROM ANSWER AS A LEFT JOIN USER AS U ON U.ID = A.USER_ID
+        WHERE A.QUESTION_ID = ?
+        """,
+        (question_id,),
+    ).fetchall()
+
+    return Question(
+        url=url,
+        gyik_id=gyik_id,
+        title=title,
+        category=category,
+        subcategory=subcategory,
+        question=text,
+        question_date=datetime.fromisoformat(question_date),
+        keywords=tuple(keyword for (keyword,) in keywords),
+        user=UserRef(user, None),
+        answers=tuple(
+            Answer(
+                gyik_id=answer_id,
+                user=UserRef(answer_user, user_percent),
+                answer_date=datetime.fromisoformat(answer_date),
+                answer_text=answer_text,
+                answer_percent=answer_percent,
+            )
+            for answer_id, answer_user, user_percent, answer_date, answer_text, answer_percent in answers
+        ),
+    )
+
+
+def measure(
+    operation: Callable[[int], object],
+    repeat: int,
+    rollback: Callable[[], None] | None = None,
+) -> Dict[str, float]:
+    """Latencies of an operation in microseconds.
+
+    Args:
+        operation (callable): run with the index of the repetition
+        repeat (int): number of timed runs, after a tenth as many warm up runs
+        rollback (callable | None): run after every call, not timed
+    Returns:
+        dict: median and 95th percentile latency, and operations per second
+    """
+    timings = []
+    for i in range(-(repeat // 10), repeat):
+        start = time.perf_counter_ns()
+        operation(i)
+        elapsed = time.perf_counter_ns() - start
+        if rollback is not None:
+            rollback()
+        if i >= 0:
+            timings.append(elapsed / 1000)
+
+    timings.sort()
+    return {
+        "median_us": round(statistics.median(timings), 1),
+        "p95_us": round(timings[int(len(timings) * 0.95) - 1], 1),
+        "ops": round(1_000_000 / statistics.mean(timings)),
+    }
+
+
+def run_variant(
+    filename: str, answers: int, seed: int, variant: str, repeat: int
+) -> List[dict]:
+    """Measure all operations on a copy of the database with the settings of a variant.
+
+    Returns:
+        list: one result per operation
+    """
+    indexes, pragmas = VARIANTS[variant]
+
+    with tempfile.TemporaryDirectory() as folder:
+        copy = os.path.join(folder, "benchmark.db")
+        shutil.copyfile(filename, copy)
+
+        connection = db_connection(copy)
+        conn = connection.conn
+
+        setup_ms = 0.0
+        if indexes:
+            start = time.perf_counter()
+            with conn:
+                for statement in PROPOSED_INDEXES:
+                    conn.execute(statement)
+            setup_ms = (time.perf_counter() - start) * 1000
+        if pragmas:
+            for statement in PROPOSED_PRAGMAS:
+                conn.execute(statement)
+        conn.execute("ANALYZE")
+        conn.commit()
+
+        handler = db_handler(conn)
+        loader = question_loader(handler)
+        rng = random.Random(seed)
+
+        # Existing keys, users and keywords drawn with their popularity:
+        generator = synthetic_generator(answers, seed)
+        questions = conn.execute("SELECT ID, GYIK_ID FROM QUESTION").fetchall()
+        answer_rows = conn.execute(
+            f"SELECT ID, GYIK_ID FROM ANSWER ORDER BY RANDOM() LIMIT {SAMPLE_SIZE}"
+        ).fetchall()
+        keyword_ids = [row[0] for row in conn.execute("SELECT ID FROM KEYWORD")]
+        sampled_questions = rng.choices(questions, k=SAMPLE_SIZE)
+        users = rng.choices(
+            generator.users, cum_weights=generator.user_weights, k=SAMPLE_SIZE
+        )
+        keywords = rng.choices(
+            generator.keywords, cum_weights=generator.keyword_weights, k=SAMPLE_SIZE
+        )
+        missing_ids = [
+            generator.next_question_id + 10**9 + i for i in range(SAMPLE_SIZE)
+        ]
+
+        # New questions, and stored ones with one more answer, for the loader:
+        generator.next_question_id += 10**9
+        generator.next_answer_id += 10**9
+        new_questions = [generator.question() for _ in range(min(repeat, 200))]
+        refreshed = []
+        for question_id, _ in sampled_questions[: min(repeat, 200)]:
+            question = load_question(conn, question_id)
+            refreshed.append(
+                replace(
+                    question,
+                    answers=question.answers
+                    + (generator.answer(question.question_date),),
+                )
+            )
+
+        def pick(items):
+            return lambda i: items[i % len(items)]
+
+        q, a, u, k = (
+            pick(sampled_questions),
+            pick(answer_rows),
+            pick(users),
+            pick(keywords),
+        )
+        new_question, refresh = pick(new_questions), pick(refreshed)
+
+        reads = {
+            "db_handler.get_question_id": lambda i: handler.get_question_id(q(i)[1]),
+            "db_handler.get_question_id (missing)": lambda i: handler.get_question_id(
+                missing_ids[i % SAMPLE_SIZE]
+            ),
+            "db_handler.get_answer_count": lambda i: handler.get_answer_count(q(i)[1]),
+            "db_handler.test_answer": lambda i: handler.test_answer(a(i)[1]),
+            "db_handler.add_user (existing)": lambda i: handler.add_user(u(i), None),
+            "db_handler.add_keyword (existing)": lambda i: handler.add_keyword(k(i)),
+            "db_handler.get_stored_answers": lambda i: handler.get_stored_answers(
+                q(i)[0]
+            ),
+            "db_handler.get_keyword_links": lambda i: handler.get_keyword_links(
+                q(i)[0]
+            ),
+            "db_handler.get_answer_text": lambda i: handler.get_answer_text(a(i)[0]),
+        }
+        writes = {
+            "db_handler.add_user (new)": lambda i: handler.add_user(
+                f"new_user_{i}", 50
+            ),
+            "db_handler.link_to_keyword": lambda i: handler.link_to_keyword(
+                q(i)[0], keyword_ids[i % len(keyword_ids)]
+            ),
+            "question_loader.add_question": lambda i: loader.add_question(
+                new_question(i), commit=False
+            ),
+            "question_loader.refresh_question": lambda i: loader.refresh_question(
+                refresh(i), commit=False
+            ),
+        }
+
+        results = []
+        for name, operation in reads.items():
+            results.append({"operation": name, **measure(operation, repeat)})
+        for name, operation in writes.items():
+            results.append(
+                {"operation": name, **measure(operation, repeat, conn.rollback)}
+            )
+
+        size_mb = round(os.path.getsize(copy) / 2**20, 1)
+        connection.conn.close()
+
+    for result in results:
+        result.update(
+            {
+                "answers": answers,
+                "variant": variant,
+                "size_mb": size_mb,
+                "setup_ms": round(setup_ms),
+            }
+        )
+    return results
+
+
+def compare(results: List[dict], previous: List[dict]) -> List[str]:
+    """Median latency ratios of the current results and the ones of an earlier label."""
+    earlier = {
+        (row["answers"], row["variant"], row["operation"]): row["median_us"]
+        for row in previous
+    }
+    lines = []
+    for row in results:
+        key = (row["answers"], row["variant"], row["operation"])
+        if key in earlier and row["median_us"]:
+            lines.append(
+                f"{row['answers']:>9} {row['variant']:<16} {row['operation']:<40} "
+                f"{earlier[key]:>10.1f} -> {row['median_us']:>10.1f} us "
+                f"({earlier[key] / row['median_us']:.2f}x)"
+            )
+    return lines
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Measure db_handler and question_loader latencies at growing database sizes."
+    )
+    parser.add_argument(
+        "--scales",
+        type=int,
+        nargs="+",
+        default=[10000, 100000, 1000000],
+        help="Numbers of answers of the scale points.",
+    )
+    parser.add_argument(
+        "--variants",
+        type=str,
+        nargs="+",
+        choices=list(VARIANTS),
+        default=list(VARIANTS),
+        help="Index and PRAGMA settings measured.",
+    )
+    parser.add_argument(
+        "--repeat", type=int, default=200, help="Timed runs of each operation."
+    )
+    parser.add_argument("--seed", type=int, default=1, help="Random seed.")
+    parser.add_argument(
+        "--dataDir",
+        type=str,
+        default=os.path.join(tempfile.gettempdir(), "gyik_scaling"),
+        help="Folder of the synthetic databases, reused by later runs.",
+    )
+    parser.add_argument(
+        "--output",
+        type=str,
+        default="db_scaling.jsonl",
+        help="JSONL file the results are appended to.",
+    )
+    parser.add_argument(
+        "--label", type=str, help="Label of the results. Default: git commit."
+    )
+    parser.add_argument(
+        "--compare", type=str, help="Compare with the results of this label."
+    )
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(message)s")
+
+    os.makedirs(args.dataDir, exist_ok=True)
+    label = args.label or git_label()
+
+    results = []
+    for answers in args.scales:
+        filename = base_database(args.dataDir, answers, args.seed)
+        for variant in args.variants:
+            logger.info(f"Measuring {variant} at {answers} answers.")
+            results += run_variant(filename, answers, args.seed, variant, args.repeat)
+
+    print(
+        f"{'answers':>9} {'variant':<16} {'operation':<40} {'median us':>10} {'p95 us':>10} {'ops/s':>9}"
+    )
+    for row in results:
+        print(
+            f"{row['answers']:>9} {row['variant']:<16} {row['operation']:<40} "
+            f"{row['median_us']:>10.1f} {row['p95_us']:>10.1f} {row['ops']:>9}"
+        )
+
+    with open(args.output, "a") as f:
+        for row in results:
+            f.write(json.dumps({"label": label, **row}) + "\n")
+    logger.info(f"Results of {label} appended to {args.output}")
+
+    if args.compare:
+        with open(args.output) as f:
+            previous = [
+                row for row in map(json.loads, f) if row["label"] == args.compare
+            ]
+        print(f"\nMedian latency, {args.compare} -> {label}:")
+        print("\n".join(compare(results, previous)))
@@ -0,0 +1,105 @@
+"""Measure the startup import time of the scraper and guard it against a budget.
+
+Every measurement runs `python -X importtime` in a fresh interpreter; the fastest run is reported
+with the modules taking the most time. The script fails if the budget is exceeded or if a heavy
+module, which should only be loaded when used, is imported at startup.
+
+Usage:
+    python -m benchmarks.import_time [--module gyik_scraper] [--budget 100] [--runs 5]
+"""
+from __future__ import annotations
+
+import argparse
+import subprocess
+import sys
+from typing import Dict, List
+
+# Modules which must not be loaded by importing the entry point:
+DEFERRED_MODULES = [
+    "bs4",
+    "duckdb",
+    "faker",
+    "httpx",
+    "numpy",
+    "requests",
+    "scipy",
+    "zstandard",
+    "db_tools.db_writer",
+    "db_tools.refresh_scheduler",
+]
+
+
+def measure(module: str) -> Dict[str, tuple]:
+    """Import a module in a fresh interpreter.
+
+    Args:
+        module (str): module to import
+    Returns:
+        dict: modules imported by the module (and the module itself) mapped to their self and
+            cumulative time in microseconds. Modules loaded by the interpreter startup are left out.
+    """
+    output = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+
+    # Children are listed before their parent, top level imports are not indented:
+    timings: Dict[str, tuple] = {}
+    for line in output.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_time, cumulative, name = line[len("import time:") :].split("|")
+        timings[name.strip()] = (int(self_time), int(cumulative))
+        if not name.startswith("  ") and name.strip() != module:
+            timings.clear()
+
+    return timings
+
+
+def report(timings: Dict[str, tuple], module: str, top: int) -> List[str]:
+    """Format the breakdown of the modules imported by the measured module."""
+    lines = [f"{module}: {timings[module][1] / 1000:.1f} ms"]
+    ranked = sorted(timings.items(), key=lambda item: item[1][0], reverse=True)
+    for name, (self_time, cumulative) in ranked[:top]:
+        lines.append(
+            f"  {name:<40} self: {self_time / 1000:>6.1f} ms  cumulative: {cumulative / 1000:>6.1f} ms"
+        )
+    return lines
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--module", type=str, default="gyik_scraper", help="Module to import."
+    )
+    parser.add_argument(
+        "--budget", type=float, default=100.0, help="Import time budget in ms."
+    )
+    parser.add_argument("--runs", type=int, default=5, help="Number of measurements.")
+    parser.add_argument(
+        "--top", type=int, default=15, help="Number of modules in the breakdown."
+    )
+    args = parser.parse_args()
+
+    runs = [measure(args.module) for _ in range(args.runs)]
+    fastest = min(runs, key=lambda timings: timings[args.module][1])
+    print("\n".join(report(fastest, args.module, args.top)))
+
+    errors = []
+    elapsed = fastest[args.module][1] / 1000
+    if elapsed > args.budget:
+        errors.append(
+            f"Import time {elapsed:.1f} ms exceeds budget of {args.budget} ms."
+        )
+
+    for name in DEFERRED_MODULES:
+        if name in fastest:
+            errors.append(f"{name} is imported at startup.")
+
+    if errors:
+        print("\n".join(errors), file=sys.stderr)
+        sys.exit(1)
+
+    print(f"Within budget of {args.budget} ms.")
@@ -0,0 +1,150 @@
+"""Throughput of the query catalog (db_tools.query_catalog) with and without its result cache.
+
+A synthetic database (see benchmarks.synthetic) in WAL mode with the indexes of the catalog is read
+by threads running the hot dashboard queries (latest questions of the categories, answers of the
+most active users), while a writer loads further questions with question_loader every `--pause`
+seconds. Each load invalidates the cache. The reads per second, the hit rate, and whether the
+cached results after the last load equal the results of the database are reported.
+
+Usage:
+    python -m benchmarks.query_cache [--answers 200000] [--threads 4] [--seconds 5] [--pause 0.5]
+"""
+from __future__ import annotations
+
+import argparse
+import logging
+import os
+import random
+import tempfile
+import threading
+import time
+
+from benchmarks.synthetic import CATEGORIES, build_database, synthetic_generator
+from db_tools.db_connection import db_connection
+from db_tools.db_utils import question_loader
+from db_tools.query_catalog import DEFAULTS, QUERIES, install, query_catalog
+from db_tools.snapshot import enable_wal
+
+
+def hot_queries(filename: str, users: int) -> list:
+    """The queries of a dashboard: latest questions of each category, answers of active users."""
+    connection = db_connection(filename).conn
+    active = connection.execute(
+        """
+        SELECT U.USER FROM ANSWER AS A JOIN USER AS U ON U.ID = A.USER_ID
+        GROUP BY U.USER ORDER BY COUNT(*) DESC LIMIT :users
+        """,
+        {"users": users},
+    ).fetchall()
+    connection.close()
+
+    return [("latest_questions", {"category": category}) for category in CATEGORIES] + [
+        ("user_answers", {"user": user}) for (user,) in active
+    ]
+
+
+def measure(
+    filename: str,
+    queries: list,
+    cache_size: int,
+    threads: int,
+    seconds: float,
+    pause: float,
+) -> dict:
+    """Run the queries from reader threads while a writer loads questions.
+
+    Args:
+        filename (str): database file
+        queries (list): (name, parameters) of the queries, drawn at random
+        cache_size (int): size of the result cache, 0 disables it
+        threads (int): number of reader threads
+        seconds (float): duration of the reads
+        pause (float): seconds between two loads of the writer
+    Returns:
+        dict: reads per second, hit rate, loads, and whether the last results were current
+    """
+    catalog = query_catalog(filename, cache_size)
+    stopped = threading.Event()
+    reads = [0] * threads
+
+    def reader(index: int) -> None:
+        generator = random.Random(index)
+        while not stopped.is_set():
+            name, parameters = generator.choice(queries)
+            catalog.run(name, **parameters)
+            reads[index] += 1
+
+    def writer() -> None:
+        connection = db_connection(filename)
+        loader = question_loader(connection.handler())
+        for question in synthetic_generator(
+            10_000, seed=int(cache_size) + 7
+        ).questions():
+            if stopped.wait(pause):
+                break
+            loader.add_question(question)
+            loaded.append(question)
+        connection.conn.close()
+
+    loaded: list = []
+    workers = [threading.Thread(target=reader, args=(i,)) for i in range(threads)]
+    workers.append(threading.Thread(target=writer))
+    for worker in workers:
+        worker.start()
+    time.sleep(seconds)
+    stopped.set()
+    for worker in workers:
+        worker.join()
+
+    # Results after the loads are the same as without the cache:
+    direct = db_connection(filename).conn
+    current = all(
+        catalog.run(name, **parameters)
+        == tuple(direct.execute(QUERIES[name], {**DEFAULTS, **parameters}).fetchall())
+        for name, parameters in queries
+    )
+    direct.close()
+    stats = catalog.stats()
+    catalog.close()
+
+    return {
+        "reads_per_second": round(sum(reads) / seconds),
+        "hit_rate": round(stats["hits"] / max(stats["hits"] + stats["misses"], 1), 3),
+        "loads": len(loaded),
+        "current": current,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Measure the query catalog with and without its result cache."
+    )
+    parser.add_argument(
+        "--answers", type=int, default=200000, help="Answers in the database."
+    )
+    parser.add_argument("--threads", type=int, default=4, help="Reader threads.")
+    parser.add_argument(
+        "--seconds", type=float, default=5.0, help="Duration of each measurement."
+    )
+    parser.add_argument(
+        "--pause", type=float, default=0.5, help="Seconds between two loads."
+    )
+    parser.add_argument(
+        "--users", type=int, default=20, help="Active users whose answers are read."
+    )
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.ERROR, format="%(asctime)s %(message)s")
+
+    with tempfile.TemporaryDirectory() as folder:
+        filename = os.path.join(folder, "catalog.db")
+        build_database(filename, args.answers)
+        enable_wal(filename)
+        install(filename)
+
+        queries = hot_queries(filename, args.users)
+        for label, cache_size in [("no cache", 0), ("cache", 256)]:
+            result = measure(
+                filename, queries, cache_size, args.threads, args.seconds, args.pause
+            )
+            print(f"{label:<10} {result}")
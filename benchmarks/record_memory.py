@@ -0,0 +1,94 @@
+"""Compare peak memory of the dict and the record representation of parsed answers.
+
+Each representation is built in a fresh interpreter, so the peak RSS values are not mixed up.
+
+Usage:
+    python -m benchmarks.record_memory --answers 10000
+"""
+from __future__ import annotations
+
+import argparse
+import subprocess
+import sys
+from datetime import datetime
+
+# Answer text of typical length:
+ANSWER_TEXT = (
+    "Szerintem ez teljesen rendben van, de érdemes megkérdezni egy szakembert is. " * 3
+)
+
+
+def build_dicts(count: int) -> list:
+    """Build answers as nested dictionaries, as the parsers used to do."""
+    return [
+        {
+            "GYIK_ID": 10_000_000 + i,
+            "USER": {"USER": f"user_{i % 1000}", "USER_PERCENT": 70},
+            "ANSWER_DATE": datetime(2020, 1, 1),
+            "ANSWER_TEXT": ANSWER_TEXT + str(i),
+            "USER_PERCENT": 70,
+            "ANSWER_PERCENT": 50,
+            "USER_ID": i % 1000,
+            "QUESTION_ID": i // 10,
+        }
+        for i in range(count)
+    ]
+
+
+def build_records(count: int) -> list:
+    """Build answers as records."""
+    from scraper.records import Answer, UserRef
+
+    return [
+        Answer(
+            gyik_id=10_000_000 + i,
+            user=UserRef(f"user_{i % 1000}", 70),
+            answer_date=datetime(2020, 1, 1),
+            answer_text=ANSWER_TEXT + str(i),
+            answer_percent=50,
+        )
+        for i in range(count)
+    ]
+
+
+def measure(representation: str, count: int) -> int:
+    """Return the peak RSS in kilobytes of an interpreter building the answers."""
+    code = (
+        "import resource\n"
+        "from benchmarks.record_memory import build_dicts, build_records\n"
+        f"data = build_{representation}({count})\n"
+        "print(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)\n"
+    )
+    output = subprocess.run(
+        [sys.executable, "-c", code], capture_output=True, text=True, check=True
+    )
+    return int(output.stdout.strip())
+
+
+def measure_baseline() -> int:
+    """Return the peak RSS in kilobytes of an interpreter doing nothing but the imports."""
+    code = (
+        "import resource\n"
+        "import benchmarks.record_memory, scraper.records\n"
+        "print(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)\n"
+    )
+    output = subprocess.run(
+        [sys.executable, "-c", code], capture_output=True, text=True, check=True
+    )
+    return int(output.stdout.strip())
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--answers", type=int, default=10_000, help="Number of answers."
+    )
+    args = parser.parse_args()
+
+    baseline = measure_baseline()
+    for representation in ["dicts", "records"]:
+        peak = measure(representation, args.answers) - baseline
+        per_10k = peak * 10_000 / args.answers
+        print(
+            f"{representation:>8}: {peak:>8} kB peak RSS, {per_10k:>8.0f} kB per 10k answers"
+        )
@@ -0,0 +1,139 @@
+"""Commit latency of a writer while snapshots of its database are taken (see db_tools.snapshot).
+
+A synthetic database (see benchmarks.synthetic) with the indexes proposed by benchmarks.db_scaling is
+switched to WAL mode, and a writer thread loads
+further synthetic questions with question_loader, committing every question as the crawler does.
+The latencies of the commits are measured without a snapshot, and while snapshots are taken with
+each duty cycle. Every snapshot is checked with `PRAGMA integrity_check`.
+
+Usage:
+    python -m benchmarks.snapshot_latency [--answers 200000] [--dutyCycles 1.0 0.5 0.2] [--pages 256]
+"""
+from __future__ import annotations
+
+import argparse
+import logging
+import os
+import sqlite3
+import statistics
+import tempfile
+import threading
+import time
+from typing import List
+
+from benchmarks.db_scaling import PROPOSED_INDEXES
+from benchmarks.synthetic import build_database, synthetic_generator
+from db_tools.db_connection import db_connection
+from db_tools.db_utils import question_loader
+from db_tools.snapshot import enable_wal, online_snapshot
+
+
+class committing_writer(threading.Thread):
+    """Loads synthetic questions one commit at a time, recording the commit latencies."""
+
+    def __init__(
+        self: committing_writer, filename: str, answers: int, pause: float
+    ) -> None:
+        super().__init__(daemon=True)
+        self.filename = filename
+        self.answers = answers
+        self.pause = pause
+        self.latencies: List[float] = []
+        self.stopped = threading.Event()
+
+    def run(self: committing_writer) -> None:
+        connection = db_connection(self.filename)
+        handler = connection.handler()
+        loader = question_loader(handler)
+
+        # Other seed than the database, so the questions are new:
+        for question in synthetic_generator(self.answers, seed=99).questions():
+            if self.stopped.is_set():
+                break
+            loader.add_question(question, commit=False)
+            start = time.perf_counter()
+            handler.commit()
+            self.latencies.append(time.perf_counter() - start)
+            time.sleep(self.pause)
+
+        connection.conn.close()
+
+    def collect(self: committing_writer) -> List[float]:
+        """Latencies since the last call."""
+        latencies, self.latencies = self.latencies, []
+        return latencies
+
+
+def percentiles(latencies: List[float]) -> dict:
+    """Median, 99th percentile and maximum in milliseconds."""
+    latencies = sorted(latencies)
+    return {
+        "commits": len(latencies),
+        "p50_ms": round(statistics.median(latencies) * 1000, 2),
+        "p99_ms": round(latencies[int(len(latencies) * 0.99)] * 1000, 2),
+        "max_ms": round(latencies[-1] * 1000, 2),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Measure the commit latency of a writer while snapshots are taken."
+    )
+    parser.add_argument(
+        "--answers", type=int, default=200000, help="Answers in the database."
+    )
+    parser.add_argument(
+        "--dutyCycles",
+        type=float,
+        nargs="+",
+        default=[1.0, 0.5, 0.2],
+        help="Duty cycles of the snapshots.",
+    )
+    parser.add_argument(
+        "--pages", type=int, default=256, help="Pages copied in one step."
+    )
+    parser.add_argument(
+        "--baseline", type=float, default=5.0, help="Seconds without a snapshot."
+    )
+    parser.add_argument(
+        "--pause", type=float, default=0.01, help="Seconds between two commits."
+    )
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.ERROR, format="%(asctime)s %(message)s")
+
+    with tempfile.TemporaryDirectory() as folder:
+        filename = os.path.join(folder, "live.db")
+        build_database(filename, args.answers)
+        enable_wal(filename)
+
+        # The lookups of the loader are indexed, so the commits are frequent:
+        connection = sqlite3.connect(filename)
+        for statement in PROPOSED_INDEXES:
+            connection.execute(statement)
+        connection.close()
+
+        writer = committing_writer(filename, args.answers, args.pause)
+        writer.start()
+
+        time.sleep(args.baseline)
+        results = {"no snapshot": percentiles(writer.collect())}
+
+        for duty_cycle in args.dutyCycles:
+            output = os.path.join(folder, f"snapshot_{duty_cycle}.db")
+            writer.collect()
+            summary = online_snapshot(filename, args.pages, duty_cycle).take(output)
+            label = f"duty cycle {duty_cycle}"
+            results[label] = {**percentiles(writer.collect()), **summary}
+
+            check = sqlite3.connect(output)
+            results[label]["integrity"] = check.execute(
+                "PRAGMA integrity_check"
+            ).fetchone()[0]
+            check.close()
+
+        writer.stopped.set()
+        writer.join()
+
+    for label, result in results.items():
+        print(f"{label:<18} {result}")
@@ -0,0 +1,282 @@
+"""Ingest throughput and analytical query latency of the storage backends (see db_tools.storage).
+
+First the same loader checks are run on every backend: adding, re-adding, refreshing, rolling back
+and dropping questions through question_loader must give the same results. Then the same synthetic
+questions (see benchmarks.synthetic) are loaded into each backend with question_loader, and the
+aggregate queries of ANALYTICAL_QUERIES are timed on the loaded databases. The query results are
+compared between the backends as well.
+
+Usage:
+    python -m benchmarks.storage_backends [--answers 20000] [--backends sqlite duckdb] [--repeat 5]
+"""
+from __future__ import annotations
+
+import argparse
+import logging
+import os
+import statistics
+import tempfile
+import time
+from dataclasses import replace
+from typing import Dict, List, Tuple
+
+from benchmarks.synthetic import synthetic_generator
+from db_tools.db_utils import question_loader
+from db_tools.storage import BACKENDS, open_storage, storage_backend
+
+logger = logging.getLogger("__main__")
+
+# Aggregations over the answers and questions, written in SQL both backends understand:
+ANALYTICAL_QUERIES = {
+    "answers per user": """
+        SELECT USER_ID, COUNT(*), AVG(ANSWER_PERCENT)
+        FROM ANSWER
+        WHERE USER_ID IS NOT NULL
+        GROUP BY USER_ID
+        ORDER BY COUNT(*) DESC, USER_ID
+        LIMIT 20
+    """,
+    "usefulness per category": """
+        SELECT Q.CATEGORY, Q.SUBCATEGORY, COUNT(*), AVG(A.ANSWER_PERCENT), AVG(A.USER_PERCENT)
+        FROM ANSWER AS A JOIN QUESTION AS Q ON Q.ID = A.QUESTION_ID
+        GROUP BY Q.CATEGORY, Q.SUBCATEGORY
+        ORDER BY Q.CATEGORY, Q.SUBCATEGORY
+    """,
+    "monthly volume": """
+        SELECT Q.CATEGORY, SUBSTR(CAST(Q.QUESTION_DATE AS VARCHAR), 1, 7) AS MONTH, COUNT(*)
+        FROM QUESTION AS Q
+        GROUP BY Q.CATEGORY, MONTH
+        ORDER BY Q.CATEGORY, MONTH
+    """,
+    "top keywords": """
+        SELECT K.KEYWORD, COUNT(*)
+        FROM QUESTION_KEYWORD AS QK JOIN KEYWORD AS K ON K.ID = QK.KEYWORD_ID
+        GROUP BY K.KEYWORD
+        ORDER BY COUNT(*) DESC, K.KEYWORD
+        LIMIT 20
+    """,
+    "unanswered questions": """
+        SELECT Q.CATEGORY, COUNT(*)
+        FROM QUESTION AS Q
+        WHERE NOT EXISTS (SELECT 1 FROM ANSWER AS A WHERE A.QUESTION_ID = Q.ID)
+        GROUP BY Q.CATEGORY
+        ORDER BY Q.CATEGORY
+    """,
+}
+
+
+def check_loader(storage: storage_backend) -> List[tuple]:
+    """Load, refresh, roll back and drop questions through question_loader.
+
+    The expected outcome is asserted, and the observations are returned, so they can be compared
+    between backends.
+
+    Args:
+        storage (storage_backend): empty database
+    Returns:
+        list: (check, observed value) tuples
+    """
+    loader = question_loader(storage)
+    generator = synthetic_generator(100, seed=7, mean_answers=5.0)
+    questions = [
+        question for question in generator.questions() if len(question.answers) >= 3
+    ]
+    question, other = questions[0], questions[1]
+    observed = []
+
+    def check(name, value, expected=None):
+        if expected is not None:
+            assert value == expected, f"{name}: {value} != {expected}"
+        observed.append((name, value))
+
+    # New question, loaded twice:
+    loader.add_question(question)
+    loader.add_question(question)
+    question_id = storage.get_question_id(question.gyik_id)
+    check("stored", question_id is not None, True)
+    check(
+        "answers", len(storage.get_stored_answers(question_id)), len(question.answers)
+    )
+    check("answer count", storage.get_answer_count(question.gyik_id))
+    check(
+        "keywords", len(storage.get_keyword_links(question_id)), len(question.keywords)
+    )
+    check("question text", storage.get_question_text(question_id), question.question)
+    answer_id, *_ = storage.get_stored_answers(question_id)[question.answers[0].gyik_id]
+    check(
+        "answer text",
+        storage.get_answer_text(answer_id),
+        question.answers[0].answer_text,
+    )
+    check("missing question", storage.get_answer_count(-1), None)
+
+    # Refresh: an answer removed, one with new usefulness, one new answer and a new keyword:
+    changed = replace(question.answers[1], answer_percent=1)
+    refreshed = replace(
+        question,
+        keywords=question.keywords + ("uj_kulcsszo",),
+        answers=(changed,)
+        + question.answers[2:]
+        + (generator.answer(question.question_date),),
+    )
+    check(
+        "refresh",
+        loader.refresh_question(refreshed),
+        {"inserted": 1, "updated": 1, "removed": 1, "keywords": 1},
+    )
+    check(
+        "refresh again",
+        loader.refresh_question(refreshed),
+        {"inserted": 0, "updated": 0, "removed": 0, "keywords": 0},
+    )
+    stored = storage.get_stored_answers(question_id)
+    check("removed flag", stored[question.answers[0].gyik_id][3] is not None, True)
+    check("updated percent", stored[changed.gyik_id][2], 1)
+    check("answer count after refresh", storage.get_answer_count(question.gyik_id))
+
+    # The removed answer is back:
+    check(
+        "restore",
+        loader.refresh_question(
+            replace(refreshed, answers=question.answers[:1] + refreshed.answers)
+        )["updated"],
+        1,
+    )
+
+    # A failing refresh leaves the question as it was:
+    links = storage.get_keyword_links(question_id)
+    broken = replace(refreshed, keywords=("masik_kulcsszo",), answers=(None,))
+    try:
+        loader.refresh_question(broken)
+    except AttributeError:
+        pass
+    storage.commit()
+    check("savepoint rollback", storage.get_keyword_links(question_id) == links, True)
+
+    # Uncommitted question rolled back:
+    loader.add_question(other, commit=False)
+    check("pending", storage.get_question_id(other.gyik_id) is not None, True)
+    storage.rollback()
+    check("rolled back", storage.get_question_id(other.gyik_id), None)
+    check("rolled back answer", storage.test_answer(other.answers[0].gyik_id), False)
+
+    # Loaded again and dropped:
+    loader.add_question(other)
+    check("reloaded", storage.get_answer_count(other.gyik_id) is not None, True)
+    storage.drop_question(other.gyik_id)
+    check("dropped", storage.get_question_id(other.gyik_id), None)
+    check("dropped answer", storage.test_answer(other.answers[0].gyik_id), False)
+    check("kept", storage.get_question_id(question.gyik_id), question_id)
+
+    return observed
+
+
+def measure_backend(
+    backend: str, filename: str, questions: list, repeat: int
+) -> Tuple[Dict[str, float], Dict[str, List[tuple]]]:
+    """Load the questions into a new database and time the analytical queries.
+
+    Returns:
+        tuple: ingest throughput, database size and median query latencies, and the query results
+    """
+    storage = open_storage(filename, backend)
+    loader = question_loader(storage)
+
+    start = time.perf_counter()
+    for count, question in enumerate(questions, 1):
+        loader.add_question(question, commit=False)
+        if count % 5000 == 0:
+            storage.commit()
+    storage.commit()
+    elapsed = time.perf_counter() - start
+
+    answers = sum(len(question.answers) for question in questions)
+    result = {
+        "ingest_s": round(elapsed, 2),
+        "answers_per_s": round(answers / elapsed),
+    }
+
+    rows = {}
+    for name, sql in ANALYTICAL_QUERIES.items():
+        timings = []
+        for _ in range(repeat + 1):
+            start = time.perf_counter()
+            rows[name] = storage.query(sql)
+            timings.append((time.perf_counter() - start) * 1000)
+        # The first run warms the caches:
+        result[name] = round(statistics.median(timings[1:]), 2)
+
+    storage.close()
+    result["size_mb"] = round(os.path.getsize(filename) / 2**20, 1)
+    return result, rows
+
+
+def normalized(rows: List[tuple]) -> List[tuple]:
+    """Query rows with the averages rounded, for comparing the backends."""
+    return [
+        tuple(round(value, 6) if isinstance(value, float) else value for value in row)
+        for row in rows
+    ]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Compare the ingest throughput and the aggregate query latency of the storage backends."
+    )
+    parser.add_argument(
+        "--answers", type=int, default=20000, help="Number of answers loaded."
+    )
+    parser.add_argument(
+        "--backends",
+        type=str,
+        nargs="+",
+        choices=BACKENDS,
+        default=BACKENDS,
+        help="Backends measured.",
+    )
+    parser.add_argument(
+        "--repeat", type=int, default=5, help="Timed runs of each query."
+    )
+    parser.add_argument("--seed", type=int, default=1, help="Random seed.")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.ERROR, format="%(asctime)s %(message)s")
+
+    with tempfile.TemporaryDirectory() as folder:
+        observations = {}
+        for backend in args.backends:
+            storage = open_storage(os.path.join(folder, f"check.{backend}"), backend)
+            observations[backend] = check_loader(storage)
+            storage.close()
+            print(f"{backend}: loader checks passed")
+        if len({repr(observed) for observed in observations.values()}) > 1:
+            raise AssertionError(f"The backends differ: {observations}")
+
+        questions = list(synthetic_generator(args.answers, args.seed).questions())
+
+        results, query_rows = {}, {}
+        for backend in args.backends:
+            results[backend], rows = measure_backend(
+                backend,
+                os.path.join(folder, f"bench.{backend}"),
+                questions,
+                args.repeat,
+            )
+            query_rows[backend] = {
+                name: normalized(result) for name, result in rows.items()
+            }
+
+    reference = query_rows[args.backends[0]]
+    for backend, rows in query_rows.items():
+        for name in ANALYTICAL_QUERIES:
+            if rows[name] != reference[name]:
+                print(f"{backend}: results of {name} differ from {args.backends[0]}")
+
+    print(f"\n{len(questions)} questions, {args.answers} answers")
+    print(f"{'':<26}" + "".join(f"{backend:>12}" for backend in args.backends))
+    for key in ["ingest_s", "answers_per_s", "size_mb", *ANALYTICAL_QUERIES]:
+        unit = " ms" if key in ANALYTICAL_QUERIES else ""
+        print(
+            f"{key + unit:<26}"
+            + "".join(f"{results[backend][key]:>12}" for backend in args.backends)
+        )
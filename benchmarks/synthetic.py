@@ -0,0 +1,199 @@
+"""Generator of realistic synthetic questions, and databases of configurable size built from them.
+
+The popularity of users, keywords and categories follows a Zipf distribution: a few users write
+most of the answers and a few keywords are on most questions, like on the site. The number of
+answers per question is geometric, answer dates follow the question date with exponential delays,
+texts are built of common phrases. The generation is deterministic for a seed.
+
+Usage:
+    python -m benchmarks.synthetic --database <str> --answers 100000 [--seed 1]
+"""
+from __future__ import annotations
+
+import argparse
+import itertools
+import logging
+import random
+from datetime import datetime, timedelta
+from typing import Iterator, List
+
+from benchmarks.text_storage import PHRASES
+from scraper.records import Answer, Question, UserRef
+
+logger = logging.getLogger("__main__")
+
+CATEGORIES = {
+    "egeszseg": ["betegsegek", "gyogyszerek", "taplalkozas"],
+    "szamitastechnika": ["programozas", "hardver", "internet"],
+    "tudomanyok": ["fizika", "matematika", "biologia"],
+    "csaladi-kapcsolatok": ["parkapcsolat", "gyerekneveles"],
+    "otthon": ["epites", "kert"],
+}
+
+FIRST_QUESTION_ID = 10_000_000
+FIRST_ANSWER_ID = 50_000_000
+
+
+def zipf_cum_weights(count: int, exponent: float) -> List[float]:
+    """Cumulative weights of ranks 1..count with probability proportional to rank^-exponent."""
+    return list(itertools.accumulate(rank**-exponent for rank in range(1, count + 1)))
+
+
+class synthetic_generator:
+    """Deterministic source of synthetic questions."""
+
+    def __init__(
+        self: synthetic_generator,
+        answers: int,
+        seed: int = 1,
+        mean_answers: float = 6.0,
+        user_exponent: float = 1.1,
+        keyword_exponent: float = 1.0,
+    ) -> None:
+        """Initialize the populations sized for the number of answers.
+
+        Args:
+            self (synthetic_generator)
+            answers (int): approximate number of answers to generate
+            seed (int): seed of the random generator
+            mean_answers (float): mean number of answers per question
+            user_exponent (float): Zipf exponent of user activity
+            keyword_exponent (float): Zipf exponent of keyword popularity
+        """
+        self.answers = answers
+        self.mean_answers = mean_answers
+        self.rng = random.Random(seed)
+
+        # Populations grow sublinearly with the data, like on the site:
+        self.users = [f"user_{i}" for i in range(max(100, int(answers**0.8)))]
+        self.keywords = [f"kulcsszo_{i}" for i in range(max(50, int(answers**0.6)))]
+        self.user_weights = zipf_cum_weights(len(self.users), user_exponent)
+        self.keyword_weights = zipf_cum_weights(len(self.keywords), keyword_exponent)
+
+        # Usefulness of the users does not change:
+        self.user_percents = {
+            user: self.rng.choice([None, None] + list(range(0, 101, 10)))
+            for user in self.users
+        }
+
+        self.categories = [
+            (category, subcategory)
+            for category, subcategories in CATEGORIES.items()
+            for subcategory in subcategories
+        ]
+        self.category_weights = zipf_cum_weights(len(self.categories), 1.0)
+
+        self.start = datetime(2018, 1, 1)
+        self.span = (datetime(2024, 1, 1) - self.start).total_seconds()
+
+        self.next_question_id = FIRST_QUESTION_ID
+        self.next_answer_id = FIRST_ANSWER_ID
+
+    def _user(self: synthetic_generator) -> UserRef:
+        # Some of the answers are anonymous:
+        if self.rng.random() < 0.1:
+            return UserRef(None, None)
+
+        user = self.rng.choices(self.users, cum_weights=self.user_weights)[0]
+        return UserRef(user, self.user_percents[user])
+
+    def _text(self: synthetic_generator, low: int, high: int) -> str:
+        return " ".join(self.rng.choices(PHRASES, k=self.rng.randint(low, high)))
+
+    def answer(self: synthetic_generator, question_date: datetime) -> Answer:
+        """A new answer to a question asked at the given date."""
+        answer_id = self.next_answer_id
+        self.next_answer_id += 1
+
+        return Answer(
+            gyik_id=answer_id,
+            user=self._user(),
+            answer_date=question_date + timedelta(hours=self.rng.expovariate(1 / 12)),
+            answer_text=self._text(2, 30),
+            answer_percent=self.rng.choice([None, None, 0, 25, 50, 75, 100]),
+        )
+
+    def question(self: synthetic_generator) -> Question:
+        """A new question with its answers."""
+        question_id = self.next_question_id
+        self.next_question_id += 1
+
+        category, subcategory = self.rng.choices(
+            self.categories, cum_weights=self.category_weights
+        )[0]
+        question_date = self.start + timedelta(
+            seconds=int(self.rng.random() * self.span)
+        )
+
+        # Geometric number of answers:
+        answer_count = int(self.rng.expovariate(1 / self.mean_answers))
+        keyword_count = self.rng.randint(0, 5)
+
+        return Question(
+            url=f"https://www.gyakorikerdesek.hu/{category}__{subcategory}__{question_id}-synthetic",
+            gyik_id=question_id,
+            title=self._text(1, 4),
+            category=category,
+            subcategory=subcategory,
+            question=self._text(1, 15),
+            question_date=question_date,
+            keywords=tuple(
+                dict.fromkeys(
+                    self.rng.choices(
+                        self.keywords,
+                        cum_weights=self.keyword_weights,
+                        k=keyword_count,
+                    )
+                )
+            ),
+            user=self._user(),
+            answers=tuple(self.answer(question_date) for _ in range(answer_count)),
+        )
+
+    def questions(self: synthetic_generator) -> Iterator[Question]:
+        """Questions until the number of answers is reached."""
+        generated = 0
+        while generated < self.answers:
+            question = self.question()
+            generated += len(question.answers)
+            yield question
+
+
+def build_database(filename: str, answers: int, seed: int = 1) -> dict:
+    """Create a database with synthetic data, loaded by the bulk importer.
+
+    Args:
+        filename (str): SQLite file, created
+        answers (int): approximate number of answers
+        seed (int): seed of the generator
+    Returns:
+        dict: number of rows added by table
+    """
+    from db_tools.bulk_import import bulk_importer
+    from db_tools.db_connection import db_connection
+
+    connection = db_connection(filename).conn
+    try:
+        return bulk_importer(connection, batch_size=20000).import_questions(
+            synthetic_generator(answers, seed).questions()
+        )
+    finally:
+        connection.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Create a database with synthetic questions."
+    )
+    parser.add_argument(
+        "--database", type=str, help="SQLite database file.", required=True
+    )
+    parser.add_argument(
+        "--answers", type=int, help="Number of answers.", default=100000
+    )
+    parser.add_argument("--seed", type=int, help="Random seed.", default=1)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(message)s")
+
+    build_database(args.database, args.answers, args.seed)
@@ -0,0 +1,132 @@
+"""Compare database file size and text scan speed of the text storage modes.
+
+The source database (or a synthetic one) is copied for each mode, the texts are converted, the
+copy is vacuumed, then all answer texts are read back decoded.
+
+Usage:
+    python -m benchmarks.text_storage [--database <str>] [--answers 50000]
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import random
+import sqlite3
+import tempfile
+import time
+from datetime import datetime
+
+from db_tools.db_connection import db_connection
+from db_tools.text_codec import convert_texts, text_codec
+
+# Phrases the synthetic answers are made of:
+PHRASES = [
+    "Szerintem",
+    "ez teljesen rendben van,",
+    "de érdemes megkérdezni egy szakembert is.",
+    "Én is így csináltam,",
+    "nálam bevált.",
+    "Nem tudom,",
+    "miért lenne gond,",
+    "ha odafigyelsz rá.",
+    "Próbáld ki,",
+    "aztán majd meglátod.",
+    "Orvoshoz kellene fordulnod,",
+    "mert ez nem normális.",
+    "Köszönöm a választ!",
+    "Egyetértek az előttem szólóval.",
+    "A legjobb ha",
+    "megbeszélitek egymással.",
+]
+
+# (name, codec, dictionary):
+MODES = [
+    ("plain", None, False),
+    ("zlib", "zlib", False),
+    ("zlib+dict", "zlib", True),
+    ("zstd", "zstd", False),
+    ("zstd+dict", "zstd", True),
+]
+
+SCAN_SQL = "SELECT SUM(LENGTH(gyik_text(ANSWER_TEXT))) FROM ANSWER"
+
+
+def build_synthetic(filename: str, answers: int) -> None:
+    """Create a database with random answers built of common phrases."""
+    connection = db_connection(filename).conn
+    rng = random.Random(42)
+    now = datetime(2020, 1, 1)
+
+    with connection:
+        connection.execute(
+            """INSERT INTO QUESTION (ID, GYIK_ID, CATEGORY, SUBCATEGORY, QUESTION_TITLE,
+                QUESTION_DATE, URL, ADDED_DATE) VALUES (1, 1, 'c', 's', 't', ?, 'u', ?)""",
+            (now, now),
+        )
+        connection.executemany(
+            """INSERT INTO ANSWER (GYIK_ID, QUESTION_ID, ANSWER_DATE, ANSWER_TEXT)
+                VALUES (?, 1, ?, ?)""",
+            (
+                (
+                    i,
+                    now,
+                    " ".join(rng.choices(PHRASES, k=rng.randint(2, 20)))
+                    + f" {rng.randint(0, 10**6)}",
+                )
+                for i in range(answers)
+            ),
+        )
+    connection.close()
+
+
+def measure(
+    source: str, target: str, codec_name: str | None, dictionary: bool
+) -> tuple:
+    """Convert a copy of the source database and return its size and scan time."""
+    with sqlite3.connect(source) as src, sqlite3.connect(target) as dst:
+        src.backup(dst)
+
+    connection = db_connection(target).conn
+    if codec_name is not None:
+        reader = text_codec(connection)
+        dictionary_id = reader.train_dictionary(codec_name) if dictionary else None
+        codec = text_codec(connection, codec_name, dictionary_id=dictionary_id)
+        convert_texts(connection, codec, batch_size=10_000)
+    connection.execute("VACUUM")
+
+    # Fresh connection, so nothing is cached in the codec:
+    connection.close()
+    connection = db_connection(target).conn
+
+    start = time.perf_counter()
+    connection.execute(SCAN_SQL).fetchone()
+    elapsed = time.perf_counter() - start
+    connection.close()
+
+    return os.path.getsize(target), elapsed
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--database", type=str, help="Database to measure on.")
+    parser.add_argument(
+        "--answers", type=int, default=50_000, help="Number of synthetic answers."
+    )
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as folder:
+        source = args.database
+        if source is None:
+            source = os.path.join(folder, "synthetic.db")
+            build_synthetic(source, args.answers)
+
+        plain_size = None
+        for name, codec_name, dictionary in MODES:
+            size, elapsed = measure(
+                source, os.path.join(folder, f"{name}.db"), codec_name, dictionary
+            )
+            plain_size = plain_size or size
+            print(
+                f"{name:>10}: {size / 2**20:>8.2f} MB ({size / plain_size:>5.1%}), "
+                f"scan: {elapsed * 1000:>8.1f} ms"
+            )
@@ -0,0 +1,354 @@
+"""Incrementally maintained summary tables for analytics.
+
+The summary tables are kept up to date by triggers, so every insert, update or delete made by the
+loader is reflected immediately, without scanning the base tables. Installing the tables on an
+existing database backfills them once with a full scan.
+
+Usage:
+    python -m db_tools.aggregates --database <str> [--rebuild | --drop]
+"""
+from __future__ import annotations
+
+import argparse
+import logging
+import sqlite3
+from typing import TYPE_CHECKING, List
+
+from db_tools.db_connection import db_connection
+
+if TYPE_CHECKING:
+    from sqlite3 import Connection
+
+logger = logging.getLogger("__main__")
+
+
+class aggregate_tables:
+    """Install, rebuild and query the summary tables.
+
+    - USER_ANSWER_STATS: number of answers and sum of the rated answer usefulness per user.
+    - CATEGORY_DAY_STATS: number of questions per category, subcategory and day.
+    - KEYWORD_STATS: number of questions linked to each keyword.
+
+    Answers flagged as removed are not counted. Anonymous answers are not attributed to any user.
+    """
+
+    summary_tables_sql = [
+        """CREATE TABLE IF NOT EXISTS USER_ANSWER_STATS (
+            USER_ID INTEGER PRIMARY KEY,
+            ANSWER_COUNT INTEGER NOT NULL,
+            RATED_COUNT INTEGER NOT NULL,
+            PERCENT_SUM NUMERIC NOT NULL
+        )""",
+        """CREATE INDEX IF NOT EXISTS USER_ANSWER_STATS_COUNT
+            ON USER_ANSWER_STATS (ANSWER_COUNT)""",
+        """CREATE TABLE IF NOT EXISTS CATEGORY_DAY_STATS (
+            CATEGORY TEXT NOT NULL,
+            SUBCATEGORY TEXT NOT NULL,
+            DAY DATE NOT NULL,
+            QUESTION_COUNT INTEGER NOT NULL,
+            PRIMARY KEY (CATEGORY, SUBCATEGORY, DAY)
+        )""",
+        """CREATE TABLE IF NOT EXISTS KEYWORD_STATS (
+            KEYWORD_ID INTEGER PRIMARY KEY,
+            QUESTION_COUNT INTEGER NOT NULL
+        )""",
+        """CREATE INDEX IF NOT EXISTS KEYWORD_STATS_COUNT
+            ON KEYWORD_STATS (QUESTION_COUNT)""",
+    ]
+
+    # Adding and removing the contribution of a single row to the summary tables:
+    _add_answer = """
+        INSERT INTO USER_ANSWER_STATS (USER_ID, ANSWER_COUNT, RATED_COUNT, PERCENT_SUM)
+        SELECT NEW.USER_ID, 1, NEW.ANSWER_PERCENT IS NOT NULL, COALESCE(NEW.ANSWER_PERCENT, 0)
+        WHERE NEW.USER_ID IS NOT NULL AND NEW.REMOVED_DATE IS NULL
+        ON CONFLICT (USER_ID) DO UPDATE SET
+            ANSWER_COUNT = ANSWER_COUNT + excluded.ANSWER_COUNT,
+            RATED_COUNT = RATED_COUNT + excluded.RATED_COUNT,
+            PERCENT_SUM = PERCENT_SUM + excluded.PERCENT_SUM;
+    """
+    _remove_answer = """
+        UPDATE USER_ANSWER_STATS SET
+            ANSWER_COUNT = ANSWER_COUNT - 1,
+            RATED_COUNT = RATED_COUNT - (OLD.ANSWER_PERCENT IS NOT NULL),
+            PERCENT_SUM = PERCENT_SUM - COALESCE(OLD.ANSWER_PERCENT, 0)
+        WHERE USER_ID = OLD.USER_ID AND OLD.REMOVED_DATE IS NULL;
+        DELETE FROM USER_ANSWER_STATS WHERE USER_ID = OLD.USER_ID AND ANSWER_COUNT = 0;
+    """
+    _add_question = """
+        INSERT INTO CATEGORY_DAY_STATS (CATEGORY, SUBCATEGORY, DAY, QUESTION_COUNT)
+        VALUES (NEW.CATEGORY, NEW.SUBCATEGORY, DATE(NEW.QUESTION_DATE), 1)
+        ON CONFLICT (CATEGORY, SUBCATEGORY, DAY) DO UPDATE SET
+            QUESTION_COUNT = QUESTION_COUNT + 1;
+    """
+    _remove_question = """
+        UPDATE CATEGORY_DAY_STATS SET QUESTION_COUNT = QUESTION_COUNT - 1
+        WHERE
+            CATEGORY = OLD.CATEGORY AND
+            SUBCATEGORY = OLD.SUBCATEGORY AND
+            DAY = DATE(OLD.QUESTION_DATE);
+        DELETE FROM CATEGORY_DAY_STATS WHERE QUESTION_COUNT = 0 AND
+            CATEGORY = OLD.CATEGORY AND
+            SUBCATEGORY = OLD.SUBCATEGORY AND
+            DAY = DATE(OLD.QUESTION_DATE);
+    """
+    _add_link = """
+        INSERT INTO KEYWORD_STATS (KEYWORD_ID, QUESTION_COUNT)
+        VALUES (NEW.KEYWORD_ID, 1)
+        ON CONFLICT (KEYWORD_ID) DO UPDATE SET QUESTION_COUNT = QUESTION_COUNT + 1;
+    """
+    _remove_link = """
+        UPDATE KEYWORD_STATS SET QUESTION_COUNT = QUESTION_COUNT - 1
+        WHERE KEYWORD_ID = OLD.KEYWORD_ID;
+        DELETE FROM KEYWORD_STATS WHERE KEYWORD_ID = OLD.KEYWORD_ID AND QUESTION_COUNT = 0;
+    """
+
+    # Trigger name mapped to the triggering event and the statements:
+    triggers = {
+        "ANSWER_STATS_INSERT": ("AFTER INSERT ON ANSWER", [_add_answer]),
+        "ANSWER_STATS_DELETE": ("AFTER DELETE ON ANSWER", [_remove_answer]),
+        "ANSWER_STATS_UPDATE": (
+            "AFTER UPDATE OF USER_ID, ANSWER_PERCENT, REMOVED_DATE ON ANSWER",
+            [_remove_answer, _add_answer],
+        ),
+        "QUESTION_STATS_INSERT": ("AFTER INSERT ON QUESTION", [_add_question]),
+        "QUESTION_STATS_DELETE": ("AFTER DELETE ON QUESTION", [_remove_question]),
+        "QUESTION_STATS_UPDATE": (
+            "AFTER UPDATE OF CATEGORY, SUBCATEGORY, QUESTION_DATE ON QUESTION",
+            [_remove_question, _add_question],
+        ),
+        "KEYWORD_STATS_INSERT": ("AFTER INSERT ON QUESTION_KEYWORD", [_add_link]),
+        "KEYWORD_STATS_DELETE": ("AFTER DELETE ON QUESTION_KEYWORD", [_remove_link]),
+    }
+
+    # Recomputing the summary tables from scratch:
+    rebuild_sql = [
+        "DELETE FROM USER_ANSWER_STATS",
+        """INSERT INTO USER_ANSWER_STATS (USER_ID, ANSWER_COUNT, RATED_COUNT, PERCENT_SUM)
+            SELECT
+                USER_ID,
+                COUNT(*),
+                COUNT(ANSWER_PERCENT),
+                COALESCE(SUM(ANSWER_PERCENT), 0)
+            FROM ANSWER
+            WHERE USER_ID IS NOT NULL AND REMOVED_DATE IS NULL
+            GROUP BY USER_ID""",
+        "DELETE FROM CATEGORY_DAY_STATS",
+        """INSERT INTO CATEGORY_DAY_STATS (CATEGORY, SUBCATEGORY, DAY, QUESTION_COUNT)
+            SELECT CATEGORY, SUBCATEGORY, DATE(QUESTION_DATE), COUNT(*)
+            FROM QUESTION
+            GROUP BY CATEGORY, SUBCATEGORY, DATE(QUESTION_DATE)""",
+        "DELETE FROM KEYWORD_STATS",
+        """INSERT INTO KEYWORD_STATS (KEYWORD_ID, QUESTION_COUNT)
+            SELECT KEYWORD_ID, COUNT(*)
+            FROM QUESTION_KEYWORD
+            GROUP BY KEYWORD_ID""",
+    ]
+
+    # Queries on top of the summary tables:
+    user_stats_sql = """
+        SELECT
+            U.USER,
+            S.ANSWER_COUNT,
+            S.RATED_COUNT,
+            S.PERCENT_SUM * 1.0 / NULLIF(S.RATED_COUNT, 0) AS AVERAGE_PERCENT
+        FROM USER_ANSWER_STATS AS S
+        JOIN USER AS U ON U.ID = S.USER_ID
+        WHERE S.USER_ID = :user_id
+    """
+    top_users_sql = """
+        SELECT
+            U.USER,
+            S.ANSWER_COUNT,
+            S.RATED_COUNT,
+            S.PERCENT_SUM * 1.0 / NULLIF(S.RATED_COUNT, 0) AS AVERAGE_PERCENT
+        FROM USER_ANSWER_STATS AS S
+        JOIN USER AS U ON U.ID = S.USER_ID
+        ORDER BY S.ANSWER_COUNT DESC
+        LIMIT :limit
+    """
+    category_volume_sql = """
+        SELECT DAY, SUM(QUESTION_COUNT)
+        FROM CATEGORY_DAY_STATS
+        WHERE
+            CATEGORY = :category AND
+            (:subcategory IS NULL OR SUBCATEGORY = :subcategory) AND
+            (:start IS NULL OR DAY >= :start) AND
+            (:end IS NULL OR DAY <= :end)
+        GROUP BY DAY
+        ORDER BY DAY
+    """
+    top_keywords_sql = """
+        SELECT K.KEYWORD, S.QUESTION_COUNT
+        FROM KEYWORD_STATS AS S
+        JOIN KEYWORD AS K ON K.ID = S.KEYWORD_ID
+        ORDER BY S.QUESTION_COUNT DESC
+        LIMIT :limit
+    """
+
+    def __init__(self: aggregate_tables, connection: Connection) -> None:
+        """Initialize the object with a database connection.
+
+        Args:
+            self (aggregate_tables)
+            connection (Connection): connection to a database with the scraper schema
+        """
+        if not isinstance(connection, sqlite3.Connection):
+            raise TypeError(
+                f"Connection object is expected for initialize aggregate_tables object. Got type: {type(connection)}."
+            )
+
+        self.conn = connection
+
+    def is_installed(self: aggregate_tables) -> bool:
+        """Test if the summary tables are maintained in the database.
+
+        Args:
+            self (aggregate_tables)
+        Returns:
+            bool: True if all triggers are installed.
+        """
+        installed = {
+            row[0]
+            for row in self.conn.execute(
+                "SELECT name FROM sqlite_master WHERE type = 'trigger'"
+            )
+        }
+        return set(self.triggers).issubset(installed)
+
+    def install(self: aggregate_tables) -> None:
+        """Create the summary tables and triggers. Newly installed tables are backfilled.
+
+        Args:
+            self (aggregate_tables)
+        """
+        if self.is_installed():
+            logger.info("Summary tables are already installed.")
+            return
+
+        logger.info("Installing summary tables.")
+        with self.conn:
+            for statement in self.summary_tables_sql:
+                self.conn.execute(statement)
+
+            for name, (event, statements) in self.triggers.items():
+                self.conn.execute(
+                    f"CREATE TRIGGER IF NOT EXISTS {name} {event} BEGIN {''.join(statements)} END"
+                )
+
+            self._rebuild()
+
+    def rebuild(self: aggregate_tables) -> None:
+        """Recompute the summary tables with a full scan of the base tables.
+
+        Args:
+            self (aggregate_tables)
+        """
+        logger.info("Rebuilding summary tables.")
+        with self.conn:
+            self._rebuild()
+
+    def drop(self: aggregate_tables) -> None:
+        """Remove the triggers and the summary tables.
+
+        Args:
+            self (aggregate_tables)
+        """
+        with self.conn:
+            for name in self.triggers:
+                self.conn.execute(f"DROP TRIGGER IF EXISTS {name}")
+            for table in ["USER_ANSWER_STATS", "CATEGORY_DAY_STATS", "KEYWORD_STATS"]:
+                self.conn.execute(f"DROP TABLE IF EXISTS {table}")
+
+    def _rebuild(self: aggregate_tables) -> None:
+        for statement in self.rebuild_sql:
+            self.conn.execute(statement)
+
+    def user_stats(self: aggregate_tables, user_id: int) -> tuple | None:
+        """Get the answer statistics of a user.
+
+        Args:
+            self (aggregate_tables)
+            user_id (int): database identifier of the user
+        Returns:
+            tuple | None: (user name, answer count, rated answer count, average answer percent)
+        """
+        return self.conn.execute(self.user_stats_sql, {"user_id": user_id}).fetchone()
+
+    def top_users(self: aggregate_tables, limit: int = 10) -> List[tuple]:
+        """Get the users with the most answers.
+
+        Args:
+            self (aggregate_tables)
+            limit (int): number of users returned
+        Returns:
+            list: (user name, answer count, rated answer count, average answer percent) tuples
+        """
+        return self.conn.execute(self.top_users_sql, {"limit": limit}).fetchall()
+
+    def category_volume(
+        self: aggregate_tables,
+        category: str,
+        subcategory: str | None = None,
+        start: str | None = None,
+        end: str | None = None,
+    ) -> List[tuple]:
+        """Get the number of questions asked per day in a category.
+
+        Args:
+            self (aggregate_tables)
+            category (str): category of the questions
+            subcategory (str | None): if given, only questions of this subcategory are counted
+            start (str | None): first day (YYYY-MM-DD) included
+            end (str | None): last day (YYYY-MM-DD) included
+        Returns:
+            list: (day, question count) tuples ordered by day
+        """
+        return self.conn.execute(
+            self.category_volume_sql,
+            {
+                "category": category,
+                "subcategory": subcategory,
+                "start": start,
+                "end": end,
+            },
+        ).fetchall()
+
+    def top_keywords(self: aggregate_tables, limit: int = 10) -> List[tuple]:
+        """Get the most frequently used keywords.
+
+        Args:
+            self (aggregate_tables)
+            limit (int): number of keywords returned
+        Returns:
+            list: (keyword, question count) tuples
+        """
+        return self.conn.execute(self.top_keywords_sql, {"limit": limit}).fetchall()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Install and maintain the analytics summary tables."
+    )
+    parser.add_argument(
+        "--database", type=str, help="SQLite database file.", required=True
+    )
+    parser.add_argument(
+        "--rebuild",
+        action="store_true",
+        help="Recompute the summary tables from the base tables.",
+    )
+    parser.add_argument(
+        "--drop", action="store_true", help="Remove the summary tables and triggers."
+    )
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(message)s")
+
+    aggregates = aggregate_tables(db_connection(args.database).conn)
+
+    if args.drop:
+        aggregates.drop()
+    elif args.rebuild and aggregates.is_installed():
+        aggregates.rebuild()
+    else:
+        aggregates.install()
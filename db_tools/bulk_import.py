@@ -0,0 +1,452 @@
+"""Bulk import of parsed questions from JSONL interchange files (see scraper.interchange).
+
+Loading questions one by one with question_loader costs several lookups per answer. The importer
+works on large batches instead:
+    - the lines are decoded by a pool of worker processes, while the main process writes,
+    - the identifiers of the stored users, keywords, questions and answers are loaded into memory
+      once, and new rows get their identifiers assigned in memory, so no lookups are needed,
+    - rows are inserted with executemany, one transaction per batch,
+    - secondary indexes and triggers are dropped during the load and recreated at the end, summary
+      tables maintained by the triggers (see aggregates) are rebuilt, and the users of the imported
+      answers are logged for the reputation (see reputation).
+
+Questions already in the database get the answers and keyword links not yet stored. Texts are
+imported uncompressed and questions are not added to the near-duplicate index; run the text_codec
+and near_duplicates tools afterwards if needed.
+
+Usage:
+    python -m db_tools.bulk_import --database <str> --input <file> [<file> ...] [--workers 4]
+"""
+from __future__ import annotations
+
+import argparse
+import itertools
+import logging
+import multiprocessing
+import sqlite3
+import time
+from datetime import datetime
+from typing import TYPE_CHECKING, Dict, Iterable, Iterator, List, Set, Tuple
+
+from db_tools.aggregates import aggregate_tables
+from scraper import interchange
+
+if TYPE_CHECKING:
+    from sqlite3 import Connection
+
+    from scraper.records import Question
+
+logger = logging.getLogger("__main__")
+
+# Tables written by the importer, their indexes and triggers are deferred:
+IMPORTED_TABLES = ["USER", "KEYWORD", "QUESTION", "ANSWER", "QUESTION_KEYWORD"]
+
+
+def _parse_dates(question: dict) -> dict:
+    """Convert the dates of a question dictionary to datetime."""
+    if question["question_date"] is not None:
+        question["question_date"] = datetime.fromisoformat(question["question_date"])
+    for answer in question["answers"]:
+        answer["answer_date"] = datetime.fromisoformat(answer["answer_date"])
+    return question
+
+
+def decode_lines(lines: List[str]) -> List[dict]:
+    """Decode a chunk of interchange lines, the dates are converted to datetime (run by the workers).
+
+    Args:
+        lines (list): JSON lines
+    Returns:
+        list: questions as dictionaries
+    """
+    return [_parse_dates(interchange.loads_dict(line)) for line in lines]
+
+
+class bulk_importer:
+    """Batch loader of interchange files."""
+
+    add_users_sql = """INSERT INTO USER (ID, USER, USER_PERCENT) VALUES (?, ?, ?)"""
+    update_user_percent_sql = """UPDATE USER SET USER_PERCENT = ? WHERE ID = ?"""
+    add_keywords_sql = """INSERT INTO KEYWORD (ID, KEYWORD) VALUES (?, ?)"""
+    add_questions_sql = """
+        INSERT INTO QUESTION (
+            ID, GYIK_ID, CATEGORY, SUBCATEGORY, QUESTION_TITLE, QUESTION, QUESTION_DATE, URL,
+            USER_ID, ADDED_DATE
+        )
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    """
+    add_answers_sql = """
+        INSERT INTO ANSWER (
+            ID, GYIK_ID, USER_ID, QUESTION_ID, ANSWER_DATE, ANSWER_TEXT, USER_PERCENT,
+            ANSWER_PERCENT
+        )
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+    """
+    add_links_sql = (
+        """INSERT INTO QUESTION_KEYWORD (KEYWORD_ID, QUESTION_ID) VALUES (?, ?)"""
+    )
+
+    # Secondary indexes and triggers on the imported tables:
+    deferred_objects_sql = f"""
+        SELECT type, name, sql FROM sqlite_master
+        WHERE
+            type IN ('index', 'trigger') AND
+            sql IS NOT NULL AND
+            tbl_name IN ({", ".join(f"'{table}'" for table in IMPORTED_TABLES)})
+    """
+
+    # Cached query results are stale after every batch (see query_catalog):
+    bump_data_version_sql = """
+        INSERT INTO DATA_VERSION (ID, VERSION) VALUES (1, 1)
+        ON CONFLICT (ID) DO UPDATE SET VERSION = VERSION + 1
+    """
+
+    # Users of the imported answers, for the next incremental run of the reputation (see reputation):
+    log_reputation_sql = """
+        INSERT INTO USER_REPUTATION_DIRTY (USER_ID)
+        SELECT DISTINCT USER_ID FROM ANSWER
+        WHERE ID >= :first_answer_id AND USER_ID IS NOT NULL
+    """
+
+    def __init__(
+        self: bulk_importer,
+        connection: Connection,
+        batch_size: int = 5000,
+        workers: int = 1,
+    ) -> None:
+        """Initialize the importer.
+
+        Args:
+            self (bulk_importer)
+            connection (Connection): connection to the scraper database
+            batch_size (int): number of questions written in one transaction
+            workers (int): number of processes decoding the files. With 1 the lines are decoded by the
+                importing process.
+        """
+        if not isinstance(connection, sqlite3.Connection):
+            raise TypeError(
+                f"Connection object is expected for initialize bulk_importer object. Got type: {type(connection)}."
+            )
+
+        self.conn = connection
+        self.batch_size = batch_size
+        self.workers = workers
+
+        self.counts = {
+            "questions": 0,
+            "new_questions": 0,
+            "answers": 0,
+            "users": 0,
+            "keywords": 0,
+            "links": 0,
+        }
+
+    def _load_identifiers(self: bulk_importer) -> None:
+        """Load the identifiers of the stored rows into memory."""
+        logger.info("Loading stored identifiers.")
+        self.users: Dict[str, Tuple[int, int | None]] = {
+            user: (user_id, percent)
+            for user_id, user, percent in self.conn.execute(
+                "SELECT ID, USER, USER_PERCENT FROM USER"
+            )
+        }
+        self.keywords: Dict[str, int] = {
+            keyword: keyword_id
+            for keyword_id, keyword in self.conn.execute(
+                "SELECT ID, KEYWORD FROM KEYWORD"
+            )
+        }
+        self.questions: Dict[int, int] = {
+            gyik_id: question_id
+            for question_id, gyik_id in self.conn.execute(
+                "SELECT ID, GYIK_ID FROM QUESTION"
+            )
+        }
+        self.answers: Set[int] = {
+            gyik_id for (gyik_id,) in self.conn.execute("SELECT GYIK_ID FROM ANSWER")
+        }
+
+        # Next free identifier of each table:
+        self.next_id = {
+            table: (
+                self.conn.execute(f"SELECT MAX(ID) FROM {table}").fetchone()[0] or 0
+            )
+            + 1
+            for table in ["USER", "KEYWORD", "QUESTION", "ANSWER"]
+        }
+        self.first_answer_id = self.next_id["ANSWER"]
+
+    def _defer_indexes(self: bulk_importer) -> List[Tuple[str, str, str]]:
+        """Drop the secondary indexes and triggers of the imported tables.
+
+        Returns:
+            list: (type, name, sql) of the dropped objects, to be recreated.
+        """
+        deferred = self.conn.execute(self.deferred_objects_sql).fetchall()
+        with self.conn:
+            for object_type, name, _ in deferred:
+                self.conn.execute(f"DROP {object_type.upper()} IF EXISTS {name}")
+
+        if deferred:
+            logger.info(
+                f"Deferred {len(deferred)} indexes and triggers: {[name for _, name, _ in deferred]}"
+            )
+        return deferred
+
+    def _restore_indexes(
+        self: bulk_importer, deferred: List[Tuple[str, str, str]]
+    ) -> None:
+        """Recreate the dropped indexes and triggers, and rebuild the tables the triggers maintain."""
+        if not deferred:
+            return
+
+        logger.info("Rebuilding indexes and triggers.")
+        with self.conn:
+            for _, _, sql in deferred:
+                self.conn.execute(sql)
+
+        aggregates = aggregate_tables(self.conn)
+        if aggregates.is_installed():
+            aggregates.rebuild()
+
+        # The reputation triggers did not log the users of the imported answers:
+        if any(name.startswith("REPUTATION_") for _, name, _ in deferred):
+            with self.conn:
+                self.conn.execute(
+                    self.log_reputation_sql, {"first_answer_id": self.first_answer_id}
+                )
+
+    def _decoded_batches(
+        self: bulk_importer, filenames: Iterable[str]
+    ) -> Iterator[List[dict]]:
+        """Decode the files in batches, in parallel if there are multiple workers."""
+        lines = interchange.read_lines(filenames)
+        chunks = iter(lambda: list(itertools.islice(lines, self.batch_size)), [])
+
+        if self.workers <= 1:
+            yield from map(decode_lines, chunks)
+            return
+
+        with multiprocessing.Pool(self.workers) as pool:
+            yield from pool.imap(decode_lines, chunks)
+
+    def _user_id(
+        self: bulk_importer,
+        user: dict,
+        new_users: List[tuple],
+        percent_updates: Dict[int, int],
+    ) -> int | None:
+        """Identifier of a user, new users are assigned one. Anonymous users have no identifier."""
+        name, percent = user["user"], user["user_percent"]
+        if not name:
+            return None
+
+        stored = self.users.get(name)
+        if stored is None:
+            user_id = self.next_id["USER"]
+            self.next_id["USER"] += 1
+            self.users[name] = (user_id, percent)
+            new_users.append((user_id, name, percent))
+            return user_id
+
+        # Missing usefulness is filled in, as question_loader does:
+        user_id, stored_percent = stored
+        if percent and not stored_percent:
+            self.users[name] = (user_id, percent)
+            percent_updates[user_id] = percent
+        return user_id
+
+    def _write_batch(self: bulk_importer, questions: List[dict]) -> None:
+        """Write a batch of decoded questions in one transaction."""
+        new_users: List[tuple] = []
+        percent_updates: Dict[int, int] = {}
+        new_keywords: List[tuple] = []
+        new_questions: List[tuple] = []
+        new_answers: List[tuple] = []
+        new_links: List[tuple] = []
+
+        # Keywords linked to the questions of the batch, the new links are not written yet:
+        batch_links: Dict[int, Set[int]] = {}
+
+        added_date = datetime.now()
+
+        for question in questions:
+            user_id = self._user_id(question["user"], new_users, percent_updates)
+
+            question_id = self.questions.get(question["gyik_id"])
+            is_new = question_id is None
+            if is_new:
+                question_id = self.next_id["QUESTION"]
+                self.next_id["QUESTION"] += 1
+                self.questions[question["gyik_id"]] = question_id
+                new_questions.append(
+                    (
+                        question_id,
+                        question["gyik_id"],
+                        question["category"],
+                        question["subcategory"],
+                        question["title"],
+                        question["question"],
+                        question["question_date"],
+                        question["url"],
+                        user_id,
+                        added_date,
+                    )
+                )
+                linked = batch_links.setdefault(question_id, set())
+            elif question_id in batch_links:
+                # The question is in the batch more than once, eg. re-crawled:
+                linked = batch_links[question_id]
+            else:
+                # Only questions seen before need their links checked:
+                linked = batch_links[question_id] = {
+                    keyword_id
+                    for (keyword_id,) in self.conn.execute(
+                        "SELECT KEYWORD_ID FROM QUESTION_KEYWORD WHERE QUESTION_ID = ?",
+                        (question_id,),
+                    )
+                }
+
+            for keyword in question["keywords"]:
+                if not keyword:
+                    continue
+                keyword_id = self.keywords.get(keyword)
+                if keyword_id is None:
+                    keyword_id = self.next_id["KEYWORD"]
+                    self.next_id["KEYWORD"] += 1
+                    self.keywords[keyword] = keyword_id
+                    new_keywords.append((keyword_id, keyword))
+                if keyword_id not in linked:
+                    linked.add(keyword_id)
+                    new_links.append((keyword_id, question_id))
+
+            for answer in question["answers"]:
+                if answer["gyik_id"] in self.answers:
+                    continue
+                self.answers.add(answer["gyik_id"])
+
+                answer_id = self.next_id["ANSWER"]
+                self.next_id["ANSWER"] += 1
+                new_answers.append(
+                    (
+                        answer_id,
+                        answer["gyik_id"],
+                        self._user_id(answer["user"], new_users, percent_updates),
+                        question_id,
+                        answer["answer_date"],
+                        answer["answer_text"],
+                        answer["user"]["user_percent"],
+                        answer["answer_percent"],
+                    )
+                )
+
+        with self.conn:
+            self.conn.executemany(self.add_users_sql, new_users)
+            self.conn.executemany(
+                self.update_user_percent_sql,
+                [(percent, user_id) for user_id, percent in percent_updates.items()],
+            )
+            self.conn.executemany(self.add_keywords_sql, new_keywords)
+            self.conn.executemany(self.add_questions_sql, new_questions)
+            self.conn.executemany(self.add_answers_sql, new_answers)
+            self.conn.executemany(self.add_links_sql, new_links)
+            self.conn.execute(self.bump_data_version_sql)
+
+        self.counts["questions"] += len(questions)
+        self.counts["new_questions"] += len(new_questions)
+        self.counts["answers"] += len(new_answers)
+        self.counts["users"] += len(new_users)
+        self.counts["keywords"] += len(new_keywords)
+        self.counts["links"] += len(new_links)
+
+    def import_files(self: bulk_importer, filenames: Iterable[str]) -> dict:
+        """Import interchange files into the database.
+
+        Args:
+            self (bulk_importer)
+            filenames (iterable): interchange files, gzip compressed if ending with .gz
+        Returns:
+            dict: number of questions read, and number of rows added by table
+        """
+        return self.import_batches(self._decoded_batches(filenames))
+
+    def import_questions(self: bulk_importer, questions: Iterable[Question]) -> dict:
+        """Import parsed (or generated) questions into the database.
+
+        Args:
+            self (bulk_importer)
+            questions (iterable): question records
+        Returns:
+            dict: number of questions read, and number of rows added by table
+        """
+        rows = (_parse_dates(question.to_dict()) for question in questions)
+        return self.import_batches(
+            iter(lambda: list(itertools.islice(rows, self.batch_size)), [])
+        )
+
+    def import_batches(self: bulk_importer, batches: Iterable[List[dict]]) -> dict:
+        """Import batches of question dictionaries (see decode_lines) into the database.
+
+        Args:
+            self (bulk_importer)
+            batches (iterable): lists of questions as dictionaries, dates as datetime
+        Returns:
+            dict: number of questions read, and number of rows added by table
+        """
+        start = time.perf_counter()
+        self._load_identifiers()
+
+        # Durability is only needed at the end of the load:
+        self.conn.execute("PRAGMA synchronous = OFF")
+        deferred = self._defer_indexes()
+        try:
+            for questions in batches:
+                self._write_batch(questions)
+                logger.info(
+                    f"Imported {self.counts['questions']} questions, {self.counts['answers']} new answers."
+                )
+        finally:
+            self._restore_indexes(deferred)
+            self.conn.execute("PRAGMA synchronous = FULL")
+
+        elapsed = time.perf_counter() - start
+        logger.info(
+            f"Import finished in {elapsed:.1f}s: {self.counts} "
+            f"({self.counts['answers'] / elapsed:.0f} answers/s)"
+        )
+        return self.counts
+
+
+if __name__ == "__main__":
+    from db_tools.db_connection import db_connection
+
+    parser = argparse.ArgumentParser(
+        description="Import parsed questions from JSONL interchange files."
+    )
+    parser.add_argument(
+        "--database", type=str, help="SQLite database file.", required=True
+    )
+    parser.add_argument(
+        "--input",
+        type=str,
+        nargs="+",
+        help="Interchange files, gzip compressed if ending with .gz.",
+        required=True,
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=multiprocessing.cpu_count(),
+        help="Number of processes decoding the files.",
+    )
+    parser.add_argument(
+        "--batchSize", type=int, default=5000, help="Questions per transaction."
+    )
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(message)s")
+
+    importer = bulk_importer(
+        db_connection(args.database).conn, args.batchSize, args.workers
+    )
+    importer.import_files(args.input)
@@ -6,9 +6,13 @@ import os.path
 import sqlite3
 from typing import TYPE_CHECKING
 
+from db_tools.text_codec import text_codec
+
 if TYPE_CHECKING:
     from sqlite3 import Connection
 
+    from db_tools.db_utils import db_handler
+
 logger = logging.getLogger("__main__")
 
 
@@ -56,6 +60,7 @@ class db_connection:
         ANSWER_TEXT TEXT NOT NULL,
         USER_PERCENT NUMERIC,
         ANSWER_PERCENT NUMERIC,
+        REMOVED_DATE DATETIME,
         FOREIGN KEY (USER_ID) REFERENCES USER (ID),
         CONSTRAINT QUESTION_ID
             FOREIGN KEY (QUESTION_ID)
@@ -74,12 +79,45 @@ class db_connection:
             ON DELETE CASCADE
     )"""
 
+    # Dictionaries of the compressed texts (see text_codec):
+    text_codec_table_sql = """CREATE TABLE IF NOT EXISTS TEXT_CODEC (
+        ID INTEGER PRIMARY KEY,
+        CODEC TEXT NOT NULL,
+        DICTIONARY BLOB,
+        SAMPLE_COUNT INTEGER,
+        ADDED_DATE DATETIME NOT NULL
+    )"""
+
+    # Counter bumped by every load, cached query results of older versions are stale (see query_catalog):
+    data_version_table_sql = """CREATE TABLE IF NOT EXISTS DATA_VERSION (
+        ID INTEGER PRIMARY KEY CHECK (ID = 1),
+        VERSION INTEGER NOT NULL
+    )"""
+
+    # Tables created, their statements are the `<table>_table_sql` attributes:
+    tables = [
+        "keyword",
+        "user",
+        "question",
+        "answer",
+        "question_keyword",
+        "text_codec",
+        "data_version",
+    ]
+
+    # Columns added to existing tables since the first version of the schema (table, column, type):
+    added_columns = [
+        ("ANSWER", "REMOVED_DATE", "DATETIME"),
+    ]
+
     def __init__(self: db_connection, filename: str) -> None:
         """Initialize a database connection.
 
         - Check if a file exists,
         - Creates a connection to the file
         - Creates all necessary tables if new db is created.
+        - Adds columns missing from databases created by earlier versions.
+        - Registers the `gyik_text` SQL function decoding compressed texts.
 
         Args:
             self (db_connection)
@@ -95,6 +133,10 @@ class db_connection:
 
         # Create all tables:
         self._create_all_tables()
+        self._add_missing_columns()
+
+        # Compressed texts can be read with gyik_text(ANSWER_TEXT) in queries:
+        text_codec(self.conn).register()
 
     def _create_connection(self: db_connection, db_file: str) -> Connection:
         """Create a database connection to the SQLite database specified by db_file.
@@ -104,13 +146,30 @@ class db_connection:
             db_file (str): database file name
         """
         try:
-            return sqlite3.connect(db_file)
+            connection = sqlite3.connect(db_file)
         except ConnectionError:
             logger.error(f"[Error] DB could not be connected ({db_file}). Exiting")
             raise ConnectionError(
                 f"[Error] DB could not be connected ({db_file}). Exiting"
             )
 
+        # Foreign keys are not enforced by default, without this nothing is cascaded:
+        connection.execute("PRAGMA foreign_keys = ON")
+
+        return connection
+
+    def handler(self: db_connection) -> db_handler:
+        """Handler of the database, adding data through this connection.
+
+        Args:
+            self (db_connection)
+        Returns:
+            db_handler
+        """
+        from db_tools.db_utils import db_handler
+
+        return db_handler(self.conn)
+
     def _create_table(self: db_connection, create_table_sql: str) -> None:
         """Create a table from the create_table_sql statement.
 
@@ -131,9 +190,23 @@ class db_connection:
         Args:
             self (db_connection)
         """
-        tables_to_create = ["keyword", "user", "question", "answer", "question_keyword"]
-
         # create all tables
-        for table in tables_to_create:
+        for table in self.tables:
             sql_statement = getattr(self, table + "_table_sql")
             self._create_table(sql_statement)
+
+    def _add_missing_columns(self: db_connection) -> None:
+        """Add columns to tables created by an earlier version of the schema.
+
+        Args:
+            self (db_connection)
+        """
+        for table, column, column_type in self.added_columns:
+            existing_columns = [
+                row[1] for row in self.conn.execute(f"PRAGMA table_info({table})")
+            ]
+            if column not in existing_columns:
+                logger.info(f"Adding column {column} to table {table}.")
+                self.conn.execute(
+                    f"ALTER TABLE {table} ADD COLUMN {column} {column_type}"
+                )
@@ -4,18 +4,26 @@ from __future__ import annotations
 import logging
 import sqlite3
 from datetime import datetime
-from typing import TYPE_CHECKING
+from typing import TYPE_CHECKING, Dict, List, Set
+
+from db_tools.id_filter import bloom_filter
+from db_tools.storage import storage_backend
+from db_tools.text_codec import text_codec
+from scraper import log_events
+from scraper.records import Answer, Question, UserRef
 
 logger = logging.getLogger("__main__")
 
 if TYPE_CHECKING:
     from db_connection import db_connection
 
+    from db_tools.near_duplicates import minhash_index
+
 
-class db_handler:
+class db_handler(storage_backend):
     """This class defines the modules to add data directly to the database.
 
-    Contains all the SQL statements as well.
+    Contains all the SQL statements as well. SQLite implementation of the storage backend.
     """
 
     # Add new user to table:
@@ -43,6 +51,12 @@ class db_handler:
     # Add keyword:
     add_keyword_sql = """INSERT INTO KEYWORD(KEYWORD) VALUES(:keyword)"""
 
+    # Increase the data version, the row is added by the first load:
+    bump_data_version_sql = """
+        INSERT INTO DATA_VERSION (ID, VERSION) VALUES (1, 1)
+        ON CONFLICT (ID) DO UPDATE SET VERSION = VERSION + 1
+    """
+
     # Look up question in the database based on the gyik id:
     question_lookup_sql = """SELECT ID FROM QUESTION WHERE GYIK_ID = :gyik_id"""
 
@@ -104,6 +118,7 @@ class db_handler:
         WHERE
             Q.ID = A.QUESTION_ID AND
             Q.GYIK_ID = :gyik_id  AND
+            A.REMOVED_DATE IS NULL AND
             (
                 A.USER_ID != Q.USER_ID OR
                 A.USER_ID IS NULL
@@ -132,6 +147,38 @@ class db_handler:
         )
     """
 
+    # Answers stored for a question:
+    get_stored_answers_sql = """
+        SELECT ID, GYIK_ID, USER_PERCENT, ANSWER_PERCENT, REMOVED_DATE
+        FROM ANSWER
+        WHERE QUESTION_ID = :question_id
+    """
+
+    # Update usefulness values of an answer:
+    update_answer_percent_sql = """
+        UPDATE ANSWER
+        SET
+            USER_PERCENT = :user_percent,
+            ANSWER_PERCENT = :answer_percent
+        WHERE ID = :id
+    """
+
+    # Flag answers that are not on the site any more (or clear the flag when NULL):
+    set_answer_removed_sql = """
+        UPDATE ANSWER
+        SET REMOVED_DATE = :removed_date
+        WHERE ID = :id
+    """
+
+    # Keywords linked to a question:
+    get_keyword_links_sql = """
+        SELECT KEYWORD_ID FROM QUESTION_KEYWORD WHERE QUESTION_ID = :question_id
+    """
+
+    # Stored texts, possibly compressed:
+    get_question_text_sql = """SELECT QUESTION FROM QUESTION WHERE ID = :id"""
+    get_answer_text_sql = """SELECT ANSWER_TEXT FROM ANSWER WHERE ID = :id"""
+
     # When a question is in the database, however we want to fetch it again, we need to delete first:
     delete_question_sql = """
         DELETE FROM QUESTION
@@ -156,6 +203,81 @@ class db_handler:
         self.conn = connection
         self.cursor = connection.cursor()
 
+        # Optional in-memory filters of the stored GYIK identifiers:
+        self.question_filter: bloom_filter | None = None
+        self.answer_filter: bloom_filter | None = None
+
+        # Texts are stored uncompressed unless compression is enabled:
+        self.text_codec = text_codec(connection)
+
+        # Optional MinHash index of the questions:
+        self.duplicate_index: minhash_index | None = None
+
+    def enable_id_filters(
+        self: db_handler, error_rate: float = 0.01, capacity: int | None = None
+    ) -> None:
+        """Build in-memory filters of the stored question and answer GYIK identifiers.
+
+        Identifiers reported absent by the filters are not looked up in the database.
+
+        Args:
+            self (db_handler)
+            error_rate (float): false positive rate of the filters at full capacity
+            capacity (int | None): number of identifiers each filter is sized for. Defaults to twice
+                the number of stored identifiers.
+        """
+        self.question_filter = bloom_filter.from_query(
+            self.conn, "SELECT GYIK_ID FROM QUESTION", error_rate, capacity
+        )
+        self.answer_filter = bloom_filter.from_query(
+            self.conn, "SELECT GYIK_ID FROM ANSWER", error_rate, capacity
+        )
+
+        for name, id_filter in [
+            ("Question", self.question_filter),
+            ("Answer", self.answer_filter),
+        ]:
+            logger.info(f"{name} id filter: {id_filter.describe()}")
+
+    def enable_text_compression(
+        self: db_handler,
+        codec: str = "zstd",
+        level: int | None = None,
+        use_dictionary: bool = True,
+    ) -> None:
+        """Store the texts of new questions and answers compressed.
+
+        Args:
+            self (db_handler)
+            codec (str): zlib or zstd
+            level (int | None): compression level, defaults to the maximum ratio of the codec.
+            use_dictionary (bool): if True, the latest dictionary trained for the codec is used.
+        """
+        dictionary_id = (
+            self.text_codec.latest_dictionary(codec) if use_dictionary else None
+        )
+        self.text_codec = text_codec(self.conn, codec, level, dictionary_id)
+        logger.info(f"Text compression: {codec}, dictionary: {dictionary_id}")
+
+    def enable_near_duplicate_index(self: db_handler) -> None:
+        """Compute the MinHash signature of every new question, so near duplicates can be looked up.
+
+        Args:
+            self (db_handler)
+        """
+        # NumPy is only needed when the index is used:
+        from db_tools.near_duplicates import minhash_index
+
+        self.duplicate_index = minhash_index(self.conn)
+
+    @staticmethod
+    def _might_contain(id_filter: bloom_filter | None, gyik_id: int | None) -> bool:
+        """Test if an identifier can be in the database. False is definite, True needs a query."""
+        if id_filter is None or gyik_id is None:
+            return True
+
+        return int(gyik_id) in id_filter
+
     def link_to_keyword(self: db_handler, question_id: int, keyword_id: int) -> None:
         """Check if a link between a question and a keyword exists, and if not, adds the link.
 
@@ -175,7 +297,7 @@ class db_handler:
                 {"question_id": question_id, "keyword_id": keyword_id},
             )
         else:
-            logger.warning("Question/keyword link already exist.")
+            log_events.event("link_stored", "Question/keyword link already exist.")
 
     def add_user(self: db_handler, user: str, percent: float) -> int | None:
         """Get user ID or adds to db if not aready in the db.
@@ -260,6 +382,10 @@ class db_handler:
         Returns:
             int: question identifier if question is already in the database, None if not
         """
+        # Definitely new question:
+        if not self._might_contain(self.question_filter, gyik_id):
+            return None
+
         # Fetch data from db:
         self.cursor.execute(self.question_lookup_sql, {"gyik_id": gyik_id})
 
@@ -278,6 +404,10 @@ class db_handler:
         Returns:
             int | None: Then number of answers are returned or None if the question is not in database
         """
+        # Definitely new question:
+        if not self._might_contain(self.question_filter, gyik_id):
+            return None
+
         # Fetch data from db:
         self.cursor.execute(self.get_answer_count_sql, {"gyik_id": gyik_id})
         (count, question_id) = self.cursor.fetchone()
@@ -296,45 +426,33 @@ class db_handler:
             gyik_id (str): Gyik identifier of the question
         """
         self.cursor.execute(self.delete_question_sql, {"gyik_id": gyik_id})
+        self.bump_data_version()
         self.conn.commit()
 
-    def add_question(self: db_handler, question_data: dict) -> int:
+    def add_question(self: db_handler, question: Question, user_id: int | None) -> int:
         """Add a new row to the question table.
 
         Args:
             self (db_handler)
-            question_data (dict): parsed data organized into a dictionary and added
+            question (Question): parsed question record
+            user_id (int | None): database identifier of the user who asked the question
         Returns:
-            int identifier of the newly inserted question, None if question is already in the database
+            int identifier of the newly inserted question
         """
         # Test if data is in a proper type:
-        if not isinstance(question_data, dict):
-            raise TypeError("Question data must be a dictionary")
-
-        # Test if all required values exist:
-        for field in [
-            "URL",
-            "GYIK_ID",
-            "TITLE",
-            "CATEGORY",
-            "SUBCATEGORY",
-            "QUESTION",
-            "QUESTION_DATE",
-            "USER_ID",
-        ]:
-            if field not in question_data:
-                raise KeyError("Question data must contain key: {}".format(field))
+        if not isinstance(question, Question):
+            raise TypeError(f"Question record is expected. Got type: {type(question)}.")
 
         # Submit query:
         d = {
-            "gyik_id": question_data["GYIK_ID"],
-            "category": question_data["CATEGORY"],
-            "subcategory": question_data["SUBCATEGORY"],
-            "question_title": question_data["TITLE"],
-            "question": question_data["QUESTION"],
-            "question_date": question_data["QUESTION_DATE"],
-            "url": question_data["URL"],
-            "user_id": question_data["USER_ID"],
+            "gyik_id": question.gyik_id,
+            "category": question.category,
+            "subcategory": question.subcategory,
+            "question_title": question.title,
+            "question": self.text_codec.compress(question.question),
+            "question_date": question.question_date,
+            "url": question.url,
+            "user_id": user_id,
             "added_date": datetime.now(),
         }
         self.cursor.execute(self.add_question_sql, d)
@@ -344,6 +462,14 @@ class db_handler:
         if not isinstance(question_id, int):
             raise TypeError(f"Failed to insert new row into database: {question_id}")
 
+        if self.question_filter is not None:
+            self.question_filter.add(question.gyik_id)
+
+        if self.duplicate_index is not None:
+            self.duplicate_index.add_question(
+                question_id, question.title, question.question
+            )
+
         return question_id
 
     def test_answer(self: db_handler, gyik_id: int) -> bool:
@@ -355,6 +481,10 @@ class db_handler:
         Returns:
             boolean indicating if the answer is already there (True) or not (False)
         """
+        # Definitely new answer:
+        if not self._might_contain(self.answer_filter, gyik_id):
+            return False
+
         # Fetch data from db:
         self.cursor.execute(self.get_answer_sql, {"gyik_id": gyik_id})
 
@@ -364,53 +494,158 @@ class db_handler:
         else:
             return False
 
-    def add_answer(self: db_handler, answer_data: dict) -> int | None:
-        """Add a new row to the question data.
+    def add_answer(
+        self: db_handler, answer: Answer, question_id: int, user_id: int | None
+    ) -> int | None:
+        """Add a new row to the answer table.
 
         Args:
             self (db_handler)
-            answer_data (dict): parsed answer data
+            answer (Answer): parsed answer record
+            question_id (int): database identifier of the question the answer belongs to
+            user_id (int | None): database identifier of the user who gave the answer
         Returns:
             int for newly added answers.
         """
 
         # Test input data:
-        if not isinstance(answer_data, dict):
-            raise TypeError("Answer data must be a dictionary")
-
-        # Test if all required values exist:
-        for field in [
-            "USER_ID",
-            "GYIK_ID",
-            "ANSWER_DATE",
-            "ANSWER_TEXT",
-            "ANSWER_PERCENT",
-            "USER_PERCENT",
-        ]:
-            if field not in answer_data:
-                raise KeyError("Answer data must contain key: {}".format(field))
+        if not isinstance(answer, Answer):
+            raise TypeError(f"Answer record is expected. Got type: {type(answer)}.")
 
         # Test if this question is already in the database:
-        if self.test_answer(answer_data["GYIK_ID"]):
-            logger.warning(
-                f'Answer ({answer_data["GYIK_ID"]}) has already been added to the database! Skipping'
+        if self.test_answer(answer.gyik_id):
+            log_events.event(
+                "answer_stored",
+                f"Answer ({answer.gyik_id}) has already been added to the database! Skipping",
             )
             return None
 
         # Submit query:
         d = {
-            "gyik_id": answer_data["GYIK_ID"],
-            "answer_date": answer_data["ANSWER_DATE"],
-            "answer_text": answer_data["ANSWER_TEXT"],
-            "user_percent": answer_data["USER_PERCENT"],
-            "answer_percent": answer_data["ANSWER_PERCENT"],
-            "question_id": answer_data["QUESTION_ID"],
-            "user_id": answer_data["USER_ID"],
+            "gyik_id": answer.gyik_id,
+            "answer_date": answer.answer_date,
+            "answer_text": self.text_codec.compress(answer.answer_text),
+            "user_percent": answer.user.user_percent,
+            "answer_percent": answer.answer_percent,
+            "question_id": question_id,
+            "user_id": user_id,
         }
         self.cursor.execute(self.add_answer_sql, d)
 
+        if self.answer_filter is not None:
+            self.answer_filter.add(answer.gyik_id)
+
         return self.cursor.lastrowid
 
+    def get_stored_answers(self: db_handler, question_id: int) -> Dict[int, tuple]:
+        """Get the answers of a question already in the database.
+
+        Args:
+            self (db_handler)
+            question_id (int): database identifier of the question
+        Returns:
+            dict: gyik identifier of the answers mapped to (ID, USER_PERCENT, ANSWER_PERCENT, REMOVED_DATE)
+        """
+        self.cursor.execute(self.get_stored_answers_sql, {"question_id": question_id})
+        return {row[1]: (row[0], *row[2:]) for row in self.cursor.fetchall()}
+
+    def update_answer_percent(
+        self: db_handler,
+        answer_id: int,
+        user_percent: int | None,
+        answer_percent: int | None,
+    ) -> None:
+        """Update the usefulness values of a stored answer.
+
+        Args:
+            self (db_handler)
+            answer_id (int): database identifier of the answer
+            user_percent (int | None): usefulness of the user at the time of the answer
+            answer_percent (int | None): usefulness of the answer
+        """
+        self.cursor.execute(
+            self.update_answer_percent_sql,
+            {
+                "id": answer_id,
+                "user_percent": user_percent,
+                "answer_percent": answer_percent,
+            },
+        )
+
+    def set_answer_removed(
+        self: db_handler, answer_id: int, removed_date: datetime | None
+    ) -> None:
+        """Flag an answer as removed from the site, or clear the flag if the date is None.
+
+        Args:
+            self (db_handler)
+            answer_id (int): database identifier of the answer
+            removed_date (datetime | None): when the answer was found missing
+        """
+        self.cursor.execute(
+            self.set_answer_removed_sql, {"id": answer_id, "removed_date": removed_date}
+        )
+
+    def get_keyword_links(self: db_handler, question_id: int) -> Set[int]:
+        """Get the identifiers of the keywords linked to a question.
+
+        Args:
+            self (db_handler)
+            question_id (int): database identifier of the question
+        Returns:
+            set: keyword identifiers
+        """
+        self.cursor.execute(self.get_keyword_links_sql, {"question_id": question_id})
+        return {row[0] for row in self.cursor.fetchall()}
+
+    def get_question_text(self: db_handler, question_id: int) -> str | None:
+        """Get the text of a stored question, decompressed if needed.
+
+        Args:
+            self (db_handler)
+            question_id (int): database identifier of the question
+        Returns:
+            str | None: text of the question
+        """
+        self.cursor.execute(self.get_question_text_sql, {"id": question_id})
+        row = self.cursor.fetchone()
+        return self.text_codec.decompress(row[0]) if row else None
+
+    def get_answer_text(self: db_handler, answer_id: int) -> str | None:
+        """Get the text of a stored answer, decompressed if needed.
+
+        Args:
+            self (db_handler)
+            answer_id (int): database identifier of the answer
+        Returns:
+            str | None: text of the answer
+        """
+        self.cursor.execute(self.get_answer_text_sql, {"id": answer_id})
+        row = self.cursor.fetchone()
+        return self.text_codec.decompress(row[0]) if row else None
+
+    def query(
+        self: db_handler, sql: str, parameters: dict | None = None
+    ) -> List[tuple]:
+        """Run a read only query.
+
+        Args:
+            self (db_handler)
+            sql (str): SELECT statement with named parameters
+            parameters (dict | None): values of the parameters
+        Returns:
+            list: rows of the result
+        """
+        return self.conn.execute(sql, parameters or {}).fetchall()
+
+    def bump_data_version(self: db_handler) -> None:
+        """Increase the data version, committed with the changes.
+
+        Args:
+            self (db_handler)
+        """
+        self.cursor.execute(self.bump_data_version_sql)
+
     def commit(self: db_handler) -> None:
         """Commit changes in the database.
 
@@ -427,6 +662,33 @@ class db_handler:
         """
         self.conn.rollback()
 
+    def savepoint(self: db_handler, name: str) -> None:
+        """Open a savepoint within the current transaction.
+
+        Args:
+            self (db_handler)
+            name (str): name of the savepoint
+        """
+        self.cursor.execute(f"SAVEPOINT {name}")
+
+    def release(self: db_handler, name: str) -> None:
+        """Release a savepoint, keeping its changes in the current transaction.
+
+        Args:
+            self (db_handler)
+            name (str): name of the savepoint
+        """
+        self.cursor.execute(f"RELEASE {name}")
+
+    def rollback_to(self: db_handler, name: str) -> None:
+        """Roll back changes made since the savepoint was opened.
+
+        Args:
+            self (db_handler)
+            name (str): name of the savepoint
+        """
+        self.cursor.execute(f"ROLLBACK TO {name}")
+
     def close(self: db_handler) -> None:
         """Close connection to the databse.
 
@@ -442,43 +704,53 @@ class question_loader:
     There is a very specific order in which the data can be loaded into the database.
     """
 
-    def __init__(self: question_loader, db_handler: db_handler) -> None:
+    def __init__(self: question_loader, db_handler: storage_backend) -> None:
         """Initialize object with db_handler. When data is subsequently added, this handler is going to be called.
 
         Args:
             self (question_loader)
-            db_handler (db_handler): The `db_handler`
+            db_handler (storage_backend): The `db_handler`, or any other storage backend
         """
         # Storing db_handler:
         self.db_obj = db_handler
 
         # Get anonymous OP user identifier:
 
-    def add_question(self: question_loader, question_data: dict) -> None:
+    def add_user(self: question_loader, user: UserRef) -> int | None:
+        """Get the database identifier of a user. Anonymous users have no identifier.
+
+        Args:
+            self (question_loader)
+            user (UserRef): user as parsed from the page
+        Returns:
+            int | None: identifier of the user in the database
+        """
+        if not user.user:
+            return None
+
+        return self.db_obj.add_user(user.user, user.user_percent)
+
+    def add_question(
+        self: question_loader, question: Question, commit: bool = True
+    ) -> None:
         """Once all components of the question is parsed and the proper data structure built load to database.
 
         Args:
             self (question_loader)
-            question_data (dict): all data captrured for a question (eg. text and answers) modelled as a dictionary
+            question (Question): all data captrured for a question (eg. text and answers)
+            commit (bool): if False, committing the changes is left to the caller.
         """
         # 1. Adding user - person who asked the question is often not available. If yes, we add to the db.
-        if not question_data["USER"]["USER"]:
-            question_data["USER_ID"] = None
-        else:
-            question_data["USER_ID"] = self.db_obj.add_user(
-                question_data["USER"]["USER"], question_data["USER"]["USER_PERCENT"]
-            )
+        user_id = self.add_user(question.user)
 
         # 2. Add question only if the question is not in the database already:
-        question_id = (
-            self.db_obj.get_question_id(question_data["GYIK_ID"])
-            if self.db_obj.get_question_id(question_data["GYIK_ID"]) is not None
-            else self.db_obj.add_question(question_data)
-        )
+        question_id = self.db_obj.get_question_id(question.gyik_id)
+        if question_id is None:
+            question_id = self.db_obj.add_question(question, user_id)
 
         # Loop through all keywords:
-        for keyword in question_data["KEYWORDS"]:
-            if not keyword or keyword is None or keyword == "":
+        for keyword in question.keywords:
+            if not keyword:
                 continue
 
             # Add keyword:
@@ -487,21 +759,106 @@ class question_loader:
             # Add question links to keyword:
             self.db_obj.link_to_keyword(question_id, keyword_id)
 
-        # Loop through all answers:
-        for answer in question_data["ANSWERS"]:
-            # Adding question id as foreign key pointing to the question table:
-            answer["QUESTION_ID"] = question_id
+        # Loop through all answers, question id is the foreign key pointing to the question table:
+        for answer in question.answers:
+            self.db_obj.add_answer(answer, question_id, self.add_user(answer.user))
 
-            # Add users to answer object:
-            if answer["USER"]["USER"]:
-                answer["USER_ID"] = self.db_obj.add_user(
-                    answer["USER"]["USER"], answer["USER"]["USER_PERCENT"]
-                )
-            else:
-                answer["USER_ID"] = None
-
-            # Add answer to the database:
-            self.db_obj.add_answer(answer)
+        # Cached query results are invalidated when the load is committed:
+        self.db_obj.bump_data_version()
 
         # The changes are only committed after all uploads were successfully completed.
-        self.db_obj.commit()
+        if commit:
+            self.db_obj.commit()
+
+    def refresh_question(
+        self: question_loader, question: Question, commit: bool = True
+    ) -> Dict[str, int]:
+        """Bring a question already in the database up to date with its freshly parsed version.
+
+        Only the differences are written: new answers are inserted, changed usefulness values are
+        updated, new keywords are linked, and answers not on the site any more are flagged as removed.
+        Everything is applied in one transaction. Questions not yet in the database are added.
+
+        Args:
+            self (question_loader)
+            question (Question): freshly parsed question with all answers
+            commit (bool): if False, committing the changes is left to the caller.
+        Returns:
+            dict: number of inserted, updated, removed answers and linked keywords.
+        """
+        summary = {"inserted": 0, "updated": 0, "removed": 0, "keywords": 0}
+
+        question_id = self.db_obj.get_question_id(question.gyik_id)
+        if question_id is None:
+            self.add_question(question, commit=commit)
+            summary["inserted"] = len(question.answers)
+            return summary
+
+        self.db_obj.savepoint("refresh")
+        try:
+            # Link new keywords:
+            linked_keywords = self.db_obj.get_keyword_links(question_id)
+            for keyword in question.keywords:
+                if not keyword:
+                    continue
+
+                keyword_id = self.db_obj.add_keyword(keyword)
+                if keyword_id not in linked_keywords:
+                    self.db_obj.link_to_keyword(question_id, keyword_id)
+                    linked_keywords.add(keyword_id)
+                    summary["keywords"] += 1
+
+            # Compare answers with the stored ones:
+            stored_answers = self.db_obj.get_stored_answers(question_id)
+            for answer in question.answers:
+                stored = stored_answers.pop(answer.gyik_id, None)
+
+                if stored is None:
+                    self.db_obj.add_answer(
+                        answer, question_id, self.add_user(answer.user)
+                    )
+                    summary["inserted"] += 1
+                    continue
+
+                (answer_id, user_percent, answer_percent, removed_date) = stored
+
+                changed = False
+
+                # The answer is back on the site:
+                if removed_date is not None:
+                    self.db_obj.set_answer_removed(answer_id, None)
+                    changed = True
+
+                if (user_percent, answer_percent) != (
+                    answer.user.user_percent,
+                    answer.answer_percent,
+                ):
+                    self.db_obj.update_answer_percent(
+                        answer_id, answer.user.user_percent, answer.answer_percent
+                    )
+                    changed = True
+
+                summary["updated"] += changed
+
+            # Whatever is left in the database is not on the site any more:
+            removed_date = datetime.now()
+            for answer_id, *_, previously_removed in stored_answers.values():
+                if previously_removed is None:
+                    self.db_obj.set_answer_removed(answer_id, removed_date)
+                    summary["removed"] += 1
+
+        except Exception:
+            self.db_obj.rollback_to("refresh")
+            self.db_obj.release("refresh")
+            raise
+
+        self.db_obj.release("refresh")
+
+        # Unchanged questions keep the cached query results valid:
+        if any(summary.values()):
+            self.db_obj.bump_data_version()
+
+        if commit:
+            self.db_obj.commit()
+
+        return summary
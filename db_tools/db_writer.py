@@ -0,0 +1,351 @@
+"""Background writer loading parsed questions into the database in group commits."""
+
+from __future__ import annotations
+
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import TYPE_CHECKING, Any, List, Tuple
+
+from db_tools.db_connection import db_connection
+from db_tools.db_utils import db_handler, question_loader
+
+if TYPE_CHECKING:
+    from scraper.records import Question
+
+logger = logging.getLogger("__main__")
+
+
+class db_writer:
+    """Load questions into the database from a dedicated thread.
+
+    The writer thread owns the SQLite connection. Questions submitted by the callers are put on a
+    bounded queue, and applied one by one, each in its own savepoint. The transaction is committed
+    when `batch_size` questions are applied or `flush_interval` seconds elapsed since the first
+    uncommitted question. The returned future of each question is resolved once the question is
+    committed, or fails with the exception raised while loading that question. If the thread stops
+    on an unexpected error, the futures of the questions not yet committed fail with it, and the
+    writer is closed.
+    """
+
+    # Savepoint wrapping a single question within the group transaction:
+    SAVEPOINT = "question"
+
+    # Sentinel telling the thread to flush and exit:
+    _STOP = object()
+
+    # Seconds between two checks of the thread while a caller waits for it:
+    _POLL_INTERVAL = 1.0
+
+    def __init__(
+        self: db_writer,
+        database_file: str,
+        queue_size: int = 100,
+        batch_size: int = 50,
+        flush_interval: float = 5.0,
+        id_filter_error_rate: float | None = None,
+        text_compression: str | None = None,
+        near_duplicates: bool = False,
+    ) -> None:
+        """Start the writer thread.
+
+        Args:
+            self (db_writer)
+            database_file (str): sqlite database file. If not exists will be created.
+            queue_size (int): maximum number of questions waiting to be written. Callers block when full.
+            batch_size (int): number of questions committed in one transaction.
+            flush_interval (float): maximum number of seconds a question waits for commit.
+            id_filter_error_rate (float | None): if given, the writer uses in-memory id filters with this
+                false positive rate to skip lookups of new questions and answers.
+            text_compression (str | None): if given (zlib or zstd), the texts are stored compressed.
+            near_duplicates (bool): if True, new questions are added to the near-duplicate index.
+        """
+        if batch_size < 1:
+            raise ValueError(f"Batch size must be positive. Got: {batch_size}")
+
+        self.database_file = database_file
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.id_filter_error_rate = id_filter_error_rate
+        self.text_compression = text_compression
+        self.near_duplicates = near_duplicates
+
+        self.queue: queue.Queue = queue.Queue(maxsize=queue_size)
+        self.closed = False
+
+        # Error that stopped the thread, the questions still queued fail with it:
+        self._fatal_error: Exception | None = None
+
+        # The connection is opened in the thread, errors are reported back:
+        self._ready = threading.Event()
+        self._startup_error: Exception | None = None
+
+        self.thread = threading.Thread(target=self._run, name="db_writer", daemon=True)
+        self.thread.start()
+        self._ready.wait()
+
+        if self._startup_error is not None:
+            raise self._startup_error
+
+    def add_question(self: db_writer, question: Question) -> Future:
+        """Submit a question to be loaded into the database.
+
+        Blocks if the queue is full.
+
+        Args:
+            self (db_writer)
+            question (Question): parsed question with all answers
+        Returns:
+            Future: resolved when the question is committed.
+        """
+        return self._submit("add_question", question)
+
+    def refresh_question(self: db_writer, question: Question) -> Future:
+        """Submit a question already in the database to be brought up to date.
+
+        Blocks if the queue is full.
+
+        Args:
+            self (db_writer)
+            question (Question): freshly parsed question with all answers
+        Returns:
+            Future: resolved with the summary of the changes when the question is committed.
+        """
+        return self._submit("refresh_question", question)
+
+    def _submit(self: db_writer, method: str, question: Question) -> Future:
+        """Put a question on the queue to be processed by the given loader method.
+
+        Args:
+            self (db_writer)
+            method (str): name of the question_loader method applying the question
+            question (Question): parsed question
+        Returns:
+            Future: resolved when the question is committed.
+        """
+        future: Future = Future()
+        self._put((method, question, future))
+        return future
+
+    def flush(self: db_writer) -> None:
+        """Wait until all questions submitted so far are committed.
+
+        Args:
+            self (db_writer)
+        Raises:
+            RuntimeError: if the writer is closed, or its thread stopped before the flush.
+        """
+        flushed = threading.Event()
+        self._put(flushed)
+        while not flushed.wait(self._POLL_INTERVAL):
+            self._check_alive()
+
+    def _check_alive(self: db_writer) -> None:
+        """Raise if the writer does not accept questions anymore.
+
+        Args:
+            self (db_writer)
+        Raises:
+            RuntimeError: if the writer is closed or its thread stopped.
+        """
+        if self._fatal_error is not None:
+            raise RuntimeError(
+                f"Writer stopped: {self._fatal_error}"
+            ) from self._fatal_error
+        if self.closed or not self.thread.is_alive():
+            raise RuntimeError("Writer is already closed.")
+
+    def _put(self: db_writer, item: Any) -> None:
+        """Put an item on the queue, waiting while it is full as long as the thread runs.
+
+        Args:
+            self (db_writer)
+            item (Any): question with its future, or flush event
+        Raises:
+            RuntimeError: if the writer is closed or its thread stopped.
+        """
+        self._check_alive()
+        while True:
+            try:
+                self.queue.put(item, timeout=self._POLL_INTERVAL)
+                break
+            except queue.Full:
+                self._check_alive()
+
+        # The thread stopped meanwhile, nothing takes the item from the queue:
+        if not self.thread.is_alive():
+            self._drain()
+            self._check_alive()
+
+    def close(self: db_writer) -> None:
+        """Commit all pending questions, stop the thread and close the connection.
+
+        Args:
+            self (db_writer)
+        """
+        if self.closed:
+            return
+
+        self.closed = True
+        if self.thread.is_alive():
+            self.queue.put(self._STOP)
+        self.thread.join()
+
+    def __enter__(self: db_writer) -> db_writer:
+        return self
+
+    def __exit__(self: db_writer, *exc_info) -> None:
+        self.close()
+
+    def _run(self: db_writer) -> None:
+        """Main loop of the writer thread.
+
+        Args:
+            self (db_writer)
+        """
+        try:
+            connection = db_connection(self.database_file)
+            handler = db_handler(connection.conn)
+            if self.id_filter_error_rate is not None:
+                handler.enable_id_filters(self.id_filter_error_rate)
+            if self.text_compression is not None:
+                handler.enable_text_compression(self.text_compression)
+            if self.near_duplicates:
+                handler.enable_near_duplicate_index()
+            loader = question_loader(handler)
+        except Exception as error:
+            self._startup_error = error
+            self._ready.set()
+            return
+
+        self._ready.set()
+
+        # Futures and results of the questions applied, but not yet committed:
+        pending: List[Tuple[Future, Any]] = []
+
+        try:
+            self._loop(handler, loader, pending)
+        except Exception as error:
+            # Unexpected failure of the connection, the callers must not wait for the thread:
+            logger.error(f"Writer stopped: {error}")
+            self._fatal_error = error
+            self.closed = True
+            for future, _ in pending:
+                if not future.done():
+                    future.set_exception(error)
+            pending.clear()
+            self._drain()
+
+        handler.close()
+
+    def _loop(
+        self: db_writer,
+        handler: db_handler,
+        loader: question_loader,
+        pending: List[Tuple[Future, Any]],
+    ) -> None:
+        """Apply the queued questions and commit them in groups until stopped.
+
+        Args:
+            self (db_writer)
+            handler (db_handler): handler of the writer connection
+            loader (question_loader): loader of the writer connection
+            pending (list): futures and results of the questions applied, but not yet committed
+        """
+        batch_started = 0.0
+
+        while True:
+            # Waiting for the next question until the batch is due:
+            timeout = (
+                max(0.0, batch_started + self.flush_interval - time.monotonic())
+                if pending
+                else None
+            )
+            try:
+                item = self.queue.get(timeout=timeout)
+            except queue.Empty:
+                self._commit(handler, pending)
+                continue
+
+            # Shutting down:
+            if item is self._STOP:
+                self._commit(handler, pending)
+                break
+
+            # Flush requested by the caller:
+            if isinstance(item, threading.Event):
+                self._commit(handler, pending)
+                item.set()
+                continue
+
+            method, question, future = item
+            if not future.set_running_or_notify_cancel():
+                continue
+
+            if not pending:
+                batch_started = time.monotonic()
+
+            # Applying the question in its own savepoint, so a failure does not affect the batch:
+            try:
+                handler.savepoint(self.SAVEPOINT)
+                try:
+                    result = getattr(loader, method)(question, commit=False)
+                except Exception as error:
+                    logger.error(
+                        f"Loading question ({question.gyik_id}) failed: {error}"
+                    )
+                    handler.rollback_to(self.SAVEPOINT)
+                    handler.release(self.SAVEPOINT)
+                    future.set_exception(error)
+                    continue
+                handler.release(self.SAVEPOINT)
+            except Exception as error:
+                # The savepoint could not be handled, the question fails with the writer:
+                if not future.done():
+                    future.set_exception(error)
+                raise
+
+            pending.append((future, result))
+
+            if len(pending) >= self.batch_size:
+                self._commit(handler, pending)
+
+    def _drain(self: db_writer) -> None:
+        """Fail the questions left on the queue and release the flushes waiting after a fatal error.
+
+        Args:
+            self (db_writer)
+        """
+        error = self._fatal_error or RuntimeError("Writer is already closed.")
+        while True:
+            try:
+                item = self.queue.get_nowait()
+            except queue.Empty:
+                break
+            if isinstance(item, tuple):
+                future = item[2]
+                if future.set_running_or_notify_cancel():
+                    future.set_exception(error)
+
+    @staticmethod
+    def _commit(handler: db_handler, pending: List[Tuple[Future, Any]]) -> None:
+        """Commit the group transaction and resolve the futures of the committed questions.
+
+        Args:
+            handler (db_handler): handler of the writer connection
+            pending (list): futures and results of the questions in the transaction. Emptied.
+        """
+        try:
+            handler.commit()
+        except Exception as error:
+            logger.error(f"Committing {len(pending)} questions failed: {error}")
+            handler.rollback()
+            for future, _ in pending:
+                future.set_exception(error)
+        else:
+            for future, result in pending:
+                future.set_result(result)
+
+        pending.clear()
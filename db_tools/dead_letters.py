@@ -0,0 +1,193 @@
+"""Persistent queue of the pages that could not be downloaded.
+
+When the retries of a page are used up (see scraper.failures), the crawl records the URL here and
+moves on. The dead letters are retried later with `gyik_scraper.py --retryDeadLetters <n>`; pages
+downloaded successfully are removed from the queue, pages failing again have their failure count
+increased. Pages that do not exist any more (not_found) are not retried.
+
+Usage:
+    python -m db_tools.dead_letters --database <str> [--purge <error class>]
+"""
+from __future__ import annotations
+
+import argparse
+import logging
+import sqlite3
+from datetime import datetime
+from typing import TYPE_CHECKING, List
+
+if TYPE_CHECKING:
+    from sqlite3 import Connection
+
+logger = logging.getLogger("__main__")
+
+
+class dead_letter_queue:
+    """URLs failed to download, stored in the database."""
+
+    dead_letter_table_sql = """CREATE TABLE IF NOT EXISTS DEAD_LETTER (
+        ID INTEGER PRIMARY KEY,
+        URL TEXT NOT NULL UNIQUE,
+        KIND TEXT NOT NULL,
+        ERROR_CLASS TEXT NOT NULL,
+        ERROR TEXT,
+        ATTEMPTS INTEGER NOT NULL,
+        FAILURES INTEGER NOT NULL DEFAULT 1,
+        FIRST_FAILED DATETIME NOT NULL,
+        LAST_FAILED DATETIME NOT NULL
+    )"""
+
+    # A page failing again keeps its first failure date:
+    add_sql = """
+        INSERT INTO DEAD_LETTER (
+            URL, KIND, ERROR_CLASS, ERROR, ATTEMPTS, FIRST_FAILED, LAST_FAILED
+        )
+        VALUES (:url, :kind, :error_class, :error, :attempts, :now, :now)
+        ON CONFLICT (URL) DO UPDATE SET
+            ERROR_CLASS = excluded.ERROR_CLASS,
+            ERROR = excluded.ERROR,
+            ATTEMPTS = excluded.ATTEMPTS,
+            FAILURES = FAILURES + 1,
+            LAST_FAILED = excluded.LAST_FAILED
+    """
+
+    resolve_sql = """DELETE FROM DEAD_LETTER WHERE URL = :url"""
+
+    # Pages to retry, the least failed and oldest first:
+    retry_sql = """
+        SELECT URL, KIND
+        FROM DEAD_LETTER
+        WHERE ERROR_CLASS != 'not_found'
+        ORDER BY FAILURES, LAST_FAILED
+        LIMIT :limit
+    """
+
+    report_sql = """
+        SELECT ERROR_CLASS, COUNT(*), SUM(FAILURES), MIN(FIRST_FAILED), MAX(LAST_FAILED)
+        FROM DEAD_LETTER
+        GROUP BY ERROR_CLASS
+        ORDER BY ERROR_CLASS
+    """
+
+    purge_sql = """DELETE FROM DEAD_LETTER WHERE ERROR_CLASS = :error_class"""
+
+    def __init__(self: dead_letter_queue, connection: Connection) -> None:
+        """Initialize the queue, the table is created if not exists.
+
+        Args:
+            self (dead_letter_queue)
+            connection (Connection): connection to the scraper database
+        """
+        if not isinstance(connection, sqlite3.Connection):
+            raise TypeError(
+                f"Connection object is expected for initialize dead_letter_queue object. Got type: {type(connection)}."
+            )
+
+        self.conn = connection
+
+        with self.conn:
+            self.conn.execute(self.dead_letter_table_sql)
+
+    def add(
+        self: dead_letter_queue,
+        url: str,
+        kind: str,
+        error_class: str,
+        error: str,
+        attempts: int,
+    ) -> None:
+        """Record a page that could not be downloaded.
+
+        Args:
+            self (dead_letter_queue)
+            url (str): URL of the page
+            kind (str): question or list page
+            error_class (str): class of the last error (see scraper.failures)
+            error (str): last error message
+            attempts (int): number of download attempts
+        """
+        with self.conn:
+            self.conn.execute(
+                self.add_sql,
+                {
+                    "url": url,
+                    "kind": kind,
+                    "error_class": error_class,
+                    "error": error,
+                    "attempts": attempts,
+                    "now": datetime.now(),
+                },
+            )
+        logger.warning(f"Dead letter recorded ({error_class}): {url}")
+
+    def resolve(self: dead_letter_queue, url: str) -> None:
+        """Remove a page downloaded successfully from the queue.
+
+        Args:
+            self (dead_letter_queue)
+            url (str): URL of the page
+        """
+        with self.conn:
+            self.conn.execute(self.resolve_sql, {"url": url})
+
+    def retry_list(self: dead_letter_queue, limit: int) -> List[tuple]:
+        """Pages to retry, the least failed and longest waiting first.
+
+        Args:
+            self (dead_letter_queue)
+            limit (int): maximum number of pages
+        Returns:
+            list: (URL, kind) tuples
+        """
+        return self.conn.execute(self.retry_sql, {"limit": limit}).fetchall()
+
+    def report(self: dead_letter_queue) -> List[tuple]:
+        """Number of dead letters by error class.
+
+        Returns:
+            list: (error class, pages, failures, first failure, last failure) tuples
+        """
+        return self.conn.execute(self.report_sql).fetchall()
+
+    def purge(self: dead_letter_queue, error_class: str) -> int:
+        """Drop the dead letters of an error class.
+
+        Args:
+            self (dead_letter_queue)
+            error_class (str): class of the dropped pages
+        Returns:
+            int: number of dropped pages
+        """
+        with self.conn:
+            cursor = self.conn.execute(self.purge_sql, {"error_class": error_class})
+        return cursor.rowcount
+
+
+if __name__ == "__main__":
+    from db_tools.db_connection import db_connection
+
+    parser = argparse.ArgumentParser(
+        description="List the pages that could not be downloaded."
+    )
+    parser.add_argument(
+        "--database", type=str, help="SQLite database file.", required=True
+    )
+    parser.add_argument(
+        "--purge",
+        type=str,
+        help="Drop the dead letters of this error class (eg. not_found).",
+        required=False,
+    )
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(message)s")
+
+    queue = dead_letter_queue(db_connection(args.database).conn)
+
+    if args.purge is not None:
+        logger.info(f"Dropped {queue.purge(args.purge)} dead letters.")
+
+    for error_class, pages, failures, first_failed, last_failed in queue.report():
+        logger.info(
+            f"{error_class}: {pages} pages, {failures} failures ({first_failed} - {last_failed})"
+        )
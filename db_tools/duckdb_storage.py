@@ -0,0 +1,886 @@
+"""Embedded DuckDB storage backend, for analytical queries over the questions and answers.
+
+DuckDB stores the tables by column, so aggregations over ANSWER and QUESTION only read the columns
+they use. Single row inserts are slow in DuckDB, so the handler works like an appender:
+    - the identifiers of the stored users, keywords, questions and answers are loaded into memory,
+      new rows get their identifiers assigned in memory, and lookups are answered from there,
+    - new rows and updates are staged in memory, and written in bulk on commit, one column batch
+      per table,
+    - savepoints (not supported by DuckDB) roll back the staged changes, through an undo log.
+
+The tables have the same columns as the SQLite database. Texts are stored uncompressed, DuckDB
+compresses the columns itself. Questions can be loaded with `question_loader`, or from interchange
+files (see scraper.interchange) with:
+
+Usage:
+    python -m db_tools.duckdb_storage --database <str> --input <file> [<file> ...] [--batchSize 5000]
+"""
+from __future__ import annotations
+
+import argparse
+import logging
+import time
+from datetime import datetime
+from typing import TYPE_CHECKING, Any, Callable, Dict, Iterable, List, Set
+
+import numpy as np
+
+from db_tools.storage import storage_backend
+from scraper import log_events
+from scraper.records import Answer, Question
+
+if TYPE_CHECKING:
+    from duckdb import DuckDBPyConnection
+
+logger = logging.getLogger("__main__")
+
+# Columns of the tables in order, with their kind (id: not null integer, int: nullable integer):
+COLUMNS = {
+    "USER": [("ID", "id"), ("USER", "text"), ("USER_PERCENT", "int")],
+    "KEYWORD": [("ID", "id"), ("KEYWORD", "text")],
+    "QUESTION": [
+        ("ID", "id"),
+        ("GYIK_ID", "id"),
+        ("CATEGORY", "text"),
+        ("SUBCATEGORY", "text"),
+        ("QUESTION_TITLE", "text"),
+        ("QUESTION", "text"),
+        ("QUESTION_DATE", "time"),
+        ("URL", "text"),
+        ("USER_ID", "int"),
+        ("ADDED_DATE", "time"),
+    ],
+    "ANSWER": [
+        ("ID", "id"),
+        ("USER_ID", "int"),
+        ("GYIK_ID", "id"),
+        ("QUESTION_ID", "id"),
+        ("ANSWER_DATE", "time"),
+        ("ANSWER_TEXT", "text"),
+        ("USER_PERCENT", "int"),
+        ("ANSWER_PERCENT", "int"),
+        ("REMOVED_DATE", "time"),
+    ],
+    "QUESTION_KEYWORD": [("KEYWORD_ID", "id"), ("QUESTION_ID", "id")],
+}
+
+# Positions of the updated answer columns:
+ANSWER_USER_PERCENT, ANSWER_PERCENT, ANSWER_REMOVED_DATE = 6, 7, 8
+
+# Marks a key missing from a mapping in the undo log:
+_MISSING = object()
+
+
+def column_batch(columns: List[tuple], rows: List[list]) -> Dict[str, np.ndarray]:
+    """Turn staged rows into NumPy columns, which DuckDB scans without copying row by row.
+
+    Nullable integers are passed as floats, NaN becomes NULL. Object arrays of integers with None
+    values are orders of magnitude slower to scan.
+    """
+    batch = {}
+    for position, (name, kind) in enumerate(columns):
+        values = [row[position] for row in rows]
+        if kind == "id":
+            batch[name] = np.array(values, dtype=np.int64)
+        elif kind == "int":
+            batch[name] = np.array(
+                [np.nan if value is None else value for value in values],
+                dtype=np.float64,
+            )
+        elif kind == "time":
+            batch[name] = np.array(values, dtype="datetime64[us]")
+        else:
+            batch[name] = np.array(values, dtype=object)
+    return batch
+
+
+class duckdb_handler(storage_backend):
+    """DuckDB implementation of the storage backend."""
+
+    user_table_sql = """CREATE TABLE IF NOT EXISTS USER (
+        ID BIGINT NOT NULL,
+        USER VARCHAR NOT NULL,
+        USER_PERCENT INTEGER
+    )"""
+
+    keyword_table_sql = """CREATE TABLE IF NOT EXISTS KEYWORD (
+        ID BIGINT NOT NULL,
+        KEYWORD VARCHAR NOT NULL
+    )"""
+
+    question_table_sql = """CREATE TABLE IF NOT EXISTS QUESTION (
+        ID BIGINT NOT NULL,
+        GYIK_ID BIGINT NOT NULL,
+        CATEGORY VARCHAR NOT NULL,
+        SUBCATEGORY VARCHAR NOT NULL,
+        QUESTION_TITLE VARCHAR NOT NULL,
+        QUESTION VARCHAR,
+        QUESTION_DATE TIMESTAMP NOT NULL,
+        URL VARCHAR NOT NULL,
+        USER_ID BIGINT,
+        ADDED_DATE TIMESTAMP NOT NULL
+    )"""
+
+    answer_table_sql = """CREATE TABLE IF NOT EXISTS ANSWER (
+        ID BIGINT NOT NULL,
+        USER_ID BIGINT,
+        GYIK_ID BIGINT NOT NULL,
+        QUESTION_ID BIGINT NOT NULL,
+        ANSWER_DATE TIMESTAMP NOT NULL,
+        ANSWER_TEXT VARCHAR NOT NULL,
+        USER_PERCENT INTEGER,
+        ANSWER_PERCENT INTEGER,
+        REMOVED_DATE TIMESTAMP
+    )"""
+
+    question_keyword_table_sql = """CREATE TABLE IF NOT EXISTS QUESTION_KEYWORD (
+        KEYWORD_ID BIGINT NOT NULL,
+        QUESTION_ID BIGINT NOT NULL
+    )"""
+
+    # Stored rows, the staged ones are looked up in memory:
+    get_answers_sql = """
+        SELECT ID, GYIK_ID, USER_ID, USER_PERCENT, ANSWER_PERCENT, REMOVED_DATE
+        FROM ANSWER
+        WHERE QUESTION_ID = $question_id
+    """
+    get_keyword_links_sql = """
+        SELECT KEYWORD_ID FROM QUESTION_KEYWORD WHERE QUESTION_ID = $question_id
+    """
+    get_question_user_sql = """SELECT USER_ID FROM QUESTION WHERE ID = $id"""
+    get_question_text_sql = """SELECT QUESTION FROM QUESTION WHERE ID = $id"""
+    get_answer_text_sql = """SELECT ANSWER_TEXT FROM ANSWER WHERE ID = $id"""
+
+    # Staged updates are joined to the tables from a column batch:
+    update_user_percent_sql = """
+        UPDATE USER SET USER_PERCENT = staged_rows.USER_PERCENT
+        FROM staged_rows WHERE USER.ID = staged_rows.ID
+    """
+    update_answer_percent_sql = """
+        UPDATE ANSWER
+        SET
+            USER_PERCENT = staged_rows.USER_PERCENT,
+            ANSWER_PERCENT = staged_rows.ANSWER_PERCENT
+        FROM staged_rows WHERE ANSWER.ID = staged_rows.ID
+    """
+    set_answer_removed_sql = """
+        UPDATE ANSWER SET REMOVED_DATE = staged_rows.REMOVED_DATE
+        FROM staged_rows WHERE ANSWER.ID = staged_rows.ID
+    """
+
+    def __init__(self: duckdb_handler, filename: str) -> None:
+        """Open the database, the tables are created if not exist.
+
+        Args:
+            self (duckdb_handler)
+            filename (str): DuckDB database file, ":memory:" for an in-memory database
+        """
+        self.conn: DuckDBPyConnection = self._duckdb().connect(filename)
+
+        # The object columns of the batches only hold strings, sampling their values is skipped:
+        self.conn.execute("SET pandas_analyze_sample = 0")
+
+        for table in ["user", "keyword", "question", "answer", "question_keyword"]:
+            self.conn.execute(getattr(self, table + "_table_sql"))
+
+        self._load_identifiers()
+
+        # Changes not written yet:
+        self.staged_users: Dict[int, list] = {}
+        self.staged_keywords: Dict[int, list] = {}
+        self.staged_questions: Dict[int, list] = {}
+        self.staged_answers: Dict[int, list] = {}
+        self.staged_links: Dict[int, Set[int]] = {}
+        self.answers_of: Dict[int, List[int]] = {}
+        self.user_percent_updates: Dict[int, int | None] = {}
+        self.answer_percent_updates: Dict[int, tuple] = {}
+        self.removed_updates: Dict[int, datetime | None] = {}
+
+        # Inverse of every change since the last commit, and the open savepoints:
+        self.undo_log: List[Callable[[], Any]] = []
+        self.savepoints: List[tuple] = []
+
+        self.conn.begin()
+
+    @staticmethod
+    def _duckdb():
+        try:
+            import duckdb
+        except ImportError:
+            raise ImportError(
+                "The DuckDB backend requires the duckdb package: pip install duckdb"
+            )
+        return duckdb
+
+    def _load_identifiers(self: duckdb_handler) -> None:
+        """Load the identifiers of the stored rows into memory."""
+        self.users: Dict[str, tuple] = {
+            user: (user_id, percent)
+            for user_id, user, percent in self.conn.execute(
+                "SELECT ID, USER, USER_PERCENT FROM USER"
+            ).fetchall()
+        }
+        self.keywords: Dict[str, int] = dict(
+            self.conn.execute("SELECT KEYWORD, ID FROM KEYWORD").fetchall()
+        )
+        self.questions: Dict[int, int] = dict(
+            self.conn.execute("SELECT GYIK_ID, ID FROM QUESTION").fetchall()
+        )
+        self.answers: Set[int] = {
+            gyik_id
+            for (gyik_id,) in self.conn.execute("SELECT GYIK_ID FROM ANSWER").fetchall()
+        }
+
+        # Next free identifier of each table, rows below it may be stored:
+        self.next_id = {
+            table: (
+                self.conn.execute(f"SELECT MAX(ID) FROM {table}").fetchone()[0] or 0
+            )
+            + 1
+            for table in ["USER", "KEYWORD", "QUESTION", "ANSWER"]
+        }
+        self.committed_id = dict(self.next_id)
+        self.flushed_id = dict(self.next_id)
+
+    def _new_id(self: duckdb_handler, table: str) -> int:
+        new_id = self.next_id[table]
+        self.next_id[table] += 1
+        return new_id
+
+    def _assign(self: duckdb_handler, mapping: dict, key: Any, value: Any) -> None:
+        """Set a key of a mapping, recording the inverse in the undo log."""
+        previous = mapping.get(key, _MISSING)
+        mapping[key] = value
+
+        # Staged mappings may have been written and cleared since:
+        if previous is _MISSING:
+            self.undo_log.append(lambda: mapping.pop(key, None))
+        else:
+            self.undo_log.append(lambda: mapping.__setitem__(key, previous))
+
+    def _append(self: duckdb_handler, items: list | set, item: Any) -> None:
+        """Add an item to a list or set, recording the inverse in the undo log."""
+        if isinstance(items, set):
+            items.add(item)
+            self.undo_log.append(lambda: items.discard(item))
+        else:
+            items.append(item)
+            self.undo_log.append(items.pop)
+
+    def _is_flushed(self: duckdb_handler, table: str, row_id: int) -> bool:
+        """True if the row may be in the database (and not only staged)."""
+        return row_id < self.flushed_id[table]
+
+    def add_user(self: duckdb_handler, user: str, percent: float) -> int | None:
+        """Get user ID or adds to db if not aready in the db. Missing percent is filled in.
+
+        Args:
+            self (duckdb_handler)
+            user (str): user name
+            percent (float): percent value of the usefulness of the answers
+        Returns:
+            int: identifier of the user in the database.
+        """
+        stored = self.users.get(user)
+        if stored is None:
+            user_id = self._new_id("USER")
+            self._assign(self.users, user, (user_id, percent))
+            self._assign(self.staged_users, user_id, [user_id, user, percent])
+            return user_id
+
+        user_id, stored_percent = stored
+        if percent and not stored_percent:
+            self._assign(self.users, user, (user_id, percent))
+            self._assign(self.user_percent_updates, user_id, percent)
+        return user_id
+
+    def add_keyword(self: duckdb_handler, keyword: str) -> int:
+        """Get keyword ID or adds to db if not already in the db.
+
+        Args:
+            self (duckdb_handler)
+            keyword (str): keyword parsed from html
+        Returns:
+            int: keyword ID in the database.
+        """
+        if not keyword:
+            raise ValueError("Keyword must be specified!")
+
+        keyword_id = self.keywords.get(keyword)
+        if keyword_id is None:
+            keyword_id = self._new_id("KEYWORD")
+            self._assign(self.keywords, keyword, keyword_id)
+            self._assign(self.staged_keywords, keyword_id, [keyword_id, keyword])
+        return keyword_id
+
+    def get_keyword_links(self: duckdb_handler, question_id: int) -> Set[int]:
+        """Get the identifiers of the keywords linked to a question.
+
+        Args:
+            self (duckdb_handler)
+            question_id (int): database identifier of the question
+        Returns:
+            set: keyword identifiers
+        """
+        links = set(self.staged_links.get(question_id, ()))
+        if self._is_flushed("QUESTION", question_id):
+            links.update(
+                keyword_id
+                for (keyword_id,) in self.conn.execute(
+                    self.get_keyword_links_sql, {"question_id": question_id}
+                ).fetchall()
+            )
+        return links
+
+    def link_to_keyword(
+        self: duckdb_handler, question_id: int, keyword_id: int
+    ) -> None:
+        """Link a question to a keyword, if not linked yet.
+
+        Args:
+            question_id (int): The `question_id` identifies question in the database.
+            keyword_id (int): The `keyword_id` identifies keyword in the database.
+        """
+        if keyword_id in self.get_keyword_links(question_id):
+            log_events.event("link_stored", "Question/keyword link already exist.")
+            return
+
+        if question_id not in self.staged_links:
+            self._assign(self.staged_links, question_id, set())
+        self._append(self.staged_links[question_id], keyword_id)
+
+    def get_question_id(self: duckdb_handler, gyik_id: int) -> int | None:
+        """Question identifier by GYIK_ID, None if not in the database.
+
+        Args:
+            self (duckdb_handler)
+            gyik_id (int): GYIK identifier of a question
+        """
+        return self.questions.get(gyik_id)
+
+    def _question_answers(self: duckdb_handler, question_id: int) -> List[tuple]:
+        """(ID, GYIK_ID, USER_ID, USER_PERCENT, ANSWER_PERCENT, REMOVED_DATE) of the answers of a
+        question, the staged changes applied."""
+        answers = []
+
+        if self._is_flushed("QUESTION", question_id):
+            for answer_id, gyik_id, user_id, *values in self.conn.execute(
+                self.get_answers_sql, {"question_id": question_id}
+            ).fetchall():
+                user_percent, answer_percent, removed_date = values
+                if answer_id in self.answer_percent_updates:
+                    user_percent, answer_percent = self.answer_percent_updates[
+                        answer_id
+                    ]
+                removed_date = self.removed_updates.get(answer_id, removed_date)
+                answers.append(
+                    (
+                        answer_id,
+                        gyik_id,
+                        user_id,
+                        user_percent,
+                        answer_percent,
+                        removed_date,
+                    )
+                )
+
+        for answer_id in self.answers_of.get(question_id, ()):
+            row = self.staged_answers[answer_id]
+            answers.append((row[0], row[2], row[1], *row[6:]))
+
+        return answers
+
+    def get_answer_count(self: duckdb_handler, gyik_id: int) -> int | None:
+        """Number of answers of a question, submitted by other than OP.
+
+        Args:
+            self (duckdb_handler)
+            gyik_id (int): GYIK identifier of a question
+        Returns:
+            int | None: Then number of answers are returned or None if the question is not in database
+        """
+        question_id = self.questions.get(gyik_id)
+        if question_id is None:
+            return None
+
+        if question_id in self.staged_questions:
+            asker = self.staged_questions[question_id][8]
+        else:
+            (asker,) = self.conn.execute(
+                self.get_question_user_sql, {"id": question_id}
+            ).fetchone()
+
+        # With the NULL semantics of the SQLite query:
+        return sum(
+            1
+            for _, _, user_id, _, _, removed_date in self._question_answers(question_id)
+            if removed_date is None
+            and (user_id is None or (asker is not None and user_id != asker))
+        )
+
+    def drop_question(self: duckdb_handler, gyik_id: int) -> None:
+        """Drop a question with its answers and keyword links, the changes are committed.
+
+        Args:
+            self (duckdb_handler)
+            gyik_id (int): Gyik identifier of the question
+        """
+        self.commit()
+
+        question_id = self.questions.get(gyik_id)
+        if question_id is None:
+            return
+
+        parameters = {"question_id": question_id}
+        answers = self.conn.execute(
+            "SELECT GYIK_ID FROM ANSWER WHERE QUESTION_ID = $question_id", parameters
+        ).fetchall()
+        for table, column in [
+            ("QUESTION_KEYWORD", "QUESTION_ID"),
+            ("ANSWER", "QUESTION_ID"),
+            ("QUESTION", "ID"),
+        ]:
+            self.conn.execute(
+                f"DELETE FROM {table} WHERE {column} = $question_id", parameters
+            )
+
+        del self.questions[gyik_id]
+        self.answers.difference_update(answer_gyik_id for (answer_gyik_id,) in answers)
+        self.commit()
+
+    def add_question(
+        self: duckdb_handler, question: Question, user_id: int | None
+    ) -> int:
+        """Stage a new question.
+
+        Args:
+            self (duckdb_handler)
+            question (Question): parsed question record
+            user_id (int | None): database identifier of the user who asked the question
+        Returns:
+            int identifier of the newly inserted question
+        """
+        if not isinstance(question, Question):
+            raise TypeError(f"Question record is expected. Got type: {type(question)}.")
+
+        question_id = self._new_id("QUESTION")
+        self._assign(self.questions, question.gyik_id, question_id)
+        self._assign(
+            self.staged_questions,
+            question_id,
+            [
+                question_id,
+                question.gyik_id,
+                question.category,
+                question.subcategory,
+                question.title,
+                question.question,
+                question.question_date,
+                question.url,
+                user_id,
+                datetime.now(),
+            ],
+        )
+        return question_id
+
+    def test_answer(self: duckdb_handler, gyik_id: int) -> bool:
+        """Test if the gyik ID of the answer exist.
+
+        Args:
+            self (duckdb_handler)
+            gyik_id (int): integer value of the gyik identifer of the answer
+        Returns:
+            boolean indicating if the answer is already there (True) or not (False)
+        """
+        return gyik_id in self.answers
+
+    def add_answer(
+        self: duckdb_handler, answer: Answer, question_id: int, user_id: int | None
+    ) -> int | None:
+        """Stage a new answer.
+
+        Args:
+            self (duckdb_handler)
+            answer (Answer): parsed answer record
+            question_id (int): database identifier of the question the answer belongs to
+            user_id (int | None): database identifier of the user who gave the answer
+        Returns:
+            int for newly added answers.
+        """
+        if not isinstance(answer, Answer):
+            raise TypeError(f"Answer record is expected. Got type: {type(answer)}.")
+
+        if self.test_answer(answer.gyik_id):
+            log_events.event(
+                "answer_stored",
+                f"Answer ({answer.gyik_id}) has already been added to the database! Skipping",
+            )
+            return None
+
+        answer_id = self._new_id("ANSWER")
+        self._append(self.answers, answer.gyik_id)
+        self._assign(
+            self.staged_answers,
+            answer_id,
+            [
+                answer_id,
+                user_id,
+                answer.gyik_id,
+                question_id,
+                answer.answer_date,
+                answer.answer_text,
+                answer.user.user_percent,
+                answer.answer_percent,
+                None,
+            ],
+        )
+        if question_id not in self.answers_of:
+            self._assign(self.answers_of, question_id, [])
+        self._append(self.answers_of[question_id], answer_id)
+        return answer_id
+
+    def get_stored_answers(self: duckdb_handler, question_id: int) -> Dict[int, tuple]:
+        """Get the answers of a question already in the database.
+
+        Args:
+            self (duckdb_handler)
+            question_id (int): database identifier of the question
+        Returns:
+            dict: gyik identifier of the answers mapped to (ID, USER_PERCENT, ANSWER_PERCENT, REMOVED_DATE)
+        """
+        return {
+            gyik_id: (answer_id, *values)
+            for answer_id, gyik_id, _, *values in self._question_answers(question_id)
+        }
+
+    def _update_answer(
+        self: duckdb_handler, answer_id: int, values: Dict[int, Any]
+    ) -> None:
+        """Change columns of a staged answer row."""
+        row = self.staged_answers[answer_id]
+        previous = {position: row[position] for position in values}
+        for position, value in values.items():
+            row[position] = value
+        self.undo_log.append(
+            lambda: [row.__setitem__(*item) for item in previous.items()]
+        )
+
+    def update_answer_percent(
+        self: duckdb_handler,
+        answer_id: int,
+        user_percent: int | None,
+        answer_percent: int | None,
+    ) -> None:
+        """Update the usefulness values of an answer.
+
+        Args:
+            self (duckdb_handler)
+            answer_id (int): database identifier of the answer
+            user_percent (int | None): usefulness of the user at the time of the answer
+            answer_percent (int | None): usefulness of the answer
+        """
+        if answer_id in self.staged_answers:
+            self._update_answer(
+                answer_id,
+                {ANSWER_USER_PERCENT: user_percent, ANSWER_PERCENT: answer_percent},
+            )
+        else:
+            self._assign(
+                self.answer_percent_updates, answer_id, (user_percent, answer_percent)
+            )
+
+    def set_answer_removed(
+        self: duckdb_handler, answer_id: int, removed_date: datetime | None
+    ) -> None:
+        """Flag an answer as removed from the site, or clear the flag if the date is None.
+
+        Args:
+            self (duckdb_handler)
+            answer_id (int): database identifier of the answer
+            removed_date (datetime | None): when the answer was found missing
+        """
+        if answer_id in self.staged_answers:
+            self._update_answer(answer_id, {ANSWER_REMOVED_DATE: removed_date})
+        else:
+            self._assign(self.removed_updates, answer_id, removed_date)
+
+    def get_question_text(self: duckdb_handler, question_id: int) -> str | None:
+        """Get the text of a question.
+
+        Args:
+            self (duckdb_handler)
+            question_id (int): database identifier of the question
+        Returns:
+            str | None: text of the question
+        """
+        if question_id in self.staged_questions:
+            return self.staged_questions[question_id][5]
+
+        row = self.conn.execute(
+            self.get_question_text_sql, {"id": question_id}
+        ).fetchone()
+        return row[0] if row else None
+
+    def get_answer_text(self: duckdb_handler, answer_id: int) -> str | None:
+        """Get the text of an answer.
+
+        Args:
+            self (duckdb_handler)
+            answer_id (int): database identifier of the answer
+        Returns:
+            str | None: text of the answer
+        """
+        if answer_id in self.staged_answers:
+            return self.staged_answers[answer_id][5]
+
+        row = self.conn.execute(self.get_answer_text_sql, {"id": answer_id}).fetchone()
+        return row[0] if row else None
+
+    def query(
+        self: duckdb_handler, sql: str, parameters: dict | None = None
+    ) -> List[tuple]:
+        """Run a read only query, the staged changes are written first.
+
+        Args:
+            self (duckdb_handler)
+            sql (str): SELECT statement with $named parameters
+            parameters (dict | None): values of the parameters
+        Returns:
+            list: rows of the result
+        """
+        self._flush()
+        return self.conn.execute(sql, parameters or {}).fetchall()
+
+    def _write_rows(self: duckdb_handler, table: str, rows: Iterable[list]) -> None:
+        """Append rows to a table in one batch."""
+        rows = list(rows)
+        if not rows:
+            return
+
+        columns = COLUMNS[table]
+        self.conn.register("staged_rows", column_batch(columns, rows))
+        try:
+            names = ", ".join(name for name, _ in columns)
+            self.conn.execute(
+                f"INSERT INTO {table} ({names}) SELECT {names} FROM staged_rows"
+            )
+        finally:
+            self.conn.unregister("staged_rows")
+
+    def _write_updates(
+        self: duckdb_handler, sql: str, columns: List[tuple], rows: List[list]
+    ) -> None:
+        """Apply updates of the rows joined from a column batch."""
+        if not rows:
+            return
+
+        self.conn.register("staged_rows", column_batch(columns, rows))
+        try:
+            self.conn.execute(sql)
+        finally:
+            self.conn.unregister("staged_rows")
+
+    def _flush(self: duckdb_handler) -> None:
+        """Write the staged rows and updates into the open transaction."""
+        if self.savepoints:
+            raise RuntimeError(
+                "Staged changes cannot be written while a savepoint is open."
+            )
+
+        self._write_rows("USER", self.staged_users.values())
+        self._write_rows("KEYWORD", self.staged_keywords.values())
+        self._write_rows("QUESTION", self.staged_questions.values())
+        self._write_rows("ANSWER", self.staged_answers.values())
+        self._write_rows(
+            "QUESTION_KEYWORD",
+            (
+                [keyword_id, question_id]
+                for question_id, keyword_ids in self.staged_links.items()
+                for keyword_id in keyword_ids
+            ),
+        )
+
+        self._write_updates(
+            self.update_user_percent_sql,
+            [("ID", "id"), ("USER_PERCENT", "int")],
+            [list(item) for item in self.user_percent_updates.items()],
+        )
+        self._write_updates(
+            self.update_answer_percent_sql,
+            [("ID", "id"), ("USER_PERCENT", "int"), ("ANSWER_PERCENT", "int")],
+            [
+                [answer_id, *percents]
+                for answer_id, percents in self.answer_percent_updates.items()
+            ],
+        )
+        self._write_updates(
+            self.set_answer_removed_sql,
+            [("ID", "id"), ("REMOVED_DATE", "time")],
+            [list(item) for item in self.removed_updates.items()],
+        )
+
+        self._clear_staged()
+        self.flushed_id = dict(self.next_id)
+
+    def _clear_staged(self: duckdb_handler) -> None:
+        for staged in [
+            self.staged_users,
+            self.staged_keywords,
+            self.staged_questions,
+            self.staged_answers,
+            self.staged_links,
+            self.answers_of,
+            self.user_percent_updates,
+            self.answer_percent_updates,
+            self.removed_updates,
+        ]:
+            staged.clear()
+
+    def bump_data_version(self: duckdb_handler) -> None:
+        """Nothing to invalidate, the query catalog only serves SQLite databases.
+
+        Args:
+            self (duckdb_handler)
+        """
+
+    def commit(self: duckdb_handler) -> None:
+        """Write the staged changes and commit them. Open savepoints are released.
+
+        Args:
+            self (duckdb_handler)
+        """
+        self.savepoints.clear()
+        self._flush()
+        self.conn.commit()
+        self.conn.begin()
+
+        self.undo_log.clear()
+        self.committed_id = dict(self.next_id)
+
+    def rollback(self: duckdb_handler) -> None:
+        """Roll back changes since the last commit.
+
+        Args:
+            self (duckdb_handler)
+        """
+        self.conn.rollback()
+        self.conn.begin()
+
+        # The in-memory identifiers are restored:
+        while self.undo_log:
+            self.undo_log.pop()()
+
+        self.savepoints.clear()
+        self._clear_staged()
+        self.next_id = dict(self.committed_id)
+        self.flushed_id = dict(self.committed_id)
+
+    def savepoint(self: duckdb_handler, name: str) -> None:
+        """Open a savepoint within the current transaction. Changes are only staged until released.
+
+        Args:
+            self (duckdb_handler)
+            name (str): name of the savepoint
+        """
+        if not self.savepoints:
+            self._flush()
+        self.savepoints.append((name, len(self.undo_log), dict(self.next_id)))
+
+    def _savepoint_position(self: duckdb_handler, name: str) -> int:
+        for position in range(len(self.savepoints) - 1, -1, -1):
+            if self.savepoints[position][0] == name:
+                return position
+        raise ValueError(f"No such savepoint: {name}")
+
+    def release(self: duckdb_handler, name: str) -> None:
+        """Release a savepoint, keeping its changes in the current transaction.
+
+        Args:
+            self (duckdb_handler)
+            name (str): name of the savepoint
+        """
+        del self.savepoints[self._savepoint_position(name) :]
+
+    def rollback_to(self: duckdb_handler, name: str) -> None:
+        """Roll back changes made since the savepoint was opened.
+
+        Args:
+            self (duckdb_handler)
+            name (str): name of the savepoint
+        """
+        position = self._savepoint_position(name)
+        _, undo_length, next_id = self.savepoints[position]
+
+        while len(self.undo_log) > undo_length:
+            self.undo_log.pop()()
+
+        self.next_id = dict(next_id)
+        del self.savepoints[position + 1 :]
+
+    def close(self: duckdb_handler) -> None:
+        """Close connection to the databse, uncommitted changes are lost.
+
+        Args:
+            self (duckdb_handler)
+        """
+        self.conn.close()
+
+    def import_questions(
+        self: duckdb_handler, questions: Iterable[Question], batch_size: int = 5000
+    ) -> int:
+        """Load questions with question_loader, committing in batches.
+
+        Args:
+            self (duckdb_handler)
+            questions (Iterable[Question]): parsed questions
+            batch_size (int): number of questions written in one transaction
+        Returns:
+            int: number of questions loaded
+        """
+        from db_tools.db_utils import question_loader
+
+        loader = question_loader(self)
+        count = 0
+        for count, question in enumerate(questions, 1):
+            loader.add_question(question, commit=False)
+            if count % batch_size == 0:
+                self.commit()
+                logger.info(f"{count} questions loaded.")
+
+        self.commit()
+        return count
+
+
+if __name__ == "__main__":
+    from scraper import interchange
+
+    parser = argparse.ArgumentParser(
+        description="Load interchange files into a DuckDB database."
+    )
+    parser.add_argument(
+        "--database", type=str, help="DuckDB database file.", required=True
+    )
+    parser.add_argument(
+        "--input",
+        type=str,
+        nargs="+",
+        help="JSONL files, optionally gzip compressed.",
+        required=True,
+    )
+    parser.add_argument(
+        "--batchSize",
+        type=int,
+        help="Number of questions written in one transaction.",
+        default=5000,
+    )
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(message)s")
+
+    handler = duckdb_handler(args.database)
+    start = time.perf_counter()
+    count = handler.import_questions(
+        interchange.read_questions(args.input), args.batchSize
+    )
+    handler.close()
+    logger.info(f"{count} questions loaded in {time.perf_counter() - start:.1f} s.")
@@ -0,0 +1,137 @@
+"""Probabilistic membership filter of the GYIK identifiers already stored in the database."""
+from __future__ import annotations
+
+import hashlib
+import logging
+import math
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from sqlite3 import Connection
+
+logger = logging.getLogger("__main__")
+
+
+class bloom_filter:
+    """Bloom filter of integer identifiers.
+
+    A negative answer is definite: the identifier was never added. A positive answer is wrong with
+    a probability of about `error_rate` as long as the number of added identifiers stays below the
+    capacity.
+    """
+
+    def __init__(self: bloom_filter, capacity: int, error_rate: float = 0.01) -> None:
+        """Allocate an empty filter.
+
+        Args:
+            self (bloom_filter)
+            capacity (int): number of identifiers the filter is sized for
+            error_rate (float): false positive rate at full capacity
+        """
+        if not 0 < error_rate < 1:
+            raise ValueError(f"Error rate must be between 0 and 1. Got: {error_rate}")
+
+        self.capacity = max(int(capacity), 1)
+        self.error_rate = error_rate
+
+        # Optimal number of bits and hash functions:
+        self.size = math.ceil(-self.capacity * math.log(error_rate) / math.log(2) ** 2)
+        self.hash_count = max(1, round(self.size / self.capacity * math.log(2)))
+
+        self.bits = bytearray(math.ceil(self.size / 8))
+        self.count = 0
+
+    @classmethod
+    def from_query(
+        cls,
+        connection: Connection,
+        sql: str,
+        error_rate: float = 0.01,
+        capacity: int | None = None,
+        chunk_size: int = 100_000,
+    ) -> bloom_filter:
+        """Build a filter of the identifiers returned by a query.
+
+        Args:
+            connection (Connection): database connection
+            sql (str): query returning one identifier per row
+            error_rate (float): false positive rate at full capacity
+            capacity (int | None): number of identifiers the filter is sized for. Defaults to twice the
+                number of identifiers returned by the query, to leave room for the new ones.
+            chunk_size (int): number of rows fetched at once
+        Returns:
+            bloom_filter: filter containing all identifiers
+        """
+        if capacity is None:
+            (row_count,) = connection.execute(
+                f"SELECT COUNT(*) FROM ({sql})"
+            ).fetchone()
+            capacity = max(2 * row_count, 10_000)
+
+        id_filter = cls(capacity, error_rate)
+
+        cursor = connection.execute(sql)
+        while True:
+            rows = cursor.fetchmany(chunk_size)
+            if not rows:
+                break
+            for (identifier,) in rows:
+                id_filter.add(identifier)
+
+        return id_filter
+
+    def _positions(self: bloom_filter, identifier: int) -> list:
+        """Bit positions of an identifier by double hashing."""
+        digest = hashlib.blake2b(
+            int(identifier).to_bytes(8, "little", signed=True), digest_size=16
+        ).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+
+        return [(h1 + i * h2) % self.size for i in range(self.hash_count)]
+
+    def add(self: bloom_filter, identifier: int) -> None:
+        """Add an identifier to the filter.
+
+        Args:
+            self (bloom_filter)
+            identifier (int): GYIK identifier
+        """
+        for position in self._positions(identifier):
+            self.bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self: bloom_filter, identifier: int) -> bool:
+        return all(
+            self.bits[position >> 3] & (1 << (position & 7))
+            for position in self._positions(identifier)
+        )
+
+    def estimated_error_rate(self: bloom_filter) -> float:
+        """Expected false positive rate with the current number of identifiers.
+
+        Args:
+            self (bloom_filter)
+        Returns:
+            float: probability that a new identifier is reported as present
+        """
+        return (
+            1 - math.exp(-self.hash_count * self.count / self.size)
+        ) ** self.hash_count
+
+    def describe(self: bloom_filter) -> dict:
+        """Size and accuracy of the filter.
+
+        Args:
+            self (bloom_filter)
+        Returns:
+            dict: capacity, number of identifiers, memory size, hash count and error rates
+        """
+        return {
+            "capacity": self.capacity,
+            "count": self.count,
+            "size_bytes": len(self.bits),
+            "hash_count": self.hash_count,
+            "target_error_rate": self.error_rate,
+            "estimated_error_rate": self.estimated_error_rate(),
+        }
@@ -0,0 +1,304 @@
+"""Export user-question and keyword co-occurrence relationships as sparse matrices.
+
+The rows are streamed from the database in chunks into preallocated NumPy arrays and assembled
+into SciPy CSR matrices. Rows and columns are indexed by positions stored in the mapping files
+(position -> database ID), which are only ever extended, so the index of an entity never changes
+between exports. Subsequent exports only read the rows added since the previous one.
+
+Output files:
+    - user_question.npz: user x question matrix, number of answers given by the user to the question.
+    - question_keyword.npz: question x keyword incidence matrix.
+    - keyword_cooccurrence.npz: keyword x keyword matrix, number of questions sharing the keywords.
+    - user_ids.npy, question_ids.npy, keyword_ids.npy: database ID of each row/column.
+    - export_state.json: high-water marks of the last export.
+
+Usage:
+    python -m db_tools.matrix_export --database <str> --output <dir> [--full]
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import logging
+import os
+import sqlite3
+from typing import TYPE_CHECKING, Tuple
+
+import numpy as np
+from scipy import sparse
+
+from db_tools.db_connection import db_connection
+
+if TYPE_CHECKING:
+    from sqlite3 import Connection
+
+logger = logging.getLogger("__main__")
+
+
+class matrix_exporter:
+    """Build and incrementally update the sparse relationship matrices."""
+
+    # Answers given by known users, newer than the last export:
+    count_answers_sql = """
+        SELECT COUNT(*) FROM ANSWER
+        WHERE
+            ID > :last_id AND ID <= :max_id AND
+            USER_ID IS NOT NULL AND
+            REMOVED_DATE IS NULL
+    """
+    get_answers_sql = """
+        SELECT USER_ID, QUESTION_ID FROM ANSWER
+        WHERE
+            ID > :last_id AND ID <= :max_id AND
+            USER_ID IS NOT NULL AND
+            REMOVED_DATE IS NULL
+    """
+
+    # Question/keyword links, newer than the last export:
+    count_links_sql = """
+        SELECT COUNT(*) FROM QUESTION_KEYWORD
+        WHERE rowid > :last_id AND rowid <= :max_id
+    """
+    get_links_sql = """
+        SELECT QUESTION_ID, KEYWORD_ID FROM QUESTION_KEYWORD
+        WHERE rowid > :last_id AND rowid <= :max_id
+    """
+
+    STATE_FILE = "export_state.json"
+
+    def __init__(
+        self: matrix_exporter,
+        connection: Connection,
+        output_dir: str,
+        chunk_size: int = 100_000,
+    ) -> None:
+        """Initialize the exporter.
+
+        Args:
+            self (matrix_exporter)
+            connection (Connection): connection to the scraper database
+            output_dir (str): folder of the matrices and mapping files. Created if not exists.
+            chunk_size (int): number of rows fetched from the database at once
+        """
+        if not isinstance(connection, sqlite3.Connection):
+            raise TypeError(
+                f"Connection object is expected for initialize matrix_exporter object. Got type: {type(connection)}."
+            )
+
+        self.conn = connection
+        self.output_dir = output_dir
+        self.chunk_size = chunk_size
+
+        os.makedirs(output_dir, exist_ok=True)
+
+    def export(self: matrix_exporter, incremental: bool = True) -> dict:
+        """Export the matrices, updating the previous export if there is one.
+
+        Incremental updates only add new rows: answers flagged as removed or deleted questions since
+        the previous export are reflected by a full export only.
+
+        Args:
+            self (matrix_exporter)
+            incremental (bool): if False, the matrices are rebuilt from scratch.
+        Returns:
+            dict: the new export state.
+        """
+        state = self._load_state() if incremental else None
+
+        if state is None:
+            logger.info("Building matrices from scratch.")
+            state = {"last_answer_id": 0, "last_link_id": 0}
+            user_ids = question_ids = keyword_ids = np.empty(0, dtype=np.int64)
+            user_question = question_keyword = None
+        else:
+            logger.info(
+                f"Updating matrices with answers after {state['last_answer_id']} and links after {state['last_link_id']}."
+            )
+            user_ids = self._load_ids("user_ids")
+            question_ids = self._load_ids("question_ids")
+            keyword_ids = self._load_ids("keyword_ids")
+            user_question = self._load_matrix("user_question")
+            question_keyword = self._load_matrix("question_keyword")
+
+        # User x question:
+        max_answer_id = self._max_id("SELECT MAX(ID) FROM ANSWER")
+        answers = self._fetch_pairs(
+            self.count_answers_sql,
+            self.get_answers_sql,
+            state["last_answer_id"],
+            max_answer_id,
+        )
+        user_ids, rows = self._map_ids(user_ids, answers[:, 0])
+        question_ids, columns = self._map_ids(question_ids, answers[:, 1])
+
+        # Question x keyword:
+        max_link_id = self._max_id("SELECT MAX(rowid) FROM QUESTION_KEYWORD")
+        links = self._fetch_pairs(
+            self.count_links_sql,
+            self.get_links_sql,
+            state["last_link_id"],
+            max_link_id,
+        )
+        question_ids, link_rows = self._map_ids(question_ids, links[:, 0])
+        keyword_ids, link_columns = self._map_ids(keyword_ids, links[:, 1])
+
+        # The question index is shared, so both matrices are sized after all mapping is done:
+        user_question = self._add_entries(
+            user_question, rows, columns, (len(user_ids), len(question_ids))
+        )
+        question_keyword = self._add_entries(
+            question_keyword,
+            link_rows,
+            link_columns,
+            (len(question_ids), len(keyword_ids)),
+        )
+
+        # Keywords appearing on the same question:
+        incidence = question_keyword.copy()
+        incidence.data[:] = 1
+        keyword_cooccurrence = (incidence.T @ incidence).tocsr()
+
+        # Saving everything:
+        self._save_ids("user_ids", user_ids)
+        self._save_ids("question_ids", question_ids)
+        self._save_ids("keyword_ids", keyword_ids)
+        self._save_matrix("user_question", user_question)
+        self._save_matrix("question_keyword", question_keyword)
+        self._save_matrix("keyword_cooccurrence", keyword_cooccurrence)
+
+        state = {
+            "last_answer_id": max(max_answer_id, state["last_answer_id"]),
+            "last_link_id": max(max_link_id, state["last_link_id"]),
+        }
+        with open(os.path.join(self.output_dir, self.STATE_FILE), "w") as f:
+            json.dump(state, f)
+
+        logger.info(
+            f"Exported {len(answers)} new answers and {len(links)} new keyword links. "
+            f"Users: {len(user_ids)}, questions: {len(question_ids)}, keywords: {len(keyword_ids)}."
+        )
+        return state
+
+    def _max_id(self: matrix_exporter, sql: str) -> int:
+        """Upper bound of the rows read in this export, so concurrent inserts are left for the next one."""
+        (max_id,) = self.conn.execute(sql).fetchone()
+        return max_id or 0
+
+    def _fetch_pairs(
+        self: matrix_exporter, count_sql: str, get_sql: str, last_id: int, max_id: int
+    ) -> np.ndarray:
+        """Stream pairs of identifiers into a preallocated array.
+
+        Args:
+            self (matrix_exporter)
+            count_sql (str): query counting the rows
+            get_sql (str): query returning the pairs
+            last_id (int): rows up to this identifier are already exported
+            max_id (int): rows after this identifier are not exported
+        Returns:
+            np.ndarray: (n, 2) array of the identifiers
+        """
+        params = {"last_id": last_id, "max_id": max_id}
+        (count,) = self.conn.execute(count_sql, params).fetchone()
+        pairs = np.empty((count, 2), dtype=np.int64)
+
+        cursor = self.conn.execute(get_sql, params)
+        filled = 0
+        while True:
+            rows = cursor.fetchmany(self.chunk_size)
+            if not rows:
+                break
+            pairs[filled : filled + len(rows)] = rows
+            filled += len(rows)
+
+        return pairs[:filled]
+
+    @staticmethod
+    def _map_ids(
+        known_ids: np.ndarray, ids: np.ndarray
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """Map database identifiers to indices, appending identifiers not yet known.
+
+        Args:
+            known_ids (np.ndarray): database identifier at each index
+            ids (np.ndarray): database identifiers to map
+        Returns:
+            tuple: extended array of known identifiers, and the index of each identifier
+        """
+        new_ids = np.setdiff1d(ids, known_ids)
+        known_ids = np.concatenate([known_ids, new_ids])
+
+        sorter = np.argsort(known_ids)
+        indices = sorter[np.searchsorted(known_ids, ids, sorter=sorter)]
+        return known_ids, indices
+
+    @staticmethod
+    def _add_entries(
+        matrix: sparse.csr_matrix | None,
+        rows: np.ndarray,
+        columns: np.ndarray,
+        shape: Tuple[int, int],
+    ) -> sparse.csr_matrix:
+        """Add one to the matrix at each (row, column) pair, extending the matrix to the new shape.
+
+        Args:
+            matrix (csr_matrix | None): matrix of the previous export
+            rows (np.ndarray): row indices
+            columns (np.ndarray): column indices
+            shape (tuple): new shape of the matrix
+        Returns:
+            csr_matrix: updated matrix
+        """
+        delta = sparse.coo_matrix(
+            (np.ones(len(rows), dtype=np.int32), (rows, columns)), shape=shape
+        ).tocsr()
+
+        if matrix is None:
+            return delta
+
+        matrix.resize(shape)
+        return (matrix + delta).tocsr()
+
+    def _load_state(self: matrix_exporter) -> dict | None:
+        try:
+            with open(os.path.join(self.output_dir, self.STATE_FILE)) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    def _load_ids(self: matrix_exporter, name: str) -> np.ndarray:
+        return np.load(os.path.join(self.output_dir, f"{name}.npy"))
+
+    def _save_ids(self: matrix_exporter, name: str, ids: np.ndarray) -> None:
+        np.save(os.path.join(self.output_dir, f"{name}.npy"), ids)
+
+    def _load_matrix(self: matrix_exporter, name: str) -> sparse.csr_matrix:
+        return sparse.load_npz(os.path.join(self.output_dir, f"{name}.npz")).tocsr()
+
+    def _save_matrix(
+        self: matrix_exporter, name: str, matrix: sparse.csr_matrix
+    ) -> None:
+        sparse.save_npz(os.path.join(self.output_dir, f"{name}.npz"), matrix)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Export user-question and keyword co-occurrence matrices."
+    )
+    parser.add_argument(
+        "--database", type=str, help="SQLite database file.", required=True
+    )
+    parser.add_argument(
+        "--output", type=str, help="Folder of the exported matrices.", required=True
+    )
+    parser.add_argument(
+        "--full",
+        action="store_true",
+        help="Rebuild the matrices instead of updating the previous export.",
+    )
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(message)s")
+
+    exporter = matrix_exporter(db_connection(args.database).conn, args.output)
+    exporter.export(incremental=not args.full)
@@ -0,0 +1,450 @@
+"""Near-duplicate detection of questions with MinHash signatures and an LSH band index.
+
+The title and text of each question are split into character shingles. The MinHash signature of the
+shingle set is computed with NumPy for all hash functions at once and stored in QUESTION_MINHASH.
+The fraction of equal signature values estimates the Jaccard similarity of two questions.
+
+The signature is cut into bands, and the hash of each band is stored in QUESTION_LSH. Questions
+sharing a bucket in any band are candidates, so finding the duplicates of a question is a few index
+lookups instead of a comparison with every question. Two questions with Jaccard similarity s share
+a bucket with probability 1 - (1 - s^r)^b (b bands of r rows).
+
+Usage:
+    python -m db_tools.near_duplicates --database <str> index
+    python -m db_tools.near_duplicates --database <str> similar --question <gyik id> [--threshold 0.5]
+    python -m db_tools.near_duplicates --database <str> cluster [--threshold 0.5] [--output <tsv>]
+"""
+from __future__ import annotations
+
+import argparse
+import hashlib
+import logging
+import re
+import sqlite3
+import zlib
+from typing import TYPE_CHECKING, Dict, List, Tuple
+
+import numpy as np
+
+if TYPE_CHECKING:
+    from sqlite3 import Connection
+
+logger = logging.getLogger("__main__")
+
+
+class minhash_index:
+    """MinHash signatures and LSH buckets of the questions, stored in the database."""
+
+    # Parameters the stored signatures were computed with:
+    config_table_sql = """CREATE TABLE IF NOT EXISTS MINHASH_CONFIG (
+        NUM_PERM INTEGER NOT NULL,
+        BANDS INTEGER NOT NULL,
+        SHINGLE_SIZE INTEGER NOT NULL,
+        SEED INTEGER NOT NULL
+    )"""
+
+    signature_table_sql = """CREATE TABLE IF NOT EXISTS QUESTION_MINHASH (
+        QUESTION_ID INTEGER PRIMARY KEY,
+        SIGNATURE BLOB NOT NULL,
+        CONSTRAINT QUESTION_ID
+            FOREIGN KEY (QUESTION_ID)
+            REFERENCES QUESTION (ID)
+            ON DELETE CASCADE
+    )"""
+
+    lsh_table_sql = """CREATE TABLE IF NOT EXISTS QUESTION_LSH (
+        BAND INTEGER NOT NULL,
+        BUCKET INTEGER NOT NULL,
+        QUESTION_ID INTEGER NOT NULL,
+        CONSTRAINT QUESTION_ID
+            FOREIGN KEY (QUESTION_ID)
+            REFERENCES QUESTION (ID)
+            ON DELETE CASCADE
+    )"""
+
+    lsh_index_sql = """CREATE INDEX IF NOT EXISTS QUESTION_LSH_BUCKET
+        ON QUESTION_LSH (BAND, BUCKET)"""
+
+    lsh_question_index_sql = """CREATE INDEX IF NOT EXISTS QUESTION_LSH_QUESTION_ID
+        ON QUESTION_LSH (QUESTION_ID)"""
+
+    add_signature_sql = """
+        INSERT OR REPLACE INTO QUESTION_MINHASH (QUESTION_ID, SIGNATURE)
+        VALUES (:question_id, :signature)
+    """
+
+    delete_buckets_sql = """DELETE FROM QUESTION_LSH WHERE QUESTION_ID = :question_id"""
+
+    add_bucket_sql = """
+        INSERT INTO QUESTION_LSH (BAND, BUCKET, QUESTION_ID) VALUES (?, ?, ?)
+    """
+
+    get_signature_sql = """
+        SELECT SIGNATURE FROM QUESTION_MINHASH WHERE QUESTION_ID = :question_id
+    """
+
+    # Questions sharing a bucket with the given question, with their signatures:
+    candidates_sql = """
+        SELECT DISTINCT M.QUESTION_ID, M.SIGNATURE
+        FROM QUESTION_LSH AS Q
+        JOIN QUESTION_LSH AS C ON C.BAND = Q.BAND AND C.BUCKET = Q.BUCKET
+        JOIN QUESTION_MINHASH AS M ON M.QUESTION_ID = C.QUESTION_ID
+        WHERE Q.QUESTION_ID = :question_id AND C.QUESTION_ID != :question_id
+    """
+
+    # Questions without signature, texts decoded by the function registered by db_connection:
+    unindexed_questions_sql = """
+        SELECT ID, QUESTION_TITLE, gyik_text(QUESTION)
+        FROM QUESTION
+        WHERE ID > :last_id AND ID NOT IN (SELECT QUESTION_ID FROM QUESTION_MINHASH)
+        ORDER BY ID
+        LIMIT :limit
+    """
+
+    # Buckets with more than one question:
+    shared_buckets_sql = """
+        SELECT GROUP_CONCAT(QUESTION_ID)
+        FROM QUESTION_LSH
+        GROUP BY BAND, BUCKET
+        HAVING COUNT(*) > 1
+    """
+
+    all_signatures_sql = """SELECT QUESTION_ID, SIGNATURE FROM QUESTION_MINHASH"""
+
+    # Universal hashing modulo a Mersenne prime, the values are truncated to 32 bits:
+    MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+    MAX_HASH = np.uint64((1 << 32) - 1)
+
+    def __init__(
+        self: minhash_index,
+        connection: Connection,
+        num_perm: int = 128,
+        bands: int = 32,
+        shingle_size: int = 5,
+        seed: int = 1,
+    ) -> None:
+        """Initialize the index, the tables are created if not exist.
+
+        Args:
+            self (minhash_index)
+            connection (Connection): connection to the scraper database
+            num_perm (int): number of hash functions, the length of the signatures
+            bands (int): number of LSH bands, must divide num_perm. More bands find less similar pairs.
+            shingle_size (int): number of characters in a shingle
+            seed (int): seed of the hash functions
+        """
+        if not isinstance(connection, sqlite3.Connection):
+            raise TypeError(
+                f"Connection object is expected for initialize minhash_index object. Got type: {type(connection)}."
+            )
+
+        if num_perm % bands:
+            raise ValueError(
+                f"Number of bands ({bands}) must divide the signature length ({num_perm})."
+            )
+
+        self.conn = connection
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.shingle_size = shingle_size
+
+        with self.conn:
+            for sql in [
+                self.config_table_sql,
+                self.signature_table_sql,
+                self.lsh_table_sql,
+                self.lsh_index_sql,
+                self.lsh_question_index_sql,
+            ]:
+                self.conn.execute(sql)
+            self._check_config(num_perm, bands, shingle_size, seed)
+
+        generator = np.random.default_rng(seed)
+        self.a = generator.integers(1, 1 << 32, size=num_perm, dtype=np.uint64)
+        self.b = generator.integers(0, 1 << 32, size=num_perm, dtype=np.uint64)
+
+    def _check_config(
+        self: minhash_index, num_perm: int, bands: int, shingle_size: int, seed: int
+    ) -> None:
+        """Store the parameters, or check that they match the ones of the stored signatures."""
+        config = (num_perm, bands, shingle_size, seed)
+        stored = self.conn.execute(
+            "SELECT NUM_PERM, BANDS, SHINGLE_SIZE, SEED FROM MINHASH_CONFIG"
+        ).fetchone()
+
+        if stored is None:
+            self.conn.execute("INSERT INTO MINHASH_CONFIG VALUES (?, ?, ?, ?)", config)
+        elif tuple(stored) != config:
+            raise ValueError(
+                f"The index was built with (num_perm, bands, shingle_size, seed) = {tuple(stored)}, got {config}."
+            )
+
+    def shingles(self: minhash_index, text: str) -> np.ndarray:
+        """Hash the character shingles of a normalized text.
+
+        Args:
+            self (minhash_index)
+            text (str): text of the question
+        Returns:
+            np.ndarray: unique 32 bit hashes of the shingles
+        """
+        text = re.sub(r"\W+", " ", text.lower()).strip()
+        size = self.shingle_size
+        encoded = {
+            zlib.crc32(text[i : i + size].encode("utf-8"))
+            for i in range(max(len(text) - size + 1, 1))
+        }
+        return np.fromiter(encoded, dtype=np.uint64, count=len(encoded))
+
+    def signature(self: minhash_index, text: str) -> np.ndarray:
+        """Compute the MinHash signature of a text.
+
+        Args:
+            self (minhash_index)
+            text (str): text of the question
+        Returns:
+            np.ndarray: num_perm values of 32 bits
+        """
+        hashes = self.shingles(text)
+
+        # All hash functions applied to all shingles at once, (num_perm, shingles):
+        values = (
+            np.outer(self.a, hashes) + self.b[:, None]
+        ) % self.MERSENNE_PRIME & self.MAX_HASH
+        return values.min(axis=1).astype(np.uint32)
+
+    def buckets(self: minhash_index, signature: np.ndarray) -> List[Tuple[int, int]]:
+        """Hash the bands of a signature.
+
+        Args:
+            self (minhash_index)
+            signature (np.ndarray): MinHash signature
+        Returns:
+            list: (band, bucket) pairs
+        """
+        return [
+            (
+                band,
+                int.from_bytes(
+                    hashlib.blake2b(rows.tobytes(), digest_size=8).digest(),
+                    "little",
+                    signed=True,
+                ),
+            )
+            for band, rows in enumerate(signature.reshape(self.bands, self.rows))
+        ]
+
+    @staticmethod
+    def question_text(title: str | None, question: str | None) -> str:
+        return f"{title or ''} {question or ''}"
+
+    def add_question(
+        self: minhash_index, question_id: int, title: str | None, question: str | None
+    ) -> np.ndarray:
+        """Index a question. Committing is left to the caller.
+
+        Args:
+            self (minhash_index)
+            question_id (int): database identifier of the question
+            title (str | None): title of the question
+            question (str | None): text of the question
+        Returns:
+            np.ndarray: signature of the question
+        """
+        signature = self.signature(self.question_text(title, question))
+
+        self.conn.execute(
+            self.add_signature_sql,
+            {"question_id": question_id, "signature": signature.tobytes()},
+        )
+        self.conn.execute(self.delete_buckets_sql, {"question_id": question_id})
+        self.conn.executemany(
+            self.add_bucket_sql,
+            [(band, bucket, question_id) for band, bucket in self.buckets(signature)],
+        )
+        return signature
+
+    def index_missing(self: minhash_index, batch_size: int = 1000) -> int:
+        """Index all questions without a signature, in batches each committed separately.
+
+        Args:
+            self (minhash_index)
+            batch_size (int): number of questions indexed in one transaction
+        Returns:
+            int: number of indexed questions
+        """
+        indexed = 0
+        last_id = 0
+        while True:
+            rows = self.conn.execute(
+                self.unindexed_questions_sql, {"last_id": last_id, "limit": batch_size}
+            ).fetchall()
+            if not rows:
+                break
+
+            with self.conn:
+                for question_id, title, question in rows:
+                    self.add_question(question_id, title, question)
+
+            last_id = rows[-1][0]
+            indexed += len(rows)
+            logger.info(f"Indexed {indexed} questions.")
+
+        return indexed
+
+    @staticmethod
+    def similarity(signature: np.ndarray, other: np.ndarray) -> float:
+        """Estimated Jaccard similarity of two signatures."""
+        return float(np.mean(signature == other))
+
+    def _load_signature(self: minhash_index, value: bytes) -> np.ndarray:
+        return np.frombuffer(value, dtype=np.uint32)
+
+    def near_duplicates(
+        self: minhash_index, question_id: int, threshold: float = 0.5
+    ) -> List[Tuple[int, float]]:
+        """Find the questions similar to an indexed question.
+
+        Args:
+            self (minhash_index)
+            question_id (int): database identifier of the question
+            threshold (float): minimum estimated Jaccard similarity
+        Returns:
+            list: (question id, similarity) pairs, the most similar first
+        """
+        row = self.conn.execute(
+            self.get_signature_sql, {"question_id": question_id}
+        ).fetchone()
+        if row is None:
+            raise ValueError(f"Question {question_id} is not indexed.")
+        signature = self._load_signature(row[0])
+
+        candidates = self.conn.execute(
+            self.candidates_sql, {"question_id": question_id}
+        ).fetchall()
+
+        duplicates = [
+            (candidate_id, self.similarity(signature, self._load_signature(value)))
+            for candidate_id, value in candidates
+        ]
+        return sorted(
+            [pair for pair in duplicates if pair[1] >= threshold],
+            key=lambda pair: pair[1],
+            reverse=True,
+        )
+
+    def clusters(self: minhash_index, threshold: float = 0.5) -> List[List[int]]:
+        """Group the indexed questions into clusters of near duplicates.
+
+        Every question sharing a bucket is compared with the first question of the bucket only, so
+        the work grows linearly with the number of questions. Clusters are the connected components
+        of the similar pairs (union-find).
+
+        Args:
+            self (minhash_index)
+            threshold (float): minimum estimated Jaccard similarity of the linked questions
+        Returns:
+            list: clusters with more than one question, as lists of question identifiers, largest first
+        """
+        signatures: Dict[int, np.ndarray] = {
+            question_id: self._load_signature(value)
+            for question_id, value in self.conn.execute(self.all_signatures_sql)
+        }
+
+        parent: Dict[int, int] = {}
+
+        def find(node: int) -> int:
+            root = node
+            while parent.get(root, root) != root:
+                root = parent[root]
+            # Path compression:
+            while node != root:
+                parent[node], node = root, parent.get(node, node)
+            return root
+
+        for (members,) in self.conn.execute(self.shared_buckets_sql):
+            first, *others = (int(member) for member in members.split(","))
+            for other in others:
+                if find(first) == find(other):
+                    continue
+                if self.similarity(signatures[first], signatures[other]) >= threshold:
+                    root = find(first)
+                    parent.setdefault(root, root)
+                    parent[find(other)] = root
+
+        groups: Dict[int, List[int]] = {}
+        for question_id in parent:
+            groups.setdefault(find(question_id), []).append(question_id)
+
+        return sorted(
+            [sorted(group) for group in groups.values() if len(group) > 1],
+            key=len,
+            reverse=True,
+        )
+
+
+if __name__ == "__main__":
+    from db_tools.db_connection import db_connection
+
+    parser = argparse.ArgumentParser(
+        description="Near-duplicate question detection with MinHash/LSH."
+    )
+    parser.add_argument(
+        "--database", type=str, help="SQLite database file.", required=True
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("index", help="Index the questions without signature.")
+    similar_parser = commands.add_parser(
+        "similar", help="List the near duplicates of a question."
+    )
+    similar_parser.add_argument(
+        "--question", type=int, help="GYIK identifier of the question.", required=True
+    )
+    cluster_parser = commands.add_parser(
+        "cluster", help="Group all questions into near-duplicate clusters."
+    )
+    cluster_parser.add_argument(
+        "--output", type=str, help="Tab separated file of the clusters."
+    )
+    for subparser in [similar_parser, cluster_parser]:
+        subparser.add_argument(
+            "--threshold",
+            type=float,
+            default=0.5,
+            help="Minimum estimated Jaccard similarity.",
+        )
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(message)s")
+
+    connection = db_connection(args.database).conn
+    index = minhash_index(connection)
+
+    if args.command == "index":
+        index.index_missing()
+
+    elif args.command == "similar":
+        row = connection.execute(
+            "SELECT ID FROM QUESTION WHERE GYIK_ID = ?", (args.question,)
+        ).fetchone()
+        if row is None:
+            raise ValueError(f"Question {args.question} is not in the database.")
+
+        for question_id, similarity in index.near_duplicates(row[0], args.threshold):
+            (gyik_id, title, url) = connection.execute(
+                "SELECT GYIK_ID, QUESTION_TITLE, URL FROM QUESTION WHERE ID = ?",
+                (question_id,),
+            ).fetchone()
+            print(f"{similarity:.2f}\t{gyik_id}\t{title}\t{url}")
+
+    else:
+        clusters = index.clusters(args.threshold)
+        logger.info(
+            f"Found {len(clusters)} clusters with {sum(map(len, clusters))} questions."
+        )
+        if args.output:
+            with open(args.output, "w") as f:
+                for cluster_id, cluster in enumerate(clusters):
+                    for question_id in cluster:
+                        f.write(f"{cluster_id}\t{question_id}\n")
@@ -0,0 +1,277 @@
+"""Read-only catalog of the queries of the analytics consumers, with a cache of the results.
+
+Consumers call the queries of the catalog by name with their parameters instead of running ad-hoc
+SQL, so every query is backed by an index (see `install`) and its statement is prepared once per
+connection (the sqlite3 statement cache).
+
+The results are kept in a bounded LRU cache. Every load of question_loader, batch of the bulk
+importer and dropped question increases the version in the DATA_VERSION table in the same
+transaction, and the cached results of older versions are dropped, so the readers never see results
+older than the last committed change. Checking the version
+is a single row lookup, repeated dashboard reads are served from memory.
+
+Every thread gets its own read-only connection, reused for all its queries. With the database in
+WAL mode (see db_tools.snapshot) the readers do not block the crawler.
+
+Usage:
+    python -m db_tools.query_catalog --database <str> --install
+    python -m db_tools.query_catalog --database <str> --query latest_questions --param category=<str> [--param limit=20]
+"""
+from __future__ import annotations
+
+import argparse
+import logging
+import os
+import sqlite3
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Tuple
+
+from db_tools.db_connection import db_connection
+from db_tools.text_codec import text_codec
+
+logger = logging.getLogger("__main__")
+
+# Queries by name, the parameters are named:
+QUERIES = {
+    # Latest questions of a category:
+    "latest_questions": """
+        SELECT ID, GYIK_ID, SUBCATEGORY, QUESTION_TITLE, QUESTION_DATE, URL
+        FROM QUESTION
+        WHERE CATEGORY = :category
+        ORDER BY QUESTION_DATE DESC
+        LIMIT :limit
+    """,
+    # A question with its text:
+    "question": """
+        SELECT ID, CATEGORY, SUBCATEGORY, QUESTION_TITLE, gyik_text(QUESTION), QUESTION_DATE, URL
+        FROM QUESTION
+        WHERE GYIK_ID = :gyik_id
+    """,
+    # Answers of a question still on the site:
+    "question_answers": """
+        SELECT A.ID, U.USER, A.ANSWER_DATE, gyik_text(A.ANSWER_TEXT), A.ANSWER_PERCENT
+        FROM ANSWER AS A
+        LEFT JOIN USER AS U ON U.ID = A.USER_ID
+        WHERE A.QUESTION_ID = :question_id AND A.REMOVED_DATE IS NULL
+        ORDER BY A.ANSWER_DATE
+    """,
+    # Latest answers of a user, the identifier is looked up first so the index gives the order:
+    "user_answers": """
+        SELECT A.ID, Q.GYIK_ID, Q.QUESTION_TITLE, A.ANSWER_DATE, A.ANSWER_PERCENT
+        FROM ANSWER AS A
+        JOIN QUESTION AS Q ON Q.ID = A.QUESTION_ID
+        WHERE
+            A.USER_ID = (SELECT ID FROM USER WHERE USER = :user) AND
+            A.REMOVED_DATE IS NULL
+        ORDER BY A.ANSWER_DATE DESC
+        LIMIT :limit
+    """,
+    # Latest questions linked to a keyword:
+    "keyword_questions": """
+        SELECT Q.ID, Q.GYIK_ID, Q.CATEGORY, Q.QUESTION_TITLE, Q.QUESTION_DATE
+        FROM KEYWORD AS K
+        JOIN QUESTION_KEYWORD AS L ON L.KEYWORD_ID = K.ID
+        JOIN QUESTION AS Q ON Q.ID = L.QUESTION_ID
+        WHERE K.KEYWORD = :keyword
+        ORDER BY Q.QUESTION_DATE DESC
+        LIMIT :limit
+    """,
+}
+
+# Values of the parameters not given:
+DEFAULTS = {"limit": 20}
+
+# Indexes the queries are answered from:
+INDEXES = {
+    "QUESTION_CATEGORY_DATE": "QUESTION (CATEGORY, QUESTION_DATE)",
+    "QUESTION_GYIK_ID": "QUESTION (GYIK_ID)",
+    "ANSWER_QUESTION_ID": "ANSWER (QUESTION_ID)",
+    "ANSWER_USER_DATE": "ANSWER (USER_ID, ANSWER_DATE)",
+    "USER_USER": "USER (USER)",
+    "KEYWORD_KEYWORD": "KEYWORD (KEYWORD)",
+    "QUESTION_KEYWORD_KEYWORD": "QUESTION_KEYWORD (KEYWORD_ID, QUESTION_ID)",
+}
+
+
+def install(filename: str) -> None:
+    """Create the indexes of the queries, and the DATA_VERSION table of older databases.
+
+    Args:
+        filename (str): SQLite database file
+    """
+    connection = db_connection(filename).conn
+    with connection:
+        for name, columns in INDEXES.items():
+            connection.execute(f"CREATE INDEX IF NOT EXISTS {name} ON {columns}")
+    connection.close()
+
+
+class query_catalog:
+    """Run the queries of the catalog from any thread, with cached results."""
+
+    data_version_sql = """SELECT VERSION FROM DATA_VERSION WHERE ID = 1"""
+
+    def __init__(self: query_catalog, filename: str, cache_size: int = 256) -> None:
+        """
+        Args:
+            self (query_catalog)
+            filename (str): SQLite database file, it is not modified
+            cache_size (int): number of query results kept
+        """
+        if not os.path.isfile(filename):
+            raise FileNotFoundError(f"Database does not exist: {filename}")
+
+        self.filename = filename
+        self.cache_size = cache_size
+
+        self.local = threading.local()
+        self.connections: List[sqlite3.Connection] = []
+
+        # Results by query and parameters, the least recently used first:
+        self.lock = threading.Lock()
+        self.cache: OrderedDict[tuple, Tuple[tuple, ...]] = OrderedDict()
+        self.version = -1
+        self.hits = 0
+        self.misses = 0
+
+        existing = {
+            row[0]
+            for row in self._connection().execute(
+                "SELECT name FROM sqlite_master WHERE type IN ('table', 'index')"
+            )
+        }
+        if "DATA_VERSION" not in existing:
+            raise RuntimeError(
+                f"{filename} has no DATA_VERSION table, the cache could not be invalidated. Add it "
+                f"with: python -m db_tools.query_catalog --database {filename} --install"
+            )
+        missing = [name for name in INDEXES if name not in existing]
+        if missing:
+            logger.warning(
+                f"Indexes missing, the queries scan the tables: {', '.join(missing)}. Create them "
+                f"with: python -m db_tools.query_catalog --database {filename} --install"
+            )
+
+    def _connection(self: query_catalog) -> sqlite3.Connection:
+        """Read-only connection of the current thread, opened at its first query."""
+        connection = getattr(self.local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(
+                f"file:{self.filename}?mode=ro",
+                uri=True,
+                check_same_thread=False,
+                cached_statements=len(QUERIES) + 1,
+            )
+            # Compressed texts are decoded by the queries:
+            text_codec(connection).register()
+            self.local.connection = connection
+            with self.lock:
+                self.connections.append(connection)
+        return connection
+
+    def data_version(self: query_catalog) -> int:
+        """Version of the data, increased by every load committed."""
+        row = self._connection().execute(self.data_version_sql).fetchone()
+        return row[0] if row else 0
+
+    def run(self: query_catalog, name: str, **parameters) -> Tuple[tuple, ...]:
+        """Rows of a query of the catalog, from the cache if the data has not changed since.
+
+        Args:
+            self (query_catalog)
+            name (str): name of the query in QUERIES
+            parameters: values of the named parameters of the query, `limit` defaults to 20
+        Returns:
+            tuple: rows of the result, shared by the callers so they must not be modified
+        """
+        if name not in QUERIES:
+            raise ValueError(f"Unknown query: {name}. Choose from: {list(QUERIES)}")
+        parameters = {**DEFAULTS, **parameters}
+        key = (name, tuple(sorted(parameters.items())))
+
+        # Read before the query, so the rows are never older than the version they are cached with:
+        version = self.data_version()
+
+        with self.lock:
+            # Versions only increase, readers of an older version do not use the cache:
+            if version > self.version:
+                self.cache.clear()
+                self.version = version
+            if version == self.version and key in self.cache:
+                self.cache.move_to_end(key)
+                self.hits += 1
+                return self.cache[key]
+            self.misses += 1
+
+        rows = tuple(self._connection().execute(QUERIES[name], parameters).fetchall())
+
+        with self.lock:
+            if version == self.version:
+                self.cache[key] = rows
+                self.cache.move_to_end(key)
+                if len(self.cache) > self.cache_size:
+                    self.cache.popitem(last=False)
+        return rows
+
+    def stats(self: query_catalog) -> Dict[str, int]:
+        """Cache hits and misses, the number of cached results, and the data version."""
+        with self.lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "cached": len(self.cache),
+                "version": self.version,
+            }
+
+    def close(self: query_catalog) -> None:
+        """Close the connections of all threads."""
+        with self.lock:
+            for connection in self.connections:
+                connection.close()
+            self.connections.clear()
+        self.local = threading.local()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Run the queries of the analytics catalog."
+    )
+    parser.add_argument(
+        "--database", type=str, help="SQLite database file.", required=True
+    )
+    parser.add_argument(
+        "--install",
+        action="store_true",
+        help="Create the indexes of the queries (and the DATA_VERSION table of older databases).",
+    )
+    parser.add_argument(
+        "--query", type=str, choices=list(QUERIES), help="Name of the query to run."
+    )
+    parser.add_argument(
+        "--param",
+        type=str,
+        action="append",
+        default=[],
+        help="Parameter of the query as name=value, can be repeated.",
+    )
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(message)s")
+
+    if args.install:
+        install(args.database)
+        logger.info(f"Indexes of the query catalog created in {args.database}.")
+
+    if args.query is not None:
+        parameters = {}
+        for param in args.param:
+            key, _, value = param.partition("=")
+            parameters[key] = int(value) if value.lstrip("-").isdigit() else value
+
+        catalog = query_catalog(args.database)
+        for row in catalog.run(args.query, **parameters):
+            print(row)
+        catalog.close()
+    elif not args.install:
+        parser.error("Either --query or --install is required.")
@@ -0,0 +1,312 @@
+"""Activity-aware scheduling of question refreshes.
+
+Most questions stop getting answers within days, so re-crawling every question at the same cadence
+wastes the request budget. The scheduler estimates the answer arrival rate of each question from
+the stored answer dates, and keeps the next check time of every question in the database. Only the
+questions that are due are re-crawled, the busiest threads first.
+
+The arrival rate is an exponentially time-weighted count of the answers divided by the
+correspondingly weighted exposure time of the question, smoothed by a prior:
+
+    weighted_answers = sum(exp(-answer_age_i / tau))
+    exposure = tau * (1 - exp(-question_age / tau))
+    rate = (weighted_answers + prior_answers * exp(-question_age / tau)) / (exposure + prior_days)
+
+The next check is due when `target_answers` new answers are expected, within the interval limits.
+"""
+from __future__ import annotations
+
+import itertools
+import logging
+import math
+import sqlite3
+from datetime import datetime, timedelta
+from typing import TYPE_CHECKING, Iterable, List
+
+if TYPE_CHECKING:
+    from sqlite3 import Connection
+
+logger = logging.getLogger("__main__")
+
+
+class refresh_scheduler:
+    """Priority queue of question refreshes stored in the database."""
+
+    schedule_table_sql = """CREATE TABLE IF NOT EXISTS QUESTION_SCHEDULE (
+        QUESTION_ID INTEGER PRIMARY KEY,
+        ANSWER_RATE REAL NOT NULL,
+        NEXT_CHECK DATETIME NOT NULL,
+        LAST_CHECK DATETIME,
+        CHECK_COUNT INTEGER NOT NULL DEFAULT 0,
+        NEW_ANSWERS INTEGER NOT NULL DEFAULT 0,
+        CONSTRAINT QUESTION_ID
+            FOREIGN KEY (QUESTION_ID)
+            REFERENCES QUESTION (ID)
+            ON DELETE CASCADE
+    )"""
+
+    schedule_index_sql = """CREATE INDEX IF NOT EXISTS QUESTION_SCHEDULE_NEXT_CHECK
+        ON QUESTION_SCHEDULE (NEXT_CHECK)"""
+
+    # Questions not yet scheduled with the dates of their answers:
+    unscheduled_answer_dates_sql = """
+        SELECT Q.ID, Q.QUESTION_DATE, A.ANSWER_DATE
+        FROM QUESTION AS Q
+        LEFT JOIN ANSWER AS A ON A.QUESTION_ID = Q.ID AND A.REMOVED_DATE IS NULL
+        WHERE Q.ID NOT IN (SELECT QUESTION_ID FROM QUESTION_SCHEDULE)
+        ORDER BY Q.ID
+    """
+
+    # Dates of the answers of one question:
+    answer_dates_sql = """
+        SELECT Q.ID, Q.QUESTION_DATE, A.ANSWER_DATE
+        FROM QUESTION AS Q
+        LEFT JOIN ANSWER AS A ON A.QUESTION_ID = Q.ID AND A.REMOVED_DATE IS NULL
+        WHERE Q.ID = :question_id
+    """
+
+    add_schedule_sql = """
+        INSERT OR REPLACE INTO QUESTION_SCHEDULE (QUESTION_ID, ANSWER_RATE, NEXT_CHECK)
+        VALUES (:question_id, :answer_rate, :next_check)
+    """
+
+    record_check_sql = """
+        UPDATE QUESTION_SCHEDULE
+        SET
+            ANSWER_RATE = :answer_rate,
+            NEXT_CHECK = :next_check,
+            LAST_CHECK = :last_check,
+            CHECK_COUNT = CHECK_COUNT + 1,
+            NEW_ANSWERS = NEW_ANSWERS + :new_answers
+        WHERE QUESTION_ID = :question_id
+    """
+
+    # The due questions, the most overdue first:
+    due_questions_sql = """
+        SELECT Q.ID, Q.GYIK_ID, Q.URL
+        FROM QUESTION_SCHEDULE AS S
+        JOIN QUESTION AS Q ON Q.ID = S.QUESTION_ID
+        WHERE S.NEXT_CHECK <= :now
+        ORDER BY S.NEXT_CHECK
+        LIMIT :limit
+    """
+
+    report_sql = """
+        SELECT COUNT(*), SUM(CHECK_COUNT), SUM(NEW_ANSWERS), SUM(NEXT_CHECK <= :now)
+        FROM QUESTION_SCHEDULE
+    """
+
+    def __init__(
+        self: refresh_scheduler,
+        connection: Connection,
+        tau_days: float = 7.0,
+        prior_answers: float = 1.0,
+        prior_days: float = 1.0,
+        target_answers: float = 1.0,
+        min_interval: timedelta = timedelta(hours=1),
+        max_interval: timedelta = timedelta(days=90),
+    ) -> None:
+        """Initialize the scheduler, the schedule table is created if not exists.
+
+        Args:
+            self (refresh_scheduler)
+            connection (Connection): connection to the scraper database
+            tau_days (float): time constant in days of forgetting old answers
+            prior_answers (float): number of answers assumed for questions without history
+            prior_days (float): number of days over which the prior answers are assumed
+            target_answers (float): expected number of new answers a check is scheduled for
+            min_interval (timedelta): shortest time between two checks of a question
+            max_interval (timedelta): longest time between two checks of a question
+        """
+        if not isinstance(connection, sqlite3.Connection):
+            raise TypeError(
+                f"Connection object is expected for initialize refresh_scheduler object. Got type: {type(connection)}."
+            )
+
+        self.conn = connection
+        self.tau_days = tau_days
+        self.prior_answers = prior_answers
+        self.prior_days = prior_days
+        self.target_answers = target_answers
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+
+        with self.conn:
+            self.conn.execute(self.schedule_table_sql)
+            self.conn.execute(self.schedule_index_sql)
+
+    @staticmethod
+    def _to_datetime(value: datetime | str | None) -> datetime | None:
+        if value is None or isinstance(value, datetime):
+            return value
+        return datetime.fromisoformat(value)
+
+    def estimate_rate(
+        self: refresh_scheduler,
+        question_date: datetime | None,
+        answer_dates: Iterable[datetime],
+        now: datetime,
+    ) -> float:
+        """Estimate the current answer arrival rate of a question.
+
+        Args:
+            self (refresh_scheduler)
+            question_date (datetime | None): when the question was asked
+            answer_dates (iterable): when the answers were given
+            now (datetime): time of the estimate
+        Returns:
+            float: expected number of new answers per day
+        """
+        day = timedelta(days=1)
+        answer_dates = list(answer_dates)
+
+        # Without question date, the first answer is the best guess:
+        if question_date is None:
+            question_date = min(answer_dates, default=now)
+
+        weighted_answers = sum(
+            math.exp(-max((now - answer_date) / day, 0) / self.tau_days)
+            for answer_date in answer_dates
+        )
+        question_age = max((now - question_date) / day, 0)
+        exposure = self.tau_days * (1 - math.exp(-question_age / self.tau_days))
+
+        # The prior fades with the age of the question, so dead threads are not checked forever:
+        prior_answers = self.prior_answers * math.exp(-question_age / self.tau_days)
+
+        return (weighted_answers + prior_answers) / (exposure + self.prior_days)
+
+    def next_check(self: refresh_scheduler, rate: float, now: datetime) -> datetime:
+        """Time when `target_answers` new answers are expected.
+
+        Args:
+            self (refresh_scheduler)
+            rate (float): expected number of new answers per day
+            now (datetime): time of the check
+        Returns:
+            datetime: time of the next check
+        """
+        max_days = self.max_interval / timedelta(days=1)
+        days = self.target_answers / rate if rate > 0 else max_days
+        interval = timedelta(days=min(days, max_days))
+
+        return now + max(interval, self.min_interval)
+
+    def schedule_new_questions(
+        self: refresh_scheduler, now: datetime | None = None
+    ) -> int:
+        """Schedule all questions without a schedule entry, based on their stored answers.
+
+        Args:
+            self (refresh_scheduler)
+            now (datetime | None): time of scheduling, defaults to now
+        Returns:
+            int: number of newly scheduled questions
+        """
+        now = now or datetime.now()
+        rows = self.conn.execute(self.unscheduled_answer_dates_sql).fetchall()
+
+        scheduled = 0
+        with self.conn:
+            for question_id, question_rows in itertools.groupby(
+                rows, key=lambda row: row[0]
+            ):
+                self._schedule(question_id, list(question_rows), now)
+                scheduled += 1
+
+        logger.info(f"Scheduled {scheduled} new questions.")
+        return scheduled
+
+    def _schedule(
+        self: refresh_scheduler, question_id: int, rows: List[tuple], now: datetime
+    ) -> float:
+        question_date = self._to_datetime(rows[0][1])
+        answer_dates = [self._to_datetime(row[2]) for row in rows if row[2] is not None]
+        rate = self.estimate_rate(question_date, answer_dates, now)
+
+        self.conn.execute(
+            self.add_schedule_sql,
+            {
+                "question_id": question_id,
+                "answer_rate": rate,
+                "next_check": self.next_check(rate, now),
+            },
+        )
+        return rate
+
+    def due_questions(
+        self: refresh_scheduler, limit: int, now: datetime | None = None
+    ) -> List[tuple]:
+        """Get the questions due for a check.
+
+        Args:
+            self (refresh_scheduler)
+            limit (int): maximum number of questions returned
+            now (datetime | None): time of the check, defaults to now
+        Returns:
+            list: (question id, gyik id, URL) tuples, the most overdue first
+        """
+        return self.conn.execute(
+            self.due_questions_sql, {"now": now or datetime.now(), "limit": limit}
+        ).fetchall()
+
+    def record_check(
+        self: refresh_scheduler,
+        question_id: int,
+        new_answers: int,
+        now: datetime | None = None,
+    ) -> datetime:
+        """Reschedule a question after it was checked.
+
+        Args:
+            self (refresh_scheduler)
+            question_id (int): database identifier of the question
+            new_answers (int): number of new answers found by the check
+            now (datetime | None): time of the check, defaults to now
+        Returns:
+            datetime: time of the next check
+        """
+        now = now or datetime.now()
+        rows = self.conn.execute(
+            self.answer_dates_sql, {"question_id": question_id}
+        ).fetchall()
+
+        question_date = self._to_datetime(rows[0][1])
+        answer_dates = [self._to_datetime(row[2]) for row in rows if row[2] is not None]
+        rate = self.estimate_rate(question_date, answer_dates, now)
+        next_check = self.next_check(rate, now)
+
+        with self.conn:
+            self.conn.execute(
+                self.record_check_sql,
+                {
+                    "question_id": question_id,
+                    "answer_rate": rate,
+                    "next_check": next_check,
+                    "last_check": now,
+                    "new_answers": new_answers,
+                },
+            )
+
+        return next_check
+
+    def report(self: refresh_scheduler, now: datetime | None = None) -> dict:
+        """Summary of the schedule.
+
+        Args:
+            self (refresh_scheduler)
+            now (datetime | None): time of the report, defaults to now
+        Returns:
+            dict: number of scheduled and due questions, checks done, new answers captured per check
+        """
+        (questions, checks, new_answers, due) = self.conn.execute(
+            self.report_sql, {"now": now or datetime.now()}
+        ).fetchone()
+
+        return {
+            "questions": questions,
+            "due": due or 0,
+            "checks": checks or 0,
+            "new_answers": new_answers or 0,
+            "new_answers_per_check": (new_answers or 0) / checks if checks else None,
+        }
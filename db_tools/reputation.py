@@ -0,0 +1,449 @@
+"""Reputation of the users, computed from their answers with NumPy.
+
+The answers are streamed from the database in chunks, and aggregated per user in vectorized form,
+indexed by USER.ID:
+    - ANSWER_COUNT, RATED_COUNT: answers (not removed), and those rated by the readers,
+    - MEAN_PERCENT: average usefulness (ANSWER.ANSWER_PERCENT) of the rated answers,
+    - SMOOTHED_PERCENT: Bayesian average, the ratings of the user mixed with PRIOR_WEIGHT ratings
+      of the average of all users. Users with a few lucky answers do not get to the top,
+    - USER_PERCENT: the usefulness of the user shown by the site at the latest answer
+      (ANSWER.USER_PERCENT, USER.USER_PERCENT is only set once),
+    - FIRST_ANSWER, LAST_ANSWER: dates of the first and last answer,
+    - CATEGORY_COUNT, CATEGORY_SPREAD: number of categories answered in, and the normalized entropy
+      of the answers over the categories (0: one category only, 1: evenly spread).
+
+The results are written into USER_REPUTATION in bulk. Triggers log the users whose answers are
+added, changed or deleted into USER_REPUTATION_DIRTY, and incremental runs only recompute those
+users, with the average of the last full run as prior. The bulk importer drops the triggers during
+a load, and logs the users of the imported answers itself (see bulk_import).
+
+Usage:
+    python -m db_tools.reputation --database <str> [--full] [--priorWeight 10] [--top 20]
+"""
+from __future__ import annotations
+
+import argparse
+import logging
+import sqlite3
+from datetime import datetime
+from typing import TYPE_CHECKING, List
+
+import numpy as np
+
+from db_tools.db_connection import db_connection
+
+if TYPE_CHECKING:
+    from sqlite3 import Connection
+
+logger = logging.getLogger("__main__")
+
+
+class reputation_engine:
+    """Compute the reputation of all users, or of the users touched since the last run."""
+
+    reputation_tables_sql = [
+        """CREATE TABLE IF NOT EXISTS USER_REPUTATION (
+            USER_ID INTEGER PRIMARY KEY,
+            ANSWER_COUNT INTEGER NOT NULL,
+            RATED_COUNT INTEGER NOT NULL,
+            MEAN_PERCENT REAL,
+            SMOOTHED_PERCENT REAL NOT NULL,
+            USER_PERCENT REAL,
+            FIRST_ANSWER DATE NOT NULL,
+            LAST_ANSWER DATE NOT NULL,
+            CATEGORY_COUNT INTEGER NOT NULL,
+            CATEGORY_SPREAD REAL NOT NULL,
+            COMPUTED_DATE DATETIME NOT NULL
+        )""",
+        """CREATE INDEX IF NOT EXISTS USER_REPUTATION_SMOOTHED
+            ON USER_REPUTATION (SMOOTHED_PERCENT)""",
+        """CREATE TABLE IF NOT EXISTS USER_REPUTATION_DIRTY (
+            ID INTEGER PRIMARY KEY,
+            USER_ID INTEGER NOT NULL
+        )""",
+        """CREATE TABLE IF NOT EXISTS USER_REPUTATION_PRIOR (
+            ID INTEGER PRIMARY KEY CHECK (ID = 1),
+            MEAN_PERCENT REAL NOT NULL,
+            PRIOR_WEIGHT REAL NOT NULL,
+            COMPUTED_DATE DATETIME NOT NULL
+        )""",
+    ]
+
+    # Users of the changed answers are logged, ids are not reused so concurrent changes are not lost:
+    _log_new = "INSERT INTO USER_REPUTATION_DIRTY (USER_ID) SELECT NEW.USER_ID WHERE NEW.USER_ID IS NOT NULL;"
+    _log_old = "INSERT INTO USER_REPUTATION_DIRTY (USER_ID) SELECT OLD.USER_ID WHERE OLD.USER_ID IS NOT NULL;"
+
+    triggers = {
+        "REPUTATION_INSERT": ("AFTER INSERT ON ANSWER", [_log_new]),
+        "REPUTATION_DELETE": ("AFTER DELETE ON ANSWER", [_log_old]),
+        "REPUTATION_UPDATE": (
+            "AFTER UPDATE OF USER_ID, ANSWER_PERCENT, USER_PERCENT, ANSWER_DATE, REMOVED_DATE ON ANSWER",
+            [_log_old, _log_new],
+        ),
+    }
+
+    # Categories get integer codes, so the answer rows are all numeric:
+    category_codes_sql = [
+        """CREATE TEMP TABLE IF NOT EXISTS REPUTATION_CATEGORY (
+            CODE INTEGER PRIMARY KEY,
+            CATEGORY TEXT NOT NULL UNIQUE
+        )""",
+        "DELETE FROM REPUTATION_CATEGORY",
+        """INSERT INTO REPUTATION_CATEGORY (CATEGORY)
+            SELECT DISTINCT CATEGORY FROM QUESTION ORDER BY CATEGORY""",
+    ]
+
+    # Answers of all users, or of the logged users only, with the days since 1970-01-01:
+    get_answers_sql = """
+        SELECT
+            A.USER_ID,
+            A.ANSWER_PERCENT,
+            A.USER_PERCENT,
+            CAST(JULIANDAY(A.ANSWER_DATE) - 2440587.5 AS INTEGER),
+            C.CODE - 1
+        FROM ANSWER AS A
+        JOIN QUESTION AS Q ON Q.ID = A.QUESTION_ID
+        JOIN REPUTATION_CATEGORY AS C ON C.CATEGORY = Q.CATEGORY
+        WHERE
+            A.USER_ID <= :max_user_id AND
+            A.REMOVED_DATE IS NULL AND
+            (:all_users OR A.USER_ID IN (
+                SELECT USER_ID FROM USER_REPUTATION_DIRTY WHERE ID <= :last_dirty_id
+            ))
+    """
+    get_dirty_sql = """
+        SELECT MAX(ID), COUNT(DISTINCT USER_ID) FROM USER_REPUTATION_DIRTY
+    """
+    get_dirty_users_sql = """
+        SELECT DISTINCT USER_ID FROM USER_REPUTATION_DIRTY WHERE ID <= :last_dirty_id
+    """
+    clear_dirty_sql = """
+        DELETE FROM USER_REPUTATION_DIRTY WHERE ID <= :last_dirty_id
+    """
+    get_prior_sql = """
+        SELECT MEAN_PERCENT, PRIOR_WEIGHT FROM USER_REPUTATION_PRIOR WHERE ID = 1
+    """
+    set_prior_sql = """
+        INSERT OR REPLACE INTO USER_REPUTATION_PRIOR (ID, MEAN_PERCENT, PRIOR_WEIGHT, COMPUTED_DATE)
+        VALUES (1, :mean_percent, :prior_weight, :computed_date)
+    """
+    store_sql = """
+        INSERT OR REPLACE INTO USER_REPUTATION (
+            USER_ID, ANSWER_COUNT, RATED_COUNT, MEAN_PERCENT, SMOOTHED_PERCENT, USER_PERCENT,
+            FIRST_ANSWER, LAST_ANSWER, CATEGORY_COUNT, CATEGORY_SPREAD, COMPUTED_DATE
+        )
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    """
+    delete_user_sql = "DELETE FROM USER_REPUTATION WHERE USER_ID = ?"
+    max_user_sql = "SELECT MAX(ID) FROM USER"
+
+    top_users_sql = """
+        SELECT U.USER, R.ANSWER_COUNT, R.RATED_COUNT, R.MEAN_PERCENT, R.SMOOTHED_PERCENT, R.CATEGORY_COUNT, R.CATEGORY_SPREAD
+        FROM USER_REPUTATION AS R
+        JOIN USER AS U ON U.ID = R.USER_ID
+        WHERE R.RATED_COUNT >= :min_rated
+        ORDER BY R.SMOOTHED_PERCENT DESC
+        LIMIT :limit
+    """
+
+    def __init__(
+        self: reputation_engine,
+        connection: Connection,
+        prior_weight: float = 10.0,
+        chunk_size: int = 100_000,
+    ) -> None:
+        """Initialize the engine, the tables and triggers are created if not exist.
+
+        Args:
+            self (reputation_engine)
+            connection (Connection): connection to the scraper database
+            prior_weight (float): number of average ratings mixed into the ratings of each user
+            chunk_size (int): number of answers fetched from the database at once
+        """
+        if not isinstance(connection, sqlite3.Connection):
+            raise TypeError(
+                f"Connection object is expected for initialize reputation_engine object. Got type: {type(connection)}."
+            )
+
+        self.conn = connection
+        self.prior_weight = prior_weight
+        self.chunk_size = chunk_size
+
+        with self.conn:
+            for statement in self.reputation_tables_sql:
+                self.conn.execute(statement)
+            for name, (event, statements) in self.triggers.items():
+                self.conn.execute(
+                    f"CREATE TRIGGER IF NOT EXISTS {name} {event} BEGIN {''.join(statements)} END"
+                )
+
+    def compute(self: reputation_engine, full: bool = False) -> dict:
+        """Compute the reputation of the users touched since the last run.
+
+        The first run, and runs with a changed prior weight, compute every user.
+
+        Args:
+            self (reputation_engine)
+            full (bool): if True, every user is recomputed and the prior is updated.
+        Returns:
+            dict: number of users stored and removed, and the prior used
+        """
+        last_dirty_id, dirty_users = self.conn.execute(self.get_dirty_sql).fetchone()
+        last_dirty_id = last_dirty_id or 0
+
+        prior = self.conn.execute(self.get_prior_sql).fetchone()
+        if prior is None or prior[1] != self.prior_weight:
+            full = True
+
+        if full:
+            logger.info("Computing the reputation of all users.")
+        else:
+            logger.info(f"Recomputing the reputation of {dirty_users} users.")
+
+        for statement in self.category_codes_sql:
+            self.conn.execute(statement)
+        (category_count,) = self.conn.execute(
+            "SELECT COUNT(*) FROM REPUTATION_CATEGORY"
+        ).fetchone()
+        # Users added meanwhile are logged, they are computed in the next run:
+        max_user_id = self.conn.execute(self.max_user_sql).fetchone()[0] or 0
+
+        stats = user_statistics(max_user_id + 1, category_count)
+        cursor = self.conn.execute(
+            self.get_answers_sql,
+            {
+                "all_users": full,
+                "last_dirty_id": last_dirty_id,
+                "max_user_id": max_user_id,
+            },
+        )
+        while True:
+            rows = cursor.fetchmany(self.chunk_size)
+            if not rows:
+                break
+            # Missing percents become NaN:
+            stats.add(np.array(rows, dtype=np.float64))
+
+        mean_percent = stats.mean_percent() if full else prior[0]
+        rows = stats.rows(mean_percent, self.prior_weight)
+
+        # Users without answers left are dropped:
+        if full:
+            stored = {
+                row[0]
+                for row in self.conn.execute("SELECT USER_ID FROM USER_REPUTATION")
+            }
+        else:
+            stored = {
+                row[0]
+                for row in self.conn.execute(
+                    self.get_dirty_users_sql, {"last_dirty_id": last_dirty_id}
+                )
+            }
+        removed = stored - {row[0] for row in rows}
+
+        computed_date = datetime.now().replace(microsecond=0)
+        with self.conn:
+            self.conn.executemany(
+                self.store_sql, [row + (computed_date,) for row in rows]
+            )
+            self.conn.executemany(self.delete_user_sql, [(user,) for user in removed])
+            self.conn.execute(self.clear_dirty_sql, {"last_dirty_id": last_dirty_id})
+            # Without ratings there is no prior yet, the next run is full again:
+            if full and stats.rated_count.any():
+                self.conn.execute(
+                    self.set_prior_sql,
+                    {
+                        "mean_percent": mean_percent,
+                        "prior_weight": self.prior_weight,
+                        "computed_date": computed_date,
+                    },
+                )
+
+        summary = {
+            "users": len(rows),
+            "removed": len(removed),
+            "mean_percent": round(mean_percent, 2),
+            "prior_weight": self.prior_weight,
+        }
+        logger.info(f"Reputation stored: {summary}")
+        return summary
+
+    def top_users(
+        self: reputation_engine, limit: int = 20, min_rated: int = 1
+    ) -> List[tuple]:
+        """Get the users with the highest smoothed usefulness.
+
+        Args:
+            self (reputation_engine)
+            limit (int): number of users returned
+            min_rated (int): users with fewer rated answers are left out
+        Returns:
+            list: (user name, answer count, rated count, mean percent, smoothed percent,
+                category count, category spread) tuples
+        """
+        return self.conn.execute(
+            self.top_users_sql, {"limit": limit, "min_rated": min_rated}
+        ).fetchall()
+
+
+class user_statistics:
+    """Per user sums of the answer chunks, in arrays indexed by USER.ID."""
+
+    def __init__(self: user_statistics, users: int, categories: int) -> None:
+        """
+        Args:
+            self (user_statistics)
+            users (int): size of the arrays, larger than the largest user identifier
+            categories (int): number of category codes
+        """
+        self.categories = categories
+        self.answer_count = np.zeros(users, dtype=np.int64)
+        self.rated_count = np.zeros(users, dtype=np.int64)
+        self.percent_sum = np.zeros(users, dtype=np.float64)
+        self.first_day = np.full(users, np.iinfo(np.int64).max, dtype=np.int64)
+        self.last_day = np.full(users, -1, dtype=np.int64)
+        self.user_percent = np.full(users, np.nan, dtype=np.float64)
+
+        # Answer counts of the (user, category) pairs seen, keyed by user * categories + category:
+        self.pair_keys = np.empty(0, dtype=np.int64)
+        self.pair_counts = np.empty(0, dtype=np.int64)
+
+    def add(self: user_statistics, chunk: np.ndarray) -> None:
+        """Add a chunk of answers.
+
+        Args:
+            self (user_statistics)
+            chunk (np.ndarray): (n, 5) array of user id, answer percent, user percent, day of the answer
+                and category code, missing percents are NaN
+        """
+        users = chunk[:, 0].astype(np.int64)
+        answer_percent = chunk[:, 1]
+        days = chunk[:, 3].astype(np.int64)
+        size = len(self.answer_count)
+
+        self.answer_count += np.bincount(users, minlength=size)
+        rated = ~np.isnan(answer_percent)
+        self.rated_count += np.bincount(users[rated], minlength=size)
+        self.percent_sum += np.bincount(
+            users[rated], weights=answer_percent[rated], minlength=size
+        )
+        np.minimum.at(self.first_day, users, days)
+
+        # The user percent of the latest answer of each user in the chunk:
+        order = np.lexsort((days, users))
+        last = np.r_[users[order][1:] != users[order][:-1], True]
+        latest = order[last]
+        newer = days[latest] >= self.last_day[users[latest]]
+        self.last_day[users[latest][newer]] = days[latest][newer]
+        self.user_percent[users[latest][newer]] = chunk[latest[newer], 2]
+
+        # The pairs of the chunk merged into the pairs seen before:
+        keys = users * self.categories + chunk[:, 4].astype(np.int64)
+        keys, inverse = np.unique(
+            np.concatenate([self.pair_keys, keys]), return_inverse=True
+        )
+        self.pair_counts = np.bincount(
+            inverse,
+            weights=np.concatenate([self.pair_counts, np.ones(len(chunk))]),
+        ).astype(np.int64)
+        self.pair_keys = keys
+
+    def mean_percent(self: user_statistics) -> float:
+        """Average usefulness of all rated answers, the prior of the smoothing."""
+        rated = self.rated_count.sum()
+        return float(self.percent_sum.sum() / rated) if rated else 0.0
+
+    def rows(
+        self: user_statistics, mean_percent: float, prior_weight: float
+    ) -> List[tuple]:
+        """Rows of USER_REPUTATION for the users with answers, without the computation date.
+
+        Args:
+            self (user_statistics)
+            mean_percent (float): prior average usefulness
+            prior_weight (float): number of prior ratings mixed into the ratings of each user
+        Returns:
+            list: tuples in the column order of USER_REPUTATION
+        """
+        users = np.flatnonzero(self.answer_count)
+        rated = self.rated_count[users]
+        sums = self.percent_sum[users]
+
+        with np.errstate(invalid="ignore", divide="ignore"):
+            mean = np.where(rated > 0, sums / rated, np.nan)
+        smoothed = (sums + prior_weight * mean_percent) / (rated + prior_weight)
+
+        # Category distribution of the answers of each user:
+        pair_users = self.pair_keys // self.categories
+        shares = self.pair_counts / self.answer_count[pair_users]
+        entropy = np.bincount(
+            pair_users,
+            weights=-shares * np.log(shares),
+            minlength=len(self.answer_count),
+        )[users]
+        category_count = np.bincount(pair_users, minlength=len(self.answer_count))[
+            users
+        ]
+        spread = np.where(
+            self.categories > 1, entropy / np.log(max(self.categories, 2)), 0.0
+        )
+
+        # Days since 1970-01-01 to dates:
+        first = self.first_day[users].astype("datetime64[D]").astype(str)
+        last = self.last_day[users].astype("datetime64[D]").astype(str)
+
+        return list(
+            zip(
+                users.tolist(),
+                self.answer_count[users].tolist(),
+                rated.tolist(),
+                [None if np.isnan(value) else value for value in mean.tolist()],
+                smoothed.tolist(),
+                [
+                    None if np.isnan(value) else value
+                    for value in self.user_percent[users].tolist()
+                ],
+                first.tolist(),
+                last.tolist(),
+                category_count.tolist(),
+                np.round(spread, 6).tolist(),
+            )
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Compute the reputation of the users from their answers."
+    )
+    parser.add_argument(
+        "--database", type=str, help="SQLite database file.", required=True
+    )
+    parser.add_argument(
+        "--full",
+        action="store_true",
+        help="Recompute every user instead of the users touched since the last run.",
+    )
+    parser.add_argument(
+        "--priorWeight",
+        type=float,
+        help="Number of average ratings mixed into the ratings of each user.",
+        default=10.0,
+    )
+    parser.add_argument(
+        "--top", type=int, help="Number of top users listed.", default=20
+    )
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(message)s")
+
+    engine = reputation_engine(db_connection(args.database).conn, args.priorWeight)
+    engine.compute(full=args.full)
+
+    for user, answers, rated, mean, smoothed, categories, spread in engine.top_users(
+        args.top
+    ):
+        logger.info(
+            f"{user}: {smoothed:.1f}% smoothed ({mean:.1f}% of {rated} rated answers), "
+            f"{answers} answers in {categories} categories (spread {spread:.2f})"
+        )
@@ -0,0 +1,573 @@
+"""Sharded storage: one SQLite file per category, with a shared dictionary of users and keywords.
+
+A single database file is a write bottleneck: crawlers of different categories wait for the same
+lock, and the backups copy everything every time. In sharded mode the folder holds:
+    - `<category>.db`: the questions, answers and keyword links of one category, named after the
+      category in the URLs (eg. tudomanyok, as given to --category), not its display name,
+    - `dictionary.db`: the users and keywords, shared by all shards.
+
+Each crawler only writes its own shard. New users and keywords are added to the dictionary in their
+own short transactions (and cached), so the shard transactions never hold the dictionary lock. Both
+kinds of files use WAL, so reads do not block the writers.
+
+The identifiers of the questions and answers are only unique within a shard. The federated reader
+attaches the shards read-only and exposes QUESTION, ANSWER and QUESTION_KEYWORD as views over all
+shards with an extra SHARD column, USER and KEYWORD come from the dictionary. Join questions and
+answers on SHARD as well. Compressed texts are read through the connection of their shard, as the
+compression dictionaries are trained by shard. SQLite attaches at most SQLITE_LIMIT_ATTACHED
+(usually 10) databases: over more shards the query is run for each group of shards and the rows are
+concatenated.
+
+Usage:
+    python gyik_scraper.py --shardDir <folder> --category <str> ...
+    python -m db_tools.sharding --shardDir <folder> split --database <str>
+    python -m db_tools.sharding --shardDir <folder> query --sql <str>
+    python -m db_tools.sharding --shardDir <folder> summary
+"""
+from __future__ import annotations
+
+import argparse
+import glob
+import logging
+import os
+import re
+import sqlite3
+import unicodedata
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, Tuple
+from urllib.parse import urlsplit
+
+from db_tools.db_connection import db_connection
+from db_tools.db_utils import db_handler, question_loader
+
+if TYPE_CHECKING:
+    from sqlite3 import Connection
+
+    from scraper.records import Question
+
+logger = logging.getLogger("__main__")
+
+DICTIONARY_FILE = "dictionary.db"
+
+# Tables of the shards, exposed as views by the federated reader:
+SHARDED_TABLES = ["QUESTION", "ANSWER", "QUESTION_KEYWORD"]
+
+# Seconds a writer waits for a lock held by another crawler:
+BUSY_TIMEOUT = 60
+
+# Category of a question or list page URL, eg. tudomanyok of /tudomanyok__biologia__123-cim:
+URL_CATEGORY_PATTERN = re.compile(r"^/([^/_]+)__")
+
+
+def shard_name(category: str) -> str:
+    """Name of the shard of a category, usable as a file and schema name.
+
+    Accented letters are transliterated (á -> a), so different categories do not collide.
+    """
+    ascii_name = (
+        unicodedata.normalize("NFKD", category).encode("ascii", "ignore").decode()
+    )
+    return re.sub(r"[^a-z0-9_]", "_", ascii_name.lower())
+
+
+def url_category(url: str, category: str) -> str:
+    """Category of a question as named in the URLs, the key of its shard.
+
+    The crawler opens the shard of its --category, which is the URL name of the category, while
+    the parsed questions carry the display name (eg. Tudományok). Every shard is named after the URL
+    name, so the questions of a category always end up in the same shard.
+
+    Args:
+        url (str): URL of the question
+        category (str): display name of the category, used if the URL has no category
+    Returns:
+        str: URL name of the category
+    """
+    match = URL_CATEGORY_PATTERN.match(urlsplit(url).path)
+    return match.group(1) if match else category
+
+
+def shard_file(folder: str, category: str) -> str:
+    """File of the shard of a category."""
+    return os.path.join(folder, shard_name(category) + ".db")
+
+
+def list_shards(folder: str) -> Dict[str, str]:
+    """Shards of a folder.
+
+    Returns:
+        dict: shard names mapped to their files
+    """
+    return {
+        os.path.basename(filename)[: -len(".db")]: filename
+        for filename in sorted(glob.glob(os.path.join(folder, "*.db")))
+        if os.path.basename(filename) != DICTIONARY_FILE
+    }
+
+
+class dictionary_connection(db_connection):
+    """Connection to the shared dictionary, holding the users and keywords."""
+
+    tables = ["keyword", "user"]
+    added_columns = []
+
+    # Lookups by name, and no duplicates when crawlers add the same user at once:
+    dictionary_indexes_sql = [
+        "CREATE UNIQUE INDEX IF NOT EXISTS USER_NAME ON USER (USER)",
+        "CREATE UNIQUE INDEX IF NOT EXISTS KEYWORD_NAME ON KEYWORD (KEYWORD)",
+    ]
+
+    def __init__(self: dictionary_connection, filename: str) -> None:
+        super().__init__(filename)
+
+        with self.conn:
+            for statement in self.dictionary_indexes_sql:
+                self.conn.execute(statement)
+
+    def _create_connection(self: dictionary_connection, db_file: str) -> Connection:
+        connection = super()._create_connection(db_file)
+        connection.execute("PRAGMA journal_mode = WAL")
+        connection.execute(f"PRAGMA busy_timeout = {BUSY_TIMEOUT * 1000}")
+        return connection
+
+
+class shared_dictionary:
+    """Users and keywords shared by the shards, added in their own transactions."""
+
+    def __init__(self: shared_dictionary, filename: str) -> None:
+        """Open the dictionary, created if not exists.
+
+        Args:
+            self (shared_dictionary)
+            filename (str): SQLite file of the dictionary
+        """
+        self.conn = dictionary_connection(filename).conn
+
+        # Identifiers do not change, they are cached (user name: (ID, USER_PERCENT)):
+        self.users: Dict[str, Tuple[int, int | None]] = {}
+        self.keywords: Dict[str, int] = {}
+
+    def _write(self: shared_dictionary, add: Callable[[], Any]) -> Any:
+        """Run a lookup-or-insert in an immediate transaction, so crawlers cannot add the same row."""
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            row_id = add()
+        except Exception:
+            self.conn.rollback()
+            raise
+        self.conn.commit()
+        return row_id
+
+    def add_user(self: shared_dictionary, user: str, percent: float) -> int:
+        """Get user ID or adds to the dictionary if not aready there. Missing percent is filled in.
+
+        Args:
+            self (shared_dictionary)
+            user (str): user name
+            percent (float): percent value of the usefulness of the answers
+        Returns:
+            int: identifier of the user in the dictionary.
+        """
+        cached = self.users.get(user)
+        if cached is not None and (cached[1] or not percent):
+            return cached[0]
+
+        def add():
+            row = self.conn.execute(db_handler.get_user_sql, {"user": user}).fetchone()
+            if row is None:
+                cursor = self.conn.execute(
+                    db_handler.add_user_sql, {"user": user, "user_percent": percent}
+                )
+                return cursor.lastrowid, percent
+
+            user_id, _, stored_percent = row
+            if percent and not stored_percent:
+                self.conn.execute(
+                    db_handler.update_percent_sql,
+                    {"user": user, "user_percent": percent},
+                )
+                stored_percent = percent
+            return user_id, stored_percent
+
+        self.users[user] = self._write(add)
+        return self.users[user][0]
+
+    def add_keyword(self: shared_dictionary, keyword: str) -> int:
+        """Get keyword ID or adds to the dictionary if not already there.
+
+        Args:
+            self (shared_dictionary)
+            keyword (str): keyword parsed from html
+        Returns:
+            int: keyword ID in the dictionary.
+        """
+        if keyword not in self.keywords:
+
+            def add():
+                row = self.conn.execute(
+                    db_handler.get_keyword_sql, {"keyword": keyword}
+                ).fetchone()
+                if row is not None:
+                    return row[0]
+                return self.conn.execute(
+                    db_handler.add_keyword_sql, {"keyword": keyword}
+                ).lastrowid
+
+            self.keywords[keyword] = self._write(add)
+
+        return self.keywords[keyword]
+
+    def close(self: shared_dictionary) -> None:
+        self.conn.close()
+
+
+class shard_connection(db_connection):
+    """Connection to the shard of a category, users and keywords go to the shared dictionary."""
+
+    tables = ["question", "answer", "question_keyword", "text_codec", "data_version"]
+
+    # Same tables as the single file database, the users and keywords are in another file:
+    question_table_sql = """CREATE TABLE IF NOT EXISTS QUESTION (
+        ID INTEGER PRIMARY KEY,
+        GYIK_ID INTEGER NOT NULL,
+        CATEGORY TEXT NOT NULL,
+        SUBCATEGORY TEXT NOT NULL,
+        QUESTION_TITLE TEXT NOT NULL,
+        QUESTION TEXT,
+        QUESTION_DATE DATETIME NOT NULL,
+        URL TEXT NOT NULL,
+        USER_ID INTEGER,
+        ADDED_DATE DATETIME NOT NULL
+    )"""
+
+    answer_table_sql = """CREATE TABLE IF NOT EXISTS ANSWER (
+        ID INTEGER PRIMARY KEY,
+        USER_ID INTEGER,
+        GYIK_ID INTEGER NOT NULL,
+        QUESTION_ID INTEGER NOT NULL,
+        ANSWER_DATE DATETIME NOT NULL,
+        ANSWER_TEXT TEXT NOT NULL,
+        USER_PERCENT NUMERIC,
+        ANSWER_PERCENT NUMERIC,
+        REMOVED_DATE DATETIME,
+        CONSTRAINT QUESTION_ID
+            FOREIGN KEY (QUESTION_ID)
+            REFERENCES QUESTION (ID)
+            ON DELETE CASCADE
+    )"""
+
+    question_keyword_table_sql = """CREATE TABLE IF NOT EXISTS QUESTION_KEYWORD (
+        KEYWORD_ID INTEGER NOT NULL,
+        QUESTION_ID INTEGER NOT NULL,
+        CONSTRAINT QUESTION_ID
+            FOREIGN KEY (QUESTION_ID)
+            REFERENCES QUESTION (ID)
+            ON DELETE CASCADE
+    )"""
+
+    def __init__(
+        self: shard_connection,
+        folder: str,
+        category: str,
+        dictionary: shared_dictionary | None = None,
+    ) -> None:
+        """Open the shard of a category, created if not exists.
+
+        Args:
+            self (shard_connection)
+            folder (str): folder of the shards
+            category (str): category of the questions stored in the shard, as named in the URLs
+            dictionary (shared_dictionary | None): dictionary of the folder, opened if not given
+        """
+        os.makedirs(folder, exist_ok=True)
+        self.folder = folder
+        self.category = category
+        self.dictionary = dictionary or shared_dictionary(
+            os.path.join(folder, DICTIONARY_FILE)
+        )
+
+        super().__init__(shard_file(folder, category))
+
+    def _create_connection(self: shard_connection, db_file: str) -> Connection:
+        connection = super()._create_connection(db_file)
+        connection.execute("PRAGMA journal_mode = WAL")
+        connection.execute(f"PRAGMA busy_timeout = {BUSY_TIMEOUT * 1000}")
+        return connection
+
+    def handler(self: shard_connection) -> shard_handler:
+        """Handler of the shard, users and keywords are added to the dictionary."""
+        return shard_handler(self.conn, self.dictionary)
+
+
+class shard_handler(db_handler):
+    """db_handler of a shard, with the users and keywords in the shared dictionary."""
+
+    def __init__(
+        self: shard_handler, connection: Connection, dictionary: shared_dictionary
+    ) -> None:
+        """Initialize the handler.
+
+        Args:
+            self (shard_handler)
+            connection (Connection): connection to the shard
+            dictionary (shared_dictionary): dictionary of the shard folder
+        """
+        super().__init__(connection)
+        self.dictionary = dictionary
+
+    def add_user(self: shard_handler, user: str, percent: float) -> int:
+        return self.dictionary.add_user(user, percent)
+
+    def add_keyword(self: shard_handler, keyword: str) -> int:
+        # None values cannot be added:
+        if not keyword:
+            raise ValueError("Keyword must be specified!")
+
+        return self.dictionary.add_keyword(keyword)
+
+
+class sharded_storage:
+    """Routes the questions to the shard of their category."""
+
+    def __init__(self: sharded_storage, folder: str) -> None:
+        """Open the dictionary of a shard folder, the shards are opened when first used.
+
+        Args:
+            self (sharded_storage)
+            folder (str): folder of the shards
+        """
+        os.makedirs(folder, exist_ok=True)
+        self.folder = folder
+        self.dictionary = shared_dictionary(os.path.join(folder, DICTIONARY_FILE))
+        self.loaders: Dict[str, question_loader] = {}
+
+    def loader(self: sharded_storage, question: Question) -> question_loader:
+        """Loader of the shard of the category of a question."""
+        category = url_category(question.url, question.category)
+        name = shard_name(category)
+        if name not in self.loaders:
+            connection = shard_connection(self.folder, category, self.dictionary)
+            self.loaders[name] = question_loader(connection.handler())
+        return self.loaders[name]
+
+    def add_question(
+        self: sharded_storage, question: Question, commit: bool = True
+    ) -> None:
+        """Load a question into the shard of its category (see question_loader.add_question)."""
+        self.loader(question).add_question(question, commit)
+
+    def refresh_question(
+        self: sharded_storage, question: Question, commit: bool = True
+    ) -> Dict[str, int]:
+        """Refresh a question in the shard of its category (see question_loader.refresh_question)."""
+        return self.loader(question).refresh_question(question, commit)
+
+    def commit(self: sharded_storage) -> None:
+        for loader in self.loaders.values():
+            loader.db_obj.commit()
+
+    def close(self: sharded_storage) -> None:
+        for loader in self.loaders.values():
+            loader.db_obj.close()
+        self.dictionary.close()
+
+
+class federated_reader:
+    """Read-only queries over all shards of a folder."""
+
+    def __init__(self: federated_reader, folder: str) -> None:
+        """Attach the dictionary and the shards of a folder.
+
+        Args:
+            self (federated_reader)
+            folder (str): folder of the shards
+        """
+        self.folder = folder
+        self.shards = list_shards(folder)
+        if not self.shards:
+            raise ValueError(f"No shards found in {folder}.")
+
+        self.conn = sqlite3.connect(":memory:", uri=True)
+        self._attach("dictionary", os.path.join(folder, DICTIONARY_FILE))
+
+        # One database is the dictionary, the shards are attached in groups of the rest:
+        group_size = self.conn.getlimit(sqlite3.SQLITE_LIMIT_ATTACHED) - 1
+        names = list(self.shards)
+        self.groups = [
+            names[i : i + group_size] for i in range(0, len(names), group_size)
+        ]
+        if len(self.groups) > 1:
+            logger.info(
+                f"{len(names)} shards are queried in {len(self.groups)} groups of {group_size}."
+            )
+        self.attached: List[str] = []
+
+    def _attach(self: federated_reader, schema: str, filename: str) -> None:
+        self.conn.execute(
+            "ATTACH DATABASE ? AS " + schema, (f"file:{filename}?mode=ro",)
+        )
+
+    def _attach_group(self: federated_reader, group: List[str]) -> None:
+        """Attach a group of shards, and union their tables in temporary views."""
+        if group == self.attached:
+            return
+
+        for name in self.attached:
+            self.conn.execute(f"DETACH DATABASE shard_{name}")
+        for table in SHARDED_TABLES:
+            self.conn.execute(f"DROP VIEW IF EXISTS temp.{table}")
+
+        for name in group:
+            self._attach(f"shard_{name}", self.shards[name])
+        for table in SHARDED_TABLES:
+            union = " UNION ALL ".join(
+                f"SELECT '{name}' AS SHARD, * FROM shard_{name}.{table}"
+                for name in group
+            )
+            self.conn.execute(f"CREATE TEMP VIEW {table} AS {union}")
+        self.attached = group
+
+    def query(
+        self: federated_reader, sql: str, parameters: dict | None = None
+    ) -> List[tuple]:
+        """Run a query over all shards.
+
+        With more shards than can be attached at once, the query is run for each group of shards
+        and the rows are concatenated: aggregates over several groups have to be combined.
+
+        Args:
+            self (federated_reader)
+            sql (str): SELECT statement over QUESTION, ANSWER, QUESTION_KEYWORD (with a SHARD
+                column), USER and KEYWORD
+            parameters (dict | None): values of the named parameters
+        Returns:
+            list: rows of the result
+        """
+        rows = []
+        for group in self.groups:
+            self._attach_group(group)
+            rows += self.conn.execute(sql, parameters or {}).fetchall()
+        return rows
+
+    def summary(self: federated_reader) -> List[tuple]:
+        """Number of questions and answers by shard.
+
+        Returns:
+            list: (shard, questions, answers) tuples
+        """
+        return self.query(
+            """
+            SELECT Q.SHARD, COUNT(DISTINCT Q.ID), COUNT(A.ID)
+            FROM QUESTION AS Q
+            LEFT JOIN ANSWER AS A ON A.SHARD = Q.SHARD AND A.QUESTION_ID = Q.ID
+            GROUP BY Q.SHARD
+            ORDER BY Q.SHARD
+            """
+        )
+
+    def close(self: federated_reader) -> None:
+        self.conn.close()
+
+
+def split_database(database: str, folder: str) -> Dict[str, int]:
+    """Split a single file database into shards by category, keeping the identifiers.
+
+    The shards are named after the categories in the URLs, the same as the shards of the crawler.
+
+    Args:
+        database (str): SQLite database file
+        folder (str): folder of the shards, created
+    Returns:
+        dict: number of questions by shard
+    """
+    source = db_connection(database).conn
+    # The URL of any question of a category gives its URL name:
+    categories = [
+        (category, url_category(url, category))
+        for category, url in source.execute(
+            "SELECT CATEGORY, MIN(URL) FROM QUESTION GROUP BY CATEGORY"
+        )
+    ]
+    source.close()
+
+    os.makedirs(folder, exist_ok=True)
+    dictionary = shared_dictionary(os.path.join(folder, DICTIONARY_FILE))
+    with dictionary.conn as conn:
+        conn.execute("ATTACH DATABASE ? AS source", (database,))
+        conn.execute("INSERT OR IGNORE INTO USER SELECT * FROM source.USER")
+        conn.execute("INSERT OR IGNORE INTO KEYWORD SELECT * FROM source.KEYWORD")
+    conn.execute("DETACH DATABASE source")
+
+    counts: Dict[str, int] = {}
+    for category, shard_category in categories:
+        name = shard_name(shard_category)
+        shard = shard_connection(folder, shard_category, dictionary).conn
+        shard.execute("ATTACH DATABASE ? AS source", (database,))
+        with shard:
+            shard.execute(
+                "INSERT OR IGNORE INTO TEXT_CODEC SELECT * FROM source.TEXT_CODEC"
+            )
+            counts[name] = (
+                counts.get(name, 0)
+                + shard.execute(
+                    "INSERT INTO QUESTION SELECT * FROM source.QUESTION WHERE CATEGORY = ?",
+                    (category,),
+                ).rowcount
+            )
+            shard.execute(
+                """
+                INSERT INTO ANSWER
+                SELECT A.* FROM source.ANSWER AS A JOIN main.QUESTION AS Q ON Q.ID = A.QUESTION_ID
+                WHERE Q.CATEGORY = ?
+                """,
+                (category,),
+            )
+            shard.execute(
+                """
+                INSERT INTO QUESTION_KEYWORD
+                SELECT QK.* FROM source.QUESTION_KEYWORD AS QK
+                JOIN main.QUESTION AS Q ON Q.ID = QK.QUESTION_ID
+                WHERE Q.CATEGORY = ?
+                """,
+                (category,),
+            )
+        shard.execute("DETACH DATABASE source")
+        shard.close()
+        logger.info(f"Shard {name} ({category}): {counts[name]} questions.")
+
+    dictionary.close()
+    return counts
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Split a database into per-category shards, and query the shards."
+    )
+    parser.add_argument(
+        "--shardDir", type=str, help="Folder of the shards.", required=True
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+    split_parser = commands.add_parser(
+        "split", help="Split a single file database into shards."
+    )
+    split_parser.add_argument(
+        "--database", type=str, help="SQLite database file.", required=True
+    )
+    query_parser = commands.add_parser("query", help="Run a query over all shards.")
+    query_parser.add_argument(
+        "--sql", type=str, help="SELECT statement.", required=True
+    )
+    commands.add_parser("summary", help="Number of questions and answers by shard.")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(message)s")
+
+    if args.command == "split":
+        split_database(args.database, args.shardDir)
+
+    elif args.command == "query":
+        for row in federated_reader(args.shardDir).query(args.sql):
+            print("\t".join(map(str, row)))
+
+    else:
+        for shard, questions, answers in federated_reader(args.shardDir).summary():
+            logger.info(f"{shard}: {questions} questions, {answers} answers")
@@ -0,0 +1,226 @@
+"""Consistent snapshots of a database, taken while the crawler is writing it.
+
+Copying the file during writes gives a corrupt copy, and the online backup API alone does not help
+either: a backup is restarted whenever another connection commits between two of its steps, so
+under a crawler committing every few seconds it never completes. The database has to be in WAL
+mode (see `enable_wal`, the mode is stored in the file and the crawler keeps using it):
+    - the snapshot is taken in a read transaction, so it sees the database as it was at the start,
+      and the backup copies it in small steps without being restarted,
+    - readers do not block the writer in WAL mode, the commits of the crawler go on. Checkpoints
+      cannot go beyond the snapshot, so the WAL file grows with the writes until it is finished,
+    - the steps are paced by a duty cycle, the copying only uses part of the time. Steps slower
+      than the latency budget mean the disk is contended, then the pace is slowed down further,
+      and sped up again when the steps are fast.
+
+The copy is written into a temporary file and renamed when complete, so the output is always a
+complete snapshot.
+
+Usage:
+    python -m db_tools.snapshot --database <str> --enableWal
+    python -m db_tools.snapshot --database <str> --output <str> [--pages 256] [--dutyCycle 0.5] [--latencyBudget 20]
+"""
+from __future__ import annotations
+
+import argparse
+import logging
+import os
+import sqlite3
+import time
+
+logger = logging.getLogger("__main__")
+
+# The pace is not slowed down below this duty cycle:
+MIN_DUTY_CYCLE = 0.05
+
+
+def enable_wal(filename: str, timeout: float = 60.0) -> None:
+    """Switch a database to WAL mode, it is kept until switched back.
+
+    Connections of a running crawler may stay open, the switch waits for the transaction in progress.
+
+    Args:
+        filename (str): database file
+        timeout (float): seconds to wait for the lock
+    """
+    connection = sqlite3.connect(filename, timeout=timeout)
+    try:
+        mode = connection.execute("PRAGMA journal_mode = WAL").fetchone()[0]
+    finally:
+        connection.close()
+
+    if mode != "wal":
+        raise RuntimeError(f"{filename} could not be switched to WAL mode ({mode}).")
+
+
+class online_snapshot:
+    """Copy of a WAL mode database in paced steps of the backup API."""
+
+    def __init__(
+        self: online_snapshot,
+        database: str,
+        pages: int = 256,
+        duty_cycle: float = 0.5,
+        latency_budget: float = 0.02,
+        progress_interval: float = 10.0,
+    ) -> None:
+        """
+        Args:
+            self (online_snapshot)
+            database (str): database file, in WAL mode
+            pages (int): pages copied in one step
+            duty_cycle (float): highest fraction of the time spent copying
+            latency_budget (float): seconds a step may take before the pace is slowed down
+            progress_interval (float): seconds between two progress reports
+        """
+        if not os.path.isfile(database):
+            raise FileNotFoundError(f"Database does not exist: {database}")
+        if not 0 < duty_cycle <= 1:
+            raise ValueError(f"Duty cycle must be in (0, 1]. Got: {duty_cycle}")
+
+        self.database = database
+        self.pages = pages
+        self.duty_cycle = duty_cycle
+        self.latency_budget = latency_budget
+        self.progress_interval = progress_interval
+
+    def _reset(self: online_snapshot) -> None:
+        now = time.perf_counter()
+        self.started = now
+        self.step_started = now
+        self.last_report = now
+        self.duty = self.duty_cycle
+        self.steps = 0
+        self.slow_steps = 0
+        self.max_step = 0.0
+        self.paused = 0.0
+
+    def _step(self: online_snapshot, status: int, remaining: int, total: int) -> None:
+        """Called by the backup after every step: reports the progress and paces the copying."""
+        step = time.perf_counter() - self.step_started
+        self.steps += 1
+
+        # The last step also syncs the snapshot file, no pause follows it:
+        if remaining == 0:
+            return
+        self.max_step = max(self.max_step, step)
+
+        # Slow steps mean the disk is contended, the copying backs off:
+        if step > self.latency_budget:
+            self.slow_steps += 1
+            self.duty = max(MIN_DUTY_CYCLE, self.duty / 2)
+        else:
+            self.duty = min(self.duty_cycle, self.duty * 1.25)
+
+        if time.perf_counter() - self.last_report >= self.progress_interval:
+            self.last_report = time.perf_counter()
+            done = total - remaining
+            elapsed = self.last_report - self.started
+            logger.info(
+                f"Snapshot: {done}/{total} pages ({done / total:.0%}), "
+                f"{elapsed:.0f} s elapsed, duty cycle {self.duty:.2f}."
+            )
+
+        # Pause so the copying takes the duty cycle of the time:
+        if self.duty < 1:
+            pause = step * (1 - self.duty) / self.duty
+            time.sleep(pause)
+            self.paused += pause
+
+        self.step_started = time.perf_counter()
+
+    def take(self: online_snapshot, output: str) -> dict:
+        """Write a snapshot of the database.
+
+        Args:
+            self (online_snapshot)
+            output (str): file of the snapshot, replaced if exists
+        Returns:
+            dict: size and timing of the snapshot
+        """
+        # The transactions are controlled explicitly:
+        source = sqlite3.connect(self.database, isolation_level=None)
+        mode = source.execute("PRAGMA journal_mode").fetchone()[0]
+        if mode != "wal":
+            source.close()
+            raise RuntimeError(
+                f"{self.database} is in {mode} journal mode, the snapshot would be restarted by "
+                f"every commit. Switch it to WAL with: python -m db_tools.snapshot --database "
+                f"{self.database} --enableWal"
+            )
+
+        partial = f"{output}.partial"
+        if os.path.exists(partial):
+            os.remove(partial)
+        target = sqlite3.connect(partial)
+
+        try:
+            # The read transaction pins the state copied by the backup steps:
+            source.execute("BEGIN")
+            source.execute("SELECT COUNT(*) FROM sqlite_master").fetchone()
+
+            self._reset()
+            source.backup(target, pages=self.pages, progress=self._step)
+            source.execute("COMMIT")
+        finally:
+            target.close()
+            source.close()
+
+        os.replace(partial, output)
+
+        summary = {
+            "size_mb": round(os.path.getsize(output) / 2**20, 1),
+            "seconds": round(time.perf_counter() - self.started, 2),
+            "paused_seconds": round(self.paused, 2),
+            "steps": self.steps,
+            "slow_steps": self.slow_steps,
+            "max_step_ms": round(self.max_step * 1000, 1),
+        }
+        logger.info(f"Snapshot saved into {output}: {summary}")
+        return summary
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Take a consistent snapshot of a database while it is written."
+    )
+    parser.add_argument(
+        "--database", type=str, help="SQLite database file.", required=True
+    )
+    parser.add_argument(
+        "--output", type=str, help="File of the snapshot.", required=False
+    )
+    parser.add_argument(
+        "--enableWal",
+        action="store_true",
+        help="Switch the database to WAL mode, needed for snapshots while writing.",
+        required=False,
+    )
+    parser.add_argument(
+        "--pages", type=int, help="Pages copied in one step.", default=256
+    )
+    parser.add_argument(
+        "--dutyCycle",
+        type=float,
+        help="Highest fraction of the time spent copying.",
+        default=0.5,
+    )
+    parser.add_argument(
+        "--latencyBudget",
+        type=float,
+        help="Milliseconds a step may take before the copying is slowed down.",
+        default=20.0,
+    )
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(message)s")
+
+    if args.enableWal:
+        enable_wal(args.database)
+        logger.info(f"{args.database} is in WAL mode.")
+
+    if args.output is not None:
+        online_snapshot(
+            args.database, args.pages, args.dutyCycle, args.latencyBudget / 1000
+        ).take(args.output)
+    elif not args.enableWal:
+        parser.error("Either --output or --enableWal is required.")
@@ -0,0 +1,160 @@
+"""Interface of the storage backends, used by question_loader.
+
+Every write and lookup of the loader goes through these methods, so a question can be loaded into
+any backend the same way:
+    - sqlite: `db_utils.db_handler`, the scraper database,
+    - duckdb: `duckdb_storage.duckdb_handler`, an embedded columnar database for analytical
+      queries, rows are staged in memory and appended in bulk on commit.
+
+Usage:
+    storage = open_storage("gyik.duckdb", "duckdb")
+    question_loader(storage).add_question(question)
+"""
+from __future__ import annotations
+
+from abc import ABC, abstractmethod
+from datetime import datetime
+from typing import Dict, List, Set
+
+from scraper.records import Answer, Question
+
+BACKENDS = ["sqlite", "duckdb"]
+
+
+class storage_backend(ABC):
+    """Operations a backend has to provide for loading and refreshing questions.
+
+    Identifiers returned by the backend are the ID columns of the tables. Changes are kept in a
+    transaction until `commit`, savepoints can be nested within it.
+    """
+
+    @abstractmethod
+    def add_user(self: storage_backend, user: str, percent: float) -> int | None:
+        """Identifier of a user, added if not stored. A missing usefulness value is filled in."""
+
+    @abstractmethod
+    def add_keyword(self: storage_backend, keyword: str) -> int:
+        """Identifier of a keyword, added if not stored."""
+
+    @abstractmethod
+    def link_to_keyword(
+        self: storage_backend, question_id: int, keyword_id: int
+    ) -> None:
+        """Link a question to a keyword, if not linked yet."""
+
+    @abstractmethod
+    def get_question_id(self: storage_backend, gyik_id: int) -> int | None:
+        """Identifier of a question by its GYIK identifier, None if not stored."""
+
+    @abstractmethod
+    def get_answer_count(self: storage_backend, gyik_id: int) -> int | None:
+        """Number of answers of a question not given by the asker, None if not stored."""
+
+    @abstractmethod
+    def drop_question(self: storage_backend, gyik_id: int) -> None:
+        """Delete a question with its answers and keyword links, committed."""
+
+    @abstractmethod
+    def add_question(
+        self: storage_backend, question: Question, user_id: int | None
+    ) -> int:
+        """Add a question without its answers and keywords, returns its identifier."""
+
+    @abstractmethod
+    def test_answer(self: storage_backend, gyik_id: int) -> bool:
+        """True if an answer with the GYIK identifier is stored."""
+
+    @abstractmethod
+    def add_answer(
+        self: storage_backend, answer: Answer, question_id: int, user_id: int | None
+    ) -> int | None:
+        """Add an answer, returns its identifier. Answers already stored are skipped (None)."""
+
+    @abstractmethod
+    def get_stored_answers(self: storage_backend, question_id: int) -> Dict[int, tuple]:
+        """Answers of a question: GYIK identifier mapped to (ID, USER_PERCENT, ANSWER_PERCENT, REMOVED_DATE)."""
+
+    @abstractmethod
+    def update_answer_percent(
+        self: storage_backend,
+        answer_id: int,
+        user_percent: int | None,
+        answer_percent: int | None,
+    ) -> None:
+        """Update the usefulness values of a stored answer."""
+
+    @abstractmethod
+    def set_answer_removed(
+        self: storage_backend, answer_id: int, removed_date: datetime | None
+    ) -> None:
+        """Flag an answer as removed from the site, or clear the flag if the date is None."""
+
+    @abstractmethod
+    def get_keyword_links(self: storage_backend, question_id: int) -> Set[int]:
+        """Identifiers of the keywords linked to a question."""
+
+    @abstractmethod
+    def get_question_text(self: storage_backend, question_id: int) -> str | None:
+        """Text of a stored question."""
+
+    @abstractmethod
+    def get_answer_text(self: storage_backend, answer_id: int) -> str | None:
+        """Text of a stored answer."""
+
+    @abstractmethod
+    def query(
+        self: storage_backend, sql: str, parameters: dict | None = None
+    ) -> List[tuple]:
+        """Rows of a read only query, with the pending changes visible."""
+
+    @abstractmethod
+    def bump_data_version(self: storage_backend) -> None:
+        """Mark the data changed in the current transaction, cached query results become stale."""
+
+    @abstractmethod
+    def commit(self: storage_backend) -> None:
+        """Commit the changes."""
+
+    @abstractmethod
+    def rollback(self: storage_backend) -> None:
+        """Roll back the changes since the last commit."""
+
+    @abstractmethod
+    def savepoint(self: storage_backend, name: str) -> None:
+        """Open a savepoint within the current transaction."""
+
+    @abstractmethod
+    def release(self: storage_backend, name: str) -> None:
+        """Release a savepoint, keeping its changes in the current transaction."""
+
+    @abstractmethod
+    def rollback_to(self: storage_backend, name: str) -> None:
+        """Roll back the changes made since the savepoint was opened."""
+
+    @abstractmethod
+    def close(self: storage_backend) -> None:
+        """Close the connection."""
+
+
+def open_storage(filename: str, backend: str = "sqlite") -> storage_backend:
+    """Open a database with one of the backends, created with the tables if not exists.
+
+    Args:
+        filename (str): database file
+        backend (str): sqlite or duckdb
+    Returns:
+        storage_backend
+    """
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown storage backend: {backend}. Choose from: {BACKENDS}")
+
+    if backend == "sqlite":
+        from db_tools.db_connection import db_connection
+        from db_tools.db_utils import db_handler
+
+        return db_handler(db_connection(filename).conn)
+
+    # Only imported when used:
+    from db_tools.duckdb_storage import duckdb_handler
+
+    return duckdb_handler(filename)
@@ -0,0 +1,430 @@
+"""Compressed storage of the question and answer texts.
+
+The texts make up most of the database file. When compression is enabled, texts are stored as
+BLOBs prefixed by a three byte header: the codec (1: zlib, 2: zstd) and the little-endian
+identifier of the dictionary in the TEXT_CODEC table (0: no dictionary). Texts that would not get
+shorter are kept as plain TEXT, so plain and compressed values can be mixed in the same column and
+databases can be converted gradually.
+
+Compressed values are decoded transparently:
+    - in SQL with the `gyik_text` function registered by db_connection, eg.
+      SELECT gyik_text(ANSWER_TEXT) FROM ANSWER
+    - in Python with `text_codec.decompress` or the text getters of db_handler.
+
+Usage (in place conversion of an existing database):
+    python -m db_tools.text_codec --database <str> [--codec zstd] [--train] [--decompress] [--vacuum]
+"""
+from __future__ import annotations
+
+import argparse
+import logging
+import re
+import sqlite3
+import struct
+import zlib
+from collections import Counter
+from datetime import datetime
+from typing import TYPE_CHECKING, Dict, List
+
+if TYPE_CHECKING:
+    from sqlite3 import Connection
+
+logger = logging.getLogger("__main__")
+
+
+class text_codec:
+    """Compress texts for storage and decompress stored values."""
+
+    # Codec identifiers stored in the first byte of the compressed values:
+    CODECS = {"zlib": 1, "zstd": 2}
+
+    # Codec identifier and dictionary identifier:
+    HEADER = struct.Struct("<BH")
+
+    DEFAULT_LEVELS = {"zlib": 9, "zstd": 19}
+
+    # zlib only uses the last 32 kB of a dictionary:
+    ZLIB_DICTIONARY_SIZE = 32 * 1024
+
+    # Columns holding texts (table, identifier column, text column):
+    TEXT_COLUMNS = [("ANSWER", "ID", "ANSWER_TEXT"), ("QUESTION", "ID", "QUESTION")]
+
+    get_dictionary_sql = """SELECT CODEC, DICTIONARY FROM TEXT_CODEC WHERE ID = :id"""
+
+    latest_dictionary_sql = """
+        SELECT MAX(ID) FROM TEXT_CODEC WHERE CODEC = :codec AND DICTIONARY IS NOT NULL
+    """
+
+    add_dictionary_sql = """
+        INSERT INTO TEXT_CODEC (CODEC, DICTIONARY, SAMPLE_COUNT, ADDED_DATE)
+        VALUES (:codec, :dictionary, :sample_count, :added_date)
+    """
+
+    # Random sample of the stored plain texts, used to train dictionaries:
+    sample_texts_sql = """
+        SELECT ANSWER_TEXT FROM ANSWER
+        WHERE typeof(ANSWER_TEXT) = 'text'
+        ORDER BY RANDOM()
+        LIMIT :limit
+    """
+
+    def __init__(
+        self: text_codec,
+        connection: Connection,
+        codec: str | None = None,
+        level: int | None = None,
+        dictionary_id: int | None = None,
+    ) -> None:
+        """Initialize the codec.
+
+        Args:
+            self (text_codec)
+            connection (Connection): connection to the scraper database, the dictionaries are read from it.
+            codec (str | None): zlib or zstd. If None, texts are stored uncompressed, but stored values are
+                still decoded.
+            level (int | None): compression level, defaults to the maximum ratio of the codec.
+            dictionary_id (int | None): identifier of the dictionary in the TEXT_CODEC table.
+        """
+        if not isinstance(connection, sqlite3.Connection):
+            raise TypeError(
+                f"Connection object is expected for initialize text_codec object. Got type: {type(connection)}."
+            )
+
+        if codec is not None and codec not in self.CODECS:
+            raise ValueError(f"Unknown codec: {codec}. Available: {list(self.CODECS)}")
+
+        self.conn = connection
+        self.codec = codec
+        self.level = level if level is not None else self.DEFAULT_LEVELS.get(codec)
+        self.dictionary_id = dictionary_id or 0
+
+        # Dictionaries and zstd (de)compressors are cached by dictionary identifier:
+        self._dictionaries: Dict[int, bytes] = {0: b""}
+        self._compressor = None
+        self._decompressors: Dict[int, object] = {}
+
+        if codec is not None:
+            dictionary = self._dictionary(self.dictionary_id)
+            self._compressor = self._make_compressor(dictionary)
+
+    @staticmethod
+    def _zstd():
+        try:
+            import zstandard
+        except ImportError:
+            raise ImportError(
+                "The zstd codec requires the zstandard package: pip install zstandard"
+            )
+        return zstandard
+
+    def _dictionary(self: text_codec, dictionary_id: int) -> bytes:
+        """Get a dictionary, loading it from the database when first used."""
+        if dictionary_id not in self._dictionaries:
+            row = self.conn.execute(
+                self.get_dictionary_sql, {"id": dictionary_id}
+            ).fetchone()
+            if row is None:
+                raise ValueError(f"Unknown text dictionary: {dictionary_id}")
+            self._dictionaries[dictionary_id] = row[1] or b""
+
+        return self._dictionaries[dictionary_id]
+
+    def _make_compressor(self: text_codec, dictionary: bytes):
+        if self.codec != "zstd":
+            return None
+
+        zstandard = self._zstd()
+        return zstandard.ZstdCompressor(
+            level=self.level,
+            dict_data=zstandard.ZstdCompressionDict(dictionary) if dictionary else None,
+            write_checksum=False,
+            write_content_size=True,
+            write_dict_id=False,
+        )
+
+    def compress(self: text_codec, text: str | None) -> str | bytes | None:
+        """Encode a text for storage.
+
+        Args:
+            self (text_codec)
+            text (str | None): text to store
+        Returns:
+            str | bytes | None: compressed value, or the text itself if compression does not make it shorter
+        """
+        if text is None or self.codec is None:
+            return text
+
+        raw = text.encode("utf-8")
+        if self.codec == "zstd":
+            payload = self._compressor.compress(raw)
+        else:
+            compressor = zlib.compressobj(
+                self.level,
+                zlib.DEFLATED,
+                -zlib.MAX_WBITS,
+                zdict=self._dictionary(self.dictionary_id),
+            )
+            payload = compressor.compress(raw) + compressor.flush()
+
+        value = self.HEADER.pack(self.CODECS[self.codec], self.dictionary_id) + payload
+        return value if len(value) < len(raw) else text
+
+    def decompress(self: text_codec, value: str | bytes | None) -> str | None:
+        """Decode a stored value. Plain texts are returned as they are.
+
+        Args:
+            self (text_codec)
+            value (str | bytes | None): value of a text column
+        Returns:
+            str | None: the text
+        """
+        if not isinstance(value, bytes):
+            return value
+
+        codec, dictionary_id = self.HEADER.unpack_from(value)
+        payload = memoryview(value)[self.HEADER.size :]
+
+        if codec == self.CODECS["zstd"]:
+            decompressor = self._decompressors.get(dictionary_id)
+            if decompressor is None:
+                zstandard = self._zstd()
+                dictionary = self._dictionary(dictionary_id)
+                decompressor = zstandard.ZstdDecompressor(
+                    dict_data=zstandard.ZstdCompressionDict(dictionary)
+                    if dictionary
+                    else None
+                )
+                self._decompressors[dictionary_id] = decompressor
+            raw = decompressor.decompress(payload)
+        elif codec == self.CODECS["zlib"]:
+            decompressor = zlib.decompressobj(
+                -zlib.MAX_WBITS, zdict=self._dictionary(dictionary_id) or b""
+            )
+            raw = decompressor.decompress(payload) + decompressor.flush()
+        else:
+            raise ValueError(f"Unknown text codec identifier: {codec}")
+
+        return raw.decode("utf-8")
+
+    def register(self: text_codec) -> None:
+        """Register the `gyik_text` SQL function decoding the stored values.
+
+        Args:
+            self (text_codec)
+        """
+        self.conn.create_function("gyik_text", 1, self.decompress, deterministic=True)
+
+    def latest_dictionary(self: text_codec, codec: str) -> int | None:
+        """Identifier of the most recently trained dictionary of a codec.
+
+        Args:
+            self (text_codec)
+            codec (str): zlib or zstd
+        Returns:
+            int | None: dictionary identifier, None if there is no dictionary for the codec.
+        """
+        (dictionary_id,) = self.conn.execute(
+            self.latest_dictionary_sql, {"codec": codec}
+        ).fetchone()
+        return dictionary_id
+
+    def train_dictionary(
+        self: text_codec,
+        codec: str,
+        size: int = 64 * 1024,
+        sample_count: int = 20_000,
+    ) -> int | None:
+        """Build a dictionary from a sample of the stored plain texts and save it to the TEXT_CODEC table.
+
+        Short texts compress poorly on their own, as the compressor has no history to refer to. A
+        dictionary of the frequent phrases of the site provides that history.
+
+        Args:
+            self (text_codec)
+            codec (str): zlib or zstd
+            size (int): size of the dictionary in bytes. zlib dictionaries are at most 32 kB.
+            sample_count (int): number of texts sampled
+        Returns:
+            int | None: identifier of the new dictionary, None if there are too few texts to train on.
+        """
+        samples = [
+            text.encode("utf-8")
+            for (text,) in self.conn.execute(
+                self.sample_texts_sql, {"limit": sample_count}
+            )
+        ]
+        if len(samples) < 100:
+            logger.warning(
+                f"Only {len(samples)} plain texts found, no dictionary is trained."
+            )
+            return None
+
+        if codec == "zstd":
+            dictionary = self._zstd().train_dictionary(size, samples).as_bytes()
+        elif codec == "zlib":
+            dictionary = self._frequent_phrases(
+                samples, min(size, self.ZLIB_DICTIONARY_SIZE)
+            )
+        else:
+            raise ValueError(f"Unknown codec: {codec}. Available: {list(self.CODECS)}")
+
+        with self.conn:
+            cursor = self.conn.execute(
+                self.add_dictionary_sql,
+                {
+                    "codec": codec,
+                    "dictionary": dictionary,
+                    "sample_count": len(samples),
+                    "added_date": datetime.now(),
+                },
+            )
+
+        logger.info(
+            f"Trained {len(dictionary)} byte {codec} dictionary on {len(samples)} texts."
+        )
+        return cursor.lastrowid
+
+    @staticmethod
+    def _frequent_phrases(samples: List[bytes], size: int) -> bytes:
+        """Build a zlib dictionary of the most frequent two and three word phrases.
+
+        zlib finds matches closer to the end of the dictionary cheaper, so the most frequent
+        phrases are put last.
+        """
+        counts: Counter = Counter()
+        for sample in samples:
+            words = re.findall(rb"\w+\W*", sample)
+            for n in (2, 3):
+                counts.update(
+                    b"".join(words[i : i + n]) for i in range(len(words) - n + 1)
+                )
+
+        phrases = []
+        length = 0
+        # Phrases seen only once are not worth the space:
+        for phrase, count in counts.most_common():
+            if count < 2 or length + len(phrase) > size:
+                break
+            phrases.append(phrase)
+            length += len(phrase)
+
+        return b"".join(reversed(phrases))
+
+
+def convert_texts(
+    connection: Connection,
+    codec: text_codec,
+    decompress: bool = False,
+    batch_size: int = 1000,
+) -> int:
+    """Convert the stored texts in place, in batches each committed separately.
+
+    The conversion can be interrupted and restarted any time: only values not yet in the target
+    form are read.
+
+    Args:
+        connection (Connection): connection to the scraper database
+        codec (text_codec): codec compressing the texts, also used to decode them
+        decompress (bool): if True, compressed texts are converted back to plain text
+        batch_size (int): number of rows converted in one transaction
+    Returns:
+        int: number of values processed. Texts not getting shorter stay plain.
+    """
+    source_type = "blob" if decompress else "text"
+    convert = codec.decompress if decompress else codec.compress
+
+    converted = 0
+    for table, id_column, text_column in text_codec.TEXT_COLUMNS:
+        last_id = 0
+        while True:
+            rows = connection.execute(
+                f"""
+                SELECT {id_column}, {text_column} FROM {table}
+                WHERE {id_column} > :last_id AND typeof({text_column}) = :source_type
+                ORDER BY {id_column}
+                LIMIT :limit
+                """,
+                {"last_id": last_id, "source_type": source_type, "limit": batch_size},
+            ).fetchall()
+            if not rows:
+                break
+
+            with connection:
+                connection.executemany(
+                    f"UPDATE {table} SET {text_column} = ? WHERE {id_column} = ?",
+                    [(convert(text), row_id) for row_id, text in rows],
+                )
+
+            last_id = rows[-1][0]
+            converted += len(rows)
+            logger.info(f"{table}: processed {converted} values (up to ID {last_id}).")
+
+    return converted
+
+
+if __name__ == "__main__":
+    from db_tools.db_connection import db_connection
+
+    parser = argparse.ArgumentParser(
+        description="Compress (or decompress) the stored question and answer texts in place."
+    )
+    parser.add_argument(
+        "--database", type=str, help="SQLite database file.", required=True
+    )
+    parser.add_argument(
+        "--codec",
+        type=str,
+        choices=list(text_codec.CODECS),
+        default="zstd",
+        help="Compression codec.",
+    )
+    parser.add_argument("--level", type=int, help="Compression level.")
+    parser.add_argument(
+        "--train",
+        action="store_true",
+        help="Train a new dictionary on the stored texts before compressing.",
+    )
+    parser.add_argument(
+        "--dictSize", type=int, default=64 * 1024, help="Dictionary size in bytes."
+    )
+    parser.add_argument(
+        "--noDictionary",
+        action="store_true",
+        help="Compress without the latest trained dictionary.",
+    )
+    parser.add_argument(
+        "--decompress",
+        action="store_true",
+        help="Convert compressed texts back to plain text.",
+    )
+    parser.add_argument(
+        "--batchSize", type=int, default=1000, help="Rows converted per transaction."
+    )
+    parser.add_argument(
+        "--vacuum",
+        action="store_true",
+        help="Rebuild the database file afterwards, so the freed space is returned.",
+    )
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(message)s")
+
+    connection = db_connection(args.database).conn
+
+    if args.decompress:
+        codec = text_codec(connection)
+    else:
+        reader = text_codec(connection)
+        if args.train:
+            reader.train_dictionary(args.codec, args.dictSize)
+        dictionary_id = (
+            None if args.noDictionary else reader.latest_dictionary(args.codec)
+        )
+        codec = text_codec(connection, args.codec, args.level, dictionary_id)
+
+    converted = convert_texts(connection, codec, args.decompress, args.batchSize)
+    logger.info(f"Processed {converted} texts.")
+
+    if args.vacuum:
+        logger.info("Vacuuming database.")
+        connection.execute("VACUUM")
@@ -5,17 +5,32 @@ import argparse
 import logging
 import os
 import re
+import signal
 import sys
-from typing import TYPE_CHECKING, List
+from concurrent.futures import Future
+from typing import TYPE_CHECKING, List, Tuple
 
 from db_tools.db_connection import db_connection
-from db_tools.db_utils import db_handler, question_loader
-from scraper import download_page, parse_full_question, parser_helper
+from db_tools.dead_letters import dead_letter_queue
+from db_tools.db_utils import question_loader
+from scraper import (
+    download_page,
+    failures,
+    log_events,
+    parse_cache,
+    parse_full_question,
+    parser_helper,
+    profiling,
+    transport,
+)
 from scraper.parser_helper import get_all_questions, get_last_question_page
 
 if TYPE_CHECKING:
     from argparse import Namespace
 
+    from db_tools.db_writer import db_writer
+    from db_tools.refresh_scheduler import refresh_scheduler
+
 # Core URL:
 URL = "https://www.gyakorikerdesek.hu"
 
@@ -28,33 +43,106 @@ class GyikScraper(object):
     3. Upload data to database.
     """
 
-    def __init__(self: GyikScraper, connection: db_connection) -> None:
+    def __init__(
+        self: GyikScraper, connection: db_connection, writer: db_writer | None = None
+    ) -> None:
         """Initialize by providing the database connection object. With the database object, a loader object is initialized.
 
         Args:
             self (GyikScraper)
             connection (db_connection): object with tools to interact with the database
+            writer (db_writer | None): if given, questions are loaded by this background writer (or written
+                into an interchange file by a jsonl_writer).
         """
-        self.db_handler = db_handler(connection.conn)
+        self.db_handler = connection.handler()
         self.question_loader = question_loader(self.db_handler)
+        self.db_writer = writer
+
+        # Pages given up on are recorded, so the crawl can go on:
+        self.dead_letters = dead_letter_queue(connection.conn)
 
-    def scrape_question(self: GyikScraper, URL: str) -> None:
+    def scrape_question(
+        self: GyikScraper, URL: str, refresh: bool = False
+    ) -> dict | Future | None:
         """Scrape a single question and add to the database without checking.
 
         Args:
             self (GyikScraper)
             URL (str): URL pointing to the question
-        """
-        # Feth data:
-        retrieved_question = parse_full_question.retrieve_question(URL)
+            refresh (bool): if True, the question in the database is updated in place.
 
-        # Parse data:
-        parsed_data = retrieved_question.get_data()
+        Returns:
+            dict | Future | None: summary of the changes of a refresh, or the future returned by the
+                background writer.
+        Raises:
+            FetchFailed: if the question could not be downloaded.
+        """
+        # Feth and parse data, downloads are attributed to the fetch stage:
+        with profiling.stage("parse"):
+            retrieved_question = parse_full_question.retrieve_question(URL)
+            parsed_data = retrieved_question.get_data()
 
         # Add data to database:
-        self.question_loader.add_question(parsed_data)
+        method = "refresh_question" if refresh else "add_question"
+        if self.db_writer is None:
+            with profiling.stage("load"):
+                result = getattr(self.question_loader, method)(parsed_data)
+            self._report_refresh(result, parsed_data.gyik_id)
+            return result
+        else:
+            future = getattr(self.db_writer, method)(parsed_data)
+            future.add_done_callback(
+                lambda f: self._report_load(f, parsed_data.gyik_id)
+            )
+            return future
+
+    @classmethod
+    def _report_load(cls, future: Future, gyik_id: int) -> None:
+        """Log the outcome of loading a question by the background writer.
 
-    def scrape_question_list(self: GyikScraper, question_list: List[tuple]) -> None:
+        Args:
+            future (Future): future returned by the writer
+            gyik_id (int): GYIK identifier of the question
+        """
+        if future.exception() is not None:
+            logging.error(
+                f"Question ({gyik_id}) could not be loaded: {future.exception()}"
+            )
+        else:
+            logging.debug(f"Question ({gyik_id}) committed.")
+            cls._report_refresh(future.result(), gyik_id)
+
+    @staticmethod
+    def _report_refresh(summary: dict | None, gyik_id: int) -> None:
+        """Log the changes applied by refreshing a question.
+
+        Args:
+            summary (dict | None): changes returned by the loader, None for new questions
+            gyik_id (int): GYIK identifier of the question
+        """
+        if summary is not None:
+            logging.info(
+                f"Question ({gyik_id}) refreshed: {summary['inserted']} new, "
+                f"{summary['updated']} updated, {summary['removed']} removed answers, "
+                f"{summary['keywords']} new keywords."
+            )
+
+    def record_failure(
+        self: GyikScraper, error: failures.FetchFailed, kind: str
+    ) -> None:
+        """Record a page given up on in the dead-letter queue.
+
+        Args:
+            self (GyikScraper)
+            error (FetchFailed): the error raised by download_page
+            kind (str): question or list page
+        """
+        logging.error(str(error))
+        self.dead_letters.add(
+            error.url, kind, error.error_class, str(error.error), error.attempts
+        )
+
+    def scrape_question_list(self: GyikScraper, question_list: List[tuple]) -> int:
         """Walk through a list of URLs pointing to question and parse data and add to database.
 
         This method also checks if the question is already in the database or update is needed.
@@ -62,24 +150,37 @@ class GyikScraper(object):
         Args:
             self (GyikScraper)
             question_list (list): list of questions by their URL to scrape
+
+        Returns:
+            int: number of questions that were new or had new answers.
         """
+        scraped_questions = 0
+
         # Looping through the list of URLs:
         for question_url, answer_count, gyik_id in question_list:
             # 1. Get counts from database:
-            answer_count_db = self.db_handler.get_answer_count(gyik_id)
+            with profiling.stage("load"):
+                answer_count_db = self.db_handler.get_answer_count(gyik_id)
 
             # 2. The question is new, scrape question:
             if answer_count_db is None:
-                self.scrape_question(question_url)
+                try:
+                    self.scrape_question(question_url)
+                except failures.FetchFailed as error:
+                    self.record_failure(error, "question")
+                    continue
+                scraped_questions += 1
             elif answer_count is None:
-                logging.warning(
-                    f"Question ({gyik_id}) already ingested, but could not get answer count. Skipping."
+                log_events.event(
+                    "answer_count_missing",
+                    f"Question ({gyik_id}) already ingested, but could not get answer count. Skipping.",
                 )
                 continue
             # 3. The question has the same number of answer as what we have in the database:
             elif answer_count_db == answer_count:
-                logging.warning(
-                    f"Question ({gyik_id}) ingested. Number of answers is the same ({answer_count_db})."
+                log_events.event(
+                    "question_unchanged",
+                    f"Question ({gyik_id}) ingested. Number of answers is the same ({answer_count_db}).",
                 )
                 continue
             # Although the question is in the database the number of answers is different:
@@ -87,11 +188,15 @@ class GyikScraper(object):
                 logging.info(
                     f"Question ({gyik_id}) has new answers: {answer_count_db} -> {answer_count}"
                 )
-                # TODO: fix deletion logic. However, strictly speaking, this is not needed. becauce the uniqueness of the Gyik id of the answer is also checket
-                # 4. Drop question from database: <- there's something problematic with the delete.
-                # self.db_handler.drop_question(gyik_id)
-                # 5. Ingesting the question again:
-                self.scrape_question(question_url)
+                # 4. Updating the question in place, only the differences are written:
+                try:
+                    self.scrape_question(question_url, refresh=True)
+                except failures.FetchFailed as error:
+                    self.record_failure(error, "question")
+                    continue
+                scraped_questions += 1
+
+        return scraped_questions
 
 
 def __main__(
@@ -100,28 +205,250 @@ def __main__(
     end_page: int | None,
     url_path: str | None,
     direct_question: str | None,
+    delta_pages: int | None = None,
+    max_depth: int | None = None,
+    background_writer: bool = False,
+    id_filter_error_rate: float | None = None,
+    refresh_due: int | None = None,
+    text_compression: str | None = None,
+    near_duplicates: bool = False,
+    jsonl_output: str | None = None,
+    retry_dead_letter_budget: int | None = None,
+    shard_dir: str | None = None,
+    category: str | None = None,
 ) -> None:
     """The main function of the GYIK scraper application.
 
     User can specify the category, start page, end page and the database file into which
     the data is saved.
 
+    In delta mode the list pages are walked from the most recent one and the crawl stops after
+    `delta_pages` consecutive pages without any new or changed questions. As the list is ordered
+    by recency, everything beyond that point is expected to be already in the database.
+
     Args:
         database_file (str): file representation of sqlite database. If not exists will be created.
         start_page (int): first page of the list of questions.
         end_page (int): last page of list of questions.
         url_path (str): path to reach the questions.
         direct_question (str): path to a single question to fetch.
+        delta_pages (int | None): number of consecutive unchanged pages after which the crawl stops.
+        max_depth (int | None): maximum number of list pages walked in delta mode.
+        background_writer (bool): if True, questions are loaded by a background thread in group commits.
+        id_filter_error_rate (float | None): if given, in-memory filters of the stored identifiers are used
+            with this false positive rate to skip database lookups of new questions and answers.
+        refresh_due (int | None): if given, only this many questions due for a refresh are re-crawled.
+        text_compression (str | None): if given (zlib or zstd), question and answer texts are stored compressed.
+        near_duplicates (bool): if True, new questions are added to the near-duplicate (MinHash) index.
+        jsonl_output (str | None): if given, parsed questions are written into this interchange file
+            instead of the database, to be loaded by the bulk importer.
+        retry_dead_letter_budget (int | None): if given, only this many pages of the dead-letter queue
+            are retried.
+        shard_dir (str | None): if given, the data is saved into the shard of the category in this
+            folder, with the users and keywords in the shared dictionary.
+        category (str | None): category of the shard.
     """
     # Open database, create connection, initialize loader object:
-    database_connection = db_connection(database_file)  # DB connection
-    scraper_object = GyikScraper(database_connection)
+    if shard_dir is not None:
+        from db_tools.sharding import shard_connection
+
+        database_connection = shard_connection(shard_dir, category)
+    else:
+        database_connection = db_connection(database_file)  # DB connection
+
+    # Optional components are only imported when used, so the startup stays fast:
+    writer = None
+    if jsonl_output is not None:
+        from scraper.interchange import jsonl_writer
+
+        writer = jsonl_writer(jsonl_output)
+    elif background_writer:
+        from db_tools.db_writer import db_writer
+
+        writer = db_writer(
+            database_file,
+            id_filter_error_rate=id_filter_error_rate,
+            text_compression=text_compression,
+            near_duplicates=near_duplicates,
+        )
+    scraper_object = GyikScraper(database_connection, writer)
+
+    # The background writer adds the loaded questions to the filters of its own handler, filters of
+    # this handler would miss them, so its lookups go to the database:
+    if id_filter_error_rate is not None and not (
+        background_writer and jsonl_output is None
+    ):
+        scraper_object.db_handler.enable_id_filters(id_filter_error_rate)
+
+    if text_compression is not None:
+        scraper_object.db_handler.enable_text_compression(text_compression)
+
+    if near_duplicates:
+        scraper_object.db_handler.enable_near_duplicate_index()
+
+    # Pending questions are committed upon termination as well:
+    signal.signal(signal.SIGTERM, handle_sigterm)
+
+    try:
+        if retry_dead_letter_budget is not None:
+            retry_dead_letters(scraper_object, retry_dead_letter_budget)
+            return
+
+        if refresh_due is not None:
+            from db_tools.refresh_scheduler import refresh_scheduler
+
+            scheduler = refresh_scheduler(database_connection.conn)
+            refresh_due_questions(scraper_object, scheduler, refresh_due)
+            return
+
+        crawl(
+            scraper_object,
+            start_page,
+            end_page,
+            url_path,
+            direct_question,
+            delta_pages,
+            max_depth,
+        )
+    finally:
+        if writer is not None:
+            logging.info("Waiting for the pending questions to be committed.")
+            writer.close()
+
+        profiling.stop()
+
+        if parse_cache.active() is not None:
+            logging.info(f"Parse cache: {parse_cache.stop()}")
+
+        logging.info(f"Transfer statistics: {transport.stats.summary()}")
+        if transport.egress_summary() is not None:
+            logging.info(f"Egresses: {transport.egress_summary()}")
+
+        # The remaining event counts and queued records are written:
+        log_events.stop()
+
+
+def handle_sigterm(signum: int, frame: object) -> None:
+    """Turn SIGTERM into a regular exit, so the clean up logic is executed.
+
+    Args:
+        signum (int): number of the received signal
+        frame (object): current stack frame
+    """
+    logging.warning("SIGTERM received. Exiting.")
+    raise SystemExit(128 + signum)
+
+
+def refresh_due_questions(
+    scraper_object: GyikScraper, scheduler: refresh_scheduler, budget: int
+) -> None:
+    """Re-crawl the questions that are due for a check according to their answer activity.
+
+    Args:
+        scraper_object (GyikScraper): scraper loading the questions into the database.
+        scheduler (refresh_scheduler): schedule of the question checks.
+        budget (int): maximum number of questions checked.
+    """
+    # Questions added since the last run are scheduled first:
+    scheduler.schedule_new_questions()
+
+    due_questions = scheduler.due_questions(budget)
+    logging.info(f"Checking {len(due_questions)} questions due for a refresh.")
+
+    checked: List[Tuple[int, dict | Future]] = []
+    for question_id, gyik_id, question_url in due_questions:
+        try:
+            summary = scraper_object.scrape_question(question_url, refresh=True)
+        except failures.FetchFailed as error:
+            scraper_object.record_failure(error, "question")
+            continue
+        checked.append((question_id, summary))
+
+    # The schedule depends on the loaded answers, the writer commits them in groups first:
+    if scraper_object.db_writer is not None:
+        scraper_object.db_writer.flush()
+
+    captured_answers = 0
+    for question_id, summary in checked:
+        if isinstance(summary, Future):
+            # Failed loads are logged by the scraper, the question stays due:
+            if summary.exception() is not None:
+                continue
+            summary = summary.result()
+
+        scheduler.record_check(question_id, summary["inserted"])
+        captured_answers += summary["inserted"]
+
+    if due_questions:
+        logging.info(
+            f"Refresh captured {captured_answers} new answers with {len(due_questions)} checks "
+            f"({captured_answers / len(due_questions):.2f} per check)."
+        )
+    logging.info(f"Schedule: {scheduler.report()}")
+
+
+def retry_dead_letters(scraper_object: GyikScraper, budget: int) -> None:
+    """Retry the pages that could not be downloaded earlier.
+
+    Questions are refreshed in place, the questions of list pages are scraped as in a crawl. Pages
+    downloaded successfully are removed from the dead-letter queue.
+
+    Args:
+        scraper_object (GyikScraper): scraper loading the questions into the database.
+        budget (int): maximum number of pages retried.
+    """
+    dead_letters = scraper_object.dead_letters.retry_list(budget)
+    logging.info(f"Retrying {len(dead_letters)} dead letters.")
+
+    resolved = 0
+    for page_url, kind in dead_letters:
+        try:
+            if kind == "list":
+                soup = download_page.download_page(page_url)
+                with profiling.stage("parse"):
+                    questions = get_all_questions(soup)
+                scraper_object.scrape_question_list(questions)
+            else:
+                scraper_object.scrape_question(page_url, refresh=True)
+        except failures.FetchFailed as error:
+            scraper_object.record_failure(error, kind)
+            continue
+
+        scraper_object.dead_letters.resolve(page_url)
+        resolved += 1
+
+    logging.info(f"{resolved} of {len(dead_letters)} dead letters resolved.")
+    logging.info(f"Dead letters left: {scraper_object.dead_letters.report()}")
+
 
+def crawl(
+    scraper_object: GyikScraper,
+    start_page: int | None,
+    end_page: int | None,
+    url_path: str | None,
+    direct_question: str | None,
+    delta_pages: int | None,
+    max_depth: int | None,
+) -> None:
+    """Fetch the requested question or range of list pages.
+
+    Args:
+        scraper_object (GyikScraper): scraper loading the questions into the database.
+        start_page (int): first page of the list of questions.
+        end_page (int): last page of list of questions.
+        url_path (str): path to reach the questions.
+        direct_question (str): path to a single question to fetch.
+        delta_pages (int | None): number of consecutive unchanged pages after which the crawl stops.
+        max_depth (int | None): maximum number of list pages walked in delta mode.
+    """
     # Only one page is parsed if direct question is passed:
     if direct_question:
         logging.info(f"Fetching single question: {direct_question}")
-        scraper_object.scrape_question(direct_question)
-        sys.exit()
+        try:
+            scraper_object.scrape_question(direct_question)
+        except failures.FetchFailed as error:
+            scraper_object.record_failure(error, "question")
+        return
 
     logging.info("Fetching data started...")
 
@@ -130,22 +457,42 @@ def __main__(
         start_page is not None and end_page is not None
     ), "Start and end pages needs to be specified."
 
+    # In delta mode, the safety depth caps the number of visited pages:
+    if delta_pages is not None and max_depth is not None:
+        end_page = min(end_page, start_page + max_depth - 1)
+
+    # Number of consecutive list pages without new or changed questions:
+    unchanged_pages = 0
+
     # Looping through all defined pages:
     for page in range(start_page, end_page + 1):
         # Fetch page with questions:
         question_list_page_url = "{}/{}__oldal-{}".format(URL, url_path, page)
-        soup = download_page.download_page(question_list_page_url)
-
+        log_events.set_page(page)
         # Get URLs for all questions:
-        questions = get_all_questions(soup)
-        # print(questions)
-        # sys.exit()
-
-        # Retrieve all question data:
-        scraper_object.scrape_question_list(questions)
+        try:
+            list_page = download_page.download_parsed(
+                question_list_page_url, "list", get_all_questions
+            )
+        except failures.FetchFailed as error:
+            scraper_object.record_failure(error, "list")
+            continue
+
+        # Retrieve all question data. The questions of a page identical to a cached one are still
+        # checked against the database, the cache knows nothing about what was loaded into it:
+        scraped_questions = scraper_object.scrape_question_list(list_page.result)
 
         logging.info(f"page completed: {question_list_page_url}")
 
+        # Keep track of the unchanged pages:
+        unchanged_pages = unchanged_pages + 1 if scraped_questions == 0 else 0
+
+        if delta_pages is not None and unchanged_pages >= delta_pages:
+            logging.info(
+                f"No new or changed questions on the last {unchanged_pages} pages. Stopping delta crawl at page {page}."
+            )
+            break
+
     logging.info("Scarping completed.")
 
 
@@ -179,7 +526,13 @@ def parse_arguments() -> Namespace:
         "--database",
         type=str,
         help="Email address where the notification is sent.",
-        required=True,
+        required=False,
+    )
+    parser.add_argument(
+        "--shardDir",
+        type=str,
+        help="Save the data into the shard of the category in this folder instead of the database.",
+        required=False,
     )
     parser.add_argument(
         "--subCategory",
@@ -187,6 +540,149 @@ def parse_arguments() -> Namespace:
         help="Subcategory within the category.",
         required=False,
     )
+    parser.add_argument(
+        "--deltaPages",
+        type=int,
+        help="Delta mode: stop after this many consecutive list pages without new or changed questions.",
+        required=False,
+    )
+    parser.add_argument(
+        "--maxDepth",
+        type=int,
+        help="Maximum number of list pages visited in delta mode.",
+        required=False,
+        default=100,
+    )
+    parser.add_argument(
+        "--backgroundWriter",
+        action="store_true",
+        help="Load questions into the database from a background thread in group commits.",
+        required=False,
+    )
+    parser.add_argument(
+        "--idFilterErrorRate",
+        type=float,
+        help="Use in-memory filters of the stored ids with this false positive rate (eg. 0.01).",
+        required=False,
+    )
+    parser.add_argument(
+        "--refreshDue",
+        type=int,
+        help="Re-crawl at most this many questions that are due for a refresh based on their answer activity.",
+        required=False,
+    )
+    parser.add_argument(
+        "--retryDeadLetters",
+        type=int,
+        help="Retry at most this many pages that could not be downloaded in earlier runs.",
+        required=False,
+    )
+    parser.add_argument(
+        "--compressText",
+        type=str,
+        choices=["zlib", "zstd"],
+        help="Store question and answer texts compressed with this codec.",
+        required=False,
+    )
+    parser.add_argument(
+        "--nearDuplicates",
+        action="store_true",
+        help="Add new questions to the near-duplicate (MinHash/LSH) index.",
+        required=False,
+    )
+    parser.add_argument(
+        "--jsonlOutput",
+        type=str,
+        help="Write the parsed questions into this JSONL file (.gz compressed) instead of the database.",
+        required=False,
+    )
+    parser.add_argument(
+        "--transport",
+        type=str,
+        help="HTTP client used to download the pages: requests (HTTP/1.1) or httpx (HTTP/2).",
+        required=False,
+        choices=list(transport.TRANSPORTS),
+        default="requests",
+    )
+    parser.add_argument(
+        "--egress",
+        type=str,
+        nargs="+",
+        help="Spread requests over these egresses: direct, proxy:<url> or source:<ip>.",
+        required=False,
+    )
+    parser.add_argument(
+        "--egressRate",
+        type=float,
+        help="Maximum number of requests per second of each egress.",
+        required=False,
+        default=0.1,
+    )
+    parser.add_argument(
+        "--recordDir",
+        type=str,
+        help="Save every downloaded page into this folder, to be replayed later.",
+        required=False,
+    )
+    parser.add_argument(
+        "--replayDir",
+        type=str,
+        help="Serve the pages from a folder saved with --recordDir instead of the network.",
+        required=False,
+    )
+    parser.add_argument(
+        "--profile",
+        type=str,
+        help="Profile the fetch, parse and load stages, the profiles are saved into this folder.",
+        required=False,
+    )
+    parser.add_argument(
+        "--profileInterval",
+        type=float,
+        help="Milliseconds between two stack samples of the profiler.",
+        required=False,
+        default=5.0,
+    )
+    parser.add_argument(
+        "--parseCache",
+        type=str,
+        help="SQLite file caching the parse results of the pages by body hash.",
+        required=False,
+    )
+    parser.add_argument(
+        "--parseCacheSize",
+        type=int,
+        help="Maximum number of pages in the parse cache.",
+        required=False,
+        default=20000,
+    )
+    parser.add_argument(
+        "--plan",
+        action="store_true",
+        help="Only estimate the requests and the time of the crawl from a sample of the list pages.",
+        required=False,
+    )
+    parser.add_argument(
+        "--planSamples",
+        type=int,
+        help="Number of list pages downloaded by --plan.",
+        required=False,
+        default=5,
+    )
+    parser.add_argument(
+        "--aggregateLogs",
+        type=float,
+        help="Write the logs from a background thread and log the counts of repetitive events every this many seconds.",
+        required=False,
+    )
+    parser.add_argument(
+        "--logLevel",
+        type=str,
+        help="Level of the logs, the repetitive events are logged one by one at DEBUG level.",
+        required=False,
+        choices=["DEBUG", "INFO", "WARNING"],
+        default="INFO",
+    )
     parser.add_argument(
         "--logFile",
         type=str,
@@ -201,33 +697,100 @@ if __name__ == "__main__":
     # Parse command line parameters:
     args = parse_arguments()
 
-    database_file = os.path.abspath(args.database)
     category = args.category
     start_page = args.startPage if args.startPage is not None else 1
     sub_category = args.subCategory
     direct_question = args.directQuestion
     end_page = args.endPage
+    delta_pages = args.deltaPages
+    max_depth = args.maxDepth
+    background_writer = args.backgroundWriter
+    id_filter_error_rate = args.idFilterErrorRate
+    refresh_due = args.refreshDue
+    text_compression = args.compressText
+    near_duplicates = args.nearDuplicates
+    jsonl_output = args.jsonlOutput
+    retry_dead_letter_budget = args.retryDeadLetters
+    shard_dir = args.shardDir
 
     # Set up logging:
-    logging.basicConfig(
-        handlers=[logging.FileHandler("debug.log"), logging.StreamHandler()],
-        level=logging.INFO,
-        format="%(asctime)s %(levelname)s %(module)s - %(funcName)s: %(message)s",
+    log_handlers: List[logging.Handler] = [
+        logging.FileHandler("debug.log"),
+        logging.StreamHandler(),
+    ]
+    log_format = logging.Formatter(
+        "%(asctime)s %(levelname)s %(module)s - %(funcName)s: %(message)s",
         datefmt="%Y-%m-%d %H:%M:%S",
     )
+    for handler in log_handlers:
+        handler.setFormatter(log_format)
+
+    # The records are written by a background thread, the repetitive events are counted:
+    if args.aggregateLogs is not None:
+        log_handlers = [log_events.start(log_handlers, args.aggregateLogs)]
+
+    logging.basicConfig(handlers=log_handlers, level=getattr(logging, args.logLevel))
+
+    # Selecting HTTP client, recorded pages are served without network:
+    if args.replayDir is not None:
+        transport.set_transport("replay", directory=args.replayDir)
+    else:
+        transport.set_transport(
+            args.transport, egresses=args.egress, egress_rate=args.egressRate
+        )
+    transport.set_recording(args.recordDir)
+
+    if args.profile is not None:
+        # The loads of the background writer run in its own thread, which is not profiled:
+        assert (
+            not background_writer
+        ), "The --profile cannot be combined with --backgroundWriter, the loads would not be profiled."
+        profiling.start(args.profile, args.profileInterval / 1000)
+
+    if args.parseCache is not None:
+        parse_cache.start(args.parseCache, args.parseCacheSize)
 
     # Initialize empty string pointing to a :
     url_path: str = ""
 
+    # Range of list pages are crawled unless a single question, the due questions or the dead letters
+    # are fetched:
+    list_crawl = (
+        direct_question is None
+        and refresh_due is None
+        and retry_dead_letter_budget is None
+    )
+
+    # Crawlers of different categories write into separate shards:
+    if shard_dir is not None:
+        from db_tools.sharding import shard_file
+
+        assert (
+            category is not None
+        ), "The --shardDir requires the --category of the shard."
+        assert (
+            not background_writer
+        ), "The --shardDir cannot be combined with --backgroundWriter."
+        database_file = os.path.abspath(shard_file(shard_dir, category))
+    else:
+        assert args.database is not None, "Either --database or --shardDir is required."
+        database_file = os.path.abspath(args.database)
+
+    # The due questions are selected based on the answers loaded into the database:
+    if jsonl_output is not None:
+        assert (
+            refresh_due is None and not background_writer
+        ), "The --jsonlOutput cannot be combined with --refreshDue or --backgroundWriter."
+
     # If no direct question is given, at least category needs to be provided:
-    if direct_question is None:
+    if list_crawl:
         assert category is not None, "Category needs to be specified."
 
         # URL path is changed depending if subcategory is provided or not:
         url_path = f"{category}__{sub_category}" if sub_category else category
 
     # Some extra logic and checks needs to be done if a range of questions is expected:
-    if (direct_question is None) and (end_page is None):
+    if list_crawl and (end_page is None):
         # One page is retrieved to determine if the category_subcategory pair is valid or not:
         test_page = download_page.download_page("{}/{}".format(URL, url_path))
 
@@ -235,22 +798,64 @@ if __name__ == "__main__":
         end_page = get_last_question_page(test_page)
 
     # If no direct question is given, the boundaries have to be checked:
-    if direct_question is None:
+    if list_crawl:
         assert (
             start_page <= end_page
         ), f"The endPage ({start_page}) must be lower than end page ({end_page})"
 
+    # Only the cost of the crawl is estimated, the stored answer counts are read if the database exists:
+    if args.plan:
+        assert (
+            list_crawl
+        ), "The --plan estimates crawls of list pages, it cannot be combined with --directQuestion, --refreshDue or --retryDeadLetters."
+        from scraper import crawl_plan
+
+        answer_count = None
+        if os.path.exists(database_file):
+            if shard_dir is not None:
+                from db_tools.sharding import shard_connection
+
+                answer_count = (
+                    shard_connection(shard_dir, category).handler().get_answer_count
+                )
+            else:
+                answer_count = db_connection(database_file).handler().get_answer_count
+
+        logging.info(
+            f"Planning the crawl of {url_path}, pages {start_page}-{end_page}."
+        )
+        crawl_plan.report(
+            crawl_plan.plan_crawl(
+                url_path,
+                start_page,
+                end_page,
+                answer_count,
+                args.planSamples,
+                delta_pages,
+                max_depth,
+            )
+        )
+        sys.exit(0)
+
     # Log startup parameters:
     logging.info(f"Data saved into file: {database_file}")
 
     if direct_question is not None:
         logging.info(f"Fetching question: {direct_question}")
+    elif refresh_due is not None:
+        logging.info(f"Refreshing at most {refresh_due} due questions.")
+    elif retry_dead_letter_budget is not None:
+        logging.info(f"Retrying at most {retry_dead_letter_budget} dead letters.")
     else:
         logging.info(f"Category: {category}")
         if sub_category is not None:
             logging.info(f"Subcategory: {sub_category}")
         logging.info(f"First page of questions: {start_page}")
         logging.info(f"Last page of questions: {end_page}")
+        if delta_pages is not None:
+            logging.info(
+                f"Delta mode: stopping after {delta_pages} unchanged pages (max depth: {max_depth})"
+            )
 
     # Call main function that does stuff:
     __main__(
@@ -259,4 +864,15 @@ if __name__ == "__main__":
         end_page,
         url_path,
         direct_question,
+        delta_pages,
+        max_depth,
+        background_writer,
+        id_filter_error_rate,
+        refresh_due,
+        text_compression,
+        near_duplicates,
+        jsonl_output,
+        retry_dead_letter_budget,
+        shard_dir,
+        category,
     )
@@ -4,9 +4,10 @@ from __future__ import annotations
 
 import logging
 import re
-from typing import TYPE_CHECKING
+from typing import TYPE_CHECKING, List
 
 from scraper import parser_helper
+from scraper.records import Answer, UserRef
 
 if TYPE_CHECKING:
     from bs4 import BeautifulSoup, Tag
@@ -22,15 +23,16 @@ class ParseAnswers:
     def __init__(self: ParseAnswers, soup: BeautifulSoup) -> None:
         """Parse all answer related data.
 
+        The soup is not kept after the parsing is done.
+
         Args:
             self (ParseAnswers)
             soup (BeautifulSoup): html data
         """
-        self.soup = soup
-        self.answer_data = []
+        self.answer_data: List[Answer] = []
 
         # Looping through the table and parse all answers:
-        for answer in self.soup.findAll(
+        for answer in soup.findAll(
             "div", id=lambda x: x is not None and x.startswith("valasz-")
         ):
             # Extract answer id as string:
@@ -61,18 +63,17 @@ class ParseAnswers:
 
             # Build data structure:
             self.answer_data.append(
-                {
-                    "GYIK_ID": int(answer_id),
-                    "USER": {"USER": userName, "USER_PERCENT": user_percent},
-                    "ANSWER_DATE": parser_helper.process_date(answer_date),
-                    "ANSWER_TEXT": answer_text,
-                    "USER_PERCENT": user_percent,
-                    "ANSWER_PERCENT": answer_percent,
-                }
+                Answer(
+                    gyik_id=int(answer_id),
+                    user=UserRef(userName, user_percent),
+                    answer_date=parser_helper.process_date(answer_date),
+                    answer_text=answer_text,
+                    answer_percent=answer_percent,
+                )
             )
 
         # Parsing last page:
-        self.next_page = self.find_next_page()
+        self.next_page = self.find_next_page(soup)
 
     @staticmethod
     def _parse_text(row: Tag, answer_id: str) -> str:
@@ -152,12 +153,13 @@ class ParseAnswers:
     def get_next_page(self):
         return self.next_page
 
-    def find_next_page(self):
+    @staticmethod
+    def find_next_page(soup):
         """
         Returns an url or None depending if the the page has a next page link:
         """
         try:
-            pages = self.soup.find("div", class_="oldalszamok")
+            pages = soup.find("div", class_="oldalszamok")
             lastpage_url = pages.find("a", string="❯").get("href")
             return f"https://www.gyakorikerdesek.hu{lastpage_url}"
 
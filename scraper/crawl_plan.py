@@ -0,0 +1,239 @@
+"""Estimate the requests and the time of a category crawl, without crawling it.
+
+Only a sample of the list pages is downloaded (evenly spread over the crawled range), and a few
+question pages with the most answers, to learn how many answers fit on a page. The questions of the
+sampled list pages are compared with the database the same way as in the crawl: new questions and
+questions with a changed answer count are scraped, with all their answer pages. The counts of the
+samples are extrapolated to the whole range.
+
+The time of a request is the measured time of the sampled downloads and parsing, plus the wait
+before the request (without egresses), or the capacity of the egress pool. The time spent loading
+the database is not included.
+
+In delta mode the crawl is expected to stop `delta_pages` pages after the first sampled page from
+which on no sampled page has new or changed questions.
+
+Usage:
+    python gyik_scraper.py --database <str> --category <str> --plan [--planSamples 5]
+"""
+from __future__ import annotations
+
+import logging
+import math
+import time
+from datetime import timedelta
+from typing import Callable, List, NamedTuple
+
+from scraper import download_page, transport
+from scraper.parse_full_question import retrieve_question
+from scraper.parser_helper import get_all_questions
+
+logger = logging.getLogger("__main__")
+
+# Core URL:
+URL = "https://www.gyakorikerdesek.hu"
+
+# Question pages downloaded to learn the number of answers on a page:
+QUESTION_SAMPLES = 3
+
+
+class ListSample(NamedTuple):
+    """Questions of a sampled list page, by the work they need."""
+
+    page: int
+    new: int
+    changed: int
+    unchanged: int
+    # Answer counts shown on the list page for the new and changed questions:
+    scraped_answers: List[int | None]
+
+    @property
+    def questions(self: ListSample) -> int:
+        return self.new + self.changed + self.unchanged
+
+
+def sample_pages(start_page: int, end_page: int, samples: int) -> List[int]:
+    """List pages evenly spread over the range, the first and the last one included."""
+    pages = end_page - start_page + 1
+    if samples >= pages:
+        return list(range(start_page, end_page + 1))
+    if samples == 1:
+        return [start_page]
+
+    step = (pages - 1) / (samples - 1)
+    return sorted({start_page + round(index * step) for index in range(samples)})
+
+
+def classify(
+    page: int, questions: List[tuple], answer_count: Callable[[str], int | None]
+) -> ListSample:
+    """Sort the questions of a list page as the crawl does (see GyikScraper.scrape_question_list).
+
+    Args:
+        page (int): number of the list page
+        questions (list): (URL, answer count, GYIK identifier) tuples of the list page
+        answer_count (Callable): stored answer count of a question, None if not stored
+    Returns:
+        ListSample
+    """
+    new, changed, unchanged, scraped_answers = 0, 0, 0, []
+    for _, count, gyik_id in questions:
+        stored = answer_count(gyik_id)
+        if stored is None:
+            new += 1
+        elif count is None or stored == count:
+            unchanged += 1
+            continue
+        else:
+            changed += 1
+        scraped_answers.append(count)
+
+    return ListSample(page, new, changed, unchanged, scraped_answers)
+
+
+def answers_per_page(urls: List[str]) -> int | None:
+    """Number of answers on the first page of questions with more than one answer page.
+
+    Args:
+        urls (list): questions with the most answers
+    Returns:
+        int | None: None if none of the questions has a second answer page
+    """
+    sizes = []
+    for url in urls:
+        page = retrieve_question.fetch_parsed(
+            url, "question", retrieve_question.parse_question_page
+        )
+        if page["next_page"]:
+            sizes.append(len(page["question"]["answers"]))
+
+    return max(sizes) if sizes else None
+
+
+def question_requests(answer_count: int | None, page_size: int | None) -> int:
+    """Requests of scraping a question: the question page and the further answer pages."""
+    if not answer_count or not page_size:
+        return 1
+    return max(1, math.ceil(answer_count / page_size))
+
+
+def plan_crawl(
+    url_path: str,
+    start_page: int,
+    end_page: int,
+    answer_count: Callable[[str], int | None] | None = None,
+    samples: int = 5,
+    delta_pages: int | None = None,
+    max_depth: int | None = None,
+) -> dict:
+    """Estimate the requests and the time of crawling a range of list pages.
+
+    Args:
+        url_path (str): path of the category (and subcategory)
+        start_page (int): first list page of the crawl
+        end_page (int): last list page of the crawl
+        answer_count (Callable | None): stored answer count of a question by its GYIK identifier,
+            None if there is no database yet, then every question is new.
+        samples (int): number of list pages downloaded
+        delta_pages (int | None): number of consecutive unchanged pages after which the crawl stops
+        max_depth (int | None): maximum number of list pages walked in delta mode
+    Returns:
+        dict: the expected work and cost of the crawl
+    """
+    if answer_count is None:
+        answer_count = lambda gyik_id: None
+
+    if delta_pages is not None and max_depth is not None:
+        end_page = min(end_page, start_page + max_depth - 1)
+
+    requests = 0
+    start = time.perf_counter()
+
+    # Sampled list pages:
+    sampled: List[ListSample] = []
+    urls: List[tuple] = []
+    for page in sample_pages(start_page, end_page, samples):
+        list_page = download_page.download_parsed(
+            "{}/{}__oldal-{}".format(URL, url_path, page),
+            "list",
+            get_all_questions,
+        )
+        requests += 1
+        sample = classify(page, list_page.result, answer_count)
+        sampled.append(sample)
+        logger.info(
+            f"List page {page}: {sample.new} new, {sample.changed} changed, {sample.unchanged} unchanged questions."
+        )
+        urls += [(count, url) for url, count, _ in list_page.result if url and count]
+
+    # Answer pages of the questions with the most answers:
+    largest = [url for _, url in sorted(urls, reverse=True)[:QUESTION_SAMPLES]]
+    page_size = answers_per_page(largest)
+    requests += len(largest)
+
+    # Time of a request without the wait before it:
+    work = time.perf_counter() - start
+    if transport.needs_delay():
+        work -= requests * download_page.REQUEST_DELAY
+    work = max(work, 0.0) / requests
+
+    # In delta mode the crawl stops after the unchanged pages:
+    last_page = end_page
+    if delta_pages is not None:
+        for index, sample in enumerate(sampled):
+            if all(not later.scraped_answers for later in sampled[index:]):
+                last_page = min(end_page, sample.page + delta_pages - 1)
+                break
+        sampled = [sample for sample in sampled if sample.page <= last_page]
+
+    list_pages = last_page - start_page + 1
+    scale = list_pages / len(sampled)
+    scraped_requests = sum(
+        question_requests(count, page_size)
+        for sample in sampled
+        for count in sample.scraped_answers
+    )
+
+    plan = {
+        "list_pages": list_pages,
+        "sampled_pages": len(sampled),
+        "questions": round(sum(sample.questions for sample in sampled) * scale),
+        "new_questions": round(sum(sample.new for sample in sampled) * scale),
+        "changed_questions": round(sum(sample.changed for sample in sampled) * scale),
+        "answers_per_page": page_size,
+        "question_requests": round(scraped_requests * scale),
+    }
+    plan["requests"] = list_pages + plan["question_requests"]
+
+    # The rate limit, or the downloads and parsing, whichever is slower:
+    if transport.needs_delay():
+        seconds_per_request = download_page.REQUEST_DELAY + work
+    elif transport.request_rate() is not None:
+        seconds_per_request = max(1 / transport.request_rate(), work)
+    else:
+        seconds_per_request = work
+
+    plan["seconds_per_request"] = round(seconds_per_request, 3)
+    plan["wall_clock"] = str(
+        timedelta(seconds=round(plan["requests"] * seconds_per_request))
+    )
+    return plan
+
+
+def report(plan: dict) -> None:
+    """Log the plan of a crawl."""
+    logger.info(
+        f"{plan['list_pages']} list pages with about {plan['questions']} questions "
+        f"({plan['sampled_pages']} pages sampled): {plan['new_questions']} new and "
+        f"{plan['changed_questions']} changed questions to scrape."
+    )
+    logger.info(
+        f"Answers per page: {plan['answers_per_page'] or 'all answers on one page'}."
+    )
+    logger.info(
+        f"Expected requests: {plan['requests']} ({plan['list_pages']} list pages, "
+        f"{plan['question_requests']} question and answer pages)."
+    )
+    logger.info(
+        f"Expected time: {plan['wall_clock']} ({plan['seconds_per_request']} s per request)."
+    )
@@ -1,90 +1,157 @@
 import logging
+import re
 import time
+from html import unescape
 
-from bs4 import BeautifulSoup, UnicodeDammit
-from faker import Faker
-from requests import Session
-from requests.adapters import HTTPAdapter
-from requests.packages.urllib3.util.retry import Retry
+from scraper import failures, parse_cache, profiling, transport
 
 # from scraper_api import ScraperAPIClient # If using scraperAPI
 logger = logging.getLogger("__main__")
 
-# Using a random user agent all the time
-faker = Faker()
-
-
-# code from: https://www.peterbe.com/plog/best-practice-with-retries-with-requests
-def requests_retry_session(
-    retries=3,
-    backoff_factor=0.3,
-    status_forcelist=(500, 502, 504),
-    session=None,
-):
-    session = Session()
-    retry = Retry(
-        total=retries,
-        read=retries,
-        connect=retries,
-        backoff_factor=backoff_factor,
-        status_forcelist=status_forcelist,
-    )
-    adapter = HTTPAdapter(max_retries=retry)
-    session.mount("http://", adapter)
-    session.mount("https://", adapter)
-    session.headers.update({"User-Agent": faker.user_agent()})
-    return session
+TITLE_PATTERN = re.compile(r"<title[^>]*>(.*?)</title>", re.IGNORECASE | re.DOTALL)
+
+# Seconds waited before each request without an egress pool:
+REQUEST_DELAY = 10
 
 
 def download_page(URL, session=None):
     """This function downloads a webpage defined in the submitted URL.
 
-    Given pages UTF-8 encoded, characters could be messed up.
-    TODO:
-        1. If empty page is retreaved, handle properly.
-        2. If something wrong handle it properly.
+    The raw body is decoded once, with the charset declared by the server. If no charset is
+    declared, BeautifulSoup detects it from the document.
+
+    Failed attempts are retried with the backoff of their error class (see scraper.failures). When
+    the retries are used up, FetchFailed is raised.
     """
+    with profiling.stage("fetch"):
+        _, html = _fetch(URL)
+
+    return _make_soup(html)
+
+
+def download_parsed(URL, kind, parse):
+    """Download a page and parse it, the result is taken from the parse cache if the body was parsed before.
+
+    Args:
+        URL (str): URL of the page
+        kind (str): name of the parser, part of the cache key (eg. question, answers, list)
+        parse (callable): function extracting a JSON serializable result from the soup
+    Returns:
+        ParsedPage: the parse result, and whether it came from the cache
+    """
+    with profiling.stage("fetch"):
+        page, html = _fetch(URL)
+
+    cache = parse_cache.active()
+    key = cache.key(kind, URL, page.body) if cache is not None else None
+    if cache is not None:
+        result = cache.get(key)
+        if result is not None:
+            return parse_cache.ParsedPage(URL, kind, key, result, True)
+
+    soup = _make_soup(html)
+    with profiling.stage("parse"):
+        parsed = parse_cache.ParsedPage(URL, kind, key, parse(soup), False)
+
+    parse_cache.store(parsed)
+    return parsed
+
 
-    # Let's wait to avoid being banned (0.1 leads to ban already).
-    time.sleep(10)
+def page_title(html):
+    """Title of the page without building the soup, None if the page has no title."""
+    if isinstance(html, bytes):
+        match = TITLE_PATTERN.search(html.decode("utf-8", "replace"))
+    else:
+        match = TITLE_PATTERN.search(html)
+
+    return unescape(match.group(1)).strip() if match else None
+
+
+def _make_soup(html):
+    # Imported on first use, so the command line starts fast:
+    from bs4 import BeautifulSoup
+
+    with profiling.stage("parse"):
+        return BeautifulSoup(html, features="html.parser")
+
+
+def _fetch(URL):
+    """Download a page with retries, returns the page and the decoded html."""
+    # Let's wait to avoid being banned (0.1 leads to ban already). The egress pool has its own limits:
+    if transport.needs_delay():
+        time.sleep(REQUEST_DELAY)
+
+    # Failed attempts by error class, each class has its own retry policy:
+    attempts = {}
+
+    # Banned egresses of a pool cool down on their own, the breaker of the host would pause the
+    # healthy ones too:
+    host_breaker = not transport.uses_egress_pool()
 
     while True:
-        try:
-            # If no session is provided we generate session:
-            session = requests_retry_session()
+        # Requests wait while the host is paused after repeated bans:
+        if host_breaker:
+            failures.breaker.wait(URL)
 
-            # URL to downloads:
-            try:
-                # response = client.get(url = URL) # If using screapAPI
-                response = session.get(URL)
-            except ConnectionError:
-                logger.warning(f"request failed for URL: {URL}")
+        try:
+            # response = client.get(url = URL) # If using screapAPI
+            page = transport.fetch(URL)
 
-            # Returned html document:
-            html = response.text.encode("utf-8", "replace").decode()
+            # Decoding the html with the declared charset:
+            if page.encoding:
+                html = page.body.decode(page.encoding, "replace")
+            else:
+                html = page.body
 
-            # Html encoded into utf8:
-            uhtml = UnicodeDammit(html)
+            # The protection pages are recognised by their title, the egress learns the outcome once:
+            title = page_title(html)
+            transport.report_page(page, title in ("Captcha!", "Ideiglenes letiltás!"))
 
-            # Creating soup:
-            soup = BeautifulSoup(uhtml.unicode_markup, features="html.parser")
+            failures.check_status(URL, page.status)
+            if title is None:
+                raise ValueError(f"Page without title: {URL}")
 
             # If certain protection mechanism is triggered we won't return anything:
-            if soup.find("title").text == "Captcha!":
+            if title == "Captcha!":
                 logger.warning(f"We have triggered the captcha... ({URL})")
-                raise ValueError(
-                    f"While fetching URL ({URL}) captcha was triggered. Exiting."
+                raise failures.BannedError(
+                    f"While fetching URL ({URL}) captcha was triggered."
                 )
-            elif soup.find("title").text == "Ideiglenes letiltás!":
+            elif title == "Ideiglenes letiltás!":
                 logger.warning(f"We are termporarily banned to access any page.")
-                raise ValueError(
-                    f"While fetching URL ({URL}) we got banned termporarily. Exiting."
+                raise failures.BannedError(
+                    f"While fetching URL ({URL}) we got banned termporarily."
                 )
 
             # Upon successful retrieval, we are breaking out the while loop and return the page:
-            return soup
-
-        except:
-            # After the failed attempt the script waits 30 seconds and try again:
-            time.sleep(30)
-            continue
+            if host_breaker:
+                failures.breaker.record_success(URL)
+            return page, html
+
+        # Waiting does not help if the page is missing from the replayed corpus:
+        except transport.PageNotRecorded:
+            raise
+        except Exception as error:
+            error_class = failures.classify(error)
+            attempts[error_class] = attempts.get(error_class, 0) + 1
+
+            if error_class == "ban" and host_breaker:
+                failures.breaker.record_ban(URL)
+
+            if attempts[error_class] >= failures.RETRY_POLICIES[error_class].attempts:
+                raise failures.FetchFailed(
+                    URL, error_class, sum(attempts.values()), error
+                ) from error
+
+            # An open breaker pauses the host anyway, the pool does not hand out a cooling egress:
+            if error_class == "ban" and (
+                not host_breaker or failures.breaker.state(URL) == "open"
+            ):
+                continue
+
+            # The next attempt is delayed by a jittered exponential backoff:
+            delay = failures.backoff_delay(error_class, attempts[error_class])
+            logger.warning(
+                f"Request failed ({error_class}: {error}) for URL: {URL}. Retrying in {delay:.1f} seconds."
+            )
+            time.sleep(delay)
@@ -0,0 +1,204 @@
+"""Pool of egresses (proxies or local source addresses) with their own rate limits and health.
+
+The ban threshold of the site applies per IP address, so every egress gets its own request budget.
+Requests are routed to the healthiest egress that has capacity. An egress that triggered a captcha
+or a ban is put on an exponentially growing cooldown.
+
+Egresses are described by strings:
+    - direct: requests leave from the default address.
+    - proxy:<url>: requests go through the given HTTP(S) or SOCKS proxy (eg. proxy:http://10.0.0.1:3128).
+    - source:<ip>: requests leave from the given local address.
+"""
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from typing import Callable, List
+
+logger = logging.getLogger("__main__")
+
+
+class Egress:
+    """One way out, with a token bucket rate limiter, health score and cooldown."""
+
+    # Weight of the latest outcome in the health score:
+    HEALTH_SMOOTHING = 0.2
+
+    def __init__(
+        self: Egress,
+        spec: str,
+        rate: float,
+        transport_factory: Callable,
+        ban_cooldown: float = 600.0,
+        error_cooldown: float = 30.0,
+        max_cooldown: float = 6 * 3600.0,
+    ) -> None:
+        """Create an egress.
+
+        Args:
+            self (Egress)
+            spec (str): description of the egress (direct, proxy:<url> or source:<ip>)
+            rate (float): maximum number of requests per second
+            transport_factory (Callable): called with the proxy and source_address keywords to build the transport
+            ban_cooldown (float): seconds of pause after the first ban, doubled with each consecutive ban
+            error_cooldown (float): seconds of pause after a failed request
+            max_cooldown (float): longest pause in seconds
+        """
+        if rate <= 0:
+            raise ValueError(f"Rate must be positive. Got: {rate}")
+
+        kind, _, value = spec.partition(":")
+        if kind == "direct":
+            options = {}
+        elif kind == "proxy" and value:
+            options = {"proxy": value}
+        elif kind == "source" and value:
+            options = {"source_address": value}
+        else:
+            raise ValueError(
+                f"Invalid egress: {spec}. Expected direct, proxy:<url> or source:<ip>."
+            )
+
+        self.name = spec
+        self.rate = rate
+        self.transport = transport_factory(**options)
+
+        self.ban_cooldown = ban_cooldown
+        self.error_cooldown = error_cooldown
+        self.max_cooldown = max_cooldown
+
+        # Token bucket holding at most one request:
+        self.tokens = 1.0
+        self.last_refill = time.monotonic()
+
+        self.health = 1.0
+        self.cooldown_until = 0.0
+        self.consecutive_bans = 0
+        self.requests = 0
+
+    def _refill(self: Egress, now: float) -> None:
+        self.tokens = min(1.0, self.tokens + (now - self.last_refill) * self.rate)
+        self.last_refill = now
+
+    def available_at(self: Egress, now: float) -> float:
+        """Earliest time the egress can send a request."""
+        self._refill(now)
+        token_at = now + max(0.0, 1.0 - self.tokens) / self.rate
+        return max(token_at, self.cooldown_until)
+
+    def take(self: Egress, now: float) -> None:
+        """Use the capacity for one request."""
+        self._refill(now)
+        self.tokens -= 1.0
+        self.requests += 1
+
+    def record(self: Egress, outcome: str, now: float) -> None:
+        """Update health and cooldown by the outcome of a request.
+
+        Args:
+            self (Egress)
+            outcome (str): ok, error or ban
+            now (float): monotonic time of the outcome
+        """
+        success = outcome == "ok"
+        self.health += self.HEALTH_SMOOTHING * (success - self.health)
+
+        if outcome == "ban":
+            self.consecutive_bans += 1
+            cooldown = min(
+                self.ban_cooldown * 2 ** (self.consecutive_bans - 1), self.max_cooldown
+            )
+            self.cooldown_until = now + cooldown
+            logger.warning(f"Egress {self.name} banned. Cooling down for {cooldown}s.")
+        elif outcome == "error":
+            self.cooldown_until = max(self.cooldown_until, now + self.error_cooldown)
+        else:
+            self.consecutive_bans = 0
+
+    def describe(self: Egress, now: float) -> dict:
+        return {
+            "egress": self.name,
+            "health": round(self.health, 3),
+            "requests": self.requests,
+            "cooling_down": self.cooldown_until > now,
+        }
+
+
+class EgressPool:
+    """Route the requests to the healthiest egress with capacity."""
+
+    def __init__(self: EgressPool, egresses: List[Egress]) -> None:
+        if not egresses:
+            raise ValueError("At least one egress is required.")
+
+        self.egresses = {egress.name: egress for egress in egresses}
+        self.condition = threading.Condition()
+
+    @classmethod
+    def from_specs(
+        cls, specs: List[str], rate: float, transport_factory: Callable, **kwargs
+    ) -> EgressPool:
+        """Build a pool of egresses sharing the same rate limit.
+
+        Args:
+            specs (list): descriptions of the egresses
+            rate (float): maximum number of requests per second of each egress
+            transport_factory (Callable): builds the transport of an egress
+            **kwargs: cooldown options of the egresses
+        Returns:
+            EgressPool
+        """
+        return cls([Egress(spec, rate, transport_factory, **kwargs) for spec in specs])
+
+    def acquire(self: EgressPool) -> Egress:
+        """Wait for an egress with capacity and reserve one request on it.
+
+        Among the egresses available right away the healthiest is chosen.
+
+        Args:
+            self (EgressPool)
+        Returns:
+            Egress: egress to send the request through
+        """
+        with self.condition:
+            while True:
+                now = time.monotonic()
+                available_at = {
+                    name: egress.available_at(now)
+                    for name, egress in self.egresses.items()
+                }
+                ready = [
+                    self.egresses[name]
+                    for name, at in available_at.items()
+                    if at <= now
+                ]
+
+                if ready:
+                    egress = max(ready, key=lambda e: e.health)
+                    egress.take(now)
+                    return egress
+
+                self.condition.wait(timeout=min(available_at.values()) - now)
+
+    def report(self: EgressPool, name: str, outcome: str) -> None:
+        """Record the outcome of a request sent through an egress.
+
+        Args:
+            self (EgressPool)
+            name (str): name of the egress
+            outcome (str): ok, error or ban
+        """
+        with self.condition:
+            self.egresses[name].record(outcome, time.monotonic())
+            self.condition.notify_all()
+
+    def describe(self: EgressPool) -> List[dict]:
+        """State of all egresses."""
+        with self.condition:
+            now = time.monotonic()
+            return [egress.describe(now) for egress in self.egresses.values()]
+
+    def close(self: EgressPool) -> None:
+        for egress in self.egresses.values():
+            egress.transport.close()
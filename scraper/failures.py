@@ -0,0 +1,223 @@
+"""Handling of failed downloads: retry policies, circuit breaker and the error raised when giving up.
+
+Failures are sorted into classes, each with its own retry policy:
+    - network: connection errors and timeouts. Usually transient.
+    - server: 5xx and 429 responses. The server is overloaded, so the backoff is longer.
+    - not_found: 404 and 410 responses. Permanent, not retried.
+    - parse: the page could not be parsed (eg. no title). Retried once, a broken page rarely heals.
+    - ban: captcha or temporary ban page. Also counted by the circuit breaker of the host, unless
+      the requests go through an egress pool, whose egresses cool down on their own.
+
+Retries wait a jittered exponential backoff ("full jitter": a uniform random delay up to the
+exponential bound), so parallel crawlers do not retry in lockstep. Once the attempts are used up,
+FetchFailed is raised and the caller records the URL in the dead-letter queue (see
+db_tools.dead_letters) instead of stalling the crawl.
+
+Bans are not the fault of the page: consecutive bans open the circuit breaker of the host, which
+pauses every request to the host for a cooldown that doubles while the bans continue.
+"""
+from __future__ import annotations
+
+import logging
+import random
+import threading
+import time
+from typing import Callable, Dict, NamedTuple
+from urllib.parse import urlsplit
+
+logger = logging.getLogger("__main__")
+
+
+class RetryPolicy(NamedTuple):
+    """Retry policy of an error class."""
+
+    attempts: int
+    base_delay: float
+    max_delay: float
+
+
+RETRY_POLICIES: Dict[str, RetryPolicy] = {
+    "network": RetryPolicy(attempts=5, base_delay=5.0, max_delay=120.0),
+    "server": RetryPolicy(attempts=5, base_delay=15.0, max_delay=300.0),
+    "not_found": RetryPolicy(attempts=1, base_delay=0.0, max_delay=0.0),
+    "parse": RetryPolicy(attempts=2, base_delay=5.0, max_delay=30.0),
+    "ban": RetryPolicy(attempts=10, base_delay=30.0, max_delay=300.0),
+}
+
+# Client libraries whose errors are transport failures:
+NETWORK_ERROR_MODULES = ("requests", "urllib3", "httpx", "httpcore", "socket", "ssl")
+
+
+class PageStatusError(Exception):
+    """The server answered with an error status."""
+
+    def __init__(self: PageStatusError, url: str, status: int) -> None:
+        super().__init__(f"HTTP status {status} for URL: {url}")
+        self.url = url
+        self.status = status
+
+
+class BannedError(Exception):
+    """A captcha or ban page was returned instead of the requested page."""
+
+
+class FetchFailed(Exception):
+    """A page could not be downloaded, the retries are used up."""
+
+    def __init__(
+        self: FetchFailed, url: str, error_class: str, attempts: int, error: Exception
+    ) -> None:
+        super().__init__(
+            f"Giving up on URL ({url}) after {attempts} attempts, {error_class} error: {error}"
+        )
+        self.url = url
+        self.error_class = error_class
+        self.attempts = attempts
+        self.error = error
+
+
+def classify(error: Exception) -> str:
+    """Error class of a failed download.
+
+    Args:
+        error (Exception): raised while downloading or parsing the page
+    Returns:
+        str: network, server, not_found, parse or ban
+    """
+    if isinstance(error, BannedError):
+        return "ban"
+    if isinstance(error, PageStatusError):
+        return "not_found" if error.status in (404, 410) else "server"
+
+    # The client libraries are imported lazily, so their errors are recognised by module:
+    if (
+        isinstance(error, (OSError, TimeoutError))
+        or type(error).__module__.split(".")[0] in NETWORK_ERROR_MODULES
+    ):
+        return "network"
+
+    return "parse"
+
+
+def check_status(url: str, status: int) -> None:
+    """Raise PageStatusError for statuses not worth parsing.
+
+    Args:
+        url (str): URL of the page
+        status (int): HTTP status of the response
+    """
+    if status in (404, 410, 429) or status >= 500:
+        raise PageStatusError(url, status)
+
+
+def backoff_delay(
+    error_class: str, attempt: int, rng: random.Random | None = None
+) -> float:
+    """Seconds to wait before retrying, with full jitter.
+
+    Args:
+        error_class (str): class of the last error
+        attempt (int): number of failed attempts so far (1 for the first failure)
+        rng (random.Random | None): random generator, the module generator by default
+    Returns:
+        float: uniform random delay between 0 and min(max_delay, base_delay * 2^(attempt - 1))
+    """
+    policy = RETRY_POLICIES[error_class]
+    bound = min(policy.max_delay, policy.base_delay * 2 ** (attempt - 1))
+    return (rng or random).uniform(0, bound)
+
+
+class circuit_breaker:
+    """Per-host circuit breaker opened by consecutive bans.
+
+    closed: requests go through. After `threshold` consecutive bans the breaker opens and requests
+    to the host wait for the cooldown. After the cooldown one request is let through (half open):
+    if it succeeds the breaker closes, if it is banned again the breaker reopens with a doubled
+    cooldown, up to `max_cooldown`.
+    """
+
+    def __init__(
+        self: circuit_breaker,
+        threshold: int = 3,
+        cooldown: float = 300.0,
+        max_cooldown: float = 3600.0,
+        sleep: Callable[[float], None] = time.sleep,
+    ) -> None:
+        """Initialize the breaker, every host starts closed.
+
+        Args:
+            self (circuit_breaker)
+            threshold (int): number of consecutive bans opening the breaker
+            cooldown (float): seconds the host is paused for when the breaker first opens
+            max_cooldown (float): upper limit of the doubling cooldown
+            sleep (callable): function used for waiting
+        """
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.max_cooldown = max_cooldown
+        self.sleep = sleep
+
+        self.lock = threading.Lock()
+
+        # Consecutive bans, time the breaker closes and the current cooldown of each host:
+        self.bans: Dict[str, int] = {}
+        self.open_until: Dict[str, float] = {}
+        self.cooldowns: Dict[str, float] = {}
+
+    @staticmethod
+    def host(url: str) -> str:
+        return urlsplit(url).netloc
+
+    def state(self: circuit_breaker, url: str) -> str:
+        """State of the breaker of the host of the URL: closed, open or half_open."""
+        host = self.host(url)
+        with self.lock:
+            if host not in self.open_until:
+                return "closed"
+            return "open" if time.monotonic() < self.open_until[host] else "half_open"
+
+    def wait(self: circuit_breaker, url: str) -> None:
+        """Wait until requests to the host of the URL are allowed."""
+        host = self.host(url)
+        with self.lock:
+            remaining = self.open_until.get(host, 0.0) - time.monotonic()
+
+        if remaining > 0:
+            logger.warning(
+                f"Circuit breaker of {host} is open, pausing for {remaining:.0f} seconds."
+            )
+            self.sleep(remaining)
+
+    def record_success(self: circuit_breaker, url: str) -> None:
+        """A page of the host was downloaded, the breaker closes."""
+        host = self.host(url)
+        with self.lock:
+            self.bans.pop(host, None)
+            self.cooldowns.pop(host, None)
+            if self.open_until.pop(host, None) is not None:
+                logger.info(f"Circuit breaker of {host} closed.")
+
+    def record_ban(self: circuit_breaker, url: str) -> None:
+        """A captcha or ban page was returned by the host, the breaker opens after enough of them."""
+        host = self.host(url)
+        with self.lock:
+            self.bans[host] = self.bans.get(host, 0) + 1
+
+            # A ban in half open state reopens the breaker at once:
+            if host not in self.open_until and self.bans[host] < self.threshold:
+                return
+
+            if host in self.cooldowns:
+                cooldown = min(self.max_cooldown, self.cooldowns[host] * 2)
+            else:
+                cooldown = self.cooldown
+            self.cooldowns[host] = cooldown
+            self.open_until[host] = time.monotonic() + cooldown
+
+        logger.warning(
+            f"Circuit breaker of {host} opened for {cooldown:.0f} seconds after {self.bans[host]} bans."
+        )
+
+
+# Breaker shared by all downloads:
+breaker = circuit_breaker()
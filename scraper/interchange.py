@@ -0,0 +1,179 @@
+"""JSONL interchange format of the parsed questions.
+
+Questions parsed on one machine can be saved into JSONL files and loaded into the database on
+another one with the bulk importer (python -m db_tools.bulk_import). Files ending with .gz are
+gzip compressed.
+
+Format (version 1): one JSON object per line, UTF-8 encoded:
+
+    {
+        "format": 1,
+        "url": str,
+        "gyik_id": int,
+        "title": str,
+        "category": str,
+        "subcategory": str,
+        "question": str | null,
+        "question_date": ISO 8601 date time | null,
+        "keywords": [str, ...],
+        "user": {"user": str | null, "user_percent": int | null},
+        "answers": [
+            {
+                "gyik_id": int,
+                "user": {"user": str | null, "user_percent": int | null},
+                "answer_date": ISO 8601 date time,
+                "answer_text": str,
+                "answer_percent": int | null
+            },
+            ...
+        ]
+    }
+
+The same question can appear more than once (eg. when it is crawled again because of new answers);
+the importer adds the answers not yet in the database.
+"""
+from __future__ import annotations
+
+import gzip
+import json
+import logging
+import threading
+from concurrent.futures import Future
+from typing import IO, Iterable, Iterator
+
+from scraper.records import Question
+
+logger = logging.getLogger("__main__")
+
+FORMAT_VERSION = 1
+
+
+def dumps(question: Question) -> str:
+    """Serialize a question into one line of the interchange format.
+
+    Args:
+        question (Question): parsed question
+    Returns:
+        str: JSON object without line break
+    """
+    return json.dumps(
+        {"format": FORMAT_VERSION, **question.to_dict()}, ensure_ascii=False
+    )
+
+
+def loads_dict(line: str) -> dict:
+    """Parse one line of the interchange format into a dictionary, checking the format version.
+
+    Args:
+        line (str): JSON object
+    Returns:
+        dict: question as a dictionary (see Question.to_dict)
+    """
+    data = json.loads(line)
+    if data.pop("format", None) != FORMAT_VERSION:
+        raise ValueError(
+            f"Unsupported interchange format: {data.get('format')} (gyik id: {data.get('gyik_id')})"
+        )
+    return data
+
+
+def loads(line: str) -> Question:
+    """Parse one line of the interchange format.
+
+    Args:
+        line (str): JSON object
+    Returns:
+        Question: parsed question
+    """
+    return Question.from_dict(loads_dict(line))
+
+
+def open_file(filename: str, mode: str) -> IO[str]:
+    """Open an interchange file for reading (r) or appending (a), gzip compressed if ending with .gz."""
+    if filename.endswith(".gz"):
+        return gzip.open(filename, f"{mode}t", encoding="utf-8")
+    return open(filename, mode, encoding="utf-8")
+
+
+def read_lines(filenames: Iterable[str]) -> Iterator[str]:
+    """Stream the non-empty lines of interchange files."""
+    for filename in filenames:
+        with open_file(filename, "r") as f:
+            for line in f:
+                if line.strip():
+                    yield line
+
+
+def read_questions(filenames: Iterable[str]) -> Iterator[Question]:
+    """Stream the questions of interchange files.
+
+    Args:
+        filenames (iterable): interchange files
+    Returns:
+        iterator: parsed questions
+    """
+    for line in read_lines(filenames):
+        yield loads(line)
+
+
+class jsonl_writer:
+    """Sink writing the parsed questions into an interchange file instead of the database.
+
+    Has the interface of db_writer, so it can be used by the scraper in its place.
+    """
+
+    def __init__(self: jsonl_writer, filename: str) -> None:
+        """Open the file, new questions are appended to it.
+
+        Args:
+            self (jsonl_writer)
+            filename (str): interchange file, gzip compressed if ending with .gz
+        """
+        self.filename = filename
+        self.file = open_file(filename, "a")
+        self.lock = threading.Lock()
+        self.count = 0
+
+    def add_question(self: jsonl_writer, question: Question) -> Future:
+        """Write a question into the file.
+
+        Args:
+            self (jsonl_writer)
+            question (Question): parsed question
+        Returns:
+            Future: already resolved, with None as result.
+        """
+        with self.lock:
+            self.file.write(dumps(question) + "\n")
+            self.count += 1
+
+        future: Future = Future()
+        future.set_result(None)
+        return future
+
+    def refresh_question(self: jsonl_writer, question: Question) -> Future:
+        """Write a crawled again question into the file, the importer adds the new answers.
+
+        Args:
+            self (jsonl_writer)
+            question (Question): parsed question
+        Returns:
+            Future: already resolved, with None as result.
+        """
+        return self.add_question(question)
+
+    def flush(self: jsonl_writer) -> None:
+        with self.lock:
+            self.file.flush()
+
+    def close(self: jsonl_writer) -> None:
+        with self.lock:
+            if not self.file.closed:
+                self.file.close()
+                logger.info(f"{self.count} questions written into {self.filename}")
+
+    def __enter__(self: jsonl_writer) -> jsonl_writer:
+        return self
+
+    def __exit__(self: jsonl_writer, *exc_info) -> None:
+        self.close()
@@ -0,0 +1,179 @@
+"""Non-blocking logging, with the repetitive events of the hot path counted instead of logged one by one.
+
+On re-crawls most questions are already stored, and every unchanged question, duplicate answer and
+keyword link is warned about: millions of lines, written synchronously into the log file and
+stderr. With aggregation started (`start`):
+    - the logging calls only put the records on a queue, a background thread writes them into the
+      handlers (QueueHandler/QueueListener), so the crawl does not wait for the disk or terminal,
+    - the repetitive events (see EVENTS) are logged at DEBUG level, and counted. The counts are
+      logged periodically, eg. "1,532 questions unchanged on pages 40-60".
+
+Without aggregation `event` logs the message at the given level, as before.
+
+Usage:
+    handler = log_events.start([logging.FileHandler("debug.log")], interval=60)
+    logging.basicConfig(handlers=[handler], level=logging.INFO)
+    log_events.event("question_unchanged", f"Question ({gyik_id}) ingested.")
+    log_events.stop()
+"""
+from __future__ import annotations
+
+import atexit
+import logging
+import queue
+import threading
+import time
+from typing import TYPE_CHECKING, Dict, List, Tuple
+
+if TYPE_CHECKING:
+    from logging.handlers import QueueHandler, QueueListener
+
+logger = logging.getLogger("__main__")
+
+# Repetitive events and their description in the summaries:
+EVENTS = {
+    "question_unchanged": "questions unchanged",
+    "answer_count_missing": "stored questions without answer count",
+    "answer_stored": "answers already stored",
+    "link_stored": "keyword links already stored",
+}
+
+
+class event_counter:
+    """Counts of the repetitive events, with the range of list pages they occurred on.
+
+    The events may come from the background writer thread as well.
+    """
+
+    def __init__(self: event_counter, interval: float) -> None:
+        """
+        Args:
+            self (event_counter)
+            interval (float): seconds between two summaries
+        """
+        self.interval = interval
+        self.lock = threading.Lock()
+        self.counts: Dict[str, int] = {}
+        self.pages: Dict[str, Tuple[int, int]] = {}
+        self.totals: Dict[str, int] = {}
+        self.page: int | None = None
+        self.last_summary = time.monotonic()
+
+    def add(self: event_counter, kind: str) -> None:
+        """Count an event, the counts are logged if the interval has passed."""
+        with self.lock:
+            self.counts[kind] = self.counts.get(kind, 0) + 1
+            if self.page is not None:
+                first, last = self.pages.get(kind, (self.page, self.page))
+                self.pages[kind] = (min(first, self.page), max(last, self.page))
+            due = time.monotonic() - self.last_summary >= self.interval
+
+        if due:
+            self.flush()
+
+    def flush(self: event_counter) -> None:
+        """Log the counts since the last summary."""
+        with self.lock:
+            counts, self.counts = self.counts, {}
+            pages, self.pages = self.pages, {}
+            self.last_summary = time.monotonic()
+            for kind, count in counts.items():
+                self.totals[kind] = self.totals.get(kind, 0) + count
+
+        for kind, count in counts.items():
+            logger.info(describe(kind, count, pages.get(kind)))
+
+
+def describe(kind: str, count: int, pages: Tuple[int, int] | None = None) -> str:
+    """Summary of an event, eg. "1,532 questions unchanged on pages 40-60"."""
+    summary = f"{count:,} {EVENTS.get(kind, kind)}"
+    if pages is None:
+        return summary
+
+    first, last = pages
+    return (
+        f"{summary} on page {first}"
+        if first == last
+        else f"{summary} on pages {first}-{last}"
+    )
+
+
+# Aggregation of the current run, if enabled:
+_counter: event_counter | None = None
+_listener: QueueListener | None = None
+
+
+def start(handlers: List[logging.Handler], interval: float = 60.0) -> QueueHandler:
+    """Write the logs by a background thread, and aggregate the repetitive events.
+
+    Args:
+        handlers (list): handlers the records are written into, with their formatters set
+        interval (float): seconds between two summaries of the event counts
+    Returns:
+        QueueHandler: handler to be set on the root logger instead of the given handlers
+    """
+    # Only imported when used, loading it takes longer than the rest of the logging:
+    from logging.handlers import QueueHandler, QueueListener
+
+    global _counter, _listener
+
+    log_queue: queue.SimpleQueue = queue.SimpleQueue()
+    _listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+    _listener.start()
+    _counter = event_counter(interval)
+
+    # The records are queued with the message only, the handlers add the rest:
+    handler = QueueHandler(log_queue)
+    handler.setFormatter(logging.Formatter("%(message)s"))
+
+    # Queued records are written even if the run ends with an error:
+    atexit.register(stop)
+    return handler
+
+
+def stop() -> Dict[str, int] | None:
+    """Log the remaining and total counts and wait until the queued records are written, if started.
+
+    Returns:
+        dict | None: total number of the events by kind
+    """
+    global _counter, _listener
+
+    if _counter is None or _listener is None:
+        return None
+
+    counter, _counter = _counter, None
+    counter.flush()
+    if counter.totals:
+        totals = ", ".join(
+            describe(kind, count) for kind, count in counter.totals.items()
+        )
+        logger.info(f"Events in total: {totals}")
+
+    # Records logged after this are dropped:
+    listener, _listener = _listener, None
+    listener.stop()
+    return counter.totals
+
+
+def set_page(page: int | None) -> None:
+    """List page being processed, the summaries show the range of pages of the events."""
+    if _counter is not None:
+        _counter.page = page
+
+
+def event(kind: str, message: str, level: int = logging.WARNING) -> None:
+    """Log a repetitive event: counted and logged at DEBUG level if aggregation is enabled.
+
+    Args:
+        kind (str): kind of the event (see EVENTS)
+        message (str): detail of the event
+        level (int): level of the message without aggregation
+    """
+    # The caller is shown as the source of the record:
+    if _counter is None:
+        logger.log(level, message, stacklevel=2)
+        return
+
+    logger.debug(message, stacklevel=2)
+    _counter.add(kind)
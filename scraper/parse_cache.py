@@ -0,0 +1,247 @@
+"""Cache of the parse results of the downloaded pages, keyed by the hash of the raw body.
+
+Many downloaded pages are byte-identical to a page parsed before: list pages without new questions,
+answer pages of closed threads. Building the soup and running the parsers again is skipped for
+them: the parse result is looked up by the BLAKE2 hash of the URL and the raw body.
+
+The key also contains the parser version, the hash of the source of the parser modules, so the
+cached results are invalidated automatically when the parsers change. Entries of other versions
+are dropped when the cache is opened.
+
+The results are stored as JSON in an SQLite file, separate from the scraper database, as losing it
+only costs parsing. The number of entries is bounded, the least recently used ones are evicted.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import time
+from typing import Any, NamedTuple
+
+logger = logging.getLogger("__main__")
+
+# Modules the parse results depend on:
+PARSER_MODULES = [
+    "parse_cache.py",
+    "parse_full_question.py",
+    "question_parser.py",
+    "answer_parser.py",
+    "parser_helper.py",
+    "records.py",
+]
+
+
+def parser_version() -> str:
+    """Hash of the source of the parser modules."""
+    digest = hashlib.blake2b(digest_size=8)
+    folder = os.path.dirname(os.path.abspath(__file__))
+    for module in PARSER_MODULES:
+        with open(os.path.join(folder, module), "rb") as f:
+            digest.update(f.read())
+    return digest.hexdigest()
+
+
+class ParsedPage(NamedTuple):
+    """Parse result of a downloaded page."""
+
+    url: str
+    kind: str
+    key: bytes | None
+    result: Any
+    cached: bool
+
+
+class parse_cache:
+    """Size bounded, persistent LRU cache of parse results."""
+
+    cache_table_sql = """CREATE TABLE IF NOT EXISTS PARSE_CACHE (
+        KEY BLOB PRIMARY KEY,
+        VERSION TEXT NOT NULL,
+        KIND TEXT NOT NULL,
+        RESULT TEXT NOT NULL,
+        LAST_USED REAL NOT NULL
+    ) WITHOUT ROWID"""
+
+    cache_index_sql = """CREATE INDEX IF NOT EXISTS PARSE_CACHE_LAST_USED
+        ON PARSE_CACHE (LAST_USED)"""
+
+    get_sql = """SELECT RESULT FROM PARSE_CACHE WHERE KEY = :key"""
+    touch_sql = """UPDATE PARSE_CACHE SET LAST_USED = :now WHERE KEY = :key"""
+    put_sql = """
+        INSERT OR REPLACE INTO PARSE_CACHE (KEY, VERSION, KIND, RESULT, LAST_USED)
+        VALUES (:key, :version, :kind, :result, :now)
+    """
+    evict_sql = """
+        DELETE FROM PARSE_CACHE WHERE KEY IN (
+            SELECT KEY FROM PARSE_CACHE ORDER BY LAST_USED LIMIT :count
+        )
+    """
+    drop_versions_sql = """DELETE FROM PARSE_CACHE WHERE VERSION != :version"""
+
+    # Writes are committed in groups, a lost tail only costs parsing:
+    commit_interval = 100
+
+    def __init__(self: parse_cache, filename: str, max_entries: int = 20000) -> None:
+        """Open the cache, entries of other parser versions are dropped.
+
+        Args:
+            self (parse_cache)
+            filename (str): SQLite file of the cache. Created if not exists.
+            max_entries (int): maximum number of cached pages
+        """
+        self.filename = filename
+        self.max_entries = max_entries
+        self.version = parser_version()
+
+        self.conn = sqlite3.connect(filename)
+        self.conn.execute("PRAGMA journal_mode = WAL")
+        self.conn.execute("PRAGMA synchronous = OFF")
+
+        with self.conn:
+            self.conn.execute(self.cache_table_sql)
+            self.conn.execute(self.cache_index_sql)
+            dropped = self.conn.execute(
+                self.drop_versions_sql, {"version": self.version}
+            ).rowcount
+
+        if dropped:
+            logger.info(f"Parsers changed, {dropped} cached parse results dropped.")
+
+        self.entries = self.conn.execute("SELECT COUNT(*) FROM PARSE_CACHE").fetchone()[
+            0
+        ]
+        self.pending = 0
+        self.hits = 0
+        self.misses = 0
+
+    def key(self: parse_cache, kind: str, url: str, body: bytes) -> bytes:
+        """Cache key of a page.
+
+        Args:
+            self (parse_cache)
+            kind (str): parser the result comes from (eg. question, answers, list)
+            url (str): URL of the page
+            body (bytes): raw body of the page
+        Returns:
+            bytes: 16 byte BLAKE2 digest
+        """
+        digest = hashlib.blake2b(digest_size=16)
+        for part in (self.version, kind, url):
+            digest.update(part.encode())
+            digest.update(b"\0")
+        digest.update(body)
+        return digest.digest()
+
+    def get(self: parse_cache, key: bytes) -> Any | None:
+        """Cached parse result, None if the page was not parsed before.
+
+        Args:
+            self (parse_cache)
+            key (bytes): cache key of the page
+        """
+        row = self.conn.execute(self.get_sql, {"key": key}).fetchone()
+        if row is None:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        self.conn.execute(self.touch_sql, {"key": key, "now": time.time()})
+        self._written()
+        return json.loads(row[0])
+
+    def put(self: parse_cache, key: bytes, kind: str, result: Any) -> None:
+        """Store a parse result, the least recently used entries are evicted above the size limit.
+
+        Args:
+            self (parse_cache)
+            key (bytes): cache key of the page
+            kind (str): parser the result comes from
+            result (Any): JSON serializable parse result
+        """
+        cursor = self.conn.execute(
+            self.put_sql,
+            {
+                "key": key,
+                "version": self.version,
+                "kind": kind,
+                "result": json.dumps(result, ensure_ascii=False),
+                "now": time.time(),
+            },
+        )
+        self.entries += cursor.rowcount
+
+        # A tenth of the entries is evicted at once, so eviction is not run for every page:
+        if self.entries > self.max_entries:
+            count = self.entries - self.max_entries + self.max_entries // 10
+            self.conn.execute(self.evict_sql, {"count": count})
+            self.entries = self.conn.execute(
+                "SELECT COUNT(*) FROM PARSE_CACHE"
+            ).fetchone()[0]
+
+        self._written()
+
+    def _written(self: parse_cache) -> None:
+        self.pending += 1
+        if self.pending >= self.commit_interval:
+            self.conn.commit()
+            self.pending = 0
+
+    def summary(self: parse_cache) -> dict:
+        return {"entries": self.entries, "hits": self.hits, "misses": self.misses}
+
+    def close(self: parse_cache) -> None:
+        self.conn.commit()
+        self.conn.close()
+
+
+# Cache of the current run, if enabled:
+_cache: parse_cache | None = None
+
+
+def start(filename: str, max_entries: int = 20000) -> parse_cache:
+    """Cache the parse results of the downloaded pages.
+
+    Args:
+        filename (str): SQLite file of the cache
+        max_entries (int): maximum number of cached pages
+    Returns:
+        parse_cache
+    """
+    global _cache
+
+    _cache = parse_cache(filename, max_entries)
+    return _cache
+
+
+def stop() -> dict | None:
+    """Close the cache, if enabled.
+
+    Returns:
+        dict | None: number of entries, hits and misses
+    """
+    global _cache
+
+    if _cache is None:
+        return None
+
+    cache, _cache = _cache, None
+    summary = cache.summary()
+    cache.close()
+    return summary
+
+
+def active() -> parse_cache | None:
+    return _cache
+
+
+def store(page: ParsedPage) -> None:
+    """Store the result of a parsed page, if the cache is enabled.
+
+    Args:
+        page (ParsedPage): parse result of the page
+    """
+    if _cache is not None and page.key is not None and not page.cached:
+        _cache.put(page.key, page.kind, page.result)
@@ -1,49 +1,77 @@
+from dataclasses import replace
+
 from scraper import answer_parser, download_page, question_parser
+from scraper.records import Answer, Question, UserRef
 
 
 class retrieve_question(object):
     def __init__(self, URL):
-        self.soup = self.fetch_url(URL)
         self.url = URL
 
-        # Parse question data:
-        pq = question_parser.ParseQuestion(self.soup, URL)
-
-        # Parsing question related information:
-        self.question_document = pq.get_question_data()
+        # Question and the first page of answers, from the parse cache if the page is unchanged:
+        page = self.fetch_parsed(URL, "question", self.parse_question_page)
+        question = Question.from_dict(page["question"])
 
         # if we know who asked the question:
-        self.user = self.question_document["USER"]["USER"]
+        self.user = question.user.user
 
-        # Parsing answers:
-        self.question_document["ANSWERS"] = self.parse_answers()
+        # Parsing answers. The html is not kept once the extraction is done:
+        answers = self.name_answers(question.answers)
+        if page["next_page"]:
+            answers += self.parse_answers(url=page["next_page"])
+
+        self.question_document = replace(question, answers=tuple(answers))
 
     def get_data(self):
         return self.question_document
 
-    def parse_answers(self, url=None):
-        # if url is given, the url is fetch, otherwise we use the original html:
-        if url:
-            soup = self.fetch_url(url)
-        else:
-            soup = self.soup
+    @staticmethod
+    def parse_question_page(soup, url):
+        # Parse question data:
+        pq = question_parser.ParseQuestion(soup, url)
 
-        # Parse answers:
+        # Parsing question related information with the answers on the page:
         pa = answer_parser.ParseAnswers(soup)
-        answers = pa.get_answer_data()
+        question = replace(pq.get_question_data(), answers=tuple(pa.get_answer_data()))
 
-        # if we know who asked the question update with the name:
-        if self.user:
-            for answer in answers:
-                if answer["USER"]["USER"] == "kerdezo_dummy_user":
-                    answer["USER"]["USER"] = self.user
+        return {"question": question.to_dict(), "next_page": pa.get_next_page()}
+
+    @staticmethod
+    def parse_answer_page(soup, url):
+        pa = answer_parser.ParseAnswers(soup)
+
+        return {
+            "answers": [answer.to_dict() for answer in pa.get_answer_data()],
+            "next_page": pa.get_next_page(),
+        }
+
+    def parse_answers(self, url):
+        # Parse answers:
+        page = self.fetch_parsed(url, "answers", self.parse_answer_page)
+        answers = self.name_answers(
+            Answer.from_dict(answer) for answer in page["answers"]
+        )
 
         # If there's a next page, go there:
-        if pa.get_next_page():
-            answers += self.parse_answers(pa.get_next_page())
+        if page["next_page"]:
+            answers += self.parse_answers(url=page["next_page"])
 
         return answers
 
+    def name_answers(self, answers):
+        # if we know who asked the question update with the name:
+        if not self.user:
+            return list(answers)
+
+        return [
+            replace(answer, user=UserRef(self.user, answer.user.user_percent))
+            if answer.user.user == answer_parser.ParseAnswers.DEFAULT_USER
+            else answer
+            for answer in answers
+        ]
+
     @staticmethod
-    def fetch_url(url):
-        return download_page.download_page(url)
+    def fetch_parsed(url, kind, parse):
+        return download_page.download_parsed(
+            url, kind, lambda soup: parse(soup, url)
+        ).result
@@ -71,7 +71,7 @@ def get_last_question_page(soup: BeautifulSoup) -> int:
         int - last page of the category
     """
     # Getting page numbers:
-    table_footer = soup.findChildren("div", class_="oldalszamok")[1]
+    table_footer = soup.findChildren("div", class_="oldalszamok")
 
     # The page numbers are expected to be stored in the "oldalszamok" div:
     assert isinstance(table_footer, list) and len(table_footer) > 1
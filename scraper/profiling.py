@@ -0,0 +1,206 @@
+"""Per-stage profiling of the scraper: fetch, parse and load.
+
+Code is attributed to a stage by wrapping it in `stage(name)`. Stages can be nested: the inner stage
+pauses the outer one. Every stage has its own cProfile profiler, and a sampling thread records the
+stack of the main thread in collapsed format, ready for flamegraph.pl or speedscope.
+
+Both measure the CPU time of the main thread, so waiting for the network, the sleeps between
+requests and other blocking calls are excluded.
+
+Output files in the profile folder, for each stage:
+    - <stage>.prof: cProfile statistics, eg. python -m pstats fetch.prof or snakeviz.
+    - <stage>.collapsed: sampled stacks ("frame;frame;frame weight", weights in CPU microseconds).
+    - <stage>.txt: the functions with the highest cumulative time.
+"""
+from __future__ import annotations
+
+import contextlib
+import cProfile
+import io
+import logging
+import os
+import pstats
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Dict, Iterator, List
+
+logger = logging.getLogger("__main__")
+
+STAGES = ["fetch", "parse", "load"]
+
+
+class stage_profiler:
+    """cProfile and stack sampling profilers of the stages of the main thread."""
+
+    def __init__(
+        self: stage_profiler, output_dir: str, interval: float = 0.005
+    ) -> None:
+        """Initialize the profilers, profiling starts with `start`.
+
+        Args:
+            self (stage_profiler)
+            output_dir (str): folder of the profiles. Created if not exists.
+            interval (float): seconds between two stack samples
+        """
+        self.output_dir = output_dir
+        self.interval = interval
+
+        # The profilers measure the CPU time of the thread, waits are not counted:
+        self.profiles = {name: cProfile.Profile(time.thread_time) for name in STAGES}
+        self.samples: Dict[str, Counter] = {name: Counter() for name in STAGES}
+
+        # Stack of the active stages of the main thread:
+        self.stages: List[str] = []
+
+        self.thread_id = threading.get_ident()
+        self.stopped = threading.Event()
+        self.sampler = threading.Thread(
+            target=self._sample, name="stage_profiler", daemon=True
+        )
+
+        os.makedirs(output_dir, exist_ok=True)
+
+    def start(self: stage_profiler) -> None:
+        self.sampler.start()
+
+    @contextlib.contextmanager
+    def stage(self: stage_profiler, name: str) -> Iterator[None]:
+        """Attribute the code run in the context to a stage.
+
+        Args:
+            self (stage_profiler)
+            name (str): fetch, parse or load
+        """
+        # Only the main thread is profiled:
+        if threading.get_ident() != self.thread_id:
+            yield
+            return
+
+        if self.stages:
+            self.profiles[self.stages[-1]].disable()
+        self.stages.append(name)
+        self.profiles[name].enable()
+        try:
+            yield
+        finally:
+            self.profiles[name].disable()
+            self.stages.pop()
+            if self.stages:
+                self.profiles[self.stages[-1]].enable()
+
+    def _cpu_clock(self: stage_profiler):
+        """Function returning the CPU time of the main thread, wall clock if not supported."""
+        try:
+            clock_id = time.pthread_getcpuclockid(self.thread_id)
+            time.clock_gettime(clock_id)
+            return lambda: time.clock_gettime(clock_id)
+        except (AttributeError, OSError):
+            logger.warning("Thread CPU clock is not available, sampling wall time.")
+            return time.perf_counter
+
+    def _sample(self: stage_profiler) -> None:
+        """Sample the stack of the main thread, weighted by the CPU time used since the last sample."""
+        clock = self._cpu_clock()
+        last = clock()
+
+        while not self.stopped.wait(self.interval):
+            now = clock()
+            weight = int((now - last) * 1_000_000)
+            last = now
+
+            stages = self.stages
+            frame = sys._current_frames().get(self.thread_id)
+            if not stages or frame is None or weight <= 0:
+                continue
+
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(
+                    f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+                )
+                frame = frame.f_back
+
+            self.samples[stages[-1]][";".join(reversed(stack))] += weight
+
+    def stop(self: stage_profiler, top: int = 30) -> Dict[str, float]:
+        """Stop profiling and write the profiles of the stages.
+
+        Args:
+            self (stage_profiler)
+            top (int): number of functions in the text reports
+        Returns:
+            dict: CPU seconds spent in each stage
+        """
+        self.stopped.set()
+        if self.sampler.is_alive():
+            self.sampler.join()
+
+        totals = {}
+        for name in STAGES:
+            profile = self.profiles[name]
+            profile.disable()
+            profile.create_stats()
+            if not profile.stats:
+                continue
+
+            profile.dump_stats(os.path.join(self.output_dir, f"{name}.prof"))
+
+            report = io.StringIO()
+            stats = pstats.Stats(profile, stream=report)
+            stats.sort_stats("cumulative").print_stats(top)
+            with open(os.path.join(self.output_dir, f"{name}.txt"), "w") as f:
+                f.write(report.getvalue())
+
+            with open(os.path.join(self.output_dir, f"{name}.collapsed"), "w") as f:
+                for stack, weight in self.samples[name].most_common():
+                    f.write(f"{stack} {weight}\n")
+
+            totals[name] = round(stats.total_tt, 3)
+
+        logger.info(f"CPU seconds per stage: {totals}. Profiles: {self.output_dir}")
+        return totals
+
+
+# Profiler of the current run, if profiling is enabled:
+_profiler: stage_profiler | None = None
+
+
+def start(output_dir: str, interval: float = 0.005) -> stage_profiler:
+    """Start profiling the stages of the main thread.
+
+    Args:
+        output_dir (str): folder of the profiles
+        interval (float): seconds between two stack samples
+    Returns:
+        stage_profiler
+    """
+    global _profiler
+
+    _profiler = stage_profiler(output_dir, interval)
+    _profiler.start()
+    return _profiler
+
+
+def stop() -> Dict[str, float] | None:
+    """Stop profiling and write the profiles, if profiling was started."""
+    global _profiler
+
+    if _profiler is None:
+        return None
+
+    profiler, _profiler = _profiler, None
+    return profiler.stop()
+
+
+def stage(name: str) -> contextlib.AbstractContextManager:
+    """Attribute the code run in the context to a stage. Does nothing if profiling is not enabled.
+
+    Args:
+        name (str): fetch, parse or load
+    """
+    if _profiler is None:
+        return contextlib.nullcontext()
+    return _profiler.stage(name)
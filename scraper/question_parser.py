@@ -5,6 +5,7 @@ import re
 from typing import TYPE_CHECKING
 
 from scraper import parser_helper
+from scraper.records import Question, UserRef
 
 if TYPE_CHECKING:
     from bs4 import BeautifulSoup
@@ -19,6 +20,8 @@ class ParseQuestion:
     def __init__(self: ParseQuestion, soup: BeautifulSoup, question_URL: str) -> None:
         """Initialize parser.
 
+        The soup is released as soon as the question data is extracted.
+
         Args:
             self (ParseQuestion)
             soup (BeautifulSoup): object of the html page
@@ -38,18 +41,23 @@ class ParseQuestion:
         text = self._parse_text()
         ID_match = re.search(r"__(\d+?)-", question_URL)
 
-        # Compile into some return value:
-        self.question_data = {
-            "URL": question_URL,
-            "GYIK_ID": ID_match.group(1),
-            "TITLE": title,
-            "CATEGORY": categories[0],
-            "SUBCATEGORY": categories[1],
-            "QUESTION": text,
-            "QUESTION_DATE": parser_helper.process_date(raw_date),
-            "KEYWORDS": keywords,
-            "USER": {"USER": user, "USER_PERCENT": None},
-        }
+        # Compile into some return value. Answers are parsed separately:
+        self.question_data = Question(
+            url=question_URL,
+            gyik_id=int(ID_match.group(1)),
+            title=title,
+            category=categories[0],
+            subcategory=categories[1],
+            question=text,
+            question_date=parser_helper.process_date(raw_date),
+            keywords=tuple(keywords),
+            user=UserRef(user, None),
+            answers=(),
+        )
+
+        # Releasing the html:
+        self.soup = None
+        self.q = None
 
     def _parse_title(self):
         title = self.soup.find("div", class_="kerdes_fejlec").find("h1").text
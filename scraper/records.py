@@ -0,0 +1,128 @@
+"""Compact, immutable records of the parsed questions and answers.
+
+The records are converted to and from plain dictionaries (`to_dict`, `from_dict`), the base of the
+JSONL interchange format (see scraper.interchange). Dates are ISO 8601 strings in the dictionaries.
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Tuple
+
+
+def _date_to_str(value: datetime | None) -> str | None:
+    return value.isoformat() if value is not None else None
+
+
+def _date_from_str(value: str | None) -> datetime | None:
+    return datetime.fromisoformat(value) if value is not None else None
+
+
+@dataclass(frozen=True)
+class UserRef:
+    """Reference to a user as it appears on the site.
+
+    The user is None for anonymous users.
+    """
+
+    __slots__ = ("user", "user_percent")
+
+    user: str | None
+    user_percent: int | None
+
+    def to_dict(self: UserRef) -> dict:
+        return {"user": self.user, "user_percent": self.user_percent}
+
+    @classmethod
+    def from_dict(cls, data: dict) -> UserRef:
+        return cls(data["user"], data["user_percent"])
+
+
+@dataclass(frozen=True)
+class Answer:
+    """One answer given to a question."""
+
+    __slots__ = ("gyik_id", "user", "answer_date", "answer_text", "answer_percent")
+
+    gyik_id: int
+    user: UserRef
+    answer_date: datetime
+    answer_text: str
+    answer_percent: int | None
+
+    def to_dict(self: Answer) -> dict:
+        return {
+            "gyik_id": self.gyik_id,
+            "user": self.user.to_dict(),
+            "answer_date": _date_to_str(self.answer_date),
+            "answer_text": self.answer_text,
+            "answer_percent": self.answer_percent,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> Answer:
+        return cls(
+            gyik_id=data["gyik_id"],
+            user=UserRef.from_dict(data["user"]),
+            answer_date=_date_from_str(data["answer_date"]),
+            answer_text=data["answer_text"],
+            answer_percent=data["answer_percent"],
+        )
+
+
+@dataclass(frozen=True)
+class Question:
+    """A question with its keywords and all answers."""
+
+    __slots__ = (
+        "url",
+        "gyik_id",
+        "title",
+        "category",
+        "subcategory",
+        "question",
+        "question_date",
+        "keywords",
+        "user",
+        "answers",
+    )
+
+    url: str
+    gyik_id: int
+    title: str
+    category: str
+    subcategory: str
+    question: str
+    question_date: datetime | None
+    keywords: Tuple[str, ...]
+    user: UserRef
+    answers: Tuple[Answer, ...]
+
+    def to_dict(self: Question) -> dict:
+        return {
+            "url": self.url,
+            "gyik_id": self.gyik_id,
+            "title": self.title,
+            "category": self.category,
+            "subcategory": self.subcategory,
+            "question": self.question,
+            "question_date": _date_to_str(self.question_date),
+            "keywords": list(self.keywords),
+            "user": self.user.to_dict(),
+            "answers": [answer.to_dict() for answer in self.answers],
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> Question:
+        return cls(
+            url=data["url"],
+            gyik_id=data["gyik_id"],
+            title=data["title"],
+            category=data["category"],
+            subcategory=data["subcategory"],
+            question=data["question"],
+            question_date=_date_from_str(data["question_date"]),
+            keywords=tuple(data["keywords"]),
+            user=UserRef.from_dict(data["user"]),
+            answers=tuple(Answer.from_dict(answer) for answer in data["answers"]),
+        )
@@ -0,0 +1,452 @@
+"""Pluggable HTTP transports used to download pages.
+
+Every transport returns the raw body with the charset declared by the server, so the html is
+decoded exactly once. Compressed transfer (gzip, deflate and brotli if available) is negotiated by
+all transports. The transfer statistics are collected in the module level `stats` object.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+import time
+from typing import TYPE_CHECKING, List, NamedTuple
+
+from scraper.egress_pool import EgressPool
+from scraper.user_agents import user_agent
+
+if TYPE_CHECKING:
+    from requests import Session
+
+logger = logging.getLogger("__main__")
+
+# Charset declared in the content-type header:
+CHARSET_PATTERN = re.compile(r"charset=[\"']?([\w.:-]+)", re.IGNORECASE)
+
+
+class FetchedPage(NamedTuple):
+    """Response of a transport."""
+
+    url: str
+    status: int
+    body: bytes
+    encoding: str | None
+    wire_bytes: int
+    elapsed: float
+    http_version: str
+    egress: str | None = None
+
+
+class TransferStats:
+    """Thread safe counters of the downloaded pages."""
+
+    def __init__(self: TransferStats) -> None:
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self: TransferStats) -> None:
+        with self.lock:
+            self.requests = 0
+            self.wire_bytes = 0
+            self.body_bytes = 0
+            self.elapsed = 0.0
+
+    def record(self: TransferStats, page: FetchedPage) -> None:
+        with self.lock:
+            self.requests += 1
+            self.wire_bytes += page.wire_bytes
+            self.body_bytes += len(page.body)
+            self.elapsed += page.elapsed
+
+    def summary(self: TransferStats) -> dict:
+        """Bytes and time spent on the transfers.
+
+        Returns:
+            dict: number of requests, bytes on the wire and decoded, saving by compression, time spent
+        """
+        with self.lock:
+            return {
+                "requests": self.requests,
+                "wire_bytes": self.wire_bytes,
+                "body_bytes": self.body_bytes,
+                "compression_saving": (
+                    1 - self.wire_bytes / self.body_bytes if self.body_bytes else None
+                ),
+                "elapsed_seconds": round(self.elapsed, 3),
+                "seconds_per_request": (
+                    round(self.elapsed / self.requests, 3) if self.requests else None
+                ),
+            }
+
+
+def declared_encoding(content_type: str | None) -> str | None:
+    """Extract the charset from the value of a content-type header.
+
+    Args:
+        content_type (str | None): content-type header
+    Returns:
+        str | None: declared charset, None if not declared.
+    """
+    if not content_type:
+        return None
+
+    match = CHARSET_PATTERN.search(content_type)
+    return match.group(1) if match else None
+
+
+# code from: https://www.peterbe.com/plog/best-practice-with-retries-with-requests
+def requests_retry_session(
+    retries=3,
+    backoff_factor=0.3,
+    status_forcelist=(500, 502, 504),
+    session=None,
+    source_address=None,
+):
+    from requests import Session
+    from requests.adapters import HTTPAdapter
+    from urllib3.util.retry import Retry
+
+    class SourceAddressAdapter(HTTPAdapter):
+        """Adapter binding the outgoing connections to a local address."""
+
+        def init_poolmanager(self, *args, **kwargs):
+            if source_address:
+                kwargs["source_address"] = (source_address, 0)
+            super().init_poolmanager(*args, **kwargs)
+
+    session = Session()
+    retry = Retry(
+        total=retries,
+        read=retries,
+        connect=retries,
+        backoff_factor=backoff_factor,
+        status_forcelist=status_forcelist,
+        # The last response is returned, its status is handled by download_page:
+        raise_on_status=False,
+    )
+    adapter = SourceAddressAdapter(max_retries=retry)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    session.headers.update({"User-Agent": user_agent()})
+    return session
+
+
+class RequestsTransport:
+    """HTTP/1.1 transport based on requests."""
+
+    name = "requests"
+
+    def __init__(
+        self: RequestsTransport,
+        timeout: float = 30.0,
+        proxy: str | None = None,
+        source_address: str | None = None,
+    ) -> None:
+        self.timeout = timeout
+        self.session: Session = requests_retry_session(source_address=source_address)
+
+        if proxy:
+            self.session.proxies = {"http": proxy, "https": proxy}
+
+    def fetch(self: RequestsTransport, url: str) -> FetchedPage:
+        """Download a page.
+
+        Args:
+            self (RequestsTransport)
+            url (str): URL of the page
+        Returns:
+            FetchedPage: raw body with the declared charset
+        """
+        start = time.perf_counter()
+        response = self.session.get(
+            url, timeout=self.timeout, headers={"User-Agent": user_agent()}
+        )
+        body = response.content
+
+        # Bytes read from the socket, before decompression:
+        try:
+            wire_bytes = response.raw.tell()
+        except AttributeError:
+            wire_bytes = len(body)
+
+        return FetchedPage(
+            url=url,
+            status=response.status_code,
+            body=body,
+            encoding=declared_encoding(response.headers.get("content-type")),
+            wire_bytes=wire_bytes or len(body),
+            elapsed=time.perf_counter() - start,
+            http_version="HTTP/1.1",
+        )
+
+    def close(self: RequestsTransport) -> None:
+        self.session.close()
+
+
+class HttpxTransport:
+    """Transport based on httpx, multiplexing requests over HTTP/2 when the server supports it."""
+
+    name = "httpx"
+
+    def __init__(
+        self: HttpxTransport,
+        timeout: float = 30.0,
+        http2: bool = True,
+        proxy: str | None = None,
+        source_address: str | None = None,
+    ) -> None:
+        import httpx
+
+        self.client = httpx.Client(
+            timeout=timeout,
+            follow_redirects=True,
+            transport=httpx.HTTPTransport(
+                http2=http2, retries=3, proxy=proxy, local_address=source_address
+            ),
+        )
+
+    def fetch(self: HttpxTransport, url: str) -> FetchedPage:
+        """Download a page.
+
+        Args:
+            self (HttpxTransport)
+            url (str): URL of the page
+        Returns:
+            FetchedPage: raw body with the declared charset
+        """
+        start = time.perf_counter()
+        response = self.client.get(url, headers={"User-Agent": user_agent()})
+        body = response.content
+
+        return FetchedPage(
+            url=url,
+            status=response.status_code,
+            body=body,
+            encoding=response.charset_encoding,
+            wire_bytes=response.num_bytes_downloaded or len(body),
+            elapsed=time.perf_counter() - start,
+            http_version=response.http_version,
+        )
+
+    def close(self: HttpxTransport) -> None:
+        self.client.close()
+
+
+class PageNotRecorded(LookupError):
+    """The requested page is not in the recorded corpus."""
+
+
+def _page_key(url: str) -> str:
+    return hashlib.sha1(url.encode("utf-8")).hexdigest()
+
+
+class ReplayTransport:
+    """Offline transport serving the pages saved by a recording run, so runs can be reproduced."""
+
+    name = "replay"
+
+    def __init__(self: ReplayTransport, directory: str) -> None:
+        if not os.path.isdir(directory):
+            raise ValueError(f"Replay folder does not exist: {directory}")
+
+        self.directory = directory
+
+    def fetch(self: ReplayTransport, url: str) -> FetchedPage:
+        """Load a recorded page.
+
+        Args:
+            self (ReplayTransport)
+            url (str): URL of the page
+        Returns:
+            FetchedPage: the recorded response
+        """
+        start = time.perf_counter()
+        path = os.path.join(self.directory, _page_key(url))
+        try:
+            with open(f"{path}.json") as f:
+                meta = json.load(f)
+            with open(f"{path}.body", "rb") as f:
+                body = f.read()
+        except FileNotFoundError:
+            raise PageNotRecorded(f"Page is not recorded: {url}")
+
+        return FetchedPage(
+            url=url,
+            status=meta["status"],
+            body=body,
+            encoding=meta["encoding"],
+            wire_bytes=meta["wire_bytes"],
+            elapsed=time.perf_counter() - start,
+            http_version=meta["http_version"],
+        )
+
+    def close(self: ReplayTransport) -> None:
+        pass
+
+
+def record_page(directory: str, page: FetchedPage) -> None:
+    """Save a downloaded page, so it can be served by the replay transport.
+
+    Args:
+        directory (str): folder of the recorded pages
+        page (FetchedPage): the downloaded page
+    """
+    path = os.path.join(directory, _page_key(page.url))
+    with open(f"{path}.body", "wb") as f:
+        f.write(page.body)
+    with open(f"{path}.json", "w") as f:
+        json.dump(
+            {
+                "url": page.url,
+                "status": page.status,
+                "encoding": page.encoding,
+                "wire_bytes": page.wire_bytes,
+                "http_version": page.http_version,
+            },
+            f,
+        )
+
+
+TRANSPORTS = {
+    RequestsTransport.name: RequestsTransport,
+    HttpxTransport.name: HttpxTransport,
+    ReplayTransport.name: ReplayTransport,
+}
+
+# Transport used by download_page, created on first use:
+_transport: RequestsTransport | HttpxTransport | ReplayTransport | None = None
+
+# If set, every downloaded page is saved into this folder:
+_record_dir: str | None = None
+
+# If set, requests are routed through the egresses of the pool:
+_egress_pool: EgressPool | None = None
+
+# Counters of all transfers:
+stats = TransferStats()
+
+
+def set_transport(
+    name: str, egresses: List[str] | None = None, egress_rate: float = 0.1, **kwargs
+) -> None:
+    """Select the transport used to download the pages.
+
+    Args:
+        name (str): name of the transport (requests, httpx or replay)
+        egresses (list | None): if given, requests are spread over these egresses (see egress_pool)
+        egress_rate (float): maximum number of requests per second of each egress
+        **kwargs: options of the transport
+    """
+    global _transport, _egress_pool
+
+    if name not in TRANSPORTS:
+        raise ValueError(f"Unknown transport: {name}. Available: {list(TRANSPORTS)}")
+
+    if _transport is not None:
+        _transport.close()
+        _transport = None
+    if _egress_pool is not None:
+        _egress_pool.close()
+        _egress_pool = None
+
+    if egresses:
+        _egress_pool = EgressPool.from_specs(
+            egresses,
+            egress_rate,
+            lambda **options: TRANSPORTS[name](**kwargs, **options),
+        )
+    else:
+        _transport = TRANSPORTS[name](**kwargs)
+
+
+def set_recording(directory: str | None) -> None:
+    """Save every downloaded page into a folder, to be replayed with the replay transport.
+
+    Args:
+        directory (str | None): folder of the recorded pages, None stops recording.
+    """
+    global _record_dir
+
+    if directory is not None:
+        os.makedirs(directory, exist_ok=True)
+    _record_dir = directory
+
+
+def needs_delay() -> bool:
+    """Test if download_page has to wait before the requests to avoid being banned.
+
+    Returns:
+        bool: False if the request rate is controlled by the egress pool, or pages are replayed.
+    """
+    return _egress_pool is None and not isinstance(_transport, ReplayTransport)
+
+
+def uses_egress_pool() -> bool:
+    """Test if the requests are spread over an egress pool, whose egresses cool down on their own bans."""
+    return _egress_pool is not None
+
+
+def request_rate() -> float | None:
+    """Maximum number of requests per second of the egress pool, None if no egress pool is used."""
+    if _egress_pool is None:
+        return None
+    return sum(egress.rate for egress in _egress_pool.egresses.values())
+
+
+def fetch(url: str) -> FetchedPage:
+    """Download a page with the selected transport, the transfer is added to the statistics.
+
+    Failed requests are reported to the egress pool, the outcome of the other responses is reported
+    with `report_page` once their content is checked (protection pages come with status 200).
+
+    Args:
+        url (str): URL of the page
+    Returns:
+        FetchedPage: raw body with the declared charset
+    """
+    global _transport
+
+    if _egress_pool is not None:
+        egress = _egress_pool.acquire()
+        try:
+            page = egress.transport.fetch(url)._replace(egress=egress.name)
+        except Exception:
+            _egress_pool.report(egress.name, "error")
+            raise
+
+        if page.status >= 500:
+            _egress_pool.report(egress.name, "error")
+    else:
+        if _transport is None:
+            _transport = RequestsTransport()
+
+        page = _transport.fetch(url)
+
+    stats.record(page)
+
+    if _record_dir is not None:
+        record_page(_record_dir, page)
+
+    return page
+
+
+def report_page(page: FetchedPage, banned: bool) -> None:
+    """Report the outcome of a response to its egress, once it is known whether it is a captcha or
+    ban page. Banned egresses cool down, other responses are credited to their health.
+
+    Args:
+        page (FetchedPage): the downloaded page
+        banned (bool): True if the page is a captcha or ban page
+    """
+    # Failed requests are reported by fetch:
+    if _egress_pool is None or page.egress is None or page.status >= 500:
+        return
+    _egress_pool.report(page.egress, "ban" if banned else "ok")
+
+
+def egress_summary() -> List[dict] | None:
+    """State of the egresses, None if no egress pool is used."""
+    return _egress_pool.describe() if _egress_pool is not None else None
@@ -0,0 +1,204 @@
+"""User agents of the pool. Generated by: python -m scraper.user_agents"""
+
+USER_AGENTS = (
+    "Opera/9.61.(X11; Linux x86_64; az-IN) Presto/2.9.190 Version/12.00",
+    "Mozilla/5.0 (compatible; MSIE 8.0; Windows NT 5.0; Trident/5.0)",
+    "Mozilla/5.0 (iPod; U; CPU iPhone OS 3_2 like Mac OS X; ht-HT) AppleWebKit/532.19.2 (KHTML, like Gecko) Version/4.0.5 Mobile/8B116 Safari/6532.19.2",
+    "Mozilla/5.0 (Windows CE; dz-BT; rv:1.9.0.20) Gecko/9733-03-20 00:27:42.407959 Firefox/11.0",
+    "Mozilla/5.0 (iPod; U; CPU iPhone OS 3_1 like Mac OS X; fr-CH) AppleWebKit/534.21.5 (KHTML, like Gecko) Version/3.0.5 Mobile/8B112 Safari/6534.21.5",
+    "Mozilla/5.0 (iPod; U; CPU iPhone OS 3_2 like Mac OS X; wae-CH) AppleWebKit/534.46.5 (KHTML, like Gecko) Version/3.0.5 Mobile/8B118 Safari/6534.46.5",
+    "Mozilla/5.0 (compatible; MSIE 6.0; Windows CE; Trident/3.1)",
+    "Mozilla/5.0 (X11; Linux i686) AppleWebKit/536.0 (KHTML, like Gecko) Chrome/57.0.828.0 Safari/536.0",
+    "Mozilla/5.0 (Macintosh; PPC Mac OS X 10_9_5; rv:1.9.5.20) Gecko/3692-07-03 11:32:14.953171 Firefox/3.8",
+    "Mozilla/5.0 (iPod; U; CPU iPhone OS 4_1 like Mac OS X; am-ET) AppleWebKit/533.8.5 (KHTML, like Gecko) Version/3.0.5 Mobile/8B118 Safari/6533.8.5",
+    "Mozilla/5.0 (Windows NT 4.0) AppleWebKit/533.2 (KHTML, like Gecko) Chrome/56.0.845.0 Safari/533.2",
+    "Opera/9.94.(Windows NT 6.2; wa-BE) Presto/2.9.161 Version/11.00",
+    "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_11_3) AppleWebKit/532.1 (KHTML, like Gecko) Chrome/48.0.881.0 Safari/532.1",
+    "Mozilla/5.0 (Macintosh; U; PPC Mac OS X 10_11_1) AppleWebKit/532.0 (KHTML, like Gecko) Chrome/14.0.835.0 Safari/532.0",
+    "Mozilla/5.0 (Macintosh; U; PPC Mac OS X 10_12_6) AppleWebKit/532.1 (KHTML, like Gecko) Chrome/36.0.868.0 Safari/532.1",
+    "Mozilla/5.0 (compatible; MSIE 7.0; Windows NT 10.0; Trident/4.0)",
+    "Mozilla/5.0 (compatible; MSIE 9.0; Windows 95; Trident/3.1)",
+    "Mozilla/5.0 (iPad; CPU iPad OS 8_4_1 like Mac OS X) AppleWebKit/532.1 (KHTML, like Gecko) FxiOS/11.8j1465.0 Mobile/17F304 Safari/532.1",
+    "Opera/8.17.(X11; Linux i686; bho-IN) Presto/2.9.166 Version/12.00",
+    "Opera/8.64.(Windows 98; mi-NZ) Presto/2.9.174 Version/11.00",
+    "Mozilla/5.0 (Linux; Android 3.2.5) AppleWebKit/533.0 (KHTML, like Gecko) Chrome/54.0.805.0 Safari/533.0",
+    "Opera/8.82.(Windows NT 5.2; en-BW) Presto/2.9.179 Version/11.00",
+    "Opera/9.73.(X11; Linux x86_64; sa-IN) Presto/2.9.181 Version/11.00",
+    "Mozilla/5.0 (Windows 98; ha-NG; rv:1.9.0.20) Gecko/2087-07-16 23:19:20.094711 Firefox/3.6.11",
+    "Opera/9.87.(X11; Linux i686; iw-IL) Presto/2.9.186 Version/11.00",
+    "Mozilla/5.0 (Windows; U; Windows NT 5.0) AppleWebKit/532.2.6 (KHTML, like Gecko) Version/4.0.2 Safari/532.2.6",
+    "Mozilla/5.0 (Windows NT 5.1; bem-ZM; rv:1.9.1.20) Gecko/3919-12-27 04:24:28.198227 Firefox/15.0",
+    "Mozilla/5.0 (Macintosh; PPC Mac OS X 10_11_4 rv:2.0; wal-ET) AppleWebKit/534.40.6 (KHTML, like Gecko) Version/5.0.1 Safari/534.40.6",
+    "Mozilla/5.0 (Android 1.6; Mobile; rv:62.0) Gecko/62.0 Firefox/62.0",
+    "Mozilla/5.0 (compatible; MSIE 7.0; Windows 98; Trident/4.0)",
+    "Mozilla/5.0 (Linux; Android 1.6) AppleWebKit/533.2 (KHTML, like Gecko) Chrome/51.0.829.0 Safari/533.2",
+    "Mozilla/5.0 (compatible; MSIE 7.0; Windows 98; Win 9x 4.90; Trident/3.0)",
+    "Mozilla/5.0 (compatible; MSIE 7.0; Windows NT 5.1; Trident/4.1)",
+    "Mozilla/5.0 (Macintosh; U; PPC Mac OS X 10_7_2 rv:3.0; sd-PK) AppleWebKit/533.12.5 (KHTML, like Gecko) Version/4.0.1 Safari/533.12.5",
+    "Mozilla/5.0 (compatible; MSIE 8.0; Windows NT 6.1; Trident/3.0)",
+    "Mozilla/5.0 (Macintosh; U; PPC Mac OS X 10_7_9 rv:5.0; mt-MT) AppleWebKit/531.26.1 (KHTML, like Gecko) Version/4.0.2 Safari/531.26.1",
+    "Mozilla/5.0 (compatible; MSIE 9.0; Windows 95; Trident/4.1)",
+    "Mozilla/5.0 (Windows NT 4.0) AppleWebKit/534.2 (KHTML, like Gecko) Chrome/20.0.871.0 Safari/534.2",
+    "Mozilla/5.0 (compatible; MSIE 8.0; Windows NT 6.1; Trident/5.0)",
+    "Opera/9.89.(X11; Linux i686; ja-JP) Presto/2.9.186 Version/12.00",
+    "Opera/9.79.(Windows CE; ka-GE) Presto/2.9.184 Version/12.00",
+    "Mozilla/5.0 (Macintosh; PPC Mac OS X 10_11_4 rv:2.0; wae-CH) AppleWebKit/532.28.6 (KHTML, like Gecko) Version/5.0.1 Safari/532.28.6",
+    "Opera/9.46.(X11; Linux x86_64; nhn-MX) Presto/2.9.183 Version/11.00",
+    "Mozilla/5.0 (Android 2.3.6; Mobile; rv:25.0) Gecko/25.0 Firefox/25.0",
+    "Mozilla/5.0 (Macintosh; U; PPC Mac OS X 10_8_7 rv:5.0; tn-ZA) AppleWebKit/534.9.5 (KHTML, like Gecko) Version/5.0.3 Safari/534.9.5",
+    "Mozilla/5.0 (Android 4.4.1; Mobile; rv:54.0) Gecko/54.0 Firefox/54.0",
+    "Mozilla/5.0 (Windows 95; mhr-RU; rv:1.9.0.20) Gecko/3042-06-29 18:35:52.617058 Firefox/3.8",
+    "Mozilla/5.0 (Macintosh; U; Intel Mac OS X 10_9_0 rv:2.0; hu-HU) AppleWebKit/535.48.4 (KHTML, like Gecko) Version/5.0.4 Safari/535.48.4",
+    "Mozilla/5.0 (Windows NT 6.0) AppleWebKit/532.0 (KHTML, like Gecko) Chrome/19.0.877.0 Safari/532.0",
+    "Mozilla/5.0 (Macintosh; U; PPC Mac OS X 10_10_3 rv:2.0; km-KH) AppleWebKit/533.13.7 (KHTML, like Gecko) Version/5.1 Safari/533.13.7",
+    "Opera/8.20.(Windows NT 10.0; mr-IN) Presto/2.9.174 Version/11.00",
+    "Mozilla/5.0 (iPad; CPU iPad OS 5_1_1 like Mac OS X) AppleWebKit/532.0 (KHTML, like Gecko) CriOS/48.0.836.0 Mobile/26C379 Safari/532.0",
+    "Mozilla/5.0 (Windows; U; Windows NT 5.2) AppleWebKit/532.46.3 (KHTML, like Gecko) Version/5.0.5 Safari/532.46.3",
+    "Mozilla/5.0 (Android 1.1; Mobile; rv:46.0) Gecko/46.0 Firefox/46.0",
+    "Mozilla/5.0 (X11; Linux x86_64; rv:1.9.6.20) Gecko/9929-11-30 16:28:36.785797 Firefox/3.6.5",
+    "Mozilla/5.0 (iPod; U; CPU iPhone OS 4_1 like Mac OS X; mg-MG) AppleWebKit/534.46.2 (KHTML, like Gecko) Version/4.0.5 Mobile/8B116 Safari/6534.46.2",
+    "Mozilla/5.0 (Android 1.1; Mobile; rv:57.0) Gecko/57.0 Firefox/57.0",
+    "Mozilla/5.0 (iPhone; CPU iPhone OS 17_2 like Mac OS X) AppleWebKit/535.0 (KHTML, like Gecko) CriOS/58.0.819.0 Mobile/66E208 Safari/535.0",
+    "Mozilla/5.0 (iPod; U; CPU iPhone OS 4_1 like Mac OS X; tl-PH) AppleWebKit/531.17.3 (KHTML, like Gecko) Version/4.0.5 Mobile/8B113 Safari/6531.17.3",
+    "Opera/9.80.(Windows NT 4.0; ps-AF) Presto/2.9.160 Version/11.00",
+    "Opera/8.68.(X11; Linux i686; sd-PK) Presto/2.9.189 Version/12.00",
+    "Opera/8.44.(X11; Linux i686; mn-MN) Presto/2.9.175 Version/10.00",
+    "Mozilla/5.0 (Macintosh; PPC Mac OS X 10_10_2) AppleWebKit/533.2 (KHTML, like Gecko) Chrome/22.0.842.0 Safari/533.2",
+    "Mozilla/5.0 (compatible; MSIE 8.0; Windows NT 10.0; Trident/4.1)",
+    "Mozilla/5.0 (Android 4.1.2; Mobile; rv:38.0) Gecko/38.0 Firefox/38.0",
+    "Mozilla/5.0 (Android 2.3.1; Mobile; rv:29.0) Gecko/29.0 Firefox/29.0",
+    "Opera/9.21.(X11; Linux x86_64; ht-HT) Presto/2.9.188 Version/11.00",
+    "Mozilla/5.0 (compatible; MSIE 5.0; Windows NT 5.1; Trident/3.1)",
+    "Mozilla/5.0 (Macintosh; PPC Mac OS X 10_6_8; rv:1.9.5.20) Gecko/8101-06-07 02:33:09.935577 Firefox/10.0",
+    "Opera/8.30.(X11; Linux i686; tcy-IN) Presto/2.9.172 Version/11.00",
+    "Mozilla/5.0 (Android 14; Mobile; rv:9.0) Gecko/9.0 Firefox/9.0",
+    "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_10_0 rv:2.0; or-IN) AppleWebKit/532.30.5 (KHTML, like Gecko) Version/5.0 Safari/532.30.5",
+    "Opera/8.33.(X11; Linux x86_64; tr-CY) Presto/2.9.164 Version/11.00",
+    "Mozilla/5.0 (Windows NT 10.0; hu-HU; rv:1.9.2.20) Gecko/3554-10-23 18:36:57.613945 Firefox/3.6.14",
+    "Mozilla/5.0 (iPhone; CPU iPhone OS 9_3_5 like Mac OS X) AppleWebKit/535.2 (KHTML, like Gecko) FxiOS/12.4k0811.0 Mobile/77M108 Safari/535.2",
+    "Mozilla/5.0 (compatible; MSIE 5.0; Windows NT 5.1; Trident/5.1)",
+    "Mozilla/5.0 (iPhone; CPU iPhone OS 2_2_1 like Mac OS X) AppleWebKit/532.0 (KHTML, like Gecko) CriOS/14.0.841.0 Mobile/45H235 Safari/532.0",
+    "Mozilla/5.0 (Macintosh; U; Intel Mac OS X 10_8_2) AppleWebKit/531.0 (KHTML, like Gecko) Chrome/36.0.865.0 Safari/531.0",
+    "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/534.1 (KHTML, like Gecko) Chrome/38.0.874.0 Safari/534.1",
+    "Mozilla/5.0 (iPod; U; CPU iPhone OS 4_3 like Mac OS X; mi-NZ) AppleWebKit/531.10.6 (KHTML, like Gecko) Version/4.0.5 Mobile/8B113 Safari/6531.10.6",
+    "Mozilla/5.0 (compatible; MSIE 9.0; Windows 98; Trident/4.1)",
+    "Mozilla/5.0 (iPhone; CPU iPhone OS 17_1_1 like Mac OS X) AppleWebKit/533.0 (KHTML, like Gecko) FxiOS/17.8m6064.0 Mobile/95J460 Safari/533.0",
+    "Mozilla/5.0 (Windows NT 6.2; el-CY; rv:1.9.2.20) Gecko/6207-03-05 22:24:24.443710 Firefox/3.8",
+    "Mozilla/5.0 (Macintosh; PPC Mac OS X 10_11_1 rv:2.0; tcy-IN) AppleWebKit/535.41.6 (KHTML, like Gecko) Version/4.0.2 Safari/535.41.6",
+    "Mozilla/5.0 (Windows 98; Win 9x 4.90) AppleWebKit/536.1 (KHTML, like Gecko) Chrome/14.0.882.0 Safari/536.1",
+    "Opera/8.92.(Windows NT 5.1; sq-AL) Presto/2.9.189 Version/11.00",
+    "Mozilla/5.0 (Macintosh; U; PPC Mac OS X 10_11_7 rv:4.0; os-RU) AppleWebKit/534.22.2 (KHTML, like Gecko) Version/5.0.1 Safari/534.22.2",
+    "Mozilla/5.0 (Windows; U; Windows NT 5.2) AppleWebKit/532.30.1 (KHTML, like Gecko) Version/4.0.4 Safari/532.30.1",
+    "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_12_5; rv:1.9.6.20) Gecko/8585-10-01 18:11:23.667450 Firefox/3.6.5",
+    "Opera/9.94.(X11; Linux i686; he-IL) Presto/2.9.189 Version/10.00",
+    "Mozilla/5.0 (compatible; MSIE 7.0; Windows NT 5.01; Trident/5.0)",
+    "Mozilla/5.0 (Windows NT 10.0) AppleWebKit/534.1 (KHTML, like Gecko) Chrome/62.0.891.0 Safari/534.1",
+    "Mozilla/5.0 (iPad; CPU iPad OS 11_4_1 like Mac OS X) AppleWebKit/536.1 (KHTML, like Gecko) CriOS/40.0.806.0 Mobile/67T879 Safari/536.1",
+    "Mozilla/5.0 (iPad; CPU iPad OS 10_3_3 like Mac OS X) AppleWebKit/534.0 (KHTML, like Gecko) CriOS/13.0.866.0 Mobile/43F521 Safari/534.0",
+    "Opera/9.70.(Windows NT 5.2; fi-FI) Presto/2.9.167 Version/11.00",
+    "Mozilla/5.0 (Windows NT 11.0) AppleWebKit/534.0 (KHTML, like Gecko) Chrome/34.0.886.0 Safari/534.0",
+    "Mozilla/5.0 (iPod; U; CPU iPhone OS 4_3 like Mac OS X; mt-MT) AppleWebKit/532.25.2 (KHTML, like Gecko) Version/3.0.5 Mobile/8B118 Safari/6532.25.2",
+    "Mozilla/5.0 (compatible; MSIE 6.0; Windows NT 5.01; Trident/4.1)",
+    "Mozilla/5.0 (Macintosh; U; PPC Mac OS X 10_12_3) AppleWebKit/535.2 (KHTML, like Gecko) Chrome/40.0.830.0 Safari/535.2",
+    "Opera/8.17.(X11; Linux i686; sa-IN) Presto/2.9.166 Version/11.00",
+    "Mozilla/5.0 (X11; Linux x86_64; rv:1.9.7.20) Gecko/8128-04-29 11:24:00.471771 Firefox/3.8",
+    "Mozilla/5.0 (iPhone; CPU iPhone OS 17_1 like Mac OS X) AppleWebKit/535.1 (KHTML, like Gecko) FxiOS/18.8v5767.0 Mobile/45L732 Safari/535.1",
+    "Opera/8.77.(X11; Linux i686; tr-CY) Presto/2.9.190 Version/12.00",
+    "Opera/9.11.(Windows NT 5.01; si-LK) Presto/2.9.162 Version/12.00",
+    "Mozilla/5.0 (Windows NT 5.01; mg-MG; rv:1.9.0.20) Gecko/8141-03-23 21:10:23.369263 Firefox/3.8",
+    "Mozilla/5.0 (X11; Linux i686) AppleWebKit/534.2 (KHTML, like Gecko) Chrome/53.0.834.0 Safari/534.2",
+    "Mozilla/5.0 (iPhone; CPU iPhone OS 12_5_7 like Mac OS X) AppleWebKit/533.0 (KHTML, like Gecko) FxiOS/14.1p8192.0 Mobile/98S614 Safari/533.0",
+    "Mozilla/5.0 (Macintosh; U; PPC Mac OS X 10_6_1; rv:1.9.6.20) Gecko/9869-03-06 06:32:41.396698 Firefox/3.6.9",
+    "Mozilla/5.0 (Linux; Android 7.0) AppleWebKit/531.0 (KHTML, like Gecko) Chrome/30.0.874.0 Safari/531.0",
+    "Opera/8.39.(X11; Linux i686; my-MM) Presto/2.9.165 Version/12.00",
+    "Opera/8.26.(Windows 95; hne-IN) Presto/2.9.169 Version/10.00",
+    "Opera/8.73.(Windows NT 10.0; lo-LA) Presto/2.9.163 Version/12.00",
+    "Mozilla/5.0 (compatible; MSIE 7.0; Windows NT 5.01; Trident/4.1)",
+    "Mozilla/5.0 (iPhone; CPU iPhone OS 9_3_5 like Mac OS X) AppleWebKit/532.2 (KHTML, like Gecko) CriOS/60.0.831.0 Mobile/85H332 Safari/532.2",
+    "Mozilla/5.0 (compatible; MSIE 5.0; Windows NT 6.2; Trident/4.0)",
+    "Mozilla/5.0 (Linux; Android 5.1.1) AppleWebKit/534.0 (KHTML, like Gecko) Chrome/41.0.886.0 Safari/534.0",
+    "Mozilla/5.0 (compatible; MSIE 5.0; Windows NT 10.0; Trident/3.0)",
+    "Mozilla/5.0 (iPad; CPU iPad OS 14_2_1 like Mac OS X) AppleWebKit/532.1 (KHTML, like Gecko) FxiOS/14.2q5554.0 Mobile/29T840 Safari/532.1",
+    "Opera/8.34.(Windows NT 6.0; ml-IN) Presto/2.9.181 Version/12.00",
+    "Opera/9.53.(Windows NT 4.0; ru-RU) Presto/2.9.176 Version/10.00",
+    "Mozilla/5.0 (compatible; MSIE 8.0; Windows NT 4.0; Trident/4.0)",
+    "Mozilla/5.0 (Macintosh; U; Intel Mac OS X 10_6_9; rv:1.9.5.20) Gecko/9746-03-17 17:56:25.198059 Firefox/11.0",
+    "Mozilla/5.0 (Windows NT 6.1; ug-CN; rv:1.9.2.20) Gecko/8966-04-04 14:36:20.213470 Firefox/10.0",
+    "Opera/9.87.(X11; Linux i686; crh-UA) Presto/2.9.177 Version/12.00",
+    "Opera/8.97.(Windows NT 6.1; es-UY) Presto/2.9.189 Version/11.00",
+    "Mozilla/5.0 (Windows NT 6.1) AppleWebKit/535.0 (KHTML, like Gecko) Chrome/35.0.865.0 Safari/535.0",
+    "Mozilla/5.0 (X11; Linux i686) AppleWebKit/536.1 (KHTML, like Gecko) Chrome/51.0.851.0 Safari/536.1",
+    "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_6_0 rv:4.0; wo-SN) AppleWebKit/534.19.3 (KHTML, like Gecko) Version/4.1 Safari/534.19.3",
+    "Mozilla/5.0 (Windows NT 5.0) AppleWebKit/536.1 (KHTML, like Gecko) Chrome/56.0.862.0 Safari/536.1",
+    "Mozilla/5.0 (Android 4.0.3; Mobile; rv:14.0) Gecko/14.0 Firefox/14.0",
+    "Mozilla/5.0 (iPod; U; CPU iPhone OS 4_3 like Mac OS X; sr-RS) AppleWebKit/532.35.1 (KHTML, like Gecko) Version/4.0.5 Mobile/8B111 Safari/6532.35.1",
+    "Mozilla/5.0 (X11; Linux x86_64; rv:1.9.7.20) Gecko/7945-05-05 22:30:20.396362 Firefox/3.6.12",
+    "Mozilla/5.0 (compatible; MSIE 6.0; Windows NT 5.2; Trident/5.1)",
+    "Opera/8.42.(Windows NT 6.0; ky-KG) Presto/2.9.170 Version/10.00",
+    "Mozilla/5.0 (Macintosh; PPC Mac OS X 10_10_9 rv:3.0; os-RU) AppleWebKit/532.35.6 (KHTML, like Gecko) Version/4.0.4 Safari/532.35.6",
+    "Mozilla/5.0 (compatible; MSIE 9.0; Windows CE; Trident/4.1)",
+    "Mozilla/5.0 (compatible; MSIE 5.0; Windows 95; Trident/3.0)",
+    "Mozilla/5.0 (iPod; U; CPU iPhone OS 3_2 like Mac OS X; xh-ZA) AppleWebKit/532.36.4 (KHTML, like Gecko) Version/3.0.5 Mobile/8B115 Safari/6532.36.4",
+    "Mozilla/5.0 (Windows; U; Windows NT 6.1) AppleWebKit/534.20.5 (KHTML, like Gecko) Version/5.0.4 Safari/534.20.5",
+    "Mozilla/5.0 (Windows 98; Win 9x 4.90) AppleWebKit/531.2 (KHTML, like Gecko) Chrome/24.0.875.0 Safari/531.2",
+    "Opera/9.96.(X11; Linux i686; fy-NL) Presto/2.9.171 Version/12.00",
+    "Mozilla/5.0 (iPad; CPU iPad OS 14_8_1 like Mac OS X) AppleWebKit/533.2 (KHTML, like Gecko) FxiOS/17.0r6227.0 Mobile/30V239 Safari/533.2",
+    "Mozilla/5.0 (compatible; MSIE 6.0; Windows NT 4.0; Trident/5.1)",
+    "Mozilla/5.0 (Linux; Android 4.4) AppleWebKit/532.1 (KHTML, like Gecko) Chrome/37.0.865.0 Safari/532.1",
+    "Mozilla/5.0 (Macintosh; U; PPC Mac OS X 10_8_7 rv:3.0; kl-GL) AppleWebKit/532.50.6 (KHTML, like Gecko) Version/4.0.1 Safari/532.50.6",
+    "Mozilla/5.0 (iPhone; CPU iPhone OS 10_3_3 like Mac OS X) AppleWebKit/535.2 (KHTML, like Gecko) CriOS/48.0.873.0 Mobile/72H033 Safari/535.2",
+    "Mozilla/5.0 (Windows; U; Windows NT 5.0) AppleWebKit/534.39.4 (KHTML, like Gecko) Version/5.0.4 Safari/534.39.4",
+    "Mozilla/5.0 (iPhone; CPU iPhone OS 10_3_3 like Mac OS X) AppleWebKit/536.2 (KHTML, like Gecko) FxiOS/13.9n9132.0 Mobile/41L917 Safari/536.2",
+    "Opera/8.46.(X11; Linux x86_64; mk-MK) Presto/2.9.164 Version/11.00",
+    "Mozilla/5.0 (X11; Linux i686; rv:1.9.5.20) Gecko/5919-05-05 10:00:26.873428 Firefox/3.6.5",
+    "Mozilla/5.0 (X11; Linux i686) AppleWebKit/536.2 (KHTML, like Gecko) Chrome/58.0.876.0 Safari/536.2",
+    "Mozilla/5.0 (iPad; CPU iPad OS 17_1 like Mac OS X) AppleWebKit/532.1 (KHTML, like Gecko) CriOS/50.0.866.0 Mobile/05M546 Safari/532.1",
+    "Mozilla/5.0 (Android 3.2.3; Mobile; rv:25.0) Gecko/25.0 Firefox/25.0",
+    "Mozilla/5.0 (compatible; MSIE 6.0; Windows NT 5.1; Trident/4.1)",
+    "Mozilla/5.0 (Macintosh; U; Intel Mac OS X 10_9_1 rv:2.0; yi-US) AppleWebKit/534.9.5 (KHTML, like Gecko) Version/5.0 Safari/534.9.5",
+    "Opera/9.66.(X11; Linux i686; tt-RU) Presto/2.9.167 Version/11.00",
+    "Mozilla/5.0 (Macintosh; U; Intel Mac OS X 10_9_8; rv:1.9.2.20) Gecko/5286-12-19 13:33:13.045395 Firefox/3.8",
+    "Mozilla/5.0 (compatible; MSIE 8.0; Windows NT 11.0; Trident/3.0)",
+    "Mozilla/5.0 (compatible; MSIE 9.0; Windows NT 5.1; Trident/4.0)",
+    "Opera/8.49.(Windows 95; cmn-TW) Presto/2.9.163 Version/11.00",
+    "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_8_1 rv:3.0; si-LK) AppleWebKit/531.33.7 (KHTML, like Gecko) Version/4.0 Safari/531.33.7",
+    "Mozilla/5.0 (X11; Linux i686; rv:1.9.7.20) Gecko/2227-10-03 18:48:31.099147 Firefox/3.6.13",
+    "Mozilla/5.0 (Android 12; Mobile; rv:21.0) Gecko/21.0 Firefox/21.0",
+    "Mozilla/5.0 (Macintosh; U; Intel Mac OS X 10_11_7 rv:6.0; lb-LU) AppleWebKit/533.14.1 (KHTML, like Gecko) Version/4.1 Safari/533.14.1",
+    "Opera/9.80.(X11; Linux x86_64; mai-IN) Presto/2.9.169 Version/11.00",
+    "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/536.1 (KHTML, like Gecko) Chrome/43.0.870.0 Safari/536.1",
+    "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_8_2 rv:2.0; ckb-IQ) AppleWebKit/533.10.2 (KHTML, like Gecko) Version/5.0.1 Safari/533.10.2",
+    "Opera/8.94.(Windows NT 5.2; ayc-PE) Presto/2.9.175 Version/10.00",
+    "Mozilla/5.0 (Macintosh; U; Intel Mac OS X 10_8_7) AppleWebKit/534.2 (KHTML, like Gecko) Chrome/53.0.839.0 Safari/534.2",
+    "Mozilla/5.0 (Linux; Android 2.2.1) AppleWebKit/533.1 (KHTML, like Gecko) Chrome/51.0.899.0 Safari/533.1",
+    "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/531.1 (KHTML, like Gecko) Chrome/59.0.854.0 Safari/531.1",
+    "Mozilla/5.0 (X11; Linux x86_64; rv:1.9.7.20) Gecko/7884-02-25 00:08:25.188324 Firefox/3.6.12",
+    "Mozilla/5.0 (compatible; MSIE 8.0; Windows NT 10.0; Trident/3.1)",
+    "Opera/8.63.(X11; Linux x86_64; ast-ES) Presto/2.9.167 Version/11.00",
+    "Mozilla/5.0 (iPod; U; CPU iPhone OS 3_2 like Mac OS X; id-ID) AppleWebKit/533.50.7 (KHTML, like Gecko) Version/4.0.5 Mobile/8B119 Safari/6533.50.7",
+    "Mozilla/5.0 (Windows 95) AppleWebKit/532.1 (KHTML, like Gecko) Chrome/29.0.800.0 Safari/532.1",
+    "Opera/9.24.(X11; Linux x86_64; ta-LK) Presto/2.9.190 Version/11.00",
+    "Mozilla/5.0 (Windows NT 5.1) AppleWebKit/534.1 (KHTML, like Gecko) Chrome/39.0.896.0 Safari/534.1",
+    "Mozilla/5.0 (Macintosh; U; Intel Mac OS X 10_11_5 rv:6.0; ht-HT) AppleWebKit/531.20.6 (KHTML, like Gecko) Version/4.0 Safari/531.20.6",
+    "Mozilla/5.0 (Windows; U; Windows NT 5.1) AppleWebKit/533.17.3 (KHTML, like Gecko) Version/5.0.4 Safari/533.17.3",
+    "Mozilla/5.0 (compatible; MSIE 5.0; Windows 95; Trident/4.1)",
+    "Mozilla/5.0 (Windows; U; Windows NT 6.0) AppleWebKit/533.36.4 (KHTML, like Gecko) Version/5.0.5 Safari/533.36.4",
+    "Mozilla/5.0 (Windows NT 5.1) AppleWebKit/532.2 (KHTML, like Gecko) Chrome/34.0.890.0 Safari/532.2",
+    "Mozilla/5.0 (X11; Linux i686; rv:1.9.7.20) Gecko/5922-03-09 11:17:32.032654 Firefox/3.8",
+    "Mozilla/5.0 (Windows NT 6.1) AppleWebKit/534.1 (KHTML, like Gecko) Chrome/62.0.824.0 Safari/534.1",
+    "Mozilla/5.0 (compatible; MSIE 6.0; Windows NT 5.1; Trident/3.0)",
+    "Mozilla/5.0 (Macintosh; U; Intel Mac OS X 10_10_1 rv:2.0; byn-ER) AppleWebKit/535.39.4 (KHTML, like Gecko) Version/5.0.2 Safari/535.39.4",
+    "Mozilla/5.0 (Windows NT 5.2) AppleWebKit/532.2 (KHTML, like Gecko) Chrome/29.0.890.0 Safari/532.2",
+    "Mozilla/5.0 (iPhone; CPU iPhone OS 4_3_5 like Mac OS X) AppleWebKit/534.2 (KHTML, like Gecko) CriOS/26.0.881.0 Mobile/14D199 Safari/534.2",
+    "Mozilla/5.0 (compatible; MSIE 8.0; Windows NT 11.0; Trident/5.0)",
+    "Mozilla/5.0 (compatible; MSIE 9.0; Windows NT 5.01; Trident/4.1)",
+    "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_10_2) AppleWebKit/532.1 (KHTML, like Gecko) Chrome/25.0.830.0 Safari/532.1",
+    "Mozilla/5.0 (compatible; MSIE 5.0; Windows NT 6.0; Trident/5.0)",
+    "Mozilla/5.0 (compatible; MSIE 6.0; Windows NT 5.2; Trident/5.0)",
+    "Mozilla/5.0 (compatible; MSIE 8.0; Windows 98; Win 9x 4.90; Trident/3.0)",
+    "Opera/8.52.(X11; Linux x86_64; mt-MT) Presto/2.9.179 Version/11.00",
+    "Opera/8.20.(Windows NT 5.2; ar-SS) Presto/2.9.175 Version/10.00",
+    "Mozilla/5.0 (iPod; U; CPU iPhone OS 3_2 like Mac OS X; kok-IN) AppleWebKit/531.9.7 (KHTML, like Gecko) Version/4.0.5 Mobile/8B119 Safari/6531.9.7",
+    "Mozilla/5.0 (compatible; MSIE 8.0; Windows CE; Trident/4.0)",
+    "Mozilla/5.0 (Macintosh; PPC Mac OS X 10_6_9 rv:3.0; ms-MY) AppleWebKit/532.37.1 (KHTML, like Gecko) Version/5.0.1 Safari/532.37.1",
+)
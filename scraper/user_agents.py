@@ -0,0 +1,74 @@
+"""Rotating pool of browser user agents.
+
+The user agents are generated once (with Faker) and stored in `user_agent_data`, so no generator has
+to be loaded when the scraper starts. To regenerate the pool:
+    python -m scraper.user_agents --count 200
+"""
+from __future__ import annotations
+
+import argparse
+import itertools
+import os
+import random
+import threading
+from typing import Iterator
+
+from scraper.user_agent_data import USER_AGENTS
+
+# Each process walks the pool in its own random order:
+_pool: Iterator[str] | None = None
+_lock = threading.Lock()
+
+
+def user_agent() -> str:
+    """Get the next user agent of the pool.
+
+    Returns:
+        str: user agent string
+    """
+    global _pool
+
+    with _lock:
+        if _pool is None:
+            _pool = itertools.cycle(random.sample(USER_AGENTS, len(USER_AGENTS)))
+        return next(_pool)
+
+
+def generate(count: int, seed: int = 0) -> list:
+    """Generate unique user agents with Faker.
+
+    Args:
+        count (int): number of user agents
+        seed (int): seed of the generator, so the pool can be reproduced
+    Returns:
+        list: user agent strings
+    """
+    from faker import Faker
+
+    faker = Faker()
+    Faker.seed(seed)
+
+    user_agents: dict = {}
+    while len(user_agents) < count:
+        user_agents[faker.user_agent()] = None
+
+    return list(user_agents)
+
+
+if __name__ == "__main__":
+    import json
+
+    parser = argparse.ArgumentParser(description="Regenerate the user agent pool.")
+    parser.add_argument("--count", type=int, default=200, help="Number of user agents.")
+    parser.add_argument("--seed", type=int, default=0, help="Seed of the generator.")
+    args = parser.parse_args()
+
+    filename = os.path.join(os.path.dirname(__file__), "user_agent_data.py")
+    with open(filename, "w") as f:
+        f.write(
+            '"""User agents of the pool. Generated by: python -m scraper.user_agents"""\n\n'
+        )
+        f.write("USER_AGENTS = (\n")
+        for agent in generate(args.count, args.seed):
+            f.write(f"    {json.dumps(agent)},\n")
+        f.write(")\n")